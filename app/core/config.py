@@ -27,6 +27,7 @@ class Settings(BaseSettings):
     TEMPORAL_THRESHOLD_6M: float = 0.85
     TEMPORAL_THRESHOLD_12M: float = 0.90
     MIN_EVENTS_FOR_CLUSTERING: int = 10
+    CLUSTERING_NUMPY_MIN_CANDIDATES: int = 1000  # NumPy scoring kernel from this many; 0 = off
 
     # ---------------------------------------------------------------------------
     # Campaign lifecycle thresholds (days)
@@ -78,6 +79,44 @@ class Settings(BaseSettings):
     ACTOR_SUGGESTION_MIN_SCORE: float = 0.85
     ACTOR_SUGGESTION_LIMIT: int = 20
 
+    # ---------------------------------------------------------------------------
+    # Ingest performance tuning
+    # ---------------------------------------------------------------------------
+    INGEST_RECENT_ID_CACHE_SIZE: int = 0  # recently committed event ids kept in-process; 0 = off
+    GEOIP_CACHE_SIZE: int = 65536  # GeoIP/ASN lookups cached in-process; 0 = off
+    GEOIP_CACHE_TTL_SECONDS: int = 86400  # max age of a cached lookup
+    GEOIP_CACHE_PREFIX_LEN: int = 32  # IPv4 cache key prefix; 24 shares one entry per /24
+    INGEST_ASYNC_QUEUE_BATCHES: int = 0  # write-behind queue capacity in batches; 0 = synchronous
+    INGEST_ASYNC_MAX_COALESCE_EVENTS: int = 5000  # events per write-behind transaction
+    INGEST_ASYNC_RETRY_AFTER_SECONDS: int = 2  # Retry-After sent with 503 when the queue is full
+    INGEST_ASYNC_SPOOL_PATH: str = ""  # fsync'd spool file for crash safety; "" = none
+    INGEST_STREAM_CHUNK_EVENTS: int = 500  # events per rolling commit on /api/ingest/stream
+    INGEST_STREAM_MAX_LINE_BYTES: int = 1_048_576  # longer NDJSON lines are rejected
+    INGEST_STREAM_MAX_ERRORS: int = 1000  # error records returned in a stream receipt
+
+    # ---------------------------------------------------------------------------
+    # Database group-commit writer
+    # ---------------------------------------------------------------------------
+    DB_GROUP_COMMIT: bool = False  # route ingest/fingerprint/job writes through one writer thread
+    DB_GROUP_COMMIT_MAX_UNITS: int = 64  # write units per group commit
+    DB_GROUP_COMMIT_WINDOW_MS: int = 5  # how long the writer waits to fill a group
+
+    # ---------------------------------------------------------------------------
+    # Fingerprint computation
+    # ---------------------------------------------------------------------------
+    FINGERPRINT_INCREMENTAL: bool = True  # fold only new events into persisted per-IP state
+    FINGERPRINT_NUMPY_MIN_EVENTS: int = 1000  # NumPy timing backend from this many events; 0 = off
+    FINGERPRINT_WINDOW: str = "all"  # all | last_events | last_days | sample
+    FINGERPRINT_WINDOW_EVENTS: int = 100_000  # events kept by last_events/sample; last_days cap
+    FINGERPRINT_WINDOW_DAYS: int = 30  # days before the IP's newest event kept by last_days
+    FINGERPRINT_MIN_INTERVAL_SECONDS: int = 0  # debounce refreshes per IP; 0 = one per batch
+    FINGERPRINT_EXECUTOR: str = "inline"  # inline (API background tasks) | worker (app.jobs.worker)
+
+    # ---------------------------------------------------------------------------
+    # Observability
+    # ---------------------------------------------------------------------------
+    METRICS_ENABLED: bool = False  # ingest stage timings + GET /api/metrics (Prometheus)
+
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
     @field_validator(
@@ -178,6 +217,86 @@ class Settings(BaseSettings):
             raise ValueError(f"Age span threshold must be > 0; got {v}")
         return v
 
+    @field_validator(
+        "INGEST_RECENT_ID_CACHE_SIZE", "GEOIP_CACHE_SIZE", "INGEST_ASYNC_QUEUE_BATCHES"
+    )
+    @classmethod
+    def non_negative_cache_size(cls, v: int) -> int:
+        if v < 0:
+            raise ValueError(f"Cache size must be >= 0; got {v}")
+        return v
+
+    @field_validator("GEOIP_CACHE_TTL_SECONDS")
+    @classmethod
+    def positive_cache_ttl(cls, v: int) -> int:
+        if v < 1:
+            raise ValueError(f"Cache TTL must be >= 1 second; got {v}")
+        return v
+
+    @field_validator(
+        "INGEST_ASYNC_MAX_COALESCE_EVENTS",
+        "INGEST_ASYNC_RETRY_AFTER_SECONDS",
+        "INGEST_STREAM_CHUNK_EVENTS",
+        "INGEST_STREAM_MAX_LINE_BYTES",
+        "INGEST_STREAM_MAX_ERRORS",
+        "DB_GROUP_COMMIT_MAX_UNITS",
+    )
+    @classmethod
+    def positive_tuning_int(cls, v: int) -> int:
+        if v < 1:
+            raise ValueError(f"Value must be >= 1; got {v}")
+        return v
+
+    @field_validator("GEOIP_CACHE_PREFIX_LEN")
+    @classmethod
+    def valid_ipv4_prefix(cls, v: int) -> int:
+        if not 8 <= v <= 32:
+            raise ValueError(f"GEOIP_CACHE_PREFIX_LEN must be between 8 and 32; got {v}")
+        return v
+
+    @field_validator("DB_GROUP_COMMIT_WINDOW_MS")
+    @classmethod
+    def non_negative_window(cls, v: int) -> int:
+        if v < 0:
+            raise ValueError(f"DB_GROUP_COMMIT_WINDOW_MS must be >= 0; got {v}")
+        return v
+
+    @field_validator(
+        "FINGERPRINT_NUMPY_MIN_EVENTS",
+        "FINGERPRINT_MIN_INTERVAL_SECONDS",
+        "CLUSTERING_NUMPY_MIN_CANDIDATES",
+    )
+    @classmethod
+    def non_negative_int_setting(cls, v: int) -> int:
+        if v < 0:
+            raise ValueError(f"Value must be >= 0; got {v}")
+        return v
+
+    @field_validator("FINGERPRINT_WINDOW")
+    @classmethod
+    def fingerprint_window_valid(cls, v: str) -> str:
+        allowed = {"all", "last_events", "last_days", "sample"}
+        normalized = v.lower()
+        if normalized not in allowed:
+            raise ValueError(f"FINGERPRINT_WINDOW must be one of {sorted(allowed)}; got {v!r}")
+        return normalized
+
+    @field_validator("FINGERPRINT_EXECUTOR")
+    @classmethod
+    def fingerprint_executor_valid(cls, v: str) -> str:
+        allowed = {"inline", "worker"}
+        normalized = v.lower()
+        if normalized not in allowed:
+            raise ValueError(f"FINGERPRINT_EXECUTOR must be one of {sorted(allowed)}; got {v!r}")
+        return normalized
+
+    @field_validator("FINGERPRINT_WINDOW_EVENTS", "FINGERPRINT_WINDOW_DAYS")
+    @classmethod
+    def positive_fingerprint_window(cls, v: int) -> int:
+        if v < 1:
+            raise ValueError(f"Value must be >= 1; got {v}")
+        return v
+
     @model_validator(mode="after")
     def weights_sum_to_one(self) -> "Settings":
         total = (
@@ -4,12 +4,23 @@ SQLite connection factory for LegionTrap TI.
 Sync-only SQLAlchemy 2.x engine. SQLite has no true async I/O; aiosqlite is a
 thread-pool wrapper with no benefit over sync + FastAPI's thread pool executor.
 All database access goes through app/db/repository.py — no SQL in routers.
+
+Writers that would otherwise contend for SQLite's single write lock can route
+through run_write(), which funnels them into group commits on one thread when
+DB_GROUP_COMMIT is enabled (see GroupCommitWriter).
 """
 
 from __future__ import annotations
 
-from collections.abc import Generator
+import logging
+import queue
+import threading
+import time
+from collections.abc import Callable, Generator
+from concurrent.futures import Future
 from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, TypeVar
 
 from sqlalchemy import Engine, create_engine, event, text
 from sqlalchemy.orm import Session, sessionmaker
@@ -17,6 +28,10 @@ from sqlalchemy.pool import StaticPool
 
 from app.core.config import settings
 
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
 _engine: Engine | None = None
 _SessionLocal: sessionmaker | None = None
 
@@ -129,6 +144,17 @@ def create_all_tables(engine: Engine) -> None:
                 "FOREIGN KEY (event_type) REFERENCES event_types(id))"
             )
         )
+        conn.execute(
+            text(
+                "CREATE TABLE IF NOT EXISTS event_fingerprint_fields ("
+                "id TEXT PRIMARY KEY, source TEXT NOT NULL, "
+                "username_class TEXT, password_class TEXT, "
+                "password_length INTEGER, password_flags INTEGER, "
+                "ssh_kex TEXT, tls_ciphers TEXT, "
+                "derivation_version INTEGER NOT NULL DEFAULT 1, "
+                "FOREIGN KEY (id) REFERENCES raw_events(id) ON DELETE CASCADE)"
+            )
+        )
         conn.execute(
             text(
                 "CREATE TABLE IF NOT EXISTS audit_log ("
@@ -156,6 +182,7 @@ def create_all_tables(engine: Engine) -> None:
                 "target_features TEXT, "
                 "tool_signals TEXT, "
                 "confidence REAL NOT NULL DEFAULT 0.5, "
+                "features_hash TEXT, "
                 "FOREIGN KEY (source_ip) REFERENCES source_ips(ip))"
             )
         )
@@ -177,7 +204,8 @@ def create_all_tables(engine: Engine) -> None:
                 "created_at TEXT NOT NULL, "
                 "updated_at TEXT NOT NULL, "
                 "representative_fingerprint_json TEXT, "
-                "behavioral_stability_json TEXT)"
+                "behavioral_stability_json TEXT, "
+                "representative_version INTEGER NOT NULL DEFAULT 0)"
             )
         )
         conn.execute(
@@ -242,7 +270,10 @@ def create_all_tables(engine: Engine) -> None:
                 "result_summary_json TEXT, "
                 "error_message TEXT, "
                 "backend_metadata_json TEXT, "
-                "ai_output_id TEXT)"
+                "ai_output_id TEXT, "
+                "worker_id TEXT, "
+                "lease_expires_at TEXT, "
+                "attempts INTEGER NOT NULL DEFAULT 0)"
             )
         )
 
@@ -310,7 +341,22 @@ def create_all_tables(engine: Engine) -> None:
                 "protocol_features TEXT, "
                 "credential_features TEXT, "
                 "target_features TEXT, "
-                "created_at TEXT NOT NULL)"
+                "created_at TEXT NOT NULL, "
+                "fingerprint_window TEXT)"
+            )
+        )
+
+        # Incremental fingerprint accumulators (cache; rebuilt from events).
+        conn.execute(
+            text(
+                "CREATE TABLE IF NOT EXISTS fingerprint_state ("
+                "source_ip TEXT PRIMARY KEY, "
+                "fingerprint_version INTEGER NOT NULL, "
+                "state_version INTEGER NOT NULL, "
+                "event_count INTEGER NOT NULL, "
+                "watermark TEXT, "
+                "state_json TEXT NOT NULL, "
+                "updated_at TEXT NOT NULL)"
             )
         )
 
@@ -407,3 +453,184 @@ def get_session() -> Generator[Session, None, None]:
         raise
     finally:
         session.close()
+
+
+# ---------------------------------------------------------------------------
+# Group-commit writer
+# ---------------------------------------------------------------------------
+#
+# SQLite admits one writer at a time. Ingest requests (threadpool), fingerprint
+# background tasks and job transitions otherwise race for that lock and surface
+# "database is locked" or long busy-waits under load. With DB_GROUP_COMMIT on,
+# their write units are funnelled to one thread that commits them in groups.
+
+
+@dataclass
+class _WriteUnit:
+    fn: Callable[[Session], Any]
+    future: Future
+
+
+class GroupCommitWriter:
+    """Single writer thread that runs write units from any thread in group commits.
+
+    A write unit is a callable taking a Session; it must not commit or close
+    the session. Units arriving within window_seconds of the first one (up to
+    max_units) share one transaction, each inside its own SAVEPOINT: a unit
+    that raises rolls back only its own writes and its future carries the
+    exception. Futures of the other units resolve after the group commits. If
+    the group fails — the commit, or a SAVEPOINT begin or rollback — every
+    unit whose future is not yet resolved is re-run in a transaction of its
+    own.  An unexpected error fails the group's unresolved futures rather
+    than the writer thread.
+    """
+
+    def __init__(self, max_units: int, window_seconds: float) -> None:
+        if max_units < 1:
+            raise ValueError(f"max_units must be >= 1; got {max_units}")
+        self._max_units = max_units
+        self._window = window_seconds
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, fn: Callable[[Session], T]) -> Future[T]:
+        """Queue fn for the writer thread; the future resolves once it is committed."""
+        if threading.current_thread() is self._thread:
+            # The writer would wait on itself.
+            raise RuntimeError("write units must not submit to the writer")
+        future: Future[T] = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("GroupCommitWriter is closed")
+            self._queue.put(_WriteUnit(fn, future))
+        return future
+
+    def close(self, timeout: float | None = None) -> None:
+        """Commit every unit already submitted, then stop the writer thread."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while True:
+            unit = self._queue.get()
+            if unit is None:
+                return
+            group = [unit]
+            stop = False
+            deadline = time.monotonic() + self._window
+            while len(group) < self._max_units:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    nxt = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    stop = True
+                    break
+                group.append(nxt)
+            try:
+                self._commit_group([u for u in group if u.future.set_running_or_notify_cancel()])
+            except Exception as exc:
+                # Never let the writer thread die: later run_write() calls would hang.
+                logger.exception("Group-commit writer failed on a group of %d unit(s)", len(group))
+                for u in group:
+                    if not u.future.done():
+                        u.future.set_exception(exc)
+            if stop:
+                return
+
+    def _commit_group(self, group: list[_WriteUnit]) -> None:
+        done: list[tuple[_WriteUnit, Any]] = []
+        committed = False
+        try:
+            session: Session = _get_session_factory()()
+            try:
+                for unit in group:
+                    savepoint = session.begin_nested()
+                    try:
+                        result = unit.fn(session)
+                        savepoint.commit()
+                    except Exception as exc:
+                        savepoint.rollback()
+                        unit.future.set_exception(exc)
+                        continue
+                    done.append((unit, result))
+                session.commit()
+                committed = True
+            except Exception:
+                session.rollback()
+                raise
+            finally:
+                session.close()
+        except Exception:
+            if not committed:
+                logger.warning("Group commit of %d unit(s) failed; retrying each", len(group))
+
+        if committed:
+            for unit, result in done:
+                unit.future.set_result(result)
+            return
+        # Every unit not yet resolved — including any the failure interrupted
+        # before it ran — is re-run in a transaction of its own.
+        for unit in group:
+            if unit.future.done():
+                continue
+            try:
+                with get_session() as retry_session:
+                    result = unit.fn(retry_session)
+            except Exception as exc:
+                unit.future.set_exception(exc)
+            else:
+                unit.future.set_result(result)
+
+
+_writer: GroupCommitWriter | None = None
+_writer_lock = threading.Lock()
+
+
+def get_group_commit_writer() -> GroupCommitWriter | None:
+    """Return the process-wide writer, or None when DB_GROUP_COMMIT is off."""
+    global _writer
+    if not settings.DB_GROUP_COMMIT:
+        return None
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = GroupCommitWriter(
+                    settings.DB_GROUP_COMMIT_MAX_UNITS,
+                    settings.DB_GROUP_COMMIT_WINDOW_MS / 1000,
+                )
+    return _writer
+
+
+def shutdown_group_commit_writer(timeout: float | None = None) -> None:
+    """Flush and stop the process-wide writer. Called on application shutdown."""
+    global _writer
+    with _writer_lock:
+        writer, _writer = _writer, None
+    if writer is not None:
+        writer.close(timeout)
+
+
+def run_write(fn: Callable[[Session], T]) -> T:
+    """Run the write unit fn(session) and return its result once committed.
+
+    With DB_GROUP_COMMIT on the unit goes through the group-commit writer;
+    otherwise it runs in a get_session() transaction of its own on the calling
+    thread. Either way an exception raised by fn propagates to the caller and
+    none of fn's writes are kept.
+    """
+    writer = get_group_commit_writer()
+    if writer is None:
+        with get_session() as session:
+            return fn(session)
+    return writer.submit(fn).result()
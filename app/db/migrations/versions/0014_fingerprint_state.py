@@ -0,0 +1,61 @@
+"""Incremental fingerprint state.
+
+Revision ID: 0014
+Revises: 0013
+Create Date: 2026-10-17
+
+Creates: fingerprint_state
+
+One row per source IP holding the serialised FingerprintState
+(app/intelligence/incremental.py) the IP's current behavioral fingerprint was
+rendered from.  A fingerprint refresh folds only the events ingested after
+the row's watermark into the state instead of re-reading the IP's whole
+history.
+
+The table is a cache.  Deleting a row (or the whole table's contents) is
+always safe: the next refresh rebuilds the state from events.  The state
+holds feature accumulators only — counts, moments, pattern classes — never
+raw credentials or payloads.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0014"
+down_revision: str | None = "0013"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    # ------------------------------------------------------------------
+    # fingerprint_state — per-IP incremental fingerprint accumulators.
+    #
+    # source_ip:           The IP the state summarises.
+    # fingerprint_version: FINGERPRINT_VERSION the state was built under.
+    # state_version:       FINGERPRINT_STATE_VERSION of state_json's layout;
+    #                      a mismatch discards the row and rebuilds.
+    # event_count:         Events folded into the state; checked against
+    #                      COUNT(events) before an incremental refresh.
+    # watermark:           Highest raw_events.ingested_at folded in.
+    # state_json:          Serialised FingerprintState.
+    # updated_at:          When the state was last written.
+    # ------------------------------------------------------------------
+    op.create_table(
+        "fingerprint_state",
+        sa.Column("source_ip", sa.Text, primary_key=True),
+        sa.Column("fingerprint_version", sa.Integer, nullable=False),
+        sa.Column("state_version", sa.Integer, nullable=False),
+        sa.Column("event_count", sa.Integer, nullable=False),
+        sa.Column("watermark", sa.Text, nullable=True),
+        sa.Column("state_json", sa.Text, nullable=False),
+        sa.Column("updated_at", sa.Text, nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("fingerprint_state")
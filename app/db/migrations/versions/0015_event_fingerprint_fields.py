@@ -0,0 +1,180 @@
+"""Typed per-event fingerprint fields.
+
+Revision ID: 0015
+Revises: 0014
+Create Date: 2026-10-17
+
+Creates: event_fingerprint_fields
+
+One row per raw event holding the few sensor fields fingerprinting reads —
+credential pattern classes, password length and character-class bits, SSH KEX
+and TLS cipher orderings, sensor source — derived at ingest by
+fingerprint_fields() (app/intelligence/sequence.py).  The fingerprint event
+fetch reads these typed columns instead of decoding raw_events.raw_json for
+every event of an IP.  Raw usernames and passwords are never copied here;
+they stay in raw_json.
+
+Existing raw_events rows are backfilled in batches.  The backfill decodes each
+raw_json once; afterwards only ingest writes the table.  The backfill uses a
+frozen copy of the derivation as it stood at this revision (derivation
+version 1, see migration 0021), not the live application code, so its result
+does not change when fingerprint_fields() does.
+"""
+
+from __future__ import annotations
+
+import json
+from collections.abc import Sequence
+from typing import Any
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0015"
+down_revision: str | None = "0014"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+_BACKFILL_BATCH = 5000
+
+
+def upgrade() -> None:
+    # ------------------------------------------------------------------
+    # event_fingerprint_fields — fingerprint inputs extracted at ingest.
+    #
+    # id:              raw_events.id (= events.id); cascades on retention.
+    # source:          Sensor identifier, copied from raw_events.source.
+    # username_class:  Username pattern class; NULL when no username.
+    # password_class:  Password pattern class; NULL when no password.
+    # password_length: Password length in characters; NULL when no password.
+    # password_flags:  Bit set of upper (1), lower (2), digit (4), special (8).
+    # ssh_kex:         JSON array of KEX algorithm names, or NULL.
+    # tls_ciphers:     JSON array of cipher suite IDs, or NULL.
+    # ------------------------------------------------------------------
+    op.create_table(
+        "event_fingerprint_fields",
+        sa.Column("id", sa.Text, primary_key=True),
+        sa.Column("source", sa.Text, nullable=False),
+        sa.Column("username_class", sa.Text, nullable=True),
+        sa.Column("password_class", sa.Text, nullable=True),
+        sa.Column("password_length", sa.Integer, nullable=True),
+        sa.Column("password_flags", sa.Integer, nullable=True),
+        sa.Column("ssh_kex", sa.Text, nullable=True),
+        sa.Column("tls_ciphers", sa.Text, nullable=True),
+        sa.ForeignKeyConstraint(["id"], ["raw_events.id"], ondelete="CASCADE"),
+    )
+    _backfill()
+
+
+def _backfill() -> None:
+    conn = op.get_bind()
+    insert = sa.text("""
+        INSERT INTO event_fingerprint_fields (
+            id, source, username_class, password_class, password_length,
+            password_flags, ssh_kex, tls_ciphers
+        ) VALUES (
+            :id, :source, :username_class, :password_class, :password_length,
+            :password_flags, :ssh_kex, :tls_ciphers
+        )
+    """)
+    after = ""
+    while True:
+        rows = conn.execute(
+            sa.text("""
+                SELECT id, source, raw_json FROM raw_events
+                WHERE id > :after ORDER BY id LIMIT :limit
+            """),
+            {"after": after, "limit": _BACKFILL_BATCH},
+        ).fetchall()
+        if not rows:
+            return
+        params = []
+        for event_id, source, raw_json in rows:
+            try:
+                data = json.loads(raw_json).get("data")
+            except (json.JSONDecodeError, AttributeError, TypeError):
+                data = None
+            fields = _fingerprint_fields(data if isinstance(data, dict) else {})
+            params.append(
+                {
+                    **fields,
+                    "id": event_id,
+                    "source": source,
+                    "ssh_kex": _json_or_none(fields["ssh_kex"]),
+                    "tls_ciphers": _json_or_none(fields["tls_ciphers"]),
+                }
+            )
+        conn.execute(insert, params)
+        after = rows[-1][0]
+
+
+def _json_or_none(value: list[str] | None) -> str | None:
+    return None if value is None else json.dumps(value)
+
+
+# ---------------------------------------------------------------------------
+# Frozen copy of fingerprint_fields() (app/intelligence/sequence.py) at
+# derivation version 1.  Do not change: later derivations are applied to
+# stored rows by the refingerprint job, not by this migration.
+# ---------------------------------------------------------------------------
+
+
+def _classify_username(username: str) -> str:
+    if not username:
+        return "empty"
+    if "@" in username:
+        return "email"
+    if username.isdigit():
+        return "numeric"
+    if username.isalpha():
+        return "alpha"
+    if username.isalnum():
+        return "alphanum"
+    return "special"
+
+
+def _classify_password(password: str) -> str:
+    if not password:
+        return "empty"
+    if password.isdigit():
+        return "numeric"
+    if password.isalpha():
+        return "alpha"
+    if password.isalnum():
+        return "alphanum"
+    return "special"
+
+
+def _password_flag_bits(pw: str) -> int:
+    """Bits: upper 1, lower 2, digit 4, special 8."""
+    flags = (
+        any(c.isupper() for c in pw),
+        any(c.islower() for c in pw),
+        any(c.isdigit() for c in pw),
+        any(not c.isalnum() for c in pw),
+    )
+    return sum(bit for bit, flag in zip((1, 2, 4, 8), flags, strict=True) if flag)
+
+
+def _string_list(value: Any) -> list[str] | None:
+    if isinstance(value, list) and all(isinstance(v, str) for v in value):
+        return value
+    return None
+
+
+def _fingerprint_fields(data: dict[str, Any]) -> dict[str, Any]:
+    username = data.get("username")
+    password = data.get("password")
+    pw = str(password) if password is not None else None
+    return {
+        "username_class": _classify_username(str(username)) if username is not None else None,
+        "password_class": _classify_password(pw) if pw is not None else None,
+        "password_length": len(pw) if pw is not None else None,
+        "password_flags": _password_flag_bits(pw) if pw is not None else None,
+        "ssh_kex": _string_list(data.get("kex_algs") or data.get("kex_algorithms")),
+        "tls_ciphers": _string_list(data.get("tls_cipher_suites") or data.get("ja3_ciphers")),
+    }
+
+
+def downgrade() -> None:
+    op.drop_table("event_fingerprint_fields")
@@ -0,0 +1,39 @@
+"""Fingerprint window on fingerprint_history.
+
+Revision ID: 0016
+Revises: 0015
+Create Date: 2026-10-17
+
+Adds: fingerprint_history.fingerprint_window
+
+Fingerprints may be built from a bounded window of an IP's events
+(FINGERPRINT_WINDOW: newest N events, last T days, or a deterministic sample)
+instead of all of them.  Each history snapshot records the FingerprintWindow
+label it was built from — e.g. "all", "last_events:100000", "sample:5000" —
+so stability scoring compares only snapshots built the same way.
+
+Existing rows keep NULL: they were all built from every event ("all").
+"""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0016"
+down_revision: str | None = "0015"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "fingerprint_history",
+        sa.Column("fingerprint_window", sa.Text, nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("fingerprint_history", "fingerprint_window")
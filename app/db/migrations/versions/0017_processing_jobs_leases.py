@@ -0,0 +1,54 @@
+"""Worker leases on processing_jobs.
+
+Revision ID: 0017
+Revises: 0016
+Create Date: 2026-10-17
+
+Adds: processing_jobs.worker_id, processing_jobs.lease_expires_at,
+      processing_jobs.attempts, idx_processing_jobs_claim
+
+Out-of-process workers (python -m app.jobs.worker) claim pending jobs with
+JobRepository.claim_jobs(): the claim records which worker holds the job and
+until when, and the worker extends the lease with heartbeat() while it runs.
+A job whose lease expires is re-queued to pending; attempts counts claims so
+a job that keeps killing its worker is failed after a bounded number of tries.
+
+idx_processing_jobs_claim (job_type, status, created_at) serves the claim
+query — oldest pending jobs of one type — without scanning the table.
+
+Existing rows keep NULL worker_id / lease_expires_at and attempts = 0: they
+were started in-process and remain subject to the started_at timeout.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0017"
+down_revision: str | None = "0016"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column("processing_jobs", sa.Column("worker_id", sa.Text, nullable=True))
+    op.add_column("processing_jobs", sa.Column("lease_expires_at", sa.Text, nullable=True))
+    op.add_column(
+        "processing_jobs",
+        sa.Column("attempts", sa.Integer, nullable=False, server_default="0"),
+    )
+    op.create_index(
+        "idx_processing_jobs_claim",
+        "processing_jobs",
+        ["job_type", "status", "created_at"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("idx_processing_jobs_claim", table_name="processing_jobs")
+    op.drop_column("processing_jobs", "attempts")
+    op.drop_column("processing_jobs", "lease_expires_at")
+    op.drop_column("processing_jobs", "worker_id")
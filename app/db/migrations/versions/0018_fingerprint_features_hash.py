@@ -0,0 +1,41 @@
+"""Content hash on behavioral_fingerprints.
+
+Revision ID: 0018
+Revises: 0017
+Create Date: 2026-10-17
+
+Adds: behavioral_fingerprints.features_hash
+
+A SHA-256 digest of the fingerprint's feature columns, confidence,
+fingerprint version and window label (fingerprint_content_hash() in
+app/intelligence/fingerprint.py).  A recompute whose digest matches the
+stored one changed nothing but the event count: it skips the
+fingerprint_history snapshot, the campaign representative update and the
+stability refresh.
+
+Existing rows keep NULL, so their next recompute is always treated as a
+change and stores the digest.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0018"
+down_revision: str | None = "0017"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "behavioral_fingerprints",
+        sa.Column("features_hash", sa.Text, nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("behavioral_fingerprints", "features_hash")
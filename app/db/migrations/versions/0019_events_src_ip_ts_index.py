@@ -0,0 +1,33 @@
+"""Per-IP chronological index on events.
+
+Revision ID: 0019
+Revises: 0018
+Create Date: 2026-10-17
+
+Adds: idx_events_src_ip_ts (src_ip, ts)
+
+The bulk re-fingerprint job (app/jobs/refingerprint.py) reads the events of a
+range of source IPs in one scan ordered by (src_ip, ts).  With only
+idx_events_src_ip that scan sorts every row it reads; this index returns the
+rows already in order, and also serves the per-IP fingerprint event fetches,
+which are ordered by ts.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+
+from alembic import op
+
+revision: str = "0019"
+down_revision: str | None = "0018"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_index("idx_events_src_ip_ts", "events", ["src_ip", "ts"])
+
+
+def downgrade() -> None:
+    op.drop_index("idx_events_src_ip_ts", table_name="events")
@@ -0,0 +1,39 @@
+"""Version stamp on the campaign representative fingerprint.
+
+Revision ID: 0020
+Revises: 0019
+Create Date: 2026-10-17
+
+Adds: campaigns.representative_version
+
+Incremented by update_representative_fingerprint() every time
+representative_fingerprint_json is rewritten.  The process-wide clustering
+candidate cache (app/intelligence/candidate_cache.py) keeps each campaign's
+parsed representative fingerprint together with the version it was parsed
+at, and re-reads only the campaigns whose version has moved on.
+
+Existing rows start at 0.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0020"
+down_revision: str | None = "0019"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "campaigns",
+        sa.Column("representative_version", sa.Integer, nullable=False, server_default="0"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("campaigns", "representative_version")
@@ -0,0 +1,40 @@
+"""Derivation version stamp on event_fingerprint_fields.
+
+Revision ID: 0021
+Revises: 0020
+Create Date: 2026-10-17
+
+Adds: event_fingerprint_fields.derivation_version
+
+The FINGERPRINT_FIELDS_VERSION (app/intelligence/constants.py) of the
+fingerprint_fields() derivation a row was written with.  Ingest stamps new
+rows with the current version; the refingerprint job (app/jobs/refingerprint.py)
+re-derives rows stamped with an older version from raw_events.raw_json before
+rebuilding their IP's fingerprint.
+
+Existing rows — backfilled by 0015 or written by ingest since — carry
+derivation version 1.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0021"
+down_revision: str | None = "0020"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "event_fingerprint_fields",
+        sa.Column("derivation_version", sa.Integer, nullable=False, server_default="1"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("event_fingerprint_fields", "derivation_version")
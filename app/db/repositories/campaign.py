@@ -96,7 +96,9 @@ class CampaignRepository(RepositoryBase):
             "behavioral_stability_json": row[14],
         }
 
-    def get_campaigns_for_clustering(self) -> list[dict[str, Any]]:
+    def get_campaigns_for_clustering(
+        self, campaign_ids: list[str] | None = None
+    ) -> list[dict[str, Any]]:
         """Return active/dormant/reactivated campaigns with a representative fingerprint.
 
         Fast path: when representative_fingerprint_json is populated on the
@@ -106,13 +108,29 @@ class CampaignRepository(RepositoryBase):
         is NULL (or fails to parse), fall back to per-member + behavioral_fingerprints
         lookup.  This handles pre-migration rows and any cache-miss edge cases.
 
+        campaign_ids, when given, restricts the result to those campaigns.
+
         Campaigns with no members or no stored fingerprint are silently excluded.
         """
-        campaign_rows = self._session.execute(text("""
-                SELECT id, status, last_seen, representative_fingerprint_json
-                FROM campaigns
-                WHERE status IN ('active', 'dormant', 'reactivated')
-            """)).fetchall()
+        if campaign_ids is None:
+            campaign_rows = self._session.execute(text("""
+                    SELECT id, status, last_seen, representative_fingerprint_json
+                    FROM campaigns
+                    WHERE status IN ('active', 'dormant', 'reactivated')
+                """)).fetchall()
+        elif not campaign_ids:
+            return []
+        else:
+            placeholders = ", ".join(f":c{i}" for i in range(len(campaign_ids)))
+            campaign_rows = self._session.execute(
+                text(f"""
+                    SELECT id, status, last_seen, representative_fingerprint_json
+                    FROM campaigns
+                    WHERE status IN ('active', 'dormant', 'reactivated')
+                      AND id IN ({placeholders})
+                """),
+                {f"c{i}": cid for i, cid in enumerate(campaign_ids)},
+            ).fetchall()
 
         if not campaign_rows:
             return []
@@ -221,11 +239,15 @@ class CampaignRepository(RepositoryBase):
         behavioral_fingerprints remains the authoritative source; this is a
         denormalized cache to avoid O(n) per-campaign member + fingerprint lookups
         in get_campaigns_for_clustering().
+
+        representative_version is incremented so that in-process caches of the
+        parsed fingerprint (app/intelligence/candidate_cache.py) re-read it.
         """
         self._session.execute(
             text("""
                 UPDATE campaigns
-                SET representative_fingerprint_json = :fp_json
+                SET representative_fingerprint_json = :fp_json,
+                    representative_version = representative_version + 1
                 WHERE id = :campaign_id
             """),
             {
@@ -234,6 +256,65 @@ class CampaignRepository(RepositoryBase):
             },
         )
 
+    def list_clustering_candidate_versions(self) -> list[dict[str, Any]]:
+        """Return the clustering candidates without their fingerprints.
+
+        One row per active/dormant/reactivated campaign: campaign_id, status,
+        last_seen, weight_profile (None when no calibrated profile exists) and
+        representative_version — None when representative_fingerprint_json is
+        NULL, so the campaign can only be compared through the slow path of
+        get_campaigns_for_clustering().  Rows come back in the same order as
+        get_campaigns_for_clustering() visits the campaigns.
+        """
+        rows = self._session.execute(text("""
+                SELECT c.id, c.status, c.last_seen, c.representative_version,
+                       (c.representative_fingerprint_json IS NOT NULL) AS has_fingerprint,
+                       wp.weight_timing, wp.weight_sequence, wp.weight_protocol,
+                       wp.weight_credential, wp.weight_target
+                FROM campaigns c
+                LEFT JOIN campaign_weight_profiles wp ON wp.campaign_id = c.id
+                WHERE c.status IN ('active', 'dormant', 'reactivated')
+            """)).fetchall()
+        return [
+            {
+                "campaign_id": r[0],
+                "status": r[1],
+                "last_seen": r[2],
+                "representative_version": r[3] if r[4] else None,
+                "weight_profile": (
+                    {
+                        "timing": r[5],
+                        "sequence": r[6],
+                        "protocol": r[7],
+                        "credential": r[8],
+                        "target": r[9],
+                    }
+                    if r[5] is not None
+                    else None
+                ),
+            }
+            for r in rows
+        ]
+
+    def get_representative_fingerprints(self, campaign_ids: list[str]) -> dict[str, str]:
+        """Return {campaign_id: representative_fingerprint_json} for campaign_ids.
+
+        Campaigns without a representative fingerprint are omitted.
+        """
+        if not campaign_ids:
+            return {}
+        placeholders = ", ".join(f":c{i}" for i in range(len(campaign_ids)))
+        rows = self._session.execute(
+            text(f"""
+                SELECT id, representative_fingerprint_json
+                FROM campaigns
+                WHERE id IN ({placeholders})
+                  AND representative_fingerprint_json IS NOT NULL
+            """),
+            {f"c{i}": cid for i, cid in enumerate(campaign_ids)},
+        ).fetchall()
+        return {r[0]: r[1] for r in rows}
+
     def get_representative_fingerprint(self, campaign_id: str) -> str | None:
         """Return the cached representative_fingerprint_json, or None if not set."""
         row = self._session.execute(
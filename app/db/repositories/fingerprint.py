@@ -1,4 +1,5 @@
-"""Fingerprint repository methods: reads and writes for behavioral_fingerprints.
+"""Fingerprint repository methods: reads and writes for behavioral_fingerprints
+and the incremental fingerprint_state cache.
 
 All SQL lives in this module.  No application logic, no fingerprint computation.
 The caller owns the session and transaction boundary.
@@ -13,6 +14,8 @@ from __future__ import annotations
 
 import json
 import uuid
+from collections import deque
+from collections.abc import Iterator
 from typing import Any
 
 from sqlalchemy import text
@@ -22,47 +25,276 @@ from app.db.repositories._base import RepositoryBase
 
 class FingerprintRepository(RepositoryBase):
     def get_events_for_fingerprint(self, ip: str) -> list[dict[str, Any]]:
-        """Return all events for ip joined with their raw_data.
+        """Return all events for ip joined with their typed fingerprint fields.
 
         Ordered chronologically ascending.  Each row becomes one entry in the
         event list consumed by the sequence extraction utilities.
 
-        The raw_json column stores the full serialised RawEvent.  Only the
-        data sub-dict is extracted here; the rest is discarded before the
-        caller sees it.  This keeps credential fields (if any) constrained
-        to the raw_data key and out of other columns.
+        The sensor-derived fields come from event_fingerprint_fields, written
+        at ingest, so raw_events.raw_json is never read or decoded here.  That
+        table holds pattern classes only: raw credentials stay in raw_json.
+        An event without a fields row (inserted outside the repository) is
+        returned with source "" and no sensor-derived fields.
         """
-        rows = self._session.execute(
-            text("""
-                SELECT e.ts, e.dst_port, e.event_type, e.service, r.raw_json
+        return list(self.iter_fingerprint_events(ip))
+
+    def iter_fingerprint_events(
+        self,
+        ip: str,
+        *,
+        last_events: int | None = None,
+        since_ts: str | None = None,
+        sample_events: int | None = None,
+    ) -> Iterator[dict[str, Any]]:
+        """Yield ip's fingerprint events in chronological order, optionally windowed.
+
+        Same dicts as get_events_for_fingerprint(), streamed from the cursor in
+        batches of _STREAM_BATCH_ROWS rows instead of fetched as one list.  The
+        generator must be consumed inside the caller's session.
+
+        Window filters (any combination, all applied in SQL):
+          last_events    only the newest last_events events (ts, then id)
+          since_ts       only events with ts >= since_ts
+          sample_events  one event from each of sample_events equal-size,
+                         consecutive slices of the timestamp-ordered events —
+                         the events at ranks floor(k * total / sample_events);
+                         every event when total <= sample_events
+        """
+        clauses = ["e.src_ip = :ip"]
+        if last_events is not None:
+            clauses.append("""e.id IN (
+                SELECT id FROM events WHERE src_ip = :ip
+                ORDER BY ts DESC, id DESC LIMIT :last_events
+            )""")
+        if since_ts is not None:
+            clauses.append("e.ts >= :since_ts")
+        if sample_events is not None:
+            # Keep ranks floor(k * total / n), k < n: rn is one when the first
+            # k with k * total >= rn * n also has k * total < (rn + 1) * n.
+            clauses.append("""e.id IN (
+                SELECT id FROM (
+                    SELECT id,
+                           ROW_NUMBER() OVER (ORDER BY ts, id) - 1 AS rn,
+                           COUNT(*) OVER () AS total
+                    FROM events WHERE src_ip = :ip
+                ) ranked
+                WHERE total <= :sample_events
+                   OR ((rn * :sample_events + total - 1) / total) * total
+                      < (rn + 1) * :sample_events
+            )""")
+        result = self._session.execute(
+            text(f"""
+                SELECT {_FINGERPRINT_EVENT_COLUMNS}
                 FROM events e
-                JOIN raw_events r ON e.id = r.id
-                WHERE e.src_ip = :ip
+                LEFT JOIN event_fingerprint_fields f ON f.id = e.id
+                WHERE {" AND ".join(clauses)}
                 ORDER BY e.ts ASC
             """),
+            {
+                "ip": ip,
+                "last_events": last_events,
+                "since_ts": since_ts,
+                "sample_events": sample_events,
+            },
+            execution_options={"yield_per": _STREAM_BATCH_ROWS},
+        )
+        try:
+            for row in result:
+                yield _fingerprint_event(row)
+        finally:
+            result.close()
+
+    def get_newest_event_ts(self, ip: str) -> str | None:
+        """Return the latest events.ts for ip, or None when ip has no events."""
+        return self._session.execute(
+            text("SELECT MAX(ts) FROM events WHERE src_ip = :ip"),
             {"ip": ip},
+        ).scalar_one()
+
+    def get_fingerprint_events_since(
+        self, ip: str, ingested_after: str | None
+    ) -> tuple[list[dict[str, Any]], str | None]:
+        """Return events for ip ingested after a watermark, plus the new watermark.
+
+        ingested_after is a raw_events.ingested_at value; None returns every
+        event, as get_events_for_fingerprint() does.  Event dicts have the same
+        shape and chronological order as get_events_for_fingerprint().  The
+        returned watermark is the highest ingested_at among the returned
+        events (ingested_after when none are returned), read in the same
+        statement so it can never cover an event the list does not contain.
+        """
+        since = "" if ingested_after is None else "AND r.ingested_at > :after"
+        result = self._session.execute(
+            text(f"""
+                SELECT {_FINGERPRINT_EVENT_COLUMNS}, r.ingested_at
+                FROM events e
+                JOIN raw_events r ON e.id = r.id
+                LEFT JOIN event_fingerprint_fields f ON f.id = e.id
+                WHERE e.src_ip = :ip {since}
+                ORDER BY e.ts ASC
+            """),
+            {"ip": ip, "after": ingested_after},
+            execution_options={"yield_per": _STREAM_BATCH_ROWS},
+        )
+
+        watermark = ingested_after
+        events: list[dict[str, Any]] = []
+        with result:
+            for row in result:
+                events.append(_fingerprint_event(row))
+                ingested_at = row[-1]
+                if watermark is None or ingested_at > watermark:
+                    watermark = ingested_at
+        return events, watermark
+
+    def list_source_ips_to_refingerprint(
+        self, *, after_ip: str | None, limit: int, below_version: int | None = None
+    ) -> list[str]:
+        """Return up to limit distinct events.src_ip values after after_ip, in order.
+
+        With below_version, only IPs with no fingerprint or one computed under
+        an older fingerprint_version are returned.
+        """
+        where, params = _refingerprint_filter(after_ip, None, below_version)
+        rows = self._session.execute(
+            text(f"""
+                SELECT DISTINCT e.src_ip
+                FROM events e
+                WHERE {where}
+                ORDER BY e.src_ip
+                LIMIT :limit
+            """),
+            {**params, "limit": limit},
         ).fetchall()
+        return [r[0] for r in rows]
+
+    def count_source_ips_to_refingerprint(
+        self, *, after_ip: str | None = None, below_version: int | None = None
+    ) -> int:
+        """Return how many IPs list_source_ips_to_refingerprint() would yield in total."""
+        where, params = _refingerprint_filter(after_ip, None, below_version)
+        return self._session.execute(
+            text(f"SELECT COUNT(DISTINCT e.src_ip) FROM events e WHERE {where}"),
+            params,
+        ).scalar_one()
 
-        result: list[dict[str, Any]] = []
-        for ts, dst_port, event_type, service, raw_json_str in rows:
-            try:
-                parsed = json.loads(raw_json_str)
-                raw_data: dict[str, Any] = parsed.get("data") or {}
-                source: str = parsed.get("source") or ""
-            except (json.JSONDecodeError, AttributeError, TypeError):
-                raw_data = {}
-                source = ""
-            result.append(
-                {
-                    "ts": ts,
-                    "dst_port": dst_port,
-                    "event_type": event_type,
-                    "service": service,
-                    "source": source,
-                    "raw_data": raw_data,
-                }
+    def iter_fingerprint_event_groups(
+        self,
+        *,
+        after_ip: str | None,
+        through_ip: str,
+        below_version: int | None = None,
+        last_events: int | None = None,
+        sample_events: int | None = None,
+    ) -> Iterator[tuple[str, list[dict[str, Any]], str | None]]:
+        """Yield (ip, events, watermark) for each src_ip in (after_ip, through_ip].
+
+        One ordered scan of events JOIN raw_events over the src_ip range,
+        streamed from the cursor, instead of one query per IP.  events are
+        the dicts of get_events_for_fingerprint() in chronological order (ts,
+        then id); watermark is the highest raw_events.ingested_at of all the
+        IP's events, as in get_fingerprint_events_since().  below_version
+        filters as in list_source_ips_to_refingerprint().  The generator must
+        be consumed inside the caller's session.
+
+        Window filters, applied while streaming so no more than the window of
+        an IP is held at once:
+          last_events    only the newest last_events events
+          sample_events  the events at ranks floor(k * total / sample_events),
+                         as in iter_fingerprint_events(); every event when
+                         total <= sample_events
+        """
+        where, params = _refingerprint_filter(after_ip, through_ip, below_version)
+        totals: dict[str, int] = {}
+        if sample_events is not None:
+            totals = dict(
+                self._session.execute(
+                    text(f"""
+                        SELECT e.src_ip, COUNT(*)
+                        FROM events e
+                        JOIN raw_events r ON e.id = r.id
+                        WHERE {where}
+                        GROUP BY e.src_ip
+                    """),
+                    params,
+                ).fetchall()
             )
-        return result
+        result = self._session.execute(
+            text(f"""
+                SELECT {_FINGERPRINT_EVENT_COLUMNS}, r.ingested_at, e.src_ip
+                FROM events e
+                JOIN raw_events r ON e.id = r.id
+                LEFT JOIN event_fingerprint_fields f ON f.id = e.id
+                WHERE {where}
+                ORDER BY e.src_ip, e.ts, e.id
+            """),
+            params,
+            execution_options={"yield_per": _STREAM_BATCH_ROWS},
+        )
+        try:
+            ip: str | None = None
+            events: deque[dict[str, Any]] = deque()
+            watermark: str | None = None
+            rank = total = kept = 0
+            for row in result:
+                if row[-1] != ip:
+                    if ip is not None:
+                        yield ip, list(events), watermark
+                    ip, events, watermark = row[-1], deque(maxlen=last_events), None
+                    rank, total, kept = 0, totals.get(row[-1], 0), 0
+                if watermark is None or row[-2] > watermark:
+                    watermark = row[-2]
+                rank += 1
+                if sample_events is not None and total > sample_events:
+                    # Ranks are 0-based; keep the row at the next sampled rank only.
+                    if kept >= sample_events or rank - 1 != kept * total // sample_events:
+                        continue
+                    kept += 1
+                events.append(_fingerprint_event(row))
+            if ip is not None:
+                yield ip, list(events), watermark
+        finally:
+            result.close()
+
+    def list_stale_fingerprint_field_sources(
+        self,
+        *,
+        after_ip: str | None,
+        through_ip: str,
+        fields_version: int,
+        limit: int,
+        below_version: int | None = None,
+    ) -> list[tuple[str, str, dict[str, Any]]]:
+        """Return up to limit (event_id, source, data) whose fingerprint fields are stale.
+
+        Covers events with src_ip in (after_ip, through_ip] whose
+        event_fingerprint_fields row is missing or was derived under a
+        derivation_version older than fields_version; below_version filters as
+        in list_source_ips_to_refingerprint().  data is the sensor payload
+        decoded from raw_events.raw_json ({} when it cannot be decoded).
+        Refreshing the returned rows removes them from the next call's result.
+        """
+        where, params = _refingerprint_filter(after_ip, through_ip, below_version)
+        rows = self._session.execute(
+            text(f"""
+                SELECT e.id, r.source, r.raw_json
+                FROM events e
+                JOIN raw_events r ON e.id = r.id
+                LEFT JOIN event_fingerprint_fields f ON f.id = e.id
+                WHERE {where}
+                  AND (f.id IS NULL OR f.derivation_version < :fields_version)
+                LIMIT :limit
+            """),
+            {**params, "fields_version": fields_version, "limit": limit},
+        ).fetchall()
+        return [(r[0], r[1], _raw_event_data(r[2])) for r in rows]
+
+    def count_events_for_ip(self, ip: str) -> int:
+        """Return the number of events stored for ip."""
+        return self._session.execute(
+            text("SELECT COUNT(*) FROM events WHERE src_ip = :ip"),
+            {"ip": ip},
+        ).scalar_one()
 
     def upsert_behavioral_fingerprint(
         self,
@@ -77,12 +309,14 @@ class FingerprintRepository(RepositoryBase):
         target_features: str | None,
         tool_signals: str | None,
         confidence: float,
+        features_hash: str | None = None,
     ) -> None:
         """Insert or update the behavioral fingerprint for ip.
 
         On first insertion for an ip: creates a new row with a fresh UUID.
         On subsequent calls (recomputation): updates all feature columns in
-        place; the row's primary key (id) is preserved.
+        place; the row's primary key (id) is preserved.  features_hash is the
+        fingerprint_content_hash() of the feature columns.
 
         Uses INSERT ... ON CONFLICT(source_ip) DO UPDATE, which is identical
         syntax in both SQLite (3.24+) and PostgreSQL.
@@ -93,12 +327,12 @@ class FingerprintRepository(RepositoryBase):
                     id, source_ip, fingerprint_version, computed_at,
                     event_count_at_computation, timing_features, sequence_features,
                     protocol_features, credential_features, target_features,
-                    tool_signals, confidence
+                    tool_signals, confidence, features_hash
                 ) VALUES (
                     :id, :source_ip, :fingerprint_version, :computed_at,
                     :event_count, :timing_features, :sequence_features,
                     :protocol_features, :credential_features, :target_features,
-                    :tool_signals, :confidence
+                    :tool_signals, :confidence, :features_hash
                 )
                 ON CONFLICT(source_ip) DO UPDATE SET
                     fingerprint_version        = excluded.fingerprint_version,
@@ -110,7 +344,8 @@ class FingerprintRepository(RepositoryBase):
                     credential_features        = excluded.credential_features,
                     target_features            = excluded.target_features,
                     tool_signals               = excluded.tool_signals,
-                    confidence                 = excluded.confidence
+                    confidence                 = excluded.confidence,
+                    features_hash              = excluded.features_hash
             """),
             {
                 "id": str(uuid.uuid4()),
@@ -125,6 +360,7 @@ class FingerprintRepository(RepositoryBase):
                 "target_features": target_features,
                 "tool_signals": tool_signals,
                 "confidence": confidence,
+                "features_hash": features_hash,
             },
         )
 
@@ -139,7 +375,7 @@ class FingerprintRepository(RepositoryBase):
                 SELECT id, source_ip, fingerprint_version, computed_at,
                        event_count_at_computation, timing_features, sequence_features,
                        protocol_features, credential_features, target_features,
-                       tool_signals, confidence
+                       tool_signals, confidence, features_hash
                 FROM behavioral_fingerprints
                 WHERE source_ip = :ip
             """),
@@ -160,4 +396,129 @@ class FingerprintRepository(RepositoryBase):
             "target_features": row[9],
             "tool_signals": row[10],
             "confidence": row[11],
+            "features_hash": row[12],
+        }
+
+    def get_fingerprint_state(self, ip: str) -> dict[str, Any] | None:
+        """Return the stored incremental fingerprint state row for ip, or None.
+
+        state_json is returned as the raw JSON string; the caller parses it.
+        """
+        row = self._session.execute(
+            text("""
+                SELECT source_ip, fingerprint_version, state_version, event_count,
+                       watermark, state_json, updated_at
+                FROM fingerprint_state
+                WHERE source_ip = :ip
+            """),
+            {"ip": ip},
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            "source_ip": row[0],
+            "fingerprint_version": row[1],
+            "state_version": row[2],
+            "event_count": row[3],
+            "watermark": row[4],
+            "state_json": row[5],
+            "updated_at": row[6],
         }
+
+    def upsert_fingerprint_state(
+        self,
+        ip: str,
+        fingerprint_version: int,
+        state_version: int,
+        event_count: int,
+        watermark: str | None,
+        state_json: str,
+        updated_at: str,
+    ) -> None:
+        """Insert or replace the incremental fingerprint state for ip."""
+        self._session.execute(
+            text("""
+                INSERT INTO fingerprint_state (
+                    source_ip, fingerprint_version, state_version, event_count,
+                    watermark, state_json, updated_at
+                ) VALUES (
+                    :source_ip, :fingerprint_version, :state_version, :event_count,
+                    :watermark, :state_json, :updated_at
+                )
+                ON CONFLICT(source_ip) DO UPDATE SET
+                    fingerprint_version = excluded.fingerprint_version,
+                    state_version       = excluded.state_version,
+                    event_count         = excluded.event_count,
+                    watermark           = excluded.watermark,
+                    state_json          = excluded.state_json,
+                    updated_at          = excluded.updated_at
+            """),
+            {
+                "source_ip": ip,
+                "fingerprint_version": fingerprint_version,
+                "state_version": state_version,
+                "event_count": event_count,
+                "watermark": watermark,
+                "state_json": state_json,
+                "updated_at": updated_at,
+            },
+        )
+
+
+# Rows buffered per cursor fetch by the streaming fingerprint event reads.
+_STREAM_BATCH_ROWS = 1000
+
+# Selected by both fingerprint event fetches; decoded by _fingerprint_event().
+_FINGERPRINT_EVENT_COLUMNS = """
+    e.ts, e.dst_port, e.event_type, e.service, f.source,
+    f.username_class, f.password_class, f.password_length, f.password_flags,
+    f.ssh_kex, f.tls_ciphers
+"""
+
+
+def _refingerprint_filter(
+    after_ip: str | None, through_ip: str | None, below_version: int | None
+) -> tuple[str, dict[str, Any]]:
+    """WHERE clause (over events e) and parameters for the re-fingerprint scans."""
+    clauses = ["e.src_ip IS NOT NULL"]
+    params: dict[str, Any] = {}
+    if after_ip is not None:
+        clauses.append("e.src_ip > :after_ip")
+        params["after_ip"] = after_ip
+    if through_ip is not None:
+        clauses.append("e.src_ip <= :through_ip")
+        params["through_ip"] = through_ip
+    if below_version is not None:
+        clauses.append("""NOT EXISTS (
+            SELECT 1 FROM behavioral_fingerprints b
+            WHERE b.source_ip = e.src_ip AND b.fingerprint_version >= :below_version
+        )""")
+        params["below_version"] = below_version
+    return " AND ".join(clauses), params
+
+
+def _raw_event_data(raw_json: str) -> dict[str, Any]:
+    """The data object of a raw_events.raw_json document, or {} when there is none."""
+    try:
+        data = json.loads(raw_json).get("data")
+    except (json.JSONDecodeError, AttributeError, TypeError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _fingerprint_event(row: Any) -> dict[str, Any]:
+    """Build one fingerprint event dict from a _FINGERPRINT_EVENT_COLUMNS row."""
+    ssh_kex, tls_ciphers = row[9], row[10]
+    return {
+        "ts": row[0],
+        "dst_port": row[1],
+        "event_type": row[2],
+        "service": row[3],
+        "source": row[4] or "",
+        "username_class": row[5],
+        "password_class": row[6],
+        "password_length": row[7],
+        "password_flags": row[8],
+        "ssh_kex": json.loads(ssh_kex) if ssh_kex is not None else None,
+        "tls_ciphers": json.loads(tls_ciphers) if tls_ciphers is not None else None,
+    }
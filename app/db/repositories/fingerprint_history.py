@@ -14,6 +14,11 @@ Content rules (§11.2):
   - tool_signals is intentionally omitted — it is not a stability-relevant
     dimension and may contain tool-name strings that could encode identifiable
     information across versions.
+
+fingerprint_window is the FingerprintWindow label (app/intelligence/
+fingerprint.py) of the events the snapshot was built from, e.g. "all" or
+"last_events:100000".  NULL on rows written before the column existed, all of
+which were built from every event.
 """
 
 from __future__ import annotations
@@ -43,6 +48,7 @@ def _row_to_dict(row) -> dict[str, Any]:
         "credential_features": row[11],
         "target_features": row[12],
         "created_at": row[13],
+        "fingerprint_window": row[14],
     }
 
 
@@ -50,7 +56,7 @@ _SELECT_COLS = """
     SELECT id, fingerprint_id, source_ip, campaign_id,
            fingerprint_version, computed_at, event_count_at_computation,
            confidence, timing_features, sequence_features, protocol_features,
-           credential_features, target_features, created_at
+           credential_features, target_features, created_at, fingerprint_window
     FROM fingerprint_history
 """
 
@@ -73,6 +79,7 @@ class FingerprintHistoryRepository(RepositoryBase):
         credential_features: str | None = None,
         target_features: str | None = None,
         created_at: str | None = None,
+        fingerprint_window: str | None = None,
     ) -> dict[str, Any]:
         """Append a fingerprint snapshot to the history table and return it.
 
@@ -88,13 +95,13 @@ class FingerprintHistoryRepository(RepositoryBase):
                     fingerprint_version, computed_at, event_count_at_computation,
                     confidence, timing_features, sequence_features,
                     protocol_features, credential_features, target_features,
-                    created_at
+                    created_at, fingerprint_window
                 ) VALUES (
                     :id, :fingerprint_id, :source_ip, :campaign_id,
                     :fingerprint_version, :computed_at, :event_count_at_computation,
                     :confidence, :timing_features, :sequence_features,
                     :protocol_features, :credential_features, :target_features,
-                    :created_at
+                    :created_at, :fingerprint_window
                 )
             """),
             {
@@ -112,6 +119,7 @@ class FingerprintHistoryRepository(RepositoryBase):
                 "credential_features": credential_features,
                 "target_features": target_features,
                 "created_at": now,
+                "fingerprint_window": fingerprint_window,
             },
         )
         return self.get_fingerprint_history_entry(hid)  # type: ignore[return-value]
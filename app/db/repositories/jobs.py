@@ -4,11 +4,22 @@ All SQL lives here. State machine transitions enforce valid status progressions.
 No business logic — callers (runner, analyze router, tasks) own that.
 
 Status machine:
-  pending  → running    (start_job)
+  pending  → running    (start_job, claim_jobs)
   running  → completed  (complete_job)
   running  → failed     (fail_job)
   pending  → cancelled  (cancel_job)
   running  → cancelled  (cancel_job)
+  running  → pending    (requeue_expired_leases — lease expired)
+  running  → failed     (requeue_expired_leases — lease expired max_attempts times)
+
+Leases: claim_jobs() marks each claimed job with the claiming worker_id and a
+lease_expires_at; the worker extends it with heartbeat() while the job runs.
+A job whose lease expires (the worker crashed or hung) is put back to pending
+for another worker — claim_jobs() re-queues expired leases before claiming.
+Workers pass their worker_id to complete_job()/fail_job(), so a worker that
+lost its lease cannot finish a job another worker has since re-claimed.
+Leased jobs are exempt from transition_stale_jobs_to_failed(), whose
+started_at timeout is meant for unleased in-process jobs.
 
 Invalid transitions are detected and return False; callers may log but must
 not raise — a stale transition must never surface as an HTTP error.
@@ -18,7 +29,7 @@ from __future__ import annotations
 
 import json
 import uuid
-from datetime import UTC, datetime
+from datetime import UTC, datetime, timedelta
 from typing import Any
 
 from sqlalchemy import text
@@ -28,6 +39,13 @@ from app.db.repositories._base import RepositoryBase
 # Valid status values
 _VALID_STATUSES = frozenset({"pending", "running", "completed", "failed", "cancelled"})
 
+_JOB_COLUMNS = """id, job_type, status, created_at, started_at,
+                       completed_at, failed_at, triggered_by,
+                       resource_type, resource_id, deduplication_key,
+                       progress_percent, result_summary_json,
+                       error_message, backend_metadata_json, ai_output_id,
+                       worker_id, lease_expires_at, attempts"""
+
 
 def _row_to_dict(row) -> dict[str, Any]:
     return {
@@ -47,9 +65,23 @@ def _row_to_dict(row) -> dict[str, Any]:
         "error_message": row[13],
         "backend_metadata_json": row[14],
         "ai_output_id": row[15] if len(row) > 15 else None,
+        "worker_id": row[16] if len(row) > 16 else None,
+        "lease_expires_at": row[17] if len(row) > 17 else None,
+        "attempts": row[18] if len(row) > 18 else 0,
     }
 
 
+def _parse_now(now: str | None) -> datetime:
+    if now is None:
+        return datetime.now(UTC)
+    return datetime.fromisoformat(now.replace("Z", "+00:00")).astimezone(UTC)
+
+
+def _held_by(worker_id: str | None) -> str:
+    """SQL guard restricting a running-job update to the worker holding its lease."""
+    return "" if worker_id is None else " AND worker_id = :worker_id"
+
+
 class JobRepository(RepositoryBase):
     def create_job(
         self,
@@ -100,12 +132,8 @@ class JobRepository(RepositoryBase):
     def get_job(self, job_id: str) -> dict[str, Any] | None:
         """Return full job row as dict, or None if not found."""
         row = self._session.execute(
-            text("""
-                SELECT id, job_type, status, created_at, started_at,
-                       completed_at, failed_at, triggered_by,
-                       resource_type, resource_id, deduplication_key,
-                       progress_percent, result_summary_json,
-                       error_message, backend_metadata_json, ai_output_id
+            text(f"""
+                SELECT {_JOB_COLUMNS}
                 FROM processing_jobs WHERE id = :id
             """),
             {"id": job_id},
@@ -137,11 +165,7 @@ class JobRepository(RepositoryBase):
         where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
         rows = self._session.execute(
             text(f"""
-                SELECT id, job_type, status, created_at, started_at,
-                       completed_at, failed_at, triggered_by,
-                       resource_type, resource_id, deduplication_key,
-                       progress_percent, result_summary_json,
-                       error_message, backend_metadata_json, ai_output_id
+                SELECT {_JOB_COLUMNS}
                 FROM processing_jobs
                 {where}
                 ORDER BY created_at DESC
@@ -159,12 +183,8 @@ class JobRepository(RepositoryBase):
         check and insert in concurrent environments.
         """
         row = self._session.execute(
-            text("""
-                SELECT id, job_type, status, created_at, started_at,
-                       completed_at, failed_at, triggered_by,
-                       resource_type, resource_id, deduplication_key,
-                       progress_percent, result_summary_json,
-                       error_message, backend_metadata_json, ai_output_id
+            text(f"""
+                SELECT {_JOB_COLUMNS}
                 FROM processing_jobs
                 WHERE deduplication_key = :key
                   AND status IN ('pending', 'running')
@@ -201,11 +221,16 @@ class JobRepository(RepositoryBase):
         result_summary_json: dict | str | None = None,
         backend_metadata_json: dict | str | None = None,
         ai_output_id: str | None = None,
+        worker_id: str | None = None,
     ) -> bool:
         """Transition job from 'running' to 'completed'.
 
         Returns True on success, False if job is not in 'running' state.
         ai_output_id links to the persisted ai_outputs row (set in PR A2+).
+        With worker_id (leased jobs, claim_jobs) the job must still be held by
+        that worker: a worker whose lease expired and whose job was re-claimed
+        gets False instead of completing the new holder's run.  The lease is
+        cleared on completion.
         """
         now = completed_at or datetime.now(UTC).isoformat()
         result_str = (
@@ -219,17 +244,19 @@ class JobRepository(RepositoryBase):
             else backend_metadata_json
         )
         result = self._session.execute(
-            text("""
+            text(f"""
                 UPDATE processing_jobs
                 SET status = 'completed',
                     completed_at = :completed_at,
                     progress_percent = 100,
                     result_summary_json = :result_summary_json,
                     backend_metadata_json = :backend_metadata_json,
-                    ai_output_id = :ai_output_id
-                WHERE id = :id AND status = 'running'
+                    ai_output_id = :ai_output_id,
+                    lease_expires_at = NULL
+                WHERE id = :id AND status = 'running'{_held_by(worker_id)}
             """),
             {
+                "worker_id": worker_id,
                 "id": job_id,
                 "completed_at": now,
                 "result_summary_json": result_str,
@@ -246,11 +273,14 @@ class JobRepository(RepositoryBase):
         failed_at: str | None = None,
         error_message: str | None = None,
         backend_metadata_json: dict | str | None = None,
+        worker_id: str | None = None,
     ) -> bool:
         """Transition job from 'running' to 'failed'.
 
         error_message must be a safe, user-visible summary. No stack traces.
-        Returns True on success, False if job is not in 'running' state.
+        Returns True on success, False if job is not in 'running' state, or
+        — with worker_id — no longer held by that worker (see complete_job).
+        The lease is cleared on failure.
         """
         now = failed_at or datetime.now(UTC).isoformat()
         meta_str = (
@@ -259,15 +289,17 @@ class JobRepository(RepositoryBase):
             else backend_metadata_json
         )
         result = self._session.execute(
-            text("""
+            text(f"""
                 UPDATE processing_jobs
                 SET status = 'failed',
                     failed_at = :failed_at,
                     error_message = :error_message,
-                    backend_metadata_json = :backend_metadata_json
-                WHERE id = :id AND status = 'running'
+                    backend_metadata_json = :backend_metadata_json,
+                    lease_expires_at = NULL
+                WHERE id = :id AND status = 'running'{_held_by(worker_id)}
             """),
             {
+                "worker_id": worker_id,
                 "id": job_id,
                 "failed_at": now,
                 "error_message": error_message,
@@ -304,12 +336,29 @@ class JobRepository(RepositoryBase):
             {"id": job_id, "pct": pct},
         )
 
+    def update_backend_metadata(self, job_id: str, backend_metadata_json: dict | str) -> None:
+        """Replace backend_metadata_json on a running job, e.g. to record a checkpoint."""
+        meta_str = (
+            json.dumps(backend_metadata_json)
+            if isinstance(backend_metadata_json, dict)
+            else backend_metadata_json
+        )
+        self._session.execute(
+            text("""
+                UPDATE processing_jobs
+                SET backend_metadata_json = :meta
+                WHERE id = :id AND status = 'running'
+            """),
+            {"id": job_id, "meta": meta_str},
+        )
+
     def transition_stale_jobs_to_failed(
         self, timeout_seconds: int, *, now: str | None = None
     ) -> int:
         """Move 'running' jobs that have exceeded timeout to 'failed'.
 
         A job is stale when started_at is more than timeout_seconds ago.
+        Leased jobs (claim_jobs) are skipped; their lease governs them.
         Returns count of rows updated.
         """
         from datetime import timedelta
@@ -329,6 +378,7 @@ class JobRepository(RepositoryBase):
                 WHERE status = 'running'
                   AND started_at IS NOT NULL
                   AND started_at < :cutoff
+                  AND lease_expires_at IS NULL
             """),
             {
                 "now": now or datetime.now(UTC).isoformat(),
@@ -337,6 +387,131 @@ class JobRepository(RepositoryBase):
         )
         return result.rowcount
 
+    def claim_jobs(
+        self,
+        job_type: str,
+        worker_id: str,
+        limit: int,
+        lease_seconds: int,
+        *,
+        now: str | None = None,
+        max_attempts: int = 3,
+    ) -> list[dict[str, Any]]:
+        """Claim up to limit pending jobs of job_type for worker_id, oldest first.
+
+        Expired leases of job_type are re-queued first (requeue_expired_leases).  Claimed
+        jobs move to 'running' with worker_id, started_at = now and a lease
+        lease_seconds long; attempts is incremented.  The claim is one
+        conditional UPDATE, so concurrent claimers never take the same job.
+        Served by idx_processing_jobs_claim (job_type, status, created_at).
+        """
+        if limit <= 0:
+            return []
+        now_dt = _parse_now(now)
+        started_at = now_dt.isoformat()
+        self.requeue_expired_leases(job_type, now=started_at, max_attempts=max_attempts)
+        self._session.execute(
+            text("""
+                UPDATE processing_jobs
+                SET status = 'running',
+                    worker_id = :worker_id,
+                    started_at = :started_at,
+                    lease_expires_at = :lease_expires_at,
+                    attempts = attempts + 1,
+                    progress_percent = 0
+                WHERE status = 'pending'
+                  AND id IN (
+                      SELECT id FROM processing_jobs
+                      WHERE job_type = :job_type AND status = 'pending'
+                      ORDER BY created_at, id
+                      LIMIT :limit
+                  )
+            """),
+            {
+                "worker_id": worker_id,
+                "started_at": started_at,
+                "lease_expires_at": (now_dt + timedelta(seconds=lease_seconds)).isoformat(),
+                "job_type": job_type,
+                "limit": limit,
+            },
+        )
+        rows = self._session.execute(
+            text(f"""
+                SELECT {_JOB_COLUMNS}
+                FROM processing_jobs
+                WHERE job_type = :job_type
+                  AND status = 'running'
+                  AND worker_id = :worker_id
+                  AND started_at = :started_at
+                ORDER BY created_at, id
+            """),
+            {"job_type": job_type, "worker_id": worker_id, "started_at": started_at},
+        ).fetchall()
+        return [_row_to_dict(r) for r in rows]
+
+    def heartbeat(
+        self, job_id: str, worker_id: str, lease_seconds: int, *, now: str | None = None
+    ) -> bool:
+        """Extend the lease of a running job held by worker_id.
+
+        Returns False when the job is no longer running under worker_id — its
+        lease expired and it was re-queued, or it was cancelled.
+        """
+        now_dt = _parse_now(now)
+        result = self._session.execute(
+            text("""
+                UPDATE processing_jobs
+                SET lease_expires_at = :lease_expires_at
+                WHERE id = :id AND worker_id = :worker_id AND status = 'running'
+            """),
+            {
+                "id": job_id,
+                "worker_id": worker_id,
+                "lease_expires_at": (now_dt + timedelta(seconds=lease_seconds)).isoformat(),
+            },
+        )
+        return result.rowcount > 0
+
+    def requeue_expired_leases(
+        self, job_type: str, *, now: str | None = None, max_attempts: int = 3
+    ) -> int:
+        """Return running job_type jobs whose lease expired to 'pending'.
+
+        A job that has already been claimed max_attempts times is moved to
+        'failed' instead, so a job that crashes its worker cannot loop forever.
+        Returns count of rows re-queued or failed.
+        """
+        now_str = _parse_now(now).isoformat()
+        failed = self._session.execute(
+            text("""
+                UPDATE processing_jobs
+                SET status = 'failed',
+                    failed_at = :now,
+                    error_message = 'Job lease expired too many times',
+                    lease_expires_at = NULL
+                WHERE job_type = :job_type
+                  AND status = 'running'
+                  AND lease_expires_at < :now
+                  AND attempts >= :max_attempts
+            """),
+            {"job_type": job_type, "now": now_str, "max_attempts": max_attempts},
+        )
+        requeued = self._session.execute(
+            text("""
+                UPDATE processing_jobs
+                SET status = 'pending',
+                    worker_id = NULL,
+                    started_at = NULL,
+                    lease_expires_at = NULL,
+                    progress_percent = 0
+                WHERE job_type = :job_type
+                  AND status = 'running'
+                  AND lease_expires_at < :now
+            """),
+            {"job_type": job_type, "now": now_str},
+        )
+        return failed.rowcount + requeued.rowcount
+
     def count_recent_ai_jobs(self, triggered_by: str, *, since: str) -> int:
         """Count campaign_summary and campaign_brief jobs created by triggered_by since cutoff.
 
@@ -10,12 +10,29 @@ existing dashboard endpoints vs. the dedicated intelligence API.
 from __future__ import annotations
 
 import json
+from collections.abc import Iterator
 from typing import Any
 
 from sqlalchemy import text
 
 from app.db.repositories._base import RepositoryBase
 
+# Maximum ids bound into a single IN (...) clause by the bulk ingest reads.
+_IN_CHUNK_SIZE = 500
+
+
+def _chunked_in(values: list[str]) -> Iterator[tuple[str, dict[str, str]]]:
+    """Yield (placeholders, params) for IN (...) over values, deduplicated, in chunks.
+
+    placeholders is the ":p0, :p1, ..." list for one chunk of at most
+    _IN_CHUNK_SIZE values and params binds them.
+    """
+    unique = list(dict.fromkeys(values))
+    for start in range(0, len(unique), _IN_CHUNK_SIZE):
+        chunk = unique[start : start + _IN_CHUNK_SIZE]
+        placeholders = ", ".join(f":p{i}" for i in range(len(chunk)))
+        yield placeholders, {f"p{i}": value for i, value in enumerate(chunk)}
+
 
 class ReadRepository(RepositoryBase):
     def event_exists(self, event_id: str) -> bool:
@@ -32,6 +49,24 @@ class ReadRepository(RepositoryBase):
         ).fetchone()
         return row is not None
 
+    def events_exist(self, event_ids: list[str]) -> set[str]:
+        """
+        Return the subset of event_ids already present in raw_events.
+
+        Bulk form of event_exists() for the set-based ingest path: one
+        primary-key IN (...) query per chunk instead of one SELECT per event.
+        Chunked by _chunked_in() to stay well under SQLite's bound parameter
+        limit.
+        """
+        found: set[str] = set()
+        for placeholders, params in _chunked_in(event_ids):
+            rows = self._session.execute(
+                text(f"SELECT id FROM raw_events WHERE id IN ({placeholders})"),
+                params,
+            ).fetchall()
+            found.update(row[0] for row in rows)
+        return found
+
     def get_stats(self) -> dict[str, Any]:
         """
         Return aggregate event counts for GET /api/stats.
@@ -130,6 +165,32 @@ class ReadRepository(RepositoryBase):
             "asn_org": row[3],
         }
 
+    def get_bulk_source_ip_geo(self, ips: list[str]) -> dict[str, dict]:
+        """
+        Bulk form of get_source_ip_geo() for the set-based ingest path.
+
+        Returns {ip: geo} for every ip that has a source_ips row with a
+        populated country_code; cache misses are simply absent from the result.
+        """
+        result: dict[str, dict] = {}
+        for placeholders, params in _chunked_in(ips):
+            rows = self._session.execute(
+                text(f"""
+                    SELECT ip, country_code, country_name, asn, asn_org
+                    FROM source_ips
+                    WHERE ip IN ({placeholders}) AND country_code IS NOT NULL
+                    """),
+                params,
+            ).fetchall()
+            for ip, country_code, country_name, asn, asn_org in rows:
+                result[ip] = {
+                    "country_code": country_code,
+                    "country_name": country_name,
+                    "asn": asn,
+                    "asn_org": asn_org,
+                }
+        return result
+
     def get_source_ip_event_types(self, ip: str) -> list[str]:
         """Return distinct normalized event_type values seen from ip."""
         rows = self._session.execute(
@@ -156,3 +217,24 @@ class ReadRepository(RepositoryBase):
         except (ValueError, TypeError):
             tags = []
         return {"event_count": event_count, "tags": tags}
+
+    def get_bulk_source_ip_intelligence(self, ips: list[str]) -> dict[str, dict]:
+        """
+        Bulk form of get_source_ip_intelligence(): {ip: {event_count, tags}}.
+
+        IPs with no source_ips row are absent from the result. Malformed tags
+        JSON is treated as an empty list, matching the single-row method.
+        """
+        result: dict[str, dict] = {}
+        for placeholders, params in _chunked_in(ips):
+            rows = self._session.execute(
+                text(f"SELECT ip, event_count, tags FROM source_ips WHERE ip IN ({placeholders})"),
+                params,
+            ).fetchall()
+            for ip, event_count, tags_json in rows:
+                try:
+                    tags: list[str] = json.loads(tags_json) if tags_json else []
+                except (ValueError, TypeError):
+                    tags = []
+                result[ip] = {"event_count": event_count, "tags": tags}
+        return result
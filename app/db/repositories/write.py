@@ -14,8 +14,56 @@ from datetime import UTC, datetime
 from sqlalchemy import text
 
 from app.db.repositories._base import RepositoryBase
+from app.intelligence.constants import FINGERPRINT_FIELDS_VERSION
+from app.intelligence.sequence import fingerprint_fields
 from app.schemas.models import EnrichedEvent, HoneypotEvent, RawEvent
 
+_INSERT_RAW_EVENT_SQL = text("""
+    INSERT INTO raw_events (id, ts, ingested_at, source, raw_json)
+    VALUES (:id, :ts, :ingested_at, :source, :raw_json)
+    """)
+
+_INSERT_FINGERPRINT_FIELDS_SQL = text("""
+    INSERT INTO event_fingerprint_fields (
+        id, source, username_class, password_class, password_length,
+        password_flags, ssh_kex, tls_ciphers, derivation_version
+    ) VALUES (
+        :id, :source, :username_class, :password_class, :password_length,
+        :password_flags, :ssh_kex, :tls_ciphers, :derivation_version
+    )
+    """)
+
+_UPSERT_FINGERPRINT_FIELDS_SQL = text("""
+    INSERT INTO event_fingerprint_fields (
+        id, source, username_class, password_class, password_length,
+        password_flags, ssh_kex, tls_ciphers, derivation_version
+    ) VALUES (
+        :id, :source, :username_class, :password_class, :password_length,
+        :password_flags, :ssh_kex, :tls_ciphers, :derivation_version
+    )
+    ON CONFLICT(id) DO UPDATE SET
+        source = excluded.source,
+        username_class = excluded.username_class,
+        password_class = excluded.password_class,
+        password_length = excluded.password_length,
+        password_flags = excluded.password_flags,
+        ssh_kex = excluded.ssh_kex,
+        tls_ciphers = excluded.tls_ciphers,
+        derivation_version = excluded.derivation_version
+    """)
+
+_INSERT_EVENT_SQL = text("""
+    INSERT INTO events (
+        id, ts, src_ip, dst_port, protocol, event_type,
+        service, country_code, country_name, city, asn, asn_org,
+        campaign_id, schema_version
+    ) VALUES (
+        :id, :ts, :src_ip, :dst_port, :protocol, :event_type,
+        :service, :country_code, :country_name, :city, :asn, :asn_org,
+        :campaign_id, :schema_version
+    )
+    """)
+
 
 class WriteRepository(RepositoryBase):
     def insert_raw_event(self, raw: RawEvent) -> None:
@@ -23,22 +71,27 @@ class WriteRepository(RepositoryBase):
         Insert into raw_events. Raises sqlalchemy.exc.IntegrityError on duplicate
         id — the caller treats this as a deduplication signal (do not retry).
 
-        raw_json stores the full serialised RawEvent including extra sensor fields
-        not extracted during normalisation. This is the immutable provenance record.
+        raw_json stores the full RawEvent including extra sensor fields not
+        extracted during normalisation — the received JSON text when the event
+        came from RawEvent.from_json_line(), else model_dump_json(). This is
+        the immutable provenance record.
+
+        The event's fingerprint inputs are written to event_fingerprint_fields
+        in the same call, so fingerprinting never decodes raw_json.
         """
         self._session.execute(
-            text("""
-                INSERT INTO raw_events (id, ts, ingested_at, source, raw_json)
-                VALUES (:id, :ts, :ingested_at, :source, :raw_json)
-                """),
+            _INSERT_RAW_EVENT_SQL,
             {
                 "id": raw.id,
                 "ts": raw.ts,
                 "ingested_at": datetime.now(UTC).isoformat(),
                 "source": raw.source,
-                "raw_json": raw.model_dump_json(),
+                "raw_json": raw.raw_json(),
             },
         )
+        self._session.execute(
+            _INSERT_FINGERPRINT_FIELDS_SQL, _fingerprint_field_params(raw.id, raw.source, raw.data)
+        )
 
     def insert_event(self, event: HoneypotEvent | EnrichedEvent) -> None:
         """
@@ -47,7 +100,8 @@ class WriteRepository(RepositoryBase):
         Explicitly excludes `ingested_at` and `source` — both fields exist on
         HoneypotEvent to allow raw_events population from the same object, but
         neither is a column in the events table. Passing them to the INSERT would
-        raise a column-not-found error; the explicit mapping below is the guard.
+        raise a column-not-found error; the explicit mapping in _event_params() is
+        the guard.
 
         `event_type` is coerced to "unknown" if the value is not in the
         event_types lookup table. This prevents FK violations for sensor-specific
@@ -57,6 +111,64 @@ class WriteRepository(RepositoryBase):
         `campaign_id` is always NULL in Phase 1 — the campaigns table does not
         exist until Phase 6.
         """
+        self._session.execute(_INSERT_EVENT_SQL, self._event_params(event))
+
+    def insert_raw_events_bulk(self, raws: list[RawEvent]) -> None:
+        """
+        Insert many raw_events rows with a single executemany.
+
+        Same row shape as insert_raw_event(). Raises IntegrityError if any id
+        already exists — the caller wraps the call in a SAVEPOINT and falls
+        back to per-event inserts to identify the duplicate.
+        """
+        if not raws:
+            return
+        ingested_at = datetime.now(UTC).isoformat()
+        self._session.execute(
+            _INSERT_RAW_EVENT_SQL,
+            [
+                {
+                    "id": raw.id,
+                    "ts": raw.ts,
+                    "ingested_at": ingested_at,
+                    "source": raw.source,
+                    "raw_json": raw.raw_json(),
+                }
+                for raw in raws
+            ],
+        )
+        self._session.execute(
+            _INSERT_FINGERPRINT_FIELDS_SQL,
+            [_fingerprint_field_params(raw.id, raw.source, raw.data) for raw in raws],
+        )
+
+    def refresh_fingerprint_fields(self, sources: list[tuple[str, str, dict]]) -> None:
+        """
+        Re-derive event_fingerprint_fields rows from (event_id, source, data).
+
+        Upserts each row with the current fingerprint_fields() derivation and
+        FINGERPRINT_FIELDS_VERSION — the refingerprint job passes the stale
+        rows of list_stale_fingerprint_field_sources() before rebuilding.
+        """
+        if not sources:
+            return
+        self._session.execute(
+            _UPSERT_FINGERPRINT_FIELDS_SQL,
+            [_fingerprint_field_params(*source) for source in sources],
+        )
+
+    def insert_events_bulk(self, events: list[HoneypotEvent | EnrichedEvent]) -> None:
+        """
+        Insert many events rows with a single executemany.
+
+        Column mapping and event_type coercion are identical to insert_event().
+        """
+        if not events:
+            return
+        self._session.execute(_INSERT_EVENT_SQL, [self._event_params(e) for e in events])
+
+    def _event_params(self, event: HoneypotEvent | EnrichedEvent) -> dict:
+        """Build the events-table bind parameters shared by the single and bulk inserts."""
         valid = self._load_valid_event_types()
         event_type = event.event_type if event.event_type in valid else "unknown"
 
@@ -71,35 +183,22 @@ class WriteRepository(RepositoryBase):
             asn = event.asn
             asn_org = event.asn_org
 
-        self._session.execute(
-            text("""
-                INSERT INTO events (
-                    id, ts, src_ip, dst_port, protocol, event_type,
-                    service, country_code, country_name, city, asn, asn_org,
-                    campaign_id, schema_version
-                ) VALUES (
-                    :id, :ts, :src_ip, :dst_port, :protocol, :event_type,
-                    :service, :country_code, :country_name, :city, :asn, :asn_org,
-                    :campaign_id, :schema_version
-                )
-                """),
-            {
-                "id": event.id,
-                "ts": event.ts.isoformat(),
-                "src_ip": event.src_ip,
-                "dst_port": event.dst_port,
-                "protocol": event.protocol,
-                "event_type": event_type,
-                "service": event.service,
-                "country_code": country_code,
-                "country_name": country_name,
-                "city": city,
-                "asn": asn,
-                "asn_org": asn_org,
-                "campaign_id": None,
-                "schema_version": event.schema_version,
-            },
-        )
+        return {
+            "id": event.id,
+            "ts": event.ts.isoformat(),
+            "src_ip": event.src_ip,
+            "dst_port": event.dst_port,
+            "protocol": event.protocol,
+            "event_type": event_type,
+            "service": event.service,
+            "country_code": country_code,
+            "country_name": country_name,
+            "city": city,
+            "asn": asn,
+            "asn_org": asn_org,
+            "campaign_id": None,
+            "schema_version": event.schema_version,
+        }
 
     def upsert_source_ip(
         self,
@@ -162,6 +261,57 @@ class WriteRepository(RepositoryBase):
             {"ip": ip, "tags": json.dumps(tags), "score": reputation_score},
         )
 
+    def upsert_source_ips_bulk(self, rows: list[dict]) -> None:
+        """
+        Apply pre-aggregated per-IP deltas to source_ips with one executemany.
+
+        Each row carries: ip, first_seen, last_seen, event_count (the number
+        of events accepted for that ip in the batch) and the geo columns.
+        Produces the same end state as calling upsert_source_ip() once per
+        event in batch order:
+          - first_seen / geo are written only when the row is inserted
+          - last_seen takes the ts of the last event applied (batch order)
+          - event_count is incremented by the batch delta
+        """
+        if not rows:
+            return
+        self._session.execute(
+            text("""
+                INSERT INTO source_ips (
+                    ip, first_seen, last_seen, event_count,
+                    country_code, country_name, asn, asn_org
+                )
+                VALUES (
+                    :ip, :first_seen, :last_seen, :event_count,
+                    :country_code, :country_name, :asn, :asn_org
+                )
+                ON CONFLICT(ip) DO UPDATE SET
+                    last_seen   = excluded.last_seen,
+                    event_count = event_count + excluded.event_count
+                """),
+            rows,
+        )
+
+    def update_source_ips_intelligence_bulk(self, rows: list[dict]) -> None:
+        """
+        Bulk form of update_source_ip_intelligence().
+
+        Each row carries ip, tags (list[str]) and reputation_score.
+        """
+        if not rows:
+            return
+        self._session.execute(
+            text("""
+                UPDATE source_ips
+                SET tags = :tags, reputation_score = :score
+                WHERE ip = :ip
+                """),
+            [
+                {"ip": r["ip"], "tags": json.dumps(r["tags"]), "score": r["reputation_score"]}
+                for r in rows
+            ],
+        )
+
     def insert_audit_log(
         self,
         event_type: str,
@@ -206,3 +356,20 @@ class WriteRepository(RepositoryBase):
             {"cutoff": cutoff.isoformat()},
         )
         return deleted
+
+
+def _fingerprint_field_params(event_id: str, source: str, data: dict) -> dict:
+    """event_fingerprint_fields bind parameters for one event: derived fields, no credentials."""
+    fields = fingerprint_fields(data)
+    return {
+        **fields,
+        "id": event_id,
+        "source": source,
+        "ssh_kex": _json_or_none(fields["ssh_kex"]),
+        "tls_ciphers": _json_or_none(fields["tls_ciphers"]),
+        "derivation_version": FINGERPRINT_FIELDS_VERSION,
+    }
+
+
+def _json_or_none(value: list[str] | None) -> str | None:
+    return None if value is None else json.dumps(value)
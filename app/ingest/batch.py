@@ -0,0 +1,379 @@
+"""Set-based batch ingest engine for POST /api/ingest.
+
+Replaces the per-event statement loop (≈10 round trips per event) with a
+fixed number of set-based statements per batch:
+
+  Normalization  — parse_timestamp / normalize_event_type / extract_src_ip in
+                   memory; unparseable timestamps are rejected with an index
+  Deduplication  — optional RecentEventIds LRU hit check, then one
+                   events_exist() IN (...) query for the remaining ids, plus an
+                   in-memory seen-set for ids repeated inside the batch
+  Enrichment     — one bulk source_ips geo read; the distinct IPs not yet in
+                   source_ips go through enrich_many() (app/utils/enrichment.py),
+                   which reads mmdb only on a process-wide cache miss
+  Persistence    — raw_events and events written with executemany inside one
+                   SAVEPOINT; source_ips folded into one aggregated upsert per
+                   distinct IP
+  Scoring        — tags and reputation recomputed once per IP from the batch's
+                   event types, isolated in its own SAVEPOINT (best-effort);
+                   IPs whose event_count the batch took to
+                   MIN_EVENTS_FOR_CLUSTERING are reported in threshold_ips as
+                   the fingerprint scheduler's priority hint
+
+Receipt semantics are identical to the per-event pipeline: the first accepted
+occurrence of an id wins, later occurrences (in the DB or earlier in the same
+batch) count as duplicates, and rejections keep their 0-based batch index.
+
+If the bulk insert hits an IntegrityError (another process inserted one of the
+ids between the dedup read and the write), the SAVEPOINT is rolled back and
+the batch falls back to per-event SAVEPOINT inserts so only the racing ids
+are counted as duplicates.
+
+Each stage is timed into the METRICS_ENABLED stage histograms
+(app/ingest/metrics.py); persistence covers the inserts and the source_ips
+upsert but not the caller's commit.
+
+The caller owns the session and therefore the transaction boundary.
+No FastAPI imports belong in this module.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.db.repository import EventRepository
+from app.ingest.dedup import RecentEventIds
+from app.ingest.metrics import stage_timer
+from app.intelligence.constants import MIN_EVENTS_FOR_CLUSTERING
+from app.schemas.models import EnrichedEvent, HoneypotEvent, IngestError, RawEvent
+from app.utils.enrichment import enrich_many
+from app.utils.event_utils import extract_src_ip, normalize_event_type, parse_timestamp
+from app.utils.scoring import compute_reputation_score, compute_tags
+
+
+@dataclass
+class BatchOutcome:
+    """Counters and per-event errors for one ingested batch."""
+
+    accepted: int = 0
+    rejected: int = 0
+    duplicate: int = 0
+    errors: list[IngestError] = field(default_factory=list)
+    accepted_ips: set[str] = field(default_factory=set)
+    # Accepted IPs whose event_count reached MIN_EVENTS_FOR_CLUSTERING in
+    # this batch; their fingerprint refresh is scheduled with priority.
+    threshold_ips: set[str] = field(default_factory=set)
+    # Ids known to be in raw_events once the caller commits: accepted inserts
+    # plus duplicates confirmed by the DB. Fed to RecentEventIds.remember().
+    committed_ids: list[str] = field(default_factory=list)
+
+
+@dataclass
+class _Candidate:
+    """A normalized, non-duplicate event awaiting persistence."""
+
+    raw: RawEvent
+    event: HoneypotEvent
+    event_type: str
+    src_ip: str | None
+    ts: datetime
+
+
+def ingest_batch(
+    session: Session,
+    events: Sequence[RawEvent],
+    ingested_at: datetime,
+    recent_ids: RecentEventIds | None = None,
+) -> BatchOutcome:
+    """Normalize, deduplicate, persist and score a batch of raw events.
+
+    recent_ids, when given, answers dedup for ids this process committed
+    recently; only its misses reach the events_exist() query. It is read
+    here but never written — the caller remembers outcome.committed_ids
+    after the session commits.
+
+    Writes go through the given session; nothing is committed here. Non-
+    IntegrityError database errors from the persistence stage propagate so the
+    caller's session rolls back the whole batch (HTTP 500), as before.
+    """
+    repo = EventRepository(session)
+    outcome = BatchOutcome()
+
+    # Stage 3: normalization (timestamp is the only rejection condition).
+    normalized: list[tuple[RawEvent, datetime, str, str | None]] = []
+    with stage_timer("normalization"):
+        for i, raw in enumerate(events):
+            ts = parse_timestamp(raw.ts)
+            if ts is None:
+                outcome.rejected += 1
+                outcome.errors.append(
+                    IngestError(index=i, reason=f"unparseable timestamp: {raw.ts!r}")
+                )
+                continue
+            event_type = normalize_event_type(raw.type, raw.source)
+            src_ip = extract_src_ip(raw.normalization_view())
+            normalized.append((raw, ts, event_type, src_ip))
+
+    if not normalized:
+        return outcome
+
+    # Stage 4: deduplication — recent-id LRU, one IN (...) query for the misses,
+    # plus an in-batch seen-set.
+    fresh: list[tuple[RawEvent, datetime, str, str | None]] = []
+    with stage_timer("dedup"):
+        batch_ids = [raw.id for raw, _, _, _ in normalized]
+        if recent_ids is not None:
+            existing, to_check = recent_ids.split(dict.fromkeys(batch_ids))
+        else:
+            existing, to_check = set(), batch_ids
+        if to_check:
+            in_db = repo.events_exist(to_check)
+            outcome.committed_ids.extend(in_db)
+            existing |= in_db
+        seen: set[str] = set()
+        for item in normalized:
+            event_id = item[0].id
+            if event_id in existing or event_id in seen:
+                outcome.duplicate += 1
+                continue
+            seen.add(event_id)
+            fresh.append(item)
+
+    if not fresh:
+        return outcome
+
+    # Stage 3.5: GeoIP + ASN enrichment, once per distinct IP (cache-first).
+    with stage_timer("enrichment"):
+        geo_by_ip = _resolve_geo(repo, [ip for _, _, _, ip in fresh if ip])
+
+    candidates = [
+        _Candidate(
+            raw=raw,
+            event=_build_event(raw, ts, ingested_at, event_type, src_ip, geo_by_ip),
+            event_type=event_type,
+            src_ip=src_ip,
+            ts=ts,
+        )
+        for raw, ts, event_type, src_ip in fresh
+    ]
+
+    # Stage 5: persistence — bulk insert, per-event fallback on a dedup race.
+    with stage_timer("persistence"):
+        inserted = _persist_events(session, repo, candidates)
+        outcome.duplicate += len(candidates) - len(inserted)
+        outcome.accepted += len(inserted)
+        outcome.committed_ids.extend(c.raw.id for c in inserted)
+
+        ip_rows = aggregate_source_ip_rows(((c.src_ip, c.ts) for c in inserted), geo_by_ip)
+        repo.upsert_source_ips_bulk(list(ip_rows.values()))
+
+    # Stage 5.5: intelligence scoring — once per IP, best-effort.
+    with stage_timer("scoring"):
+        event_counts = _score_source_ips(session, repo, inserted)
+
+    outcome.accepted_ips.update(ip_rows)
+    outcome.threshold_ips.update(
+        ip
+        for ip, count in event_counts.items()
+        if count - ip_rows[ip]["event_count"] < MIN_EVENTS_FOR_CLUSTERING <= count
+    )
+    return outcome
+
+
+def split_unparseable(events: Sequence[RawEvent]) -> tuple[list[RawEvent], list[IngestError]]:
+    """Return (events with a parseable ts, rejection errors keyed by batch index).
+
+    Used by the write-behind path, which must report rejections in the 202
+    receipt before the batch reaches ingest_batch().
+    """
+    valid: list[RawEvent] = []
+    errors: list[IngestError] = []
+    for i, raw in enumerate(events):
+        if parse_timestamp(raw.ts) is None:
+            errors.append(IngestError(index=i, reason=f"unparseable timestamp: {raw.ts!r}"))
+        else:
+            valid.append(raw)
+    return valid, errors
+
+
+def aggregate_source_ip_rows(
+    events: Iterable[tuple[str | None, datetime]],
+    geo_by_ip: dict[str, dict] | None = None,
+) -> dict[str, dict]:
+    """Fold (src_ip, ts) pairs into one upsert_source_ips_bulk() row per IP.
+
+    events must be the accepted events in the order they would have been
+    upserted one by one; events without an IP are skipped. first_seen is the
+    ts of the IP's first event and last_seen the ts of its last — batch order,
+    not min/max — mirroring the sequential upsert_source_ip() semantics, so
+    applying the rows yields the same source_ips end state.
+    """
+    geo_by_ip = geo_by_ip or {}
+    rows: dict[str, dict] = {}
+    for src_ip, ts in events:
+        if not src_ip:
+            continue
+        ts_iso = ts.isoformat()
+        row = rows.get(src_ip)
+        if row is None:
+            geo = geo_by_ip.get(src_ip) or {}
+            rows[src_ip] = {
+                "ip": src_ip,
+                "first_seen": ts_iso,
+                "last_seen": ts_iso,
+                "event_count": 1,
+                "country_code": geo.get("country_code"),
+                "country_name": geo.get("country_name"),
+                "asn": geo.get("asn"),
+                "asn_org": geo.get("asn_org"),
+            }
+        else:
+            row["last_seen"] = ts_iso
+            row["event_count"] += 1
+    return rows
+
+
+# ---------------------------------------------------------------------------
+# Stage helpers
+# ---------------------------------------------------------------------------
+
+
+def _resolve_geo(repo: EventRepository, ips: list[str]) -> dict[str, dict]:
+    """Return {ip: geo} for every distinct ip: source_ips first, then enrich_many()."""
+    unique_ips = list(dict.fromkeys(ips))
+    if not unique_ips:
+        return {}
+    geo_by_ip = repo.get_bulk_source_ip_geo(unique_ips)
+    # {country_code, country_name, city, asn, asn_org} for IPs not yet in source_ips
+    geo_by_ip.update(enrich_many(ip for ip in unique_ips if ip not in geo_by_ip))
+    return geo_by_ip
+
+
+def _build_event(
+    raw: RawEvent,
+    ts: datetime,
+    ingested_at: datetime,
+    event_type: str,
+    src_ip: str | None,
+    geo_by_ip: dict[str, dict],
+) -> HoneypotEvent:
+    """Construct the canonical event object (enriched when an IP is present)."""
+    if src_ip:
+        return EnrichedEvent(
+            id=raw.id,
+            ts=ts,
+            ingested_at=ingested_at,
+            source=raw.source,
+            event_type=event_type,
+            src_ip=src_ip,
+            **geo_by_ip[src_ip],
+        )
+    return HoneypotEvent(
+        id=raw.id,
+        ts=ts,
+        ingested_at=ingested_at,
+        source=raw.source,
+        event_type=event_type,
+        src_ip=src_ip,
+    )
+
+
+def _persist_events(
+    session: Session,
+    repo: EventRepository,
+    candidates: list[_Candidate],
+) -> list[_Candidate]:
+    """Write raw_events + events for candidates; return those actually inserted.
+
+    Fast path: two executemany statements inside one SAVEPOINT. On an
+    IntegrityError the SAVEPOINT is rolled back and each candidate is retried
+    in its own SAVEPOINT, so a racing duplicate poisons only itself.
+    """
+    sp = session.begin_nested()
+    try:
+        repo.insert_raw_events_bulk([c.raw for c in candidates])
+        repo.insert_events_bulk([c.event for c in candidates])
+        sp.commit()
+        return candidates
+    except IntegrityError:
+        sp.rollback()
+
+    inserted: list[_Candidate] = []
+    for c in candidates:
+        sp = session.begin_nested()
+        try:
+            repo.insert_raw_event(c.raw)
+            repo.insert_event(c.event)
+            sp.commit()
+        except IntegrityError:
+            # Race: another process inserted this ID between the check and write.
+            sp.rollback()
+            continue
+        inserted.append(c)
+    return inserted
+
+
+def _score_source_ips(
+    session: Session,
+    repo: EventRepository,
+    inserted: list[_Candidate],
+) -> dict[str, int]:
+    """Recompute tags and reputation once per IP after the source_ips upsert.
+
+    Tags are additive and the score depends only on the final tag set and
+    event_count, so one update per IP yields the same end state as scoring
+    after every event. Failure must never block ingest — the events are
+    already written — so errors roll back the scoring SAVEPOINT only; a failed
+    bulk update is retried per IP to keep one bad row from skipping the rest.
+
+    Returns the post-upsert event_count of every IP that was read.
+    """
+    event_types_by_ip: dict[str, list[str]] = {}
+    for c in inserted:
+        if c.src_ip:
+            event_types_by_ip.setdefault(c.src_ip, []).append(c.event_type)
+    if not event_types_by_ip:
+        return {}
+
+    score_sp = session.begin_nested()
+    try:
+        intel_by_ip = repo.get_bulk_source_ip_intelligence(list(event_types_by_ip))
+        updates = [
+            _score_row(ip, intel, event_types_by_ip[ip]) for ip, intel in intel_by_ip.items()
+        ]
+        repo.update_source_ips_intelligence_bulk(updates)
+        score_sp.commit()
+        return {ip: intel["event_count"] for ip, intel in intel_by_ip.items()}
+    except Exception:
+        score_sp.rollback()
+
+    event_counts: dict[str, int] = {}
+    for ip, event_types in event_types_by_ip.items():
+        score_sp = session.begin_nested()
+        try:
+            intel = repo.get_source_ip_intelligence(ip)
+            if intel is not None:
+                event_counts[ip] = intel["event_count"]
+                row = _score_row(ip, intel, event_types)
+                repo.update_source_ip_intelligence(ip, row["tags"], row["reputation_score"])
+            score_sp.commit()
+        except Exception:
+            score_sp.rollback()
+    return event_counts
+
+
+def _score_row(ip: str, intel: dict, event_types: list[str]) -> dict:
+    """Apply compute_tags for each event type in order, then score once."""
+    tags = intel["tags"]
+    for event_type in event_types:
+        tags = compute_tags(tags, event_type)
+    return {
+        "ip": ip,
+        "tags": tags,
+        "reputation_score": compute_reputation_score(tags, intel["event_count"]),
+    }
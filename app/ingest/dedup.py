@@ -0,0 +1,96 @@
+"""Process-local recent-event-id filter in front of the ingest dedup query.
+
+Sensors retry whole batches, so most dedup lookups during a backlog replay are
+hot duplicates of ids this process committed moments ago. RecentEventIds is a
+bounded LRU of ids known to be present in raw_events; a hit short-circuits the
+events_exist() query for that id.
+
+Correctness rules:
+  - Only committed ids are added (the router calls remember() after the ingest
+    session commits), so a hit is always a genuine duplicate.
+  - A miss is only a "maybe new": the id may have been written by another
+    process or evicted from the LRU, so misses always fall back to the DB.
+
+The filter is opt-in via INGEST_RECENT_ID_CACHE_SIZE (0 disables it). Rows
+removed by scripts/db_prune.py run in a different process and are not evicted
+here, which is why the filter is off by default.
+
+No FastAPI, SQLAlchemy, or router imports belong in this module.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from collections.abc import Iterable
+
+from app.core.config import settings
+
+
+class RecentEventIds:
+    """Thread-safe bounded LRU of event ids committed to raw_events."""
+
+    def __init__(self, capacity: int) -> None:
+        if capacity < 1:
+            raise ValueError(f"capacity must be >= 1; got {capacity}")
+        self._capacity = capacity
+        self._ids: OrderedDict[str, None] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def split(self, event_ids: Iterable[str]) -> tuple[set[str], list[str]]:
+        """Partition event_ids into (known committed ids, ids to check in the DB)."""
+        known: set[str] = set()
+        unknown: list[str] = []
+        with self._lock:
+            for eid in event_ids:
+                if eid in self._ids:
+                    self._ids.move_to_end(eid)
+                    known.add(eid)
+                else:
+                    unknown.append(eid)
+            self.hits += len(known)
+            self.misses += len(unknown)
+        return known, unknown
+
+    def remember(self, event_ids: Iterable[str]) -> None:
+        """Record ids that are committed in raw_events, evicting the oldest."""
+        with self._lock:
+            for eid in event_ids:
+                self._ids[eid] = None
+                self._ids.move_to_end(eid)
+            while len(self._ids) > self._capacity:
+                self._ids.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._ids.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+_recent_ids: RecentEventIds | None = None
+_init_lock = threading.Lock()
+
+
+def get_recent_event_ids() -> RecentEventIds | None:
+    """Return the process-wide filter, or None when INGEST_RECENT_ID_CACHE_SIZE is 0."""
+    global _recent_ids
+    if settings.INGEST_RECENT_ID_CACHE_SIZE <= 0:
+        return None
+    if _recent_ids is None:
+        with _init_lock:
+            if _recent_ids is None:
+                _recent_ids = RecentEventIds(settings.INGEST_RECENT_ID_CACHE_SIZE)
+    return _recent_ids
+
+
+def reset_recent_event_ids_for_testing() -> None:
+    """Drop the process-wide filter so the next call re-reads settings."""
+    global _recent_ids
+    with _init_lock:
+        _recent_ids = None
@@ -0,0 +1,249 @@
+"""Ingest pipeline instrumentation, rendered in Prometheus text format.
+
+Collects, per process:
+
+  legiontrap_ingest_stage_seconds    histogram per pipeline stage (validation,
+                                     normalization, dedup, enrichment,
+                                     persistence, scoring, commit, audit,
+                                     scheduling)
+  legiontrap_ingest_events_total     counter of per-event outcomes by ingest
+                                     mode (sync, async, stream) and outcome
+                                     (accepted, rejected, duplicate)
+
+GET /api/metrics (app/routers/metrics.py) renders these together with gauges
+owned by other modules (GeoIP cache, recent-id filter, write-behind queue).
+
+Everything is gated on METRICS_ENABLED. When it is off, stage_timer() returns
+a shared no-op context manager and record_outcome() returns at once, so the
+instrumented hot path pays one settings lookup per call and nothing else.
+
+Stage timings are observed once per batch (or per stream chunk), not per
+event. "commit" is the time from the end of ingest_batch() to the write unit's
+commit returning — with DB_GROUP_COMMIT on it includes the wait for the group.
+"validation" is only observed by the stream endpoint; JSON bodies are
+validated by FastAPI before the handler runs. A stage that a batch skips —
+e.g. enrichment for a batch of duplicates — records no observation for that
+batch.
+
+No FastAPI, SQLAlchemy, or router imports belong in this module.
+"""
+
+from __future__ import annotations
+
+import bisect
+import contextlib
+import threading
+import time
+from collections.abc import Callable, Iterable
+from contextlib import AbstractContextManager
+from typing import Any, TypeVar
+
+from app.core.config import settings
+
+STAGES = (
+    "validation",
+    "normalization",
+    "dedup",
+    "enrichment",
+    "persistence",
+    "scoring",
+    "commit",
+    "audit",
+    "scheduling",
+)
+MODES = ("sync", "async", "stream")
+OUTCOMES = ("accepted", "rejected", "duplicate")
+
+# Seconds. Covers a cache-warm normalization pass (sub-ms) up to a contended
+# SQLite commit of a large coalesced batch (seconds).
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+_NULL_TIMER = contextlib.nullcontext()
+
+T = TypeVar("T")
+
+
+class Histogram:
+    """Thread-safe cumulative histogram with fixed upper bounds."""
+
+    def __init__(self, buckets: Iterable[float]) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[slot] += 1
+            self._sum += value
+
+    def snapshot(self) -> tuple[list[int], float, int]:
+        """Return (cumulative bucket counts incl. +Inf, sum, count)."""
+        with self._lock:
+            counts, total = list(self._counts), self._sum
+        cumulative: list[int] = []
+        running = 0
+        for c in counts:
+            running += c
+            cumulative.append(running)
+        return cumulative, total, running
+
+
+class _StageTimer:
+    __slots__ = ("_histogram", "_start")
+
+    def __init__(self, histogram: Histogram) -> None:
+        self._histogram = histogram
+        self._start = 0.0
+
+    def __enter__(self) -> _StageTimer:
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._histogram.observe(time.perf_counter() - self._start)
+
+
+class _CommitTimer:
+    """Measures from the end of a wrapped write unit to the block's exit."""
+
+    __slots__ = ("_histogram", "_unit_done")
+
+    def __init__(self, histogram: Histogram) -> None:
+        self._histogram = histogram
+        self._unit_done: float | None = None
+
+    def wrap(self, unit: Callable[[Any], T]) -> Callable[[Any], T]:
+        def _timed(session: Any) -> T:
+            result = unit(session)
+            self._unit_done = time.perf_counter()
+            return result
+
+        return _timed
+
+    def __enter__(self) -> _CommitTimer:
+        return self
+
+    def __exit__(self, exc_type, *exc_info) -> None:
+        if exc_type is None and self._unit_done is not None:
+            self._histogram.observe(time.perf_counter() - self._unit_done)
+
+
+class _NullCommitTimer:
+    def wrap(self, unit: Callable[[Any], T]) -> Callable[[Any], T]:
+        return unit
+
+    def __enter__(self) -> _NullCommitTimer:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        return None
+
+
+_NULL_COMMIT_TIMER = _NullCommitTimer()
+
+
+class IngestMetrics:
+    """Stage histograms and outcome counters for one process."""
+
+    def __init__(self) -> None:
+        self.stages = {stage: Histogram(STAGE_BUCKETS) for stage in STAGES}
+        self._outcomes = {(mode, outcome): 0 for mode in MODES for outcome in OUTCOMES}
+        self._lock = threading.Lock()
+
+    def add_outcome(self, mode: str, accepted: int, rejected: int, duplicate: int) -> None:
+        with self._lock:
+            self._outcomes[(mode, "accepted")] += accepted
+            self._outcomes[(mode, "rejected")] += rejected
+            self._outcomes[(mode, "duplicate")] += duplicate
+
+    def outcomes(self) -> dict[tuple[str, str], int]:
+        with self._lock:
+            return dict(self._outcomes)
+
+    def render(self) -> list[str]:
+        """Prometheus exposition lines for the stage histograms and counters."""
+        lines = [
+            "# HELP legiontrap_ingest_stage_seconds Ingest pipeline stage latency per batch.",
+            "# TYPE legiontrap_ingest_stage_seconds histogram",
+        ]
+        for stage, histogram in self.stages.items():
+            cumulative, total, count = histogram.snapshot()
+            bounds = [_format_value(b) for b in histogram.buckets] + ["+Inf"]
+            for le, n in zip(bounds, cumulative, strict=True):
+                lines.append(
+                    format_sample("legiontrap_ingest_stage_seconds_bucket", n, stage=stage, le=le)
+                )
+            lines.append(format_sample("legiontrap_ingest_stage_seconds_sum", total, stage=stage))
+            lines.append(format_sample("legiontrap_ingest_stage_seconds_count", count, stage=stage))
+
+        lines += [
+            "# HELP legiontrap_ingest_events_total Ingested events by mode and outcome.",
+            "# TYPE legiontrap_ingest_events_total counter",
+        ]
+        for (mode, outcome), n in self.outcomes().items():
+            lines.append(
+                format_sample("legiontrap_ingest_events_total", n, mode=mode, outcome=outcome)
+            )
+        return lines
+
+
+def format_sample(name: str, value: float, **labels: str) -> str:
+    """One exposition line: name{label="value",...} value."""
+    if not labels:
+        return f"{name} {_format_value(value)}"
+    rendered = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+    return f"{name}{{{rendered}}} {_format_value(value)}"
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+_metrics = IngestMetrics()
+
+
+def get_ingest_metrics() -> IngestMetrics:
+    return _metrics
+
+
+def stage_timer(stage: str) -> AbstractContextManager:
+    """Time the enclosed block into the stage histogram (no-op when disabled)."""
+    if not settings.METRICS_ENABLED:
+        return _NULL_TIMER
+    return _StageTimer(_metrics.stages[stage])
+
+
+def commit_timer() -> _CommitTimer | _NullCommitTimer:
+    """Time the commit of a write unit: wrap the unit, run it inside the block.
+
+    with commit_timer() as timer:
+        outcome = run_write(timer.wrap(unit))
+    """
+    if not settings.METRICS_ENABLED:
+        return _NULL_COMMIT_TIMER
+    return _CommitTimer(_metrics.stages["commit"])
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    """Record a stage duration measured by the caller (e.g. summed per chunk)."""
+    if settings.METRICS_ENABLED:
+        _metrics.stages[stage].observe(seconds)
+
+
+def record_outcome(mode: str, accepted: int, rejected: int, duplicate: int) -> None:
+    """Add one batch's receipt counters to the outcome counter."""
+    if settings.METRICS_ENABLED:
+        _metrics.add_outcome(mode, accepted, rejected, duplicate)
+
+
+def reset_ingest_metrics_for_testing() -> None:
+    global _metrics
+    _metrics = IngestMetrics()
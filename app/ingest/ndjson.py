@@ -0,0 +1,88 @@
+"""Incremental NDJSON line splitter for POST /api/ingest/stream.
+
+NDJSONDecoder turns an arbitrarily chunked request body — optionally gzip
+encoded — into complete lines without ever holding more than one line (plus
+one inflate step) in memory:
+
+  - feed(data) yields every line completed by data; the trailing partial line
+    is kept for the next call. close() yields the final unterminated line.
+  - gzip input is inflated in _INFLATE_STEP slices, so a small compressed chunk
+    cannot expand into an unbounded buffer.
+  - A line longer than max_line_bytes is yielded once as None (so the caller
+    can record a rejection at that line index) and its remaining bytes are
+    discarded up to the next newline.
+
+Line terminators are "\\n"; a trailing "\\r" is stripped. Blank lines are
+yielded as b"" so callers can keep line numbering exact.
+
+No FastAPI, SQLAlchemy, or router imports belong in this module.
+"""
+
+from __future__ import annotations
+
+import zlib
+from collections.abc import Iterator
+
+_INFLATE_STEP = 64 * 1024
+
+
+class NDJSONDecoder:
+    """Split a (possibly gzip-compressed) byte stream into NDJSON lines."""
+
+    def __init__(self, max_line_bytes: int, gzip: bool = False) -> None:
+        self._max_line_bytes = max_line_bytes
+        self._inflater = zlib.decompressobj(16 + zlib.MAX_WBITS) if gzip else None
+        self._buffer = bytearray()
+        self._discarding = False
+
+    def feed(self, data: bytes) -> Iterator[bytes | None]:
+        """Yield the lines completed by data (None for an oversized line).
+
+        Raises zlib.error on a corrupt gzip stream.
+        """
+        if self._inflater is None:
+            yield from self._split(data)
+            return
+        piece = self._inflater.decompress(data, _INFLATE_STEP)
+        yield from self._split(piece)
+        while self._inflater.unconsumed_tail:
+            piece = self._inflater.decompress(self._inflater.unconsumed_tail, _INFLATE_STEP)
+            yield from self._split(piece)
+
+    def close(self) -> Iterator[bytes | None]:
+        """Yield the final line if the body did not end with a newline."""
+        if self._inflater is not None:
+            yield from self._split(self._inflater.flush())
+            if not self._inflater.eof:
+                raise zlib.error("truncated gzip stream")
+        if self._discarding:
+            self._discarding = False
+        elif self._buffer:
+            line = bytes(self._buffer)
+            self._buffer.clear()
+            yield line.rstrip(b"\r")
+
+    def _split(self, data: bytes) -> Iterator[bytes | None]:
+        start = 0
+        while True:
+            end = data.find(b"\n", start)
+            if end == -1:
+                break
+            if self._discarding:
+                self._discarding = False
+            else:
+                self._buffer += data[start:end]
+                line = bytes(self._buffer)
+                self._buffer.clear()
+                if len(line) > self._max_line_bytes:
+                    yield None
+                else:
+                    yield line.rstrip(b"\r")
+            start = end + 1
+        if self._discarding:
+            return
+        self._buffer += data[start:]
+        if len(self._buffer) > self._max_line_bytes:
+            self._buffer.clear()
+            self._discarding = True
+            yield None
@@ -0,0 +1,389 @@
+"""Opt-in write-behind ingest queue for POST /api/ingest.
+
+In the default (synchronous) mode the sensor's request blocks until its batch
+is committed under SQLite's single writer lock. With INGEST_ASYNC_QUEUE_BATCHES
+> 0 the router instead validates the batch, assigns its batch_id and hands it
+to a bounded in-process queue, answering 202 immediately:
+
+  Queue      — bounded by sensor batches, queued and held (below) together;
+               when full, submit() refuses and the router answers 503 with
+               Retry-After so sensors back off
+  Writer     — one dedicated thread drains the queue, coalescing consecutive
+               batches (up to INGEST_ASYNC_MAX_COALESCE_EVENTS events) into a
+               single transaction via ingest_batch(); one commit covers them all
+  Fallback   — if the coalesced transaction fails, each batch is retried in
+               its own transaction so one bad batch cannot sink its neighbours
+  Follow-up  — after commit: recent-id filter update, one audit row per
+               batch, fingerprint scheduling once per distinct IP
+
+Durability: close() (wired to application shutdown) stops intake and drains
+every queued batch before returning. With INGEST_ASYNC_SPOOL_PATH set, each
+batch is also appended to a spool file and fsync'd before the 202 is sent;
+start() replays the spool, so batches accepted before a crash are written on
+the next start. Replay relies on event-id deduplication — a batch that was
+committed but not yet truncated from the spool is simply counted as duplicate.
+
+A batch whose own transaction also fails (database locked, disk error) is
+held, not dropped: the writer retries held batches after every group that
+commits cleanly, whenever it finds the queue empty, and every
+held_retry_seconds while idle, and keeps them in the
+spool until they commit.  Held batches count toward the queue's capacity, so
+a long database outage ends in 503s rather than unbounded memory and spool
+growth.  When the writer
+finds the queue empty the spool is rewritten to contain only the held
+batches — empty once every accepted batch has committed.  Without a spool,
+held batches still unwritten at close() are lost with the process.
+
+No FastAPI imports belong in this module.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import json
+import logging
+import os
+import queue
+import threading
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.connection import run_write
+from app.db.repository import EventRepository
+from app.ingest.batch import BatchOutcome, ingest_batch
+from app.ingest.dedup import RecentEventIds, get_recent_event_ids
+from app.ingest.metrics import commit_timer, record_outcome, stage_timer
+from app.intelligence.tasks import schedule_fingerprints_for_batch
+from app.schemas.models import RawEvent
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+@dataclass
+class QueuedBatch:
+    """A validated sensor batch waiting for the writer thread."""
+
+    batch_id: str
+    ingested_at: datetime
+    events: list[RawEvent]
+
+    def to_spool_line(self) -> str:
+        return (
+            json.dumps(
+                {
+                    "batch_id": self.batch_id,
+                    "ingested_at": self.ingested_at.isoformat(),
+                    "events": [e.model_dump() for e in self.events],
+                }
+            )
+            + "\n"
+        )
+
+    @classmethod
+    def from_spool_line(cls, line: str) -> QueuedBatch:
+        record = json.loads(line)
+        return cls(
+            batch_id=record["batch_id"],
+            ingested_at=datetime.fromisoformat(record["ingested_at"]),
+            events=[RawEvent.model_validate(e) for e in record["events"]],
+        )
+
+
+class _PooledTasks:
+    """BackgroundTasks stand-in for the writer thread: add_task() runs on a pool."""
+
+    def __init__(self, executor: ThreadPoolExecutor) -> None:
+        self._executor = executor
+
+    def add_task(self, func: Callable, *args, **kwargs) -> None:
+        self._executor.submit(func, *args, **kwargs)
+
+
+class IngestQueue:
+    """Bounded write-behind queue with a single coalescing writer thread."""
+
+    def __init__(
+        self,
+        max_batches: int,
+        max_coalesce_events: int,
+        spool_path: Path | None = None,
+        *,
+        held_retry_seconds: float = 5.0,
+    ) -> None:
+        if max_batches < 1:
+            raise ValueError(f"max_batches must be >= 1; got {max_batches}")
+        self._queue: queue.Queue = queue.Queue(maxsize=max_batches)
+        self._max_batches = max_batches
+        self._max_coalesce_events = max_coalesce_events
+        self._spool_path = spool_path
+        self._spool_lock = threading.Lock()
+        self._closed = False
+        self._thread: threading.Thread | None = None
+        # Batches whose write failed; replaced only by start() and the writer,
+        # under _spool_lock so submit() sees a consistent count.
+        self._held: list[QueuedBatch] = []
+        self._held_retry_seconds = held_retry_seconds
+        self._tasks = ThreadPoolExecutor(max_workers=2, thread_name_prefix="ingest-fp")
+
+    @property
+    def depth(self) -> int:
+        """Number of batches waiting for the writer."""
+        return self._queue.qsize()
+
+    def start(self) -> None:
+        """Replay the spool (if any), then start the writer thread."""
+        if self._thread is not None:
+            return
+        pending = self._read_spool()
+        if pending:
+            logger.warning("Replaying %d spooled ingest batch(es)", len(pending))
+            for i in range(0, len(pending), self._queue.maxsize):
+                self._held.extend(self._write(pending[i : i + self._queue.maxsize]))
+            if self._held:
+                logger.error("%d spooled ingest batch(es) could not be written", len(self._held))
+            self._compact_spool_if_idle()
+        self._thread = threading.Thread(target=self._run, name="ingest-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, batch: QueuedBatch) -> bool:
+        """Queue batch for the writer; False when the queue is full or closed.
+
+        Held batches (failed writes awaiting retry) count toward the capacity.
+
+        With a spool configured the batch is durable on disk before this
+        returns True.
+        """
+        with self._spool_lock:
+            if self._closed or self._queue.qsize() + len(self._held) >= self._max_batches:
+                return False
+            if self._spool_path is not None:
+                with self._spool_path.open("a", encoding="utf-8") as f:
+                    f.write(batch.to_spool_line())
+                    f.flush()
+                    os.fsync(f.fileno())
+            # Only submit() puts (under this lock) and the writer only takes, so
+            # the capacity check holds.
+            self._queue.put_nowait(batch)
+        return True
+
+    def flush(self) -> None:
+        """Block until every batch submitted so far has been processed."""
+        self._queue.join()
+
+    def close(self, timeout: float | None = None) -> None:
+        """Stop intake, drain the queue and stop the writer thread."""
+        with self._spool_lock:
+            self._closed = True
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+        self._tasks.shutdown(wait=True)
+
+    # -----------------------------------------------------------------------
+    # Writer thread
+    # -----------------------------------------------------------------------
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            try:
+                # While batches are held, wake up to retry them even if no
+                # new batch arrives (intake may be refusing because of them).
+                item = self._queue.get(timeout=self._held_retry_seconds if self._held else None)
+            except queue.Empty:
+                self._retry_held()
+                continue
+            if item is _STOP:
+                self._queue.task_done()
+                break
+            group = [item]
+            events = len(item.events)
+            while events < self._max_coalesce_events:
+                try:
+                    nxt = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is _STOP:
+                    self._queue.task_done()
+                    stop = True
+                    break
+                group.append(nxt)
+                events += len(nxt.events)
+            try:
+                failed = self._write(group)
+            except Exception:
+                # Commit state unknown: hold the group; replay is deduplicated.
+                logger.exception("Ingest writer failed on a group of %d batch(es)", len(group))
+                failed = group
+            self._set_held(self._held + failed)
+            try:
+                if not failed or self._queue.empty():
+                    self._retry_held()
+            finally:
+                for _ in group:
+                    self._queue.task_done()
+
+    def _retry_held(self) -> None:
+        """Write the held batches again, then compact the spool if the queue is empty."""
+        try:
+            if self._held:
+                self._set_held(self._write(self._held))
+            self._compact_spool_if_idle()
+        except Exception:
+            logger.exception("Ingest writer failed to retry held batches")
+
+    def _set_held(self, held: list[QueuedBatch]) -> None:
+        with self._spool_lock:
+            self._held = held
+
+    def _write(self, group: list[QueuedBatch]) -> list[QueuedBatch]:
+        """Commit group in one transaction, falling back to one per batch.
+
+        Returns the batches that could not be committed.
+        """
+        recent_ids = get_recent_event_ids()
+        failed: list[QueuedBatch] = []
+        try:
+            results = self._commit(group, recent_ids)
+        except Exception:
+            logger.exception("Coalesced ingest of %d batch(es) failed; retrying each", len(group))
+            results = []
+            for batch in group:
+                try:
+                    results.extend(self._commit([batch], recent_ids))
+                except Exception:
+                    logger.exception("Holding ingest batch %s after write failure", batch.batch_id)
+                    failed.append(batch)
+
+        if recent_ids is not None:
+            for _, outcome in results:
+                recent_ids.remember(outcome.committed_ids)
+        for _, outcome in results:
+            record_outcome("async", outcome.accepted, outcome.rejected, outcome.duplicate)
+        _record_audit(results)
+
+        tasks = _PooledTasks(self._tasks)
+        accepted_ips: set[str] = set()
+        threshold_ips: set[str] = set()
+        for _, outcome in results:
+            accepted_ips |= outcome.accepted_ips
+            threshold_ips |= outcome.threshold_ips
+        with stage_timer("scheduling"):
+            schedule_fingerprints_for_batch(accepted_ips, threshold_ips, tasks)
+        return failed
+
+    def _commit(
+        self, group: list[QueuedBatch], recent_ids: RecentEventIds | None
+    ) -> list[tuple[QueuedBatch, BatchOutcome]]:
+        with commit_timer() as timer:
+            return run_write(
+                timer.wrap(
+                    lambda session: [
+                        (batch, ingest_batch(session, batch.events, batch.ingested_at, recent_ids))
+                        for batch in group
+                    ]
+                )
+            )
+
+    # -----------------------------------------------------------------------
+    # Spool
+    # -----------------------------------------------------------------------
+
+    def _read_spool(self) -> list[QueuedBatch]:
+        if self._spool_path is None or not self._spool_path.exists():
+            return []
+        batches: list[QueuedBatch] = []
+        with self._spool_path.open(encoding="utf-8") as f:
+            for lineno, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    batches.append(QueuedBatch.from_spool_line(line))
+                except Exception:
+                    # A torn final line from a crash mid-append; the sensor never got a 202.
+                    logger.warning("Skipping unreadable spool line %d", lineno)
+        return batches
+
+    def _compact_spool_if_idle(self) -> None:
+        """Rewrite the spool to hold only the unwritten batches, if the queue is empty."""
+        if self._spool_path is None:
+            return
+        with self._spool_lock:
+            if not self._queue.empty() or not self._spool_path.exists():
+                return
+            tmp = self._spool_path.with_name(self._spool_path.name + ".tmp")
+            with tmp.open("w", encoding="utf-8") as f:
+                f.writelines(batch.to_spool_line() for batch in self._held)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self._spool_path)
+
+
+def _record_audit(results: list[tuple[QueuedBatch, BatchOutcome]]) -> None:
+    """One ingest audit row per batch — best-effort, isolated session."""
+    if not results:
+        return
+
+    def _insert(session: Session) -> None:
+        repo = EventRepository(session)
+        for batch, outcome in results:
+            repo.insert_audit_log(
+                event_type="ingest",
+                detail=json.dumps(
+                    {
+                        "batch_id": batch.batch_id,
+                        "accepted": outcome.accepted,
+                        "rejected": outcome.rejected,
+                        "duplicate": outcome.duplicate,
+                        "mode": "async",
+                    }
+                ),
+            )
+
+    with stage_timer("audit"), contextlib.suppress(Exception):
+        run_write(_insert)
+
+
+_ingest_queue: IngestQueue | None = None
+_init_lock = threading.Lock()
+
+
+def get_ingest_queue() -> IngestQueue | None:
+    """Return the started process-wide queue, or None in synchronous mode."""
+    global _ingest_queue
+    if settings.INGEST_ASYNC_QUEUE_BATCHES <= 0:
+        return None
+    if _ingest_queue is None:
+        with _init_lock:
+            if _ingest_queue is None:
+                spool = settings.INGEST_ASYNC_SPOOL_PATH
+                q = IngestQueue(
+                    settings.INGEST_ASYNC_QUEUE_BATCHES,
+                    settings.INGEST_ASYNC_MAX_COALESCE_EVENTS,
+                    Path(spool) if spool else None,
+                )
+                q.start()
+                _ingest_queue = q
+    return _ingest_queue
+
+
+def current_ingest_queue() -> IngestQueue | None:
+    """Return the process-wide queue if it is running; never creates one."""
+    return _ingest_queue
+
+
+def shutdown_ingest_queue(timeout: float | None = None) -> None:
+    """Drain and stop the process-wide queue. Called on application shutdown."""
+    global _ingest_queue
+    with _init_lock:
+        q, _ingest_queue = _ingest_queue, None
+    if q is not None:
+        q.close(timeout)
@@ -11,9 +11,20 @@ threshold.  The operator decides whether to act on any suggestion.
 from __future__ import annotations
 
 import itertools
+import math
 from typing import Any
 
-from app.intelligence.similarity import SimilarityResult, compute_weighted_similarity
+from app.intelligence.similarity import (
+    SimilarityResult,
+    bounded_weighted_similarity,
+    parse_fingerprint,
+)
+from app.intelligence.similarity_numpy import (
+    SCORE_TOLERANCE,
+    PackedCandidates,
+    score_against_many,
+    use_for,
+)
 
 
 def _derive_relationship_type(result: SimilarityResult) -> str:
@@ -69,21 +80,42 @@ def build_actor_suggestions(
     Returns (suggestions, total_pairs_evaluated).
       suggestions: sorted by similarity_score DESC, capped at limit.
       total_pairs_evaluated: count of pairs scored (coattributed pairs excluded).
+        A pair abandoned once it can no longer reach min_score still counts.
+
+    From CLUSTERING_NUMPY_MIN_CANDIDATES campaigns, each campaign is first
+    scored against all the others by the NumPy kernel; pairs more than
+    SCORE_TOLERANCE below min_score there are not scored exactly.
 
     This function never reads from or writes to any table.
     """
     suggestions: list[dict[str, Any]] = []
     total_evaluated = 0
-
-    for c_a, c_b in itertools.combinations(campaigns, 2):
+    parsed = [(c, parse_fingerprint(c)) for c in campaigns]
+    packed = (
+        PackedCandidates().synced({c["id"]: (fp, None) for c, fp in parsed})
+        if use_for(len(campaigns))
+        else None
+    )
+    screened_id: str | None = None
+    screened: dict[str, float] | None = None
+
+    for (c_a, fp_a), (c_b, fp_b) in itertools.combinations(parsed, 2):
         pair = frozenset({c_a["id"], c_b["id"]})
         if pair in coattributed_pairs:
             continue
 
         total_evaluated += 1
-        result = compute_weighted_similarity(c_a, c_b)
-
-        if result.weighted_total < min_score:
+        if packed is not None and c_b["id"] in packed:
+            if screened_id != c_a["id"]:
+                screened_id = c_a["id"]
+                screened = score_against_many(fp_a, packed, floor=min_score)
+            if screened is not None and (
+                screened.get(c_b["id"], -math.inf) < min_score - SCORE_TOLERANCE
+            ):
+                continue
+        result = bounded_weighted_similarity(fp_a, fp_b, floor=min_score)
+
+        if result is None or result.weighted_total < min_score:
             continue
 
         suggestions.append(
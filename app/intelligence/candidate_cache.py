@@ -0,0 +1,240 @@
+"""Process-wide cache of parsed clustering candidates.
+
+assign_to_campaign() compares every new fingerprint against every active,
+dormant and reactivated campaign.  Read straight from
+get_campaigns_for_clustering(), each campaign costs one json.loads of its
+representative_fingerprint_json plus five more of its feature columns, on
+every clustering run.  The cache keeps each campaign's representative
+fingerprint already parsed (a ParsedFingerprint from
+app/intelligence/similarity.py), stamped with the campaign's
+representative_version:
+
+  Versions   — one cheap query per run reads status, last_seen, weight
+               profile and representative_version of every candidate; no
+               fingerprint JSON is read for a campaign whose cached version
+               still matches
+  Refresh    — update_representative_fingerprint() increments the version,
+               so only the campaigns rewritten since the previous run (by
+               this process or any other sharing the database) are re-read
+               and re-parsed
+  Status     — status and last_seen come from the version query on every
+               run; a campaign that leaves the candidate set (historical) is
+               dropped from the cache
+  Slow path  — campaigns without a representative fingerprint, or whose JSON
+               does not parse, are read through get_campaigns_for_clustering()
+               on every run and never cached: their features come from the
+               most recently active member and carry no version
+
+Each cached campaign also carries its FeatureSummary, and the cache keeps a
+CandidateIndex over them (app/intelligence/candidate_index.py), updated for
+the refreshed and dropped campaigns only.  load() returns the candidates with
+the index built from exactly those summaries.  When the NumPy scoring kernel
+is enabled (app/intelligence/similarity_numpy.py), the cache likewise keeps
+the cached campaigns packed, repacking only those whose representative or
+weight profile changed.
+
+Candidates come back in the order get_campaigns_for_clustering() visits
+them, so the best-candidate tie-break is unchanged.  Hit/miss counters are
+available from stats().
+
+No FastAPI imports belong in this module.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from app.intelligence import similarity_numpy
+from app.intelligence.candidate_index import CandidateIndex, FeatureSummary, summarize
+from app.intelligence.similarity import ParsedFingerprint, parse_fingerprint
+from app.intelligence.similarity_numpy import PackedCandidates
+
+if TYPE_CHECKING:
+    from app.db.repository import EventRepository
+
+
+@dataclass(frozen=True)
+class ClusteringCandidate:
+    """One campaign as seen by assign_to_campaign()."""
+
+    campaign_id: str
+    status: str
+    last_seen: str
+    weight_profile: dict[str, float] | None
+    fingerprint: ParsedFingerprint
+    summary: FeatureSummary | None
+
+
+@dataclass(frozen=True)
+class CandidateSet:
+    """The candidates of one clustering run and the index over the cached ones.
+
+    indexed holds the campaign ids whose summary is in index — the cached
+    candidates; slow-path candidates are not indexed.  packed holds the
+    cached candidates for the NumPy kernel; None when it is disabled.
+    """
+
+    candidates: list[ClusteringCandidate]
+    index: CandidateIndex
+    indexed: frozenset[str]
+    packed: PackedCandidates | None = None
+
+
+@dataclass(frozen=True)
+class _Entry:
+    version: int
+    fingerprint: ParsedFingerprint
+    summary: FeatureSummary | None
+
+
+def _parse_representative(rep_fp_json: str) -> ParsedFingerprint | None:
+    """Parse representative_fingerprint_json; None when it is not a JSON object."""
+    try:
+        fp_data = json.loads(rep_fp_json)
+        return parse_fingerprint(fp_data)
+    except (json.JSONDecodeError, TypeError, AttributeError):
+        return None
+
+
+def _indexable(entries: dict[str, _Entry]) -> dict[str, FeatureSummary]:
+    return {cid: e.summary for cid, e in entries.items() if e.summary is not None}
+
+
+class CandidateCache:
+    """Thread-safe map of campaign_id → parsed representative fingerprint and its version."""
+
+    def __init__(self) -> None:
+        self._entries: dict[str, _Entry] = {}
+        self._index = CandidateIndex()
+        self._packed: PackedCandidates | None = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.uncached = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def candidates(self, repo: EventRepository) -> list[ClusteringCandidate]:
+        """Return the current clustering candidates, re-parsing only what changed."""
+        return self.load(repo).candidates
+
+    def load(self, repo: EventRepository) -> CandidateSet:
+        """Return the current candidates with the index over the cached ones."""
+        rows = repo.list_clustering_candidate_versions()
+        with self._lock:
+            entries = self._entries
+            index = self._index
+            packed = self._packed
+
+        def _cached_version(cid: str, table: dict[str, _Entry]) -> int | None:
+            entry = table.get(cid)
+            return entry.version if entry is not None else None
+
+        stale = [
+            r["campaign_id"]
+            for r in rows
+            if r["representative_version"] is not None
+            and _cached_version(r["campaign_id"], entries) != r["representative_version"]
+        ]
+        refreshed: dict[str, _Entry] = {}
+        if stale:
+            versions = {r["campaign_id"]: r["representative_version"] for r in rows}
+            for cid, rep_fp_json in repo.get_representative_fingerprints(stale).items():
+                parsed = _parse_representative(rep_fp_json)
+                if parsed is not None:
+                    refreshed[cid] = _Entry(versions[cid], parsed, summarize(parsed))
+
+        fresh = {**entries, **refreshed}
+        slow = [
+            r["campaign_id"]
+            for r in rows
+            if r["representative_version"] is None
+            or _cached_version(r["campaign_id"], fresh) != r["representative_version"]
+        ]
+        slow_path: dict[str, ParsedFingerprint] = {
+            c["campaign_id"]: parse_fingerprint(c)
+            for c in (repo.get_campaigns_for_clustering(slow) if slow else [])
+        }
+
+        result: list[ClusteringCandidate] = []
+        current: dict[str, _Entry] = {}
+        for r in rows:
+            cid = r["campaign_id"]
+            if cid in slow_path:
+                fingerprint = slow_path[cid]
+                summary = summarize(fingerprint)
+            elif cid in fresh and r["representative_version"] is not None:
+                current[cid] = fresh[cid]
+                fingerprint = fresh[cid].fingerprint
+                summary = fresh[cid].summary
+            else:
+                continue
+            result.append(
+                ClusteringCandidate(
+                    campaign_id=cid,
+                    status=r["status"],
+                    last_seen=r["last_seen"],
+                    weight_profile=r["weight_profile"],
+                    fingerprint=fingerprint,
+                    summary=summary,
+                )
+            )
+
+        removed = {cid: e for cid, e in entries.items() if current.get(cid) is not e}
+        added = {cid: e for cid, e in current.items() if entries.get(cid) is not e}
+        index = index.changed(_indexable(removed), _indexable(added))
+        if similarity_numpy.enabled():
+            weights = {r["campaign_id"]: r["weight_profile"] for r in rows}
+            packed = (packed or PackedCandidates()).synced(
+                {cid: (e.fingerprint, weights[cid]) for cid, e in current.items()}
+            )
+        else:
+            packed = None
+
+        with self._lock:
+            self._entries = current
+            self._index = index
+            self._packed = packed
+            self.hits += len(current) - len(refreshed)
+            self.misses += len(refreshed)
+            self.uncached += len(slow)
+        return CandidateSet(
+            candidates=result,
+            index=index,
+            indexed=frozenset(_indexable(current)),
+            packed=packed,
+        )
+
+    def invalidate(self) -> None:
+        """Drop every entry; the next candidates() call re-parses all campaigns."""
+        with self._lock:
+            self._entries = {}
+            self._index = CandidateIndex()
+            self._packed = None
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "uncached": self.uncached,
+            }
+
+
+_cache = CandidateCache()
+
+
+def get_candidate_cache() -> CandidateCache:
+    """Return the process-wide candidate cache."""
+    return _cache
+
+
+def reset_candidate_cache_for_testing() -> None:
+    """Drop the cached candidates and zero the counters."""
+    global _cache
+    _cache = CandidateCache()
@@ -0,0 +1,517 @@
+"""Candidate pruning for campaign clustering.
+
+assign_to_campaign() only ever selects a candidate whose weighted similarity
+reaches SIMILARITY_UNCERTAIN_LOW.  This module discards, before any exact
+similarity is computed, candidates that provably cannot reach it:
+
+  Summary      — summarize() reduces a ParsedFingerprint to what the bound
+                 needs: the set features as sets, every sequence as a
+                 multiset (Counter) with its length.  Built once per
+                 fingerprint; the candidate cache keeps one per campaign.
+  Upper bound  — similarity_upper_bound() mirrors compute_weighted_similarity()
+                 term for term, but replaces each normalised edit distance by
+                 the overlap bound below.  Jaccard and password char-class
+                 terms are computed exactly; timing is bounded by 1.0.
+  Index        — CandidateIndex is an inverted index from feature tokens
+                 (target ports, services, event types, port / KEX / cipher /
+                 credential sequence elements, username classes) to
+                 campaigns.  A campaign that shares no token with the new
+                 fingerprint scores 0 on every indexed term, so its bound only
+                 depends on which terms are present — disjoint_upper_bound()
+                 is computed once per (shape, weights) instead of per
+                 campaign.
+
+Overlap bound: an edit script that turns a into b keeps at most
+|multiset(a) ∩ multiset(b)| elements unchanged, and every other element of
+the longer sequence costs at least one edit, so
+
+    levenshtein(a, b) >= max(len(a), len(b)) - |multiset(a) ∩ multiset(b)|
+
+The bound is evaluated with the same floating-point operations, in the same
+order, as the exact score, with each exact term replaced by one that is
+greater or equal.  Every operation involved is monotone, including the
+round(x, 6) steps, so the rounded bound is >= the rounded weighted_total and
+pruning with ``bound < threshold`` never drops a candidate the exhaustive
+scan could select.  Pairs the argument does not cover — negative weights,
+timing values that could push a timing term above 1.0, fingerprints whose
+features cannot be summarised — get an infinite bound and are never pruned.
+
+All functions are pure: no database access, no I/O.
+"""
+
+from __future__ import annotations
+
+import math
+from collections import Counter
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+from app.intelligence import similarity as _similarity
+from app.intelligence.similarity import ParsedFingerprint, _jaccard, _stat_sim
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from app.intelligence.candidate_cache import ClusteringCandidate
+
+_MAX_EVENT_TYPES = 50
+
+
+# ---------------------------------------------------------------------------
+# Summaries
+# ---------------------------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class _Bag:
+    """A sequence reduced to its multiset and length."""
+
+    counts: Counter
+    length: int
+
+
+@dataclass(frozen=True)
+class _SequenceDim:
+    ports: _Bag
+    event_types: _Bag
+    credentials: _Bag
+
+
+@dataclass(frozen=True)
+class _ProtocolDim:
+    services: frozenset
+    kex: _Bag | None
+    tls: _Bag | None
+
+
+@dataclass(frozen=True)
+class _CredentialDim:
+    username_classes: frozenset
+    char_class: dict[str, Any]
+    char_class_bounded: bool
+    credentials: _Bag
+
+
+@dataclass(frozen=True)
+class _TargetDim:
+    top_ports: frozenset
+    dst_ports: _Bag
+
+
+@dataclass(frozen=True)
+class FeatureSummary:
+    """Per-fingerprint input of similarity_upper_bound(); see summarize()."""
+
+    timing: bool
+    timing_bounded: bool
+    sequence: _SequenceDim | None
+    protocol: _ProtocolDim | None
+    credential: _CredentialDim | None
+    target: _TargetDim | None
+    tokens: frozenset[tuple[str, Any]]
+    shape: tuple
+
+
+def _bag(seq: Any) -> _Bag:
+    items = list(seq)
+    return _Bag(Counter(items), len(items))
+
+
+def _credential_bag(creds: list) -> _Bag:
+    return _bag((c.get("username_pattern", ""), c.get("password_class", "")) for c in creds)
+
+
+def _non_negative(values: Iterable, upper: float = math.inf) -> bool:
+    try:
+        return all(0.0 <= float(v) <= upper for v in values)
+    except (TypeError, ValueError):
+        return False
+
+
+def _timing_bounded(t: dict[str, Any]) -> bool:
+    """True when every timing sub-score is known to be <= 1.0 for this fingerprint.
+
+    _stat_sim stays <= 1 for non-negative inputs, 1 - JSD stays <= 1 (up to
+    rounding far below 1e-6) for histograms of fractions, and _cv_sim is <= 1
+    for any number.  Values the exact score could not convert also fail.
+    """
+    interval = t.get("interval") or {}
+    stats = [interval.get(k, 0.0) for k in ("mean", "stddev", "p25", "p75", "p95")]
+    histograms = [*(t.get("tod_histogram") or []), *(t.get("dow_histogram") or [])]
+    burst_cv = t.get("burst_cv")
+    return (
+        _non_negative(stats)
+        and _non_negative(histograms, upper=1.0)
+        and (burst_cv is None or _non_negative([abs(float(burst_cv))]))
+    )
+
+
+def summarize(fp: ParsedFingerprint) -> FeatureSummary | None:
+    """Summarise fp for bounding; None when its features have an unexpected shape."""
+    try:
+        return _summarize(fp)
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def _summarize(fp: ParsedFingerprint) -> FeatureSummary:
+    # (namespace, value) pairs: tuple equality matches the == the exact
+    # similarity uses, so 22 and 22.0 are the same token and 22 and "22" are not.
+    tokens: set[tuple[str, Any]] = set()
+
+    def _tag(prefix: str, values: Iterable) -> None:
+        tokens.update((prefix, v) for v in values)
+
+    sequence = None
+    if fp.sequence is not None:
+        s = fp.sequence
+        sequence = _SequenceDim(
+            ports=_bag(s.get("port_sequence") or []),
+            event_types=_bag((s.get("event_type_sequence") or [])[:_MAX_EVENT_TYPES]),
+            credentials=_credential_bag(s.get("credential_sequence") or []),
+        )
+        _tag("sp", sequence.ports.counts)
+        _tag("se", sequence.event_types.counts)
+        _tag("sc", sequence.credentials.counts)
+
+    protocol = None
+    if fp.protocol is not None:
+        p = fp.protocol
+        kex = p.get("ssh_kex_ordering")
+        tls = p.get("tls_cipher_ordering")
+        protocol = _ProtocolDim(
+            services=frozenset((p.get("service_distribution") or {}).keys()),
+            kex=_bag(kex) if kex is not None else None,
+            tls=_bag(tls) if tls is not None else None,
+        )
+        _tag("ps", protocol.services)
+        if protocol.kex is not None:
+            _tag("pk", protocol.kex.counts)
+        if protocol.tls is not None:
+            _tag("pt", protocol.tls.counts)
+
+    credential = None
+    if fp.credential is not None:
+        c = fp.credential
+        char_class = dict(c.get("password_char_class") or {})
+        credential = _CredentialDim(
+            username_classes=frozenset((c.get("username_class_dist") or {}).keys()),
+            char_class=char_class,
+            char_class_bounded=_non_negative(char_class.values()),
+            credentials=_credential_bag(c.get("credential_sequence") or []),
+        )
+        _tag("cu", credential.username_classes)
+        _tag("cc", credential.credentials.counts)
+
+    target = None
+    if fp.target is not None:
+        t = fp.target
+        pf = t.get("port_freq") or {}
+        target = _TargetDim(
+            top_ports=frozenset(sorted(pf, key=lambda k: pf[k], reverse=True)[:10]),
+            dst_ports=_bag(t.get("top_dst_ports") or []),
+        )
+        _tag("tf", target.top_ports)
+        _tag("td", target.dst_ports.counts)
+
+    timing = fp.timing is not None
+    timing_bounded = timing and _timing_bounded(fp.timing)
+
+    def _kind(bag: _Bag | None) -> int:
+        return 0 if bag is None else (1 if bag.length == 0 else 2)
+
+    shape = (
+        timing,
+        timing_bounded,
+        sequence
+        and (
+            sequence.ports.length > 0,
+            sequence.event_types.length > 0,
+            sequence.credentials.length > 0,
+        ),
+        protocol and (bool(protocol.services), _kind(protocol.kex), _kind(protocol.tls)),
+        credential
+        and (
+            bool(credential.username_classes),
+            bool(credential.char_class),
+            credential.char_class_bounded,
+            credential.credentials.length > 0,
+        ),
+        target and (bool(target.top_ports), target.dst_ports.length > 0),
+    )
+    return FeatureSummary(
+        timing=timing,
+        timing_bounded=timing_bounded,
+        sequence=sequence,
+        protocol=protocol,
+        credential=credential,
+        target=target,
+        tokens=frozenset(tokens),
+        shape=shape,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Upper bound
+# ---------------------------------------------------------------------------
+
+
+def _overlap(a: _Bag, b: _Bag) -> int:
+    small, large = (a.counts, b.counts) if len(a.counts) <= len(b.counts) else (b.counts, a.counts)
+    return sum(min(n, large[k]) for k, n in small.items() if k in large)
+
+
+def _no_overlap(a: _Bag, b: _Bag) -> int:
+    return 0
+
+
+def _edit_bound(a: _Bag, b: _Bag, overlap) -> float:
+    """Upper bound of _normalized_edit_sim over the two sequences."""
+    if a.length == 0 and b.length == 0:
+        return 1.0
+    longest = max(a.length, b.length)
+    return 1.0 - (longest - overlap(a, b)) / longest
+
+
+def _set_jaccard(a: frozenset, b: frozenset, disjoint: bool) -> float:
+    return _jaccard(set(), a | b) if disjoint else _jaccard(set(a), set(b))
+
+
+def _mean(scores: list[float]) -> float:
+    if not scores:
+        return 0.0
+    return round(sum(scores) / len(scores), 6)
+
+
+def _sequence_bound(a: _SequenceDim, b: _SequenceDim, overlap) -> float:
+    scores: list[float] = []
+    for x, y in (
+        (a.ports, b.ports),
+        (a.event_types, b.event_types),
+        (a.credentials, b.credentials),
+    ):
+        if x.length or y.length:
+            scores.append(_edit_bound(x, y, overlap))
+    return _mean(scores)
+
+
+def _protocol_bound(a: _ProtocolDim, b: _ProtocolDim, overlap, disjoint: bool) -> float:
+    scores: list[float] = []
+    if a.services or b.services:
+        scores.append(_set_jaccard(a.services, b.services, disjoint))
+    if a.kex is not None and b.kex is not None:
+        scores.append(_edit_bound(a.kex, b.kex, overlap))
+    if a.tls is not None and b.tls is not None:
+        scores.append(_edit_bound(a.tls, b.tls, overlap))
+    return _mean(scores)
+
+
+def _credential_bound(a: _CredentialDim, b: _CredentialDim, overlap, disjoint: bool) -> float:
+    scores: list[float] = []
+    if a.username_classes or b.username_classes:
+        scores.append(_set_jaccard(a.username_classes, b.username_classes, disjoint))
+    seq = None
+    if a.credentials.length or b.credentials.length:
+        seq = _edit_bound(a.credentials, b.credentials, overlap)
+
+    if disjoint:
+        # Char-class keys are not indexed: whether the two fingerprints share
+        # one is unknown, so take the larger of "shared, scoring at most 1.0"
+        # and "no shared key, term absent".
+        variants = [scores + ([seq] if seq is not None else [])]
+        if a.char_class and b.char_class:
+            variants.append(scores + [1.0] + ([seq] if seq is not None else []))
+        return max(_mean(v) for v in variants)
+
+    shared = set(a.char_class.keys()) & set(b.char_class.keys())
+    if shared:
+        sims = [_stat_sim(float(a.char_class[k]), float(b.char_class[k])) for k in shared]
+        scores.append(sum(sims) / len(sims))
+    if seq is not None:
+        scores.append(seq)
+    return _mean(scores)
+
+
+def _target_bound(a: _TargetDim, b: _TargetDim, overlap, disjoint: bool) -> float:
+    scores: list[float] = []
+    if a.top_ports or b.top_ports:
+        scores.append(_set_jaccard(a.top_ports, b.top_ports, disjoint))
+    if a.dst_ports.length or b.dst_ports.length:
+        scores.append(_edit_bound(a.dst_ports, b.dst_ports, overlap))
+    return _mean(scores)
+
+
+def _effective_weights(weights: dict[str, float] | None) -> tuple[float, ...] | None:
+    """The five weights compute_weighted_similarity() would use; None if not all positive."""
+    w = weights or {}
+    values = (
+        w.get("timing", _similarity.WEIGHT_TIMING),
+        w.get("sequence", _similarity.WEIGHT_SEQUENCE),
+        w.get("protocol", _similarity.WEIGHT_PROTOCOL),
+        w.get("credential", _similarity.WEIGHT_CREDENTIAL),
+        w.get("target", _similarity.WEIGHT_TARGET),
+    )
+    try:
+        if all(float(v) > 0.0 for v in values):
+            return values
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+def _bound(a: FeatureSummary, b: FeatureSummary, weights: tuple[float, ...], disjoint: bool):
+    if (a.timing and b.timing) and not (a.timing_bounded and b.timing_bounded):
+        return math.inf
+    if (
+        disjoint
+        and a.credential is not None
+        and b.credential is not None
+        and a.credential.char_class
+        and b.credential.char_class
+        and not (a.credential.char_class_bounded and b.credential.char_class_bounded)
+    ):
+        return math.inf
+    overlap = _no_overlap if disjoint else _overlap
+    sims = (
+        1.0 if a.timing and b.timing else None,
+        (
+            _sequence_bound(a.sequence, b.sequence, overlap)
+            if a.sequence is not None and b.sequence is not None
+            else None
+        ),
+        (
+            _protocol_bound(a.protocol, b.protocol, overlap, disjoint)
+            if a.protocol is not None and b.protocol is not None
+            else None
+        ),
+        (
+            _credential_bound(a.credential, b.credential, overlap, disjoint)
+            if a.credential is not None and b.credential is not None
+            else None
+        ),
+        (
+            _target_bound(a.target, b.target, overlap, disjoint)
+            if a.target is not None and b.target is not None
+            else None
+        ),
+    )
+    numerator = 0.0
+    denominator = 0.0
+    for sim, weight in zip(sims, weights, strict=True):
+        if sim is not None:
+            numerator += weight * sim
+            denominator += weight
+    return round(numerator / denominator if denominator > 0.0 else 0.0, 6)
+
+
+def similarity_upper_bound(
+    a: FeatureSummary,
+    b: FeatureSummary,
+    *,
+    weights: dict[str, float] | None = None,
+) -> float:
+    """Upper bound of compute_weighted_similarity(a, b, weights=weights).weighted_total."""
+    effective = _effective_weights(weights)
+    if effective is None:
+        return math.inf
+    return _bound(a, b, effective, disjoint=False)
+
+
+def disjoint_upper_bound(
+    a: FeatureSummary,
+    b: FeatureSummary,
+    *,
+    weights: dict[str, float] | None = None,
+) -> float:
+    """similarity_upper_bound() for b sharing no token with a.
+
+    Only b.shape is read from b, so one value serves every such campaign with
+    the same shape and weights.
+    """
+    effective = _effective_weights(weights)
+    if effective is None:
+        return math.inf
+    return _bound(a, b, effective, disjoint=True)
+
+
+# ---------------------------------------------------------------------------
+# Inverted index
+# ---------------------------------------------------------------------------
+
+
+class CandidateIndex:
+    """Immutable map of feature token → campaign ids; changed() returns a new index."""
+
+    def __init__(self, postings: dict[str, frozenset[str]] | None = None) -> None:
+        self._postings: dict[str, frozenset[str]] = postings or {}
+
+    def changed(
+        self,
+        removed: dict[str, FeatureSummary],
+        added: dict[str, FeatureSummary],
+    ) -> CandidateIndex:
+        """Return a copy without the removed campaigns' tokens and with the added ones."""
+        if not removed and not added:
+            return self
+        drop: dict[str, set[str]] = {}
+        for cid, summary in removed.items():
+            for token in summary.tokens:
+                drop.setdefault(token, set()).add(cid)
+        add: dict[str, set[str]] = {}
+        for cid, summary in added.items():
+            for token in summary.tokens:
+                add.setdefault(token, set()).add(cid)
+
+        postings = dict(self._postings)
+        for token in drop.keys() | add.keys():
+            ids = (postings.get(token, frozenset()) - drop.get(token, set())) | add.get(
+                token, set()
+            )
+            if ids:
+                postings[token] = frozenset(ids)
+            else:
+                postings.pop(token, None)
+        return CandidateIndex(postings)
+
+    def sharing(self, summary: FeatureSummary) -> set[str]:
+        """Campaign ids that share at least one token with summary."""
+        ids: set[str] = set()
+        for token in summary.tokens:
+            ids.update(self._postings.get(token, ()))
+        return ids
+
+
+def viable_candidates(
+    summary: FeatureSummary | None,
+    candidates: list[ClusteringCandidate],
+    index: CandidateIndex,
+    indexed: frozenset[str] | set[str],
+    threshold: float,
+) -> list[ClusteringCandidate]:
+    """Candidates whose similarity to summary can reach threshold, in their original order.
+
+    indexed holds the ids whose summaries are in index; the others are always
+    bounded one by one.
+    """
+    if summary is None:
+        return list(candidates)
+    sharing = index.sharing(summary)
+    shape_bounds: dict[tuple, float] = {}
+    viable: list[ClusteringCandidate] = []
+    for candidate in candidates:
+        other = candidate.summary
+        if other is None:
+            viable.append(candidate)
+            continue
+        if candidate.campaign_id in indexed and candidate.campaign_id not in sharing:
+            weights = candidate.weight_profile
+            key = (other.shape, tuple(sorted(weights.items())) if weights else None)
+            bound = shape_bounds.get(key)
+            if bound is None:
+                bound = disjoint_upper_bound(summary, other, weights=weights)
+                shape_bounds[key] = bound
+        else:
+            bound = similarity_upper_bound(summary, other, weights=candidate.weight_profile)
+        if bound >= threshold:
+            viable.append(candidate)
+    return viable
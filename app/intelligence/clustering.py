@@ -5,9 +5,20 @@ Entry point: assign_to_campaign(ip, fp, repo, now)
 Algorithm per §8.2 and §12.3:
   1. Gate: confidence < 0.20 → skip (sparse fingerprint, §12.6)
   2. Already a member → update last_active, record observation, return
-  3. Fetch candidate campaigns (active / dormant / reactivated)
+  3. Fetch candidate campaigns (active / dormant / reactivated) from the
+     process-wide candidate cache, which keeps their representative
+     fingerprints parsed between runs (app/intelligence/candidate_cache.py),
+     and drop those whose similarity upper bound is below
+     SIMILARITY_UNCERTAIN_LOW (app/intelligence/candidate_index.py) — they
+     could never be selected in step 5.  From CLUSTERING_NUMPY_MIN_CANDIDATES
+     candidates, the cached ones are first scored all at once by the NumPy
+     kernel (app/intelligence/similarity_numpy.py) and only those within
+     SCORE_TOLERANCE of the best go on to step 4
   4. For each candidate, compute weighted similarity; apply temporal threshold
-     bump if the campaign has been dormant for 6+ or 12+ months (§12.3)
+     bump if the campaign has been dormant for 6+ or 12+ months (§12.3).
+     A comparison is abandoned as soon as it can no longer reach
+     SIMILARITY_UNCERTAIN_LOW or beat the best score so far
+     (bounded_weighted_similarity() in app/intelligence/similarity.py)
   5. Select the highest-scoring candidate above SIMILARITY_UNCERTAIN_LOW
   6. Decision:
        score ≥ effective_auto_threshold  → automatic_association
@@ -27,18 +38,32 @@ No ML, no external APIs, no raw credentials or IPs in outputs.
 from __future__ import annotations
 
 import json
+import math
 import uuid
 from dataclasses import dataclass, field
 from datetime import UTC, datetime
 from typing import TYPE_CHECKING, Any
 
+from app.intelligence.candidate_cache import (
+    CandidateCache,
+    CandidateSet,
+    ClusteringCandidate,
+    get_candidate_cache,
+)
+from app.intelligence.candidate_index import summarize, viable_candidates
 from app.intelligence.constants import (
     SIMILARITY_AUTO_THRESHOLD,
     SIMILARITY_UNCERTAIN_LOW,
     TEMPORAL_THRESHOLD_6M,
     TEMPORAL_THRESHOLD_12M,
 )
-from app.intelligence.similarity import SimilarityResult, compute_weighted_similarity
+from app.intelligence.similarity import (
+    ParsedFingerprint,
+    SimilarityResult,
+    bounded_weighted_similarity,
+    parse_fingerprint,
+)
+from app.intelligence.similarity_numpy import contenders, score_against_many, use_for
 
 if TYPE_CHECKING:
     from app.db.repository import EventRepository
@@ -109,6 +134,39 @@ def _dormancy_gap_days(campaign_last_seen: str, now: datetime) -> float | None:
         return None
 
 
+# ---------------------------------------------------------------------------
+# Candidate selection
+# ---------------------------------------------------------------------------
+
+
+def _candidates_to_score(
+    parsed_fp: ParsedFingerprint,
+    candidate_set: CandidateSet,
+) -> list[ClusteringCandidate]:
+    """Candidates that may be selected in step 5, in their original order.
+
+    Packed candidates outside contenders() cannot score the best exact total
+    at or above SIMILARITY_UNCERTAIN_LOW; everything else is bounded by
+    viable_candidates() as before.
+    """
+    candidates = candidate_set.candidates
+    packed = candidate_set.packed
+    if packed is not None and use_for(len(candidates)):
+        scores = score_against_many(parsed_fp, packed, floor=SIMILARITY_UNCERTAIN_LOW)
+        if scores is not None:
+            keep = contenders(scores, SIMILARITY_UNCERTAIN_LOW)
+            candidates = [
+                c for c in candidates if c.campaign_id in keep or c.campaign_id not in packed
+            ]
+    return viable_candidates(
+        summarize(parsed_fp),
+        candidates,
+        candidate_set.index,
+        candidate_set.indexed,
+        SIMILARITY_UNCERTAIN_LOW,
+    )
+
+
 # ---------------------------------------------------------------------------
 # Public entry point
 # ---------------------------------------------------------------------------
@@ -119,6 +177,8 @@ def assign_to_campaign(
     fp: dict[str, Any],
     repo: EventRepository,
     now: datetime | None = None,
+    *,
+    cache: CandidateCache | None = None,
 ) -> ClusteringDecision:
     """Assign ip's fingerprint to an existing or new campaign.
 
@@ -127,6 +187,7 @@ def assign_to_campaign(
     strings (or None).
 
     now is injectable for deterministic testing; defaults to UTC now.
+    cache defaults to the process-wide candidate cache.
     """
     if now is None:
         now = datetime.now(UTC)
@@ -173,8 +234,10 @@ def assign_to_campaign(
             reason="IP already assigned; observation and last_active updated",
         )
 
-    # Step 3: Fetch candidate campaigns.
-    candidates = repo.get_campaigns_for_clustering()
+    # Step 3: Fetch candidate campaigns; fp is parsed once for all of them.
+    candidate_set = (cache or get_candidate_cache()).load(repo)
+    parsed_fp = parse_fingerprint(fp)
+    candidates = _candidates_to_score(parsed_fp, candidate_set)
 
     # Step 4: Find best candidate above the uncertain-low threshold.
     best_campaign_id: str | None = None
@@ -184,20 +247,32 @@ def assign_to_campaign(
     best_status: str | None = None
 
     for candidate in candidates:
-        campaign_weights = candidate.get("weight_profile")  # None → global defaults
-        sim = compute_weighted_similarity(fp, candidate, weights=campaign_weights)
+        # A candidate can only be selected with score > best so far.
+        floor = (
+            SIMILARITY_UNCERTAIN_LOW
+            if best_sim is None
+            else math.nextafter(best_sim.weighted_total, math.inf)
+        )
+        sim = bounded_weighted_similarity(
+            parsed_fp,
+            candidate.fingerprint,
+            floor=floor,
+            weights=candidate.weight_profile,  # None → global defaults
+        )
+        if sim is None:
+            continue
         score = sim.weighted_total
 
-        effective_auto = _get_effective_auto_threshold(candidate["last_seen"], now)
+        effective_auto = _get_effective_auto_threshold(candidate.last_seen, now)
 
         if score >= SIMILARITY_UNCERTAIN_LOW and (
             best_sim is None or score > best_sim.weighted_total
         ):
-            best_campaign_id = candidate["campaign_id"]
+            best_campaign_id = candidate.campaign_id
             best_sim = sim
             best_auto_threshold = effective_auto
-            best_last_seen = candidate["last_seen"]
-            best_status = candidate["status"]
+            best_last_seen = candidate.last_seen
+            best_status = candidate.status
 
     # Step 5–7: Decision and persistence.
     if best_sim is not None:
@@ -18,6 +18,13 @@ from app.core.config import settings
 # JSON field structure changes and old fingerprints need recomputation (§12.1).
 FINGERPRINT_VERSION: int = 1
 
+# Version of the per-event fingerprint_fields() derivation (pattern
+# classifiers, password flags, KEX / cipher extraction), stamped on every
+# event_fingerprint_fields row.  Increment together with FINGERPRINT_VERSION
+# when the derivation changes: the refingerprint job re-derives older rows
+# from raw_events.raw_json before rebuilding their fingerprints.
+FINGERPRINT_FIELDS_VERSION: int = 1
+
 # Inactivity gap (seconds) that ends one session and starts the next (§3.3).
 SESSION_GAP_SECONDS: int = 1800  # 30 minutes
 
@@ -30,6 +37,19 @@ TOP_PORT_FREQ_N: int = 20
 # Maximum credential-sequence entries stored; limits JSON growth (Appendix).
 MAX_CREDENTIAL_SEQUENCE: int = 50
 
+# Version of the persisted incremental fingerprint state (fingerprint_state).
+# Increment when FingerprintState's serialised layout changes; stored states
+# with another version are discarded and rebuilt from events.
+FINGERPRINT_STATE_VERSION: int = 1
+
+# Within-session intervals kept verbatim in the incremental state, giving exact
+# percentiles.  Beyond this the intervals move to a log-bucketed sketch.
+EXACT_INTERVAL_LIMIT: int = 4096
+
+# Relative accuracy of the interval sketch: every percentile taken from it is
+# within this fraction of the exact value.
+INTERVAL_SKETCH_ACCURACY: float = 0.01
+
 # ---------------------------------------------------------------------------
 # Campaign clustering weights (§3.2, §12.2) — configurable via settings
 # Must sum to 1.0.  Changing weights retroactively requires re-clustering (§12.2).
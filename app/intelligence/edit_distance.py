@@ -0,0 +1,125 @@
+"""Levenshtein distance over arbitrary list elements, for similarity scoring.
+
+_normalized_edit_sim() in app/intelligence/similarity.py runs on port,
+event-type and credential sequences and on KEX and cipher orderings, several
+times per candidate pair.  levenshtein() returns exactly the distance of the
+textbook O(m·n) dynamic programme (_levenshtein_dp), computed as follows:
+
+  Interning  — the elements of both sequences are mapped to small ints in
+               order of first appearance, so two elements share an id exactly
+               when they compare equal.  The distance depends only on that
+               equality pattern
+  Memo       — distances are cached by the interned pair, so sequences that
+               repeat across campaigns (the same credential list, the same
+               KEX ordering) are computed once
+  Bit-vector — when the shorter sequence has at most 64 elements, Hyyrö's
+               formulation of Myers' bit-parallel algorithm computes a whole
+               DP column in a handful of integer operations: O(n) steps
+               instead of O(m·n)
+
+Sequences the interning cannot represent faithfully go to the dynamic
+programme unchanged: unhashable elements (lists inside a JSON ordering) and
+float NaN, which is unequal to itself while a dict lookup would match it.
+"""
+
+from __future__ import annotations
+
+import functools
+import math
+
+# Longest pattern handled by the bit-parallel path, in elements.
+BIT_PARALLEL_MAX = 64
+
+# Interned pairs kept by the memo.
+_CACHE_SIZE = 16384
+
+
+def _levenshtein_dp(a: list, b: list) -> int:
+    """Standard Levenshtein distance over arbitrary list elements."""
+    m, n = len(a), len(b)
+    if m == 0:
+        return n
+    if n == 0:
+        return m
+    dp = list(range(n + 1))
+    for i in range(1, m + 1):
+        prev = dp[0]
+        dp[0] = i
+        for j in range(1, n + 1):
+            temp = dp[j]
+            dp[j] = prev if a[i - 1] == b[j - 1] else 1 + min(prev, dp[j], dp[j - 1])
+            prev = temp
+    return dp[n]
+
+
+def _intern(a: list, b: list) -> tuple[tuple[int, ...], tuple[int, ...]] | None:
+    """Map the elements of a and b to ids; None when ids cannot stand in for ==."""
+    ids: dict = {}
+    try:
+        ia = tuple(ids.setdefault(x, len(ids)) for x in a)
+        ib = tuple(ids.setdefault(x, len(ids)) for x in b)
+    except TypeError:  # unhashable element
+        return None
+    if any(isinstance(x, float) and math.isnan(x) for x in ids):
+        return None
+    return ia, ib
+
+
+def _bit_parallel(pattern: tuple[int, ...], text: tuple[int, ...]) -> int:
+    """Edit distance by Hyyrö's bit-vector algorithm; len(pattern) ≤ 64."""
+    m = len(pattern)
+    mask = (1 << m) - 1
+    last = 1 << (m - 1)
+    peq: dict[int, int] = {}
+    for i, c in enumerate(pattern):
+        peq[c] = peq.get(c, 0) | (1 << i)
+
+    pv = mask
+    mv = 0
+    score = m
+    for c in text:
+        eq = peq.get(c, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & mask)
+        mh = pv & xh
+        if ph & last:
+            score += 1
+        elif mh & last:
+            score -= 1
+        # Row 0 of the DP grows by one per text element: shift in a +1.
+        ph = ((ph << 1) | 1) & mask
+        mh = (mh << 1) & mask
+        pv = mh | (~(xv | ph) & mask)
+        mv = ph & xv
+    return score
+
+
+@functools.lru_cache(maxsize=_CACHE_SIZE)
+def _interned_distance(ia: tuple[int, ...], ib: tuple[int, ...]) -> int:
+    pattern, text = (ia, ib) if len(ia) <= len(ib) else (ib, ia)
+    if len(pattern) <= BIT_PARALLEL_MAX:
+        return _bit_parallel(pattern, text)
+    return _levenshtein_dp(list(ia), list(ib))
+
+
+def levenshtein(a: list, b: list) -> int:
+    """Levenshtein distance between a and b; always equal to _levenshtein_dp(a, b)."""
+    if not a:
+        return len(b)
+    if not b:
+        return len(a)
+    interned = _intern(a, b)
+    if interned is None:
+        return _levenshtein_dp(a, b)
+    return _interned_distance(*interned)
+
+
+def cache_info() -> functools._CacheInfo:
+    """Hit/miss counters of the memo."""
+    return _interned_distance.cache_info()
+
+
+def clear_cache() -> None:
+    """Drop every memoised distance."""
+    _interned_distance.cache_clear()
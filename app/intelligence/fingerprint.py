@@ -3,6 +3,19 @@
 Bridges the pure feature extraction in sequence.py and the database layer.
 build_fingerprint() accepts the event list returned by the repository and
 produces a dict whose keys map directly to behavioral_fingerprints columns.
+build_fingerprint_from_state() produces the same dict from an incremental
+FingerprintState (app/intelligence/incremental.py) instead of the events.
+
+FingerprintWindow describes which of an IP's events a fingerprint is built
+from (FINGERPRINT_WINDOW): all of them, the newest N, the last T days before
+the newest event, or a deterministic sample of N spread evenly over the IP's
+history.  Its label is recorded with every fingerprint_history snapshot.
+
+fingerprint_content_hash() digests the parts of a built fingerprint that
+similarity scoring compares; it is stored as
+behavioral_fingerprints.features_hash so a recompute that would score the
+same as the stored fingerprint can be recognised without comparing the
+JSON columns.
 
 Confidence model (§12.6):
   - event_count < MIN_EVENTS_FOR_CLUSTERING  →  confidence < 0.20 (sparse)
@@ -15,11 +28,99 @@ clustering.  PR 4 gates clustering on confidence >= 0.20.
 
 from __future__ import annotations
 
+import hashlib
 import json
-from typing import Any
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+from typing import TYPE_CHECKING, Any
 
 from app.intelligence.constants import MIN_EVENTS_FOR_CLUSTERING
 from app.intelligence.sequence import extract_all_features
+from app.intelligence.similarity import compared_features, parse_fingerprint
+
+if TYPE_CHECKING:
+    from app.intelligence.incremental import FingerprintState
+
+# ---------------------------------------------------------------------------
+# Event window
+# ---------------------------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class FingerprintWindow:
+    """Which of an IP's events a fingerprint is built from.
+
+    mode is one of:
+      all          every event (the default; incremental refreshes apply)
+      last_events  the newest `events` events
+      last_days    events from the `days` days before the IP's newest event,
+                   at most the newest `events` of them
+      sample       `events` events, one from each of `events` equal-size,
+                   consecutive slices of the IP's timestamp-ordered history
+                   (every event when the IP has no more than `events`)
+
+    Windows other than "all" bound the events a refresh loads, so the
+    fingerprint is rebuilt from the window each time.
+    """
+
+    mode: str = "all"
+    events: int | None = None
+    days: int | None = None
+
+    @classmethod
+    def from_settings(cls) -> FingerprintWindow:
+        from app.core.config import settings
+
+        mode = settings.FINGERPRINT_WINDOW
+        if mode in ("last_events", "sample"):
+            return cls(mode, events=settings.FINGERPRINT_WINDOW_EVENTS)
+        if mode == "last_days":
+            return cls(
+                mode,
+                events=settings.FINGERPRINT_WINDOW_EVENTS,
+                days=settings.FINGERPRINT_WINDOW_DAYS,
+            )
+        return cls()
+
+    @property
+    def bounded(self) -> bool:
+        return self.mode != "all"
+
+    @property
+    def label(self) -> str:
+        """Compact form stored in fingerprint_history, e.g. "last_events:100000".
+
+        last_days with an event cap is "last_days:<days>:<events>".
+        """
+        if self.mode in ("last_events", "sample"):
+            return f"{self.mode}:{self.events}"
+        if self.mode == "last_days":
+            if self.events is None:
+                return f"{self.mode}:{self.days}"
+            return f"{self.mode}:{self.days}:{self.events}"
+        return "all"
+
+    def apply(self, events: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """Select this window from an IP's complete, chronological event list.
+
+        The same events iter_fingerprint_events() selects in SQL for the
+        window, for callers that already hold all of the IP's events.
+        """
+        if not events or self.mode == "all":
+            return events
+        if self.mode == "last_events":
+            return events[-self.events :] if self.events else []
+        if self.mode == "last_days":
+            newest = datetime.fromisoformat(events[-1]["ts"]).astimezone(UTC)
+            since = (newest - timedelta(days=self.days or 0)).isoformat()
+            recent = [e for e in events if e["ts"] >= since]
+            return recent if self.events is None else recent[-self.events :]
+        n = self.events or 0
+        total = len(events)
+        if total <= n:
+            return events
+        return [events[k * total // n] for k in range(n)]
+
 
 # ---------------------------------------------------------------------------
 # Confidence calculation
@@ -70,9 +171,20 @@ def build_fingerprint(events: list[dict[str, Any]]) -> dict[str, Any]:
         timing_features, sequence_features, protocol_features,
         credential_features, target_features, tool_signals
     """
-    event_count = len(events)
-    raw_features = extract_all_features(events)
+    return _package(len(events), extract_all_features(events))
+
+
+def build_fingerprint_from_state(state: FingerprintState) -> dict[str, Any]:
+    """Render a fingerprint from an incremental FingerprintState.
+
+    Same keys as build_fingerprint(); values agree with build_fingerprint()
+    over the events folded into state within the tolerance documented in
+    app/intelligence/incremental.py.
+    """
+    return _package(state.event_count, state.features())
+
 
+def _package(event_count: int, raw_features: dict[str, Any]) -> dict[str, Any]:
     populated = sum(1 for v in raw_features.values() if v is not None)
     total = len(raw_features)  # always 6
     confidence = compute_confidence(event_count, populated, total)
@@ -90,3 +202,47 @@ def build_fingerprint(events: list[dict[str, Any]]) -> dict[str, Any]:
         "target_features": _to_json(raw_features["target_features"]),
         "tool_signals": _to_json(raw_features["tool_signals"]),
     }
+
+
+# ---------------------------------------------------------------------------
+# Content hash
+# ---------------------------------------------------------------------------
+
+# Significant digits kept of every float hashed by fingerprint_content_hash(),
+# so ratios and interval stats that drift in the last digits as a repeated
+# pattern grows do not register as a change.
+_HASH_FLOAT_DIGITS = 3
+
+
+def _round_floats(value: Any) -> Any:
+    """value with every float rounded to _HASH_FLOAT_DIGITS significant digits."""
+    if isinstance(value, float):
+        return float(f"{value:.{_HASH_FLOAT_DIGITS}g}")
+    if isinstance(value, dict):
+        return {k: _round_floats(v) for k, v in value.items()}
+    if isinstance(value, list | tuple):
+        return [_round_floats(v) for v in value]
+    return value
+
+
+def fingerprint_content_hash(
+    fp: dict[str, Any], *, fingerprint_version: int, window_label: str
+) -> str:
+    """Return a SHA-256 hex digest of what similarity scoring reads from fp.
+
+    Only compared_features() is covered: event_count, confidence,
+    tool_signals, event types past the first 50 and the exact service and
+    port frequencies all grow or shift while the same behaviour repeats, so
+    hashing them would make nearly every recompute of a long-lived IP look
+    new.  The fingerprint version and window label are part of the digest,
+    so a FINGERPRINT_VERSION bump or a change of FINGERPRINT_WINDOW always
+    counts as a change even when the features happen to match.
+    """
+    payload = [
+        fingerprint_version,
+        window_label,
+        _round_floats(compared_features(parse_fingerprint(fp))),
+    ]
+    return hashlib.sha256(
+        json.dumps(payload, sort_keys=True, separators=(",", ":")).encode()
+    ).hexdigest()
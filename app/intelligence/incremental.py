@@ -0,0 +1,529 @@
+"""Incremental behavioral fingerprints from persisted per-IP accumulators.
+
+build_fingerprint() re-reads and re-scans every event an IP has ever produced,
+so refreshing a long-lived scanner's fingerprint costs O(its history) on every
+ingest.  FingerprintState is a mergeable summary of that history from which the
+extract_all_features() dict can be rendered without the events:
+
+  timing      last event epoch, the open session (start, last, size), Welford
+              moments of within-session intervals and of closed-session
+              durations, 24 hour / 7 weekday counts, and the intervals
+              themselves for percentiles (exact list, then a sketch — below)
+  sequence    first-seen distinct ports (capped at TOP_PORT_SEQUENCE_N), the
+              event-type sequence run-length encoded, the credential pattern
+              prefix (capped at MAX_CREDENTIAL_SEQUENCE)
+  protocol    service counts, first SSH KEX / TLS cipher ordering seen
+  credential  credential count, username-class counts, password length sum
+              and character-class counts
+  target      destination-port counts
+  tools       source and event-type counts
+
+Counters keep first-seen insertion order, so Counter.most_common() breaks
+count ties exactly as the full scan does.
+
+Tolerance against build_fingerprint() over the same events:
+  - every field except those listed below is identical;
+  - interval and session_duration mean/stddev (and burst_cv) come from
+    floating-point Welford moments where the full scan uses the exact
+    arithmetic of the statistics module: relative error ~1e-12, visible at
+    most as a one-unit flip in the last rounded digit;
+  - interval p25/p75/p95 are exact while the IP has at most
+    EXACT_INTERVAL_LIMIT intervals.  Past that the intervals are kept in a
+    log-bucketed sketch and each percentile is within INTERVAL_SKETCH_ACCURACY
+    relative error of the exact value;
+  - events that share a timestamp and were folded in different refreshes may
+    appear in a different relative order than the full scan's ORDER BY ts
+    gives them (event_type_sequence, first-seen orders).
+
+Events must be folded in timestamp order.  fold() refuses a batch whose
+earliest timestamp precedes the last one folded; the caller then rebuilds the
+state from all events (see _compute_and_store in app/intelligence/tasks.py).
+
+No FastAPI, SQLAlchemy, or router imports belong in this module.
+"""
+
+from __future__ import annotations
+
+import bisect
+import math
+from collections import Counter
+from collections.abc import Iterable
+from fractions import Fraction
+from typing import Any
+
+from app.intelligence.constants import (
+    EXACT_INTERVAL_LIMIT,
+    INTERVAL_SKETCH_ACCURACY,
+    MAX_CREDENTIAL_SEQUENCE,
+    SESSION_GAP_SECONDS,
+    TOP_PORT_FREQ_N,
+    TOP_PORT_SEQUENCE_N,
+)
+from app.intelligence.sequence import (
+    _PASSWORD_FLAG_BITS,
+    _credential_entry,
+    _event_credential,
+    _infer_tools,
+    _normalize_counts,
+    _parse_dt,
+    _percentile,
+    _ssh_kex,
+    _tls_ciphers,
+)
+
+# ---------------------------------------------------------------------------
+# Accumulators
+# ---------------------------------------------------------------------------
+
+
+class _Moments:
+    """Welford running count / mean / sum of squared deviations."""
+
+    __slots__ = ("n", "mean", "m2")
+
+    def __init__(self, n: int = 0, mean: float = 0.0, m2: float = 0.0) -> None:
+        self.n = n
+        self.mean = mean
+        self.m2 = m2
+
+    def add(self, x: float) -> None:
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+
+    def copy(self) -> _Moments:
+        return _Moments(self.n, self.mean, self.m2)
+
+    def pstdev(self) -> float:
+        return math.sqrt(max(self.m2, 0.0) / self.n) if self.n else 0.0
+
+    def to_list(self) -> list[float]:
+        return [self.n, self.mean, self.m2]
+
+
+class _IntervalDigest:
+    """Percentile summary of non-negative intervals.
+
+    Keeps the sorted values while there are at most EXACT_INTERVAL_LIMIT of
+    them.  Past that, values are counted in logarithmic buckets of ratio
+    gamma = (1 + a) / (1 - a), a = INTERVAL_SKETCH_ACCURACY; a bucket's
+    representative value is within a of every value it holds.  Zeros (same-
+    timestamp bursts) are counted separately and reported exactly.
+    """
+
+    _GAMMA = (1.0 + INTERVAL_SKETCH_ACCURACY) / (1.0 - INTERVAL_SKETCH_ACCURACY)
+    _LOG_GAMMA = math.log(_GAMMA)
+
+    def __init__(
+        self,
+        exact: list[float] | None = None,
+        zeros: int = 0,
+        buckets: dict[int, int] | None = None,
+    ) -> None:
+        self.exact = exact if exact is not None or buckets is not None else []
+        self.zeros = zeros
+        self.buckets = buckets
+
+    @property
+    def count(self) -> int:
+        if self.exact is not None:
+            return len(self.exact)
+        return self.zeros + sum(self.buckets.values())
+
+    def add(self, value: float) -> None:
+        if self.exact is not None:
+            bisect.insort(self.exact, value)
+            if len(self.exact) > EXACT_INTERVAL_LIMIT:
+                values, self.exact, self.buckets = self.exact, None, {}
+                for v in values:
+                    self._bucket(v)
+        else:
+            self._bucket(value)
+
+    def _bucket(self, value: float) -> None:
+        if value <= 0.0:
+            self.zeros += 1
+            return
+        key = math.ceil(math.log(value) / self._LOG_GAMMA)
+        self.buckets[key] = self.buckets.get(key, 0) + 1
+
+    def percentile(self, p: float) -> float:
+        """Linear-interpolation percentile, as sequence._percentile computes it."""
+        if self.exact is not None:
+            return _percentile(self.exact, p)
+        n = self.count
+        if n == 0:
+            return 0.0
+        idx = (n - 1) * p
+        lo = int(idx)
+        hi = min(lo + 1, n - 1)
+        lo_value, hi_value = self._value_at(lo), self._value_at(hi)
+        return lo_value + (idx - lo) * (hi_value - lo_value)
+
+    def _value_at(self, rank: int) -> float:
+        if rank < self.zeros:
+            return 0.0
+        seen = self.zeros
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if rank < seen:
+                return 2.0 * self._GAMMA**key / (self._GAMMA + 1.0)
+        raise IndexError(rank)
+
+    def to_dict(self) -> dict[str, Any]:
+        if self.exact is not None:
+            return {"exact": self.exact}
+        return {"zeros": self.zeros, "buckets": sorted(self.buckets.items())}
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> _IntervalDigest:
+        if "exact" in data:
+            return cls(exact=list(data["exact"]))
+        return cls(zeros=data["zeros"], buckets={int(k): c for k, c in data["buckets"]})
+
+
+def _bump(counts: dict, key: Any) -> None:
+    counts[key] = counts.get(key, 0) + 1
+
+
+# ---------------------------------------------------------------------------
+# Fingerprint state
+# ---------------------------------------------------------------------------
+
+
+class FingerprintState:
+    """Mergeable per-IP summary of every event folded into it.
+
+    fold() adds events; features() renders the six feature categories in the
+    exact shape extract_all_features() returns.  to_dict() / from_dict()
+    round-trip the state through JSON for the fingerprint_state table.
+    """
+
+    def __init__(self) -> None:
+        self.event_count = 0
+        self.last_ts: str | None = None
+        # timing
+        self.last_epoch: float | None = None
+        self.session_start = 0.0
+        self.session_size = 0
+        self.intervals = _Moments()
+        self.interval_digest = _IntervalDigest()
+        self.closed_sessions = _Moments()
+        self.tod = [0] * 24
+        self.dow = [0] * 7
+        # sequence
+        self.port_sequence: list[int] = []
+        self.event_type_runs: list[list[Any]] = []
+        self.credential_sequence: list[dict[str, str]] = []
+        # protocol
+        self.service_counts: dict[str, int] = {}
+        self.ssh_kex: list[str] | None = None
+        self.tls_ciphers: list[str] | None = None
+        # credential
+        self.credential_count = 0
+        self.username_classes: dict[str, int] = {}
+        self.password_count = 0
+        self.password_length_sum = 0
+        self.password_upper = 0
+        self.password_lower = 0
+        self.password_digit = 0
+        self.password_special = 0
+        # target
+        self.port_counts: dict[int, int] = {}
+        # tools
+        self.source_counts: dict[str, int] = {}
+        self.type_counts: dict[str, int] = {}
+
+    # -- folding ------------------------------------------------------------
+
+    def fold(self, events: Iterable[dict[str, Any]]) -> bool:
+        """Add events (repository event dicts) to the state.
+
+        Returns False, leaving the state untouched, when the earliest event
+        precedes the last one already folded — an out-of-order arrival that
+        only a rebuild from all events can place correctly.
+        """
+        ordered = sorted(events, key=lambda e: e["ts"])
+        if ordered and self.last_ts is not None and ordered[0]["ts"] < self.last_ts:
+            return False
+        username_cache: dict[str, str] = {}
+        password_cache: dict[str, tuple[str, int, int]] = {}
+        for event in ordered:
+            self._fold_one(event, username_cache, password_cache)
+        return True
+
+    def _fold_one(
+        self,
+        e: dict[str, Any],
+        username_cache: dict[str, str],
+        password_cache: dict[str, tuple[str, int, int]],
+    ) -> None:
+        ts = e["ts"]
+        dt = _parse_dt(ts)
+        epoch = dt.timestamp()
+        self.event_count += 1
+        self.last_ts = ts
+
+        # Sessions and intervals, mirroring extract_sessions() and
+        # compute_timing_features().
+        if self.last_epoch is None or epoch - self.last_epoch > SESSION_GAP_SECONDS:
+            self._close_session()
+            self.session_start = epoch
+            self.session_size = 1
+        else:
+            gap = (epoch - self.last_epoch) * 1000.0
+            if gap >= 0:
+                self.intervals.add(gap)
+                self.interval_digest.add(gap)
+            self.session_size += 1
+        self.last_epoch = epoch
+        self.tod[dt.hour] += 1
+        self.dow[dt.weekday()] += 1
+
+        port = e.get("dst_port")
+        if isinstance(port, int):
+            _bump(self.port_counts, port)
+            if len(self.port_sequence) < TOP_PORT_SEQUENCE_N and port not in self.port_sequence:
+                self.port_sequence.append(port)
+
+        event_type = e["event_type"]
+        if self.event_type_runs and self.event_type_runs[-1][0] == event_type:
+            self.event_type_runs[-1][1] += 1
+        else:
+            self.event_type_runs.append([event_type, 1])
+        _bump(self.type_counts, event_type)
+        _bump(self.source_counts, e.get("source", "unknown"))
+
+        svc = e.get("service")
+        if svc:
+            _bump(self.service_counts, svc)
+
+        raw = e.get("raw_data")
+        if self.ssh_kex is None:
+            self.ssh_kex = e.get("ssh_kex") if raw is None else _ssh_kex(raw)
+        if self.tls_ciphers is None:
+            self.tls_ciphers = e.get("tls_ciphers") if raw is None else _tls_ciphers(raw)
+
+        username_class, password_class, password_length, password_flags = _event_credential(
+            e, username_cache, password_cache
+        )
+        if username_class is None and password_class is None:
+            return
+        self.credential_count += 1
+        if len(self.credential_sequence) < MAX_CREDENTIAL_SEQUENCE:
+            self.credential_sequence.append(_credential_entry(username_class, password_class))
+        if username_class is not None:
+            _bump(self.username_classes, username_class)
+        if password_class is not None:
+            upper, lower, digit, special = (password_flags & bit for bit in _PASSWORD_FLAG_BITS)
+            self.password_count += 1
+            self.password_length_sum += password_length
+            self.password_upper += bool(upper)
+            self.password_lower += bool(lower)
+            self.password_digit += bool(digit)
+            self.password_special += bool(special)
+
+    def _close_session(self) -> None:
+        if self.session_size >= 2 and self.last_epoch is not None:
+            duration = self.last_epoch - self.session_start
+            if duration >= 0:
+                self.closed_sessions.add(duration)
+
+    # -- rendering ----------------------------------------------------------
+
+    def features(self) -> dict[str, Any]:
+        """Return the six feature categories, shaped as extract_all_features()."""
+        return {
+            "timing_features": self._timing_features(),
+            "sequence_features": self._sequence_features(),
+            "protocol_features": self._protocol_features(),
+            "credential_features": self._credential_features(),
+            "target_features": self._target_features(),
+            "tool_signals": self._tool_signals(),
+        }
+
+    def _timing_features(self) -> dict[str, Any] | None:
+        if self.event_count < 2 or self.intervals.n == 0:
+            return None
+
+        mean_iv = self.intervals.mean
+        stddev_iv = self.intervals.pstdev()
+        burst_cv = stddev_iv / mean_iv if mean_iv > 0.0 else 0.0
+
+        sessions = self.closed_sessions.copy()
+        if self.session_size >= 2 and self.last_epoch - self.session_start >= 0:
+            sessions.add(self.last_epoch - self.session_start)
+        session_dur: dict[str, float] | None = None
+        if sessions.n:
+            session_dur = {
+                "mean": round(sessions.mean, 3),
+                "stddev": round(sessions.pstdev(), 3),
+            }
+
+        tod = _normalize_counts([float(c) for c in self.tod])
+        dow = _normalize_counts([float(c) for c in self.dow])
+        digest = self.interval_digest
+        return {
+            "interval": {
+                "mean": round(mean_iv, 3),
+                "stddev": round(stddev_iv, 3),
+                "p25": round(digest.percentile(0.25), 3),
+                "p75": round(digest.percentile(0.75), 3),
+                "p95": round(digest.percentile(0.95), 3),
+            },
+            "session_duration": session_dur,
+            "tod_histogram": [round(v, 6) for v in tod],
+            "dow_histogram": [round(v, 6) for v in dow],
+            "burst_cv": round(burst_cv, 6),
+        }
+
+    def _sequence_features(self) -> dict[str, Any] | None:
+        if not self.port_sequence and not self.credential_sequence:
+            return None
+        return {
+            "port_sequence": list(self.port_sequence),
+            "event_type_sequence": [t for t, n in self.event_type_runs for _ in range(n)],
+            "credential_sequence": [dict(c) for c in self.credential_sequence],
+        }
+
+    def _protocol_features(self) -> dict[str, Any] | None:
+        if self.event_count == 0:
+            return None
+        counts = Counter(self.service_counts)
+        total = sum(counts.values())
+        service_dist = (
+            {svc: round(cnt / total, 6) for svc, cnt in counts.most_common()} if total > 0 else {}
+        )
+        return {
+            "service_distribution": service_dist,
+            "ssh_kex_ordering": self.ssh_kex,
+            "tls_cipher_ordering": self.tls_ciphers,
+        }
+
+    def _credential_features(self) -> dict[str, Any] | None:
+        if self.credential_count == 0:
+            return None
+        counts = Counter(self.username_classes)
+        total_u = sum(counts.values())
+        username_class_dist = (
+            {cls: round(cnt / total_u, 6) for cls, cnt in counts.most_common()}
+            if total_u > 0
+            else {}
+        )
+        pw_count = self.password_count
+        pw_char_class: dict[str, float] = {}
+        pw_length_mean: float | int | None = None
+        if pw_count > 0:
+            pw_char_class = {
+                "has_upper_ratio": round(self.password_upper / pw_count, 6),
+                "has_lower_ratio": round(self.password_lower / pw_count, 6),
+                "has_digit_ratio": round(self.password_digit / pw_count, 6),
+                "has_special_ratio": round(self.password_special / pw_count, 6),
+            }
+            # statistics.mean() over ints returns an int when the mean is whole.
+            mean = Fraction(self.password_length_sum, pw_count)
+            pw_length_mean = round(int(mean) if mean.denominator == 1 else float(mean), 3)
+        return {
+            "credential_count": self.credential_count,
+            "username_class_dist": username_class_dist,
+            "password_length_mean": pw_length_mean,
+            "password_char_class": pw_char_class,
+            "credential_sequence": [dict(c) for c in self.credential_sequence],
+        }
+
+    def _target_features(self) -> dict[str, Any] | None:
+        if not self.port_counts:
+            return None
+        counts = Counter(self.port_counts)
+        total = sum(counts.values())
+        top_ports = counts.most_common(TOP_PORT_FREQ_N)
+        return {
+            "port_freq": {str(p): round(cnt / total, 6) for p, cnt in top_ports},
+            "unique_port_count": len(counts),
+            "top_dst_ports": [p for p, _ in top_ports],
+        }
+
+    def _tool_signals(self) -> dict[str, Any] | None:
+        if self.event_count == 0:
+            return None
+        total = self.event_count
+        source_dist = {
+            src: round(cnt / total, 6) for src, cnt in Counter(self.source_counts).most_common()
+        }
+        event_type_dist = {
+            et: round(cnt / total, 6) for et, cnt in Counter(self.type_counts).most_common()
+        }
+        return {
+            "source_dist": source_dist,
+            "event_type_dist": event_type_dist,
+            "inferred_tools": _infer_tools(source_dist, event_type_dist),
+        }
+
+    # -- serialisation ------------------------------------------------------
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "event_count": self.event_count,
+            "last_ts": self.last_ts,
+            "last_epoch": self.last_epoch,
+            "session": [self.session_start, self.session_size],
+            "intervals": self.intervals.to_list(),
+            "interval_digest": self.interval_digest.to_dict(),
+            "closed_sessions": self.closed_sessions.to_list(),
+            "tod": self.tod,
+            "dow": self.dow,
+            "port_sequence": self.port_sequence,
+            "event_type_runs": self.event_type_runs,
+            "credential_sequence": self.credential_sequence,
+            "service_counts": self.service_counts,
+            "ssh_kex": self.ssh_kex,
+            "tls_ciphers": self.tls_ciphers,
+            "credential_count": self.credential_count,
+            "username_classes": self.username_classes,
+            "password": [
+                self.password_count,
+                self.password_length_sum,
+                self.password_upper,
+                self.password_lower,
+                self.password_digit,
+                self.password_special,
+            ],
+            # JSON object keys are strings; ports stay ints as [port, count] pairs.
+            "port_counts": list(self.port_counts.items()),
+            "source_counts": self.source_counts,
+            "type_counts": self.type_counts,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> FingerprintState:
+        state = cls()
+        state.event_count = data["event_count"]
+        state.last_ts = data["last_ts"]
+        state.last_epoch = data["last_epoch"]
+        state.session_start, state.session_size = data["session"]
+        state.intervals = _Moments(*data["intervals"])
+        state.interval_digest = _IntervalDigest.from_dict(data["interval_digest"])
+        state.closed_sessions = _Moments(*data["closed_sessions"])
+        state.tod = list(data["tod"])
+        state.dow = list(data["dow"])
+        state.port_sequence = list(data["port_sequence"])
+        state.event_type_runs = [list(run) for run in data["event_type_runs"]]
+        state.credential_sequence = list(data["credential_sequence"])
+        state.service_counts = dict(data["service_counts"])
+        state.ssh_kex = data["ssh_kex"]
+        state.tls_ciphers = data["tls_ciphers"]
+        state.credential_count = data["credential_count"]
+        state.username_classes = dict(data["username_classes"])
+        (
+            state.password_count,
+            state.password_length_sum,
+            state.password_upper,
+            state.password_lower,
+            state.password_digit,
+            state.password_special,
+        ) = data["password"]
+        state.port_counts = {int(p): c for p, c in data["port_counts"]}
+        state.source_counts = dict(data["source_counts"])
+        state.type_counts = dict(data["type_counts"])
+        return state
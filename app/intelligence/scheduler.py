@@ -0,0 +1,204 @@
+"""Debounced, coalescing fingerprint scheduler.
+
+With FINGERPRINT_MIN_INTERVAL_SECONDS = 0 every ingest batch schedules one
+fingerprint refresh per accepted IP (schedule_fingerprint_if_not_pending() in
+app/intelligence/tasks.py). A source that sends a batch every second then
+recomputes its fingerprint, appends a fingerprint_history row and re-runs
+clustering almost continuously. With an interval set, ingest only marks IPs
+dirty here and one scheduler thread turns the dirty set into refreshes:
+
+  Dirty set   — ip → priority flag, in first-marked order; marking an IP that
+                is already dirty coalesces into the refresh already owed
+  Interval    — an IP is refreshed at most once per interval: the first mark
+                after a quiet period dispatches at once, marks inside the
+                interval are served by one refresh when it ends
+  Priority    — a mark with priority=True (the batch took the IP's event count
+                to MIN_EVENTS_FOR_CLUSTERING) is due immediately and is
+                dispatched ahead of the other due IPs
+  Dispatch    — creates the processing_jobs row (same deduplication_key as the
+                per-batch path) and runs run_fingerprint_task() on a small
+                thread pool; when a job for the IP is still pending or running
+                the IP stays dirty and is retried after another interval, so
+                events that arrive during a refresh are never dropped; with
+                FINGERPRINT_EXECUTOR=worker only the job row is written
+
+The dirty set is in-process: marks not yet dispatched are lost if the process
+dies, and the IP is refreshed on its next batch. close() (wired to
+application shutdown) dispatches whatever is still dirty and waits for the
+pool to finish.
+
+No FastAPI imports belong in this module.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class FingerprintScheduler:
+    """Dirty-set scheduler that refreshes each IP at most once per interval."""
+
+    def __init__(
+        self,
+        min_interval_seconds: float,
+        max_workers: int = 2,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if min_interval_seconds <= 0:
+            raise ValueError(f"min_interval_seconds must be > 0; got {min_interval_seconds}")
+        self._interval = min_interval_seconds
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._dirty: dict[str, bool] = {}
+        self._last_dispatch: dict[str, float] = {}
+        self._closed = False
+        self._thread: threading.Thread | None = None
+        self._tasks = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fp-sched")
+        self.marks = 0
+        self.coalesced = 0
+        self.dispatched = 0
+
+    @property
+    def dirty_count(self) -> int:
+        """IPs waiting for a refresh."""
+        with self._cond:
+            return len(self._dirty)
+
+    def start(self) -> None:
+        """Start the scheduler thread."""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="fingerprint-scheduler", daemon=True)
+        self._thread.start()
+
+    def mark_dirty(self, ip: str, *, priority: bool = False) -> None:
+        """Record that ip has new events and needs a fingerprint refresh."""
+        with self._cond:
+            self.marks += 1
+            if ip in self._dirty:
+                self.coalesced += 1
+                if priority and not self._dirty[ip]:
+                    self._dirty[ip] = True
+                    self._cond.notify()
+                return
+            self._dirty[ip] = priority
+            if priority or self._due_at(ip) <= self._clock():
+                self._cond.notify()
+
+    def run_pending(self) -> list[str]:
+        """Dispatch every IP that is due now; return them in dispatch order."""
+        with self._cond:
+            due = self._take_due(self._clock())
+        self._dispatch(due)
+        return due
+
+    def close(self, timeout: float | None = None) -> None:
+        """Stop the thread, dispatch the remaining dirty IPs and drain the pool."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        with self._cond:
+            remaining = sorted(self._dirty, key=lambda ip: not self._dirty[ip])
+            self._dirty.clear()
+        self._dispatch(remaining, retry=False)
+        self._tasks.shutdown(wait=True)
+
+    # -----------------------------------------------------------------------
+    # Scheduler thread
+    # -----------------------------------------------------------------------
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        return
+                    now = self._clock()
+                    due = self._take_due(now)
+                    if due:
+                        break
+                    self._cond.wait(self._seconds_until_due(now))
+            self._dispatch(due)
+
+    def _due_at(self, ip: str) -> float:
+        if self._dirty.get(ip):
+            return -math.inf
+        return self._last_dispatch.get(ip, -math.inf) + self._interval
+
+    def _take_due(self, now: float) -> list[str]:
+        """Remove and return the due dirty IPs, priority first. Caller holds the lock."""
+        due = [ip for ip in self._dirty if self._due_at(ip) <= now]
+        due.sort(key=lambda ip: not self._dirty[ip])
+        for ip in due:
+            del self._dirty[ip]
+            self._last_dispatch[ip] = now
+        # Entries past their interval no longer delay anything.
+        cutoff = now - self._interval
+        for ip in [ip for ip, at in self._last_dispatch.items() if at <= cutoff]:
+            del self._last_dispatch[ip]
+        return due
+
+    def _seconds_until_due(self, now: float) -> float | None:
+        if not self._dirty:
+            return None
+        return max(0.0, min(self._due_at(ip) for ip in self._dirty) - now)
+
+    def _dispatch(self, ips: list[str], *, retry: bool = True) -> None:
+        from app.intelligence import tasks
+
+        for ip in ips:
+            job_id = tasks.create_fingerprint_job(ip)
+            if job_id is None:
+                if retry:
+                    # A refresh for ip is still pending or running: try again
+                    # after another interval so the new events are covered.
+                    with self._cond:
+                        self._dirty.setdefault(ip, False)
+                continue
+            with self._cond:
+                self.dispatched += 1
+            if tasks.runs_inline():
+                self._tasks.submit(tasks.run_fingerprint_task, ip, job_id)
+
+
+_scheduler: FingerprintScheduler | None = None
+_init_lock = threading.Lock()
+
+
+def get_fingerprint_scheduler() -> FingerprintScheduler | None:
+    """Return the started process-wide scheduler, or None when debouncing is off."""
+    global _scheduler
+    if settings.FINGERPRINT_MIN_INTERVAL_SECONDS <= 0:
+        return None
+    if _scheduler is None:
+        with _init_lock:
+            if _scheduler is None:
+                scheduler = FingerprintScheduler(settings.FINGERPRINT_MIN_INTERVAL_SECONDS)
+                scheduler.start()
+                _scheduler = scheduler
+    return _scheduler
+
+
+def current_fingerprint_scheduler() -> FingerprintScheduler | None:
+    """Return the process-wide scheduler if it is running; never creates one."""
+    return _scheduler
+
+
+def shutdown_fingerprint_scheduler(timeout: float | None = None) -> None:
+    """Stop the process-wide scheduler. Called on application shutdown."""
+    global _scheduler
+    with _init_lock:
+        scheduler, _scheduler = _scheduler, None
+    if scheduler is not None:
+        scheduler.close(timeout)
@@ -5,14 +5,23 @@ Input is a list of event dicts as returned by FingerprintRepository.get_events_f
 
 Each event dict has the shape:
     {
-        "ts":         str,         # ISO-8601 timestamp
-        "dst_port":   int | None,
-        "event_type": str,
-        "service":    str | None,
-        "source":     str,         # sensor identifier, e.g. "cowrie"
-        "raw_data":   dict,        # parsed from raw_events.raw_json["data"]
+        "ts":              str,          # ISO-8601 timestamp
+        "dst_port":        int | None,
+        "event_type":      str,
+        "service":         str | None,
+        "source":          str,          # sensor identifier, e.g. "cowrie"
+        "username_class":  str | None,   # fingerprint_fields() of the sensor
+        "password_class":  str | None,   # data, persisted at ingest in
+        "password_length": int | None,   # event_fingerprint_fields
+        "password_flags":  int | None,
+        "ssh_kex":         list | None,
+        "tls_ciphers":     list | None,
     }
 
+An event may carry "raw_data" (the sensor's data dict) in place of the six
+derived keys — in-memory callers and tests do — and the same fields are then
+derived from it here.  Either shape produces identical features.
+
 Privacy invariants enforced by this module (tested in test_sequence_extraction.py):
   - Raw credential strings (usernames, passwords) are NEVER stored in output.
   - Source IP addresses are NEVER stored in any feature category.
@@ -22,6 +31,10 @@ Infrastructure metadata (ASN, country) is intentionally absent from all
 feature categories.  It is available on source_ips for informational lookup
 but must not drive similarity scoring (§12.4).
 
+Timing features for large event lists may be computed by the optional NumPy
+backend in timing_numpy.py (FINGERPRINT_NUMPY_MIN_EVENTS); the pure-Python
+implementation here is the reference.
+
 Feature encoding follows the Appendix: Fingerprint Feature Encoding Reference.
 """
 
@@ -32,6 +45,8 @@ from collections import Counter
 from datetime import UTC, datetime
 from typing import Any
 
+from app.core.config import settings
+from app.intelligence import timing_numpy
 from app.intelligence.constants import (
     MAX_CREDENTIAL_SEQUENCE,
     SESSION_GAP_SECONDS,
@@ -129,6 +144,11 @@ def compute_timing_features(events: list[dict[str, Any]]) -> dict[str, Any] | No
     if len(events) < 2:
         return None
 
+    numpy_timing = _numpy_timing_backend(len(events))
+    if numpy_timing is not None:
+        sorted_events = sorted(events, key=lambda e: e["ts"])
+        return numpy_timing([_parse_epoch(e["ts"]) for e in sorted_events])
+
     sessions = extract_sessions(events)
 
     # Collect within-session inter-probe intervals (milliseconds)
@@ -150,21 +170,67 @@ def compute_timing_features(events: list[dict[str, Any]]) -> dict[str, Any] | No
     if not interval_ms:
         return None
 
-    sorted_intervals = sorted(interval_ms)
-    mean_iv = statistics.mean(interval_ms)
-    stddev_iv = statistics.pstdev(interval_ms)  # population stddev over all observed intervals
-
     # Time-of-day histogram (24 UTC hour buckets)
     tod: list[float] = [0.0] * 24
     for e in events:
         tod[_parse_dt(e["ts"]).hour] += 1.0
-    tod = _normalize_counts(tod)
 
     # Day-of-week histogram (0=Monday … 6=Sunday)
     dow: list[float] = [0.0] * 7
     for e in events:
         dow[_parse_dt(e["ts"]).weekday()] += 1.0
-    dow = _normalize_counts(dow)
+
+    return _timing_result(interval_ms, session_durations_s, tod, dow)
+
+
+def _numpy_timing_backend(event_count: int):
+    """Return the NumPy timing function when it should handle event_count events.
+
+    Selected from FINGERPRINT_NUMPY_MIN_EVENTS events (0 disables it) when
+    NumPy is installed; otherwise None and the pure-Python path runs.
+    """
+    threshold = settings.FINGERPRINT_NUMPY_MIN_EVENTS
+    if threshold <= 0 or event_count < threshold or not timing_numpy.available():
+        return None
+    return timing_numpy.timing_features_from_epochs
+
+
+def _session_intervals(sorted_epochs: list[float]) -> tuple[list[float], list[float]]:
+    """Within-session intervals (ms) and multi-event session durations (s)."""
+    interval_ms: list[float] = []
+    session_durations_s: list[float] = []
+    session_start = session_last = 0.0
+    session_size = 0
+    for epoch in sorted_epochs:
+        if session_size == 0:
+            session_start, session_size = epoch, 1
+        elif epoch - session_last > SESSION_GAP_SECONDS:
+            if session_size >= 2 and session_last - session_start >= 0:
+                session_durations_s.append(session_last - session_start)
+            session_start, session_size = epoch, 1
+        else:
+            gap = (epoch - session_last) * 1000.0  # ms
+            if gap >= 0:
+                interval_ms.append(gap)
+            session_size += 1
+        session_last = epoch
+    if session_size >= 2 and session_last - session_start >= 0:
+        session_durations_s.append(session_last - session_start)
+    return interval_ms, session_durations_s
+
+
+def _timing_result(
+    interval_ms: list[float],
+    session_durations_s: list[float],
+    tod_counts: list[float],
+    dow_counts: list[float],
+) -> dict[str, Any]:
+    """Finish timing features from intervals, durations and tod/dow counts."""
+    sorted_intervals = sorted(interval_ms)
+    mean_iv = statistics.mean(interval_ms)
+    stddev_iv = statistics.pstdev(interval_ms)  # population stddev over all observed intervals
+    tod = _normalize_counts(tod_counts)
+    dow = _normalize_counts(dow_counts)
 
     # Burst coefficient of variation — low CV → metronomic tool
     burst_cv = stddev_iv / mean_iv if mean_iv > 0.0 else 0.0
@@ -264,31 +330,50 @@ def compute_protocol_features(events: list[dict[str, Any]]) -> dict[str, Any] |
     if not service_counts and not events:
         return None
 
-    total = sum(service_counts.values())
-    service_dist = (
-        {svc: round(cnt / total, 6) for svc, cnt in service_counts.most_common()}
-        if total > 0
-        else {}
-    )
-
     # SSH KEX ordering — take from the first event that has it (tool-level signal)
     ssh_kex: list[str] | None = None
     for e in events:
-        raw = e.get("raw_data") or {}
-        kex = raw.get("kex_algs") or raw.get("kex_algorithms")
-        if isinstance(kex, list) and all(isinstance(k, str) for k in kex):
-            ssh_kex = kex
+        raw = e.get("raw_data")
+        ssh_kex = e.get("ssh_kex") if raw is None else _ssh_kex(raw)
+        if ssh_kex is not None:
             break
 
     # TLS cipher ordering — take from the first event that has it
     tls_ciphers: list[str] | None = None
     for e in events:
-        raw = e.get("raw_data") or {}
-        ciphers = raw.get("tls_cipher_suites") or raw.get("ja3_ciphers")
-        if isinstance(ciphers, list) and all(isinstance(c, str) for c in ciphers):
-            tls_ciphers = ciphers
+        raw = e.get("raw_data")
+        tls_ciphers = e.get("tls_ciphers") if raw is None else _tls_ciphers(raw)
+        if tls_ciphers is not None:
             break
 
+    return _protocol_result(service_counts, ssh_kex, tls_ciphers)
+
+
+def _ssh_kex(raw: dict[str, Any]) -> list[str] | None:
+    kex = raw.get("kex_algs") or raw.get("kex_algorithms")
+    if isinstance(kex, list) and all(isinstance(k, str) for k in kex):
+        return kex
+    return None
+
+
+def _tls_ciphers(raw: dict[str, Any]) -> list[str] | None:
+    ciphers = raw.get("tls_cipher_suites") or raw.get("ja3_ciphers")
+    if isinstance(ciphers, list) and all(isinstance(c, str) for c in ciphers):
+        return ciphers
+    return None
+
+
+def _protocol_result(
+    service_counts: Counter[str],
+    ssh_kex: list[str] | None,
+    tls_ciphers: list[str] | None,
+) -> dict[str, Any]:
+    total = sum(service_counts.values())
+    service_dist = (
+        {svc: round(cnt / total, 6) for svc, cnt in service_counts.most_common()}
+        if total > 0
+        else {}
+    )
     return {
         "service_distribution": service_dist,
         "ssh_kex_ordering": ssh_kex,
@@ -331,22 +416,123 @@ def _classify_password(password: str) -> str:
     return "special"
 
 
+def _credential_entry(username_class: str | None, password_class: str | None) -> dict[str, str]:
+    """One credential_sequence entry; an absent field is classed "empty"."""
+    return {
+        "username_pattern": username_class or "empty",
+        "password_class": password_class or "empty",
+    }
+
+
+def _password_flags(pw: str) -> tuple[bool, bool, bool, bool]:
+    """(has upper, has lower, has digit, has special) for one password."""
+    return (
+        any(c.isupper() for c in pw),
+        any(c.islower() for c in pw),
+        any(c.isdigit() for c in pw),
+        any(not c.isalnum() for c in pw),
+    )
+
+
+# password_flags bit for each _password_flags() entry: upper, lower, digit, special.
+_PASSWORD_FLAG_BITS = (1, 2, 4, 8)
+
+
+def _password_flag_bits(pw: str) -> int:
+    """_password_flags() packed into the password_flags integer."""
+    return sum(
+        bit for bit, flag in zip(_PASSWORD_FLAG_BITS, _password_flags(pw), strict=True) if flag
+    )
+
+
+def _flag_counts(bit_counts: Counter[int]) -> list[int]:
+    """Per-flag password counts from a Counter of password_flags values."""
+    flag_counts = [0, 0, 0, 0]  # upper, lower, digit, special
+    for bits, count in bit_counts.items():
+        for i, bit in enumerate(_PASSWORD_FLAG_BITS):
+            if bits & bit:
+                flag_counts[i] += count
+    return flag_counts
+
+
+def _credential_fields(
+    raw: dict[str, Any],
+    username_cache: dict[str, str],
+    password_cache: dict[str, tuple[str, int, int]],
+) -> tuple[str | None, str | None, int | None, int | None]:
+    """(username_class, password_class, password_length, password_flags) of raw.
+
+    Each field is None when raw has no username / password.  Brute-force lists
+    repeat a few strings many times, so each distinct username and password is
+    classified once per cache; callers keep the caches local to one pass.
+    """
+    username = raw.get("username")
+    password = raw.get("password")
+    username_class = None
+    if username is not None:
+        uname = str(username)
+        username_class = username_cache.get(uname)
+        if username_class is None:
+            username_class = username_cache[uname] = _classify_username(uname)
+    if password is None:
+        return username_class, None, None, None
+    pw = str(password)
+    cached = password_cache.get(pw)
+    if cached is None:
+        cached = password_cache[pw] = (_classify_password(pw), len(pw), _password_flag_bits(pw))
+    return (username_class, *cached)
+
+
+def _event_credential(
+    e: dict[str, Any],
+    username_cache: dict[str, str],
+    password_cache: dict[str, tuple[str, int, int]],
+) -> tuple[str | None, str | None, int | None, int | None]:
+    """_credential_fields() of an event in either shape (see module docstring)."""
+    raw = e.get("raw_data")
+    if raw is None:
+        return (
+            e.get("username_class"),
+            e.get("password_class"),
+            e.get("password_length"),
+            e.get("password_flags"),
+        )
+    return _credential_fields(raw, username_cache, password_cache)
+
+
+def fingerprint_fields(raw_data: dict[str, Any]) -> dict[str, Any]:
+    """Derive the typed fingerprint fields of one event from its sensor data.
+
+    Ingest persists the result (event_fingerprint_fields) so fingerprinting
+    never has to decode raw_events.raw_json.  Only pattern classes, the
+    password length and its character-class bits are kept: the raw username
+    and password never leave raw_data.
+    """
+    username_class, password_class, password_length, password_flags = _credential_fields(
+        raw_data, {}, {}
+    )
+    return {
+        "username_class": username_class,
+        "password_class": password_class,
+        "password_length": password_length,
+        "password_flags": password_flags,
+        "ssh_kex": _ssh_kex(raw_data),
+        "tls_ciphers": _tls_ciphers(raw_data),
+    }
+
+
 def _extract_credential_sequence(
     sorted_events: list[dict[str, Any]],
 ) -> list[dict[str, str]]:
     """Return a credential sequence of pattern entries, no raw values."""
     sequence: list[dict[str, str]] = []
+    username_cache: dict[str, str] = {}
+    password_cache: dict[str, tuple[str, int, int]] = {}
     for e in sorted_events:
-        raw = e.get("raw_data") or {}
-        username = raw.get("username")
-        password = raw.get("password")
-        if username is None and password is None:
+        username_class, password_class, _, _ = _event_credential(e, username_cache, password_cache)
+        if username_class is None and password_class is None:
             continue
-        entry = {
-            "username_pattern": _classify_username(str(username) if username is not None else ""),
-            "password_class": _classify_password(str(password) if password is not None else ""),
-        }
-        sequence.append(entry)
+        sequence.append(_credential_entry(username_class, password_class))
         if len(sequence) >= MAX_CREDENTIAL_SEQUENCE:
             break
     return sequence
@@ -358,7 +544,7 @@ def compute_credential_features(events: list[dict[str, Any]]) -> dict[str, Any]
     Only pattern statistics are stored — no raw usernames or passwords.
 
     Returns None when no events contain credential data (username or password
-    fields absent from raw_data for all events).
+    fields absent from the sensor data of all events).
 
     Encoding (Appendix / §3.1 Credential features):
         credential_count      — total credential pairs observed
@@ -367,41 +553,53 @@ def compute_credential_features(events: list[dict[str, Any]]) -> dict[str, Any]
         password_char_class   — {metric: ratio} character class proportions
         credential_sequence   — [{"username_pattern", "password_class"}, ...] (max 50)
     """
-    cred_events = [
-        e
-        for e in events
-        if (e.get("raw_data") or {}).get("username") is not None
-        or (e.get("raw_data") or {}).get("password") is not None
-    ]
-    if not cred_events:
-        return None
-
     username_classes: list[str] = []
     password_lengths: list[int] = []
-    has_upper = has_lower = has_digit = has_special = 0
-
-    for e in cred_events:
-        raw = e.get("raw_data") or {}
-        uname = raw.get("username")
-        passwd = raw.get("password")
-
-        if uname is not None:
-            username_classes.append(_classify_username(str(uname)))
-
-        if passwd is not None:
-            pw = str(passwd)
-            password_lengths.append(len(pw))
-            if any(c.isupper() for c in pw):
-                has_upper += 1
-            if any(c.islower() for c in pw):
-                has_lower += 1
-            if any(c.isdigit() for c in pw):
-                has_digit += 1
-            if any(not c.isalnum() for c in pw):
-                has_special += 1
-
-    cred_count = len(cred_events)
+    bit_counts: Counter[int] = Counter()
+    cred_entries: list[tuple[str, dict[str, str]]] = []
+    username_cache: dict[str, str] = {}
+    password_cache: dict[str, tuple[str, int, int]] = {}
+
+    for e in events:
+        username_class, password_class, password_length, password_flags = _event_credential(
+            e, username_cache, password_cache
+        )
+        if username_class is None and password_class is None:
+            continue
+        cred_entries.append((e["ts"], _credential_entry(username_class, password_class)))
+
+        if username_class is not None:
+            username_classes.append(username_class)
+
+        if password_class is not None:
+            password_lengths.append(password_length)
+            bit_counts[password_flags] += 1
+
+    if not cred_entries:
+        return None
+
+    # Credential sequence (pattern-only), in timestamp order
+    cred_entries.sort(key=lambda c: c[0])
+    cred_sequence = [entry for _, entry in cred_entries[:MAX_CREDENTIAL_SEQUENCE]]
+
+    return _credential_result(
+        len(cred_entries),
+        username_classes,
+        password_lengths,
+        _flag_counts(bit_counts),
+        cred_sequence,
+    )
+
+
+def _credential_result(
+    cred_count: int,
+    username_classes: list[str],
+    password_lengths: list[int],
+    flag_counts: list[int],
+    cred_sequence: list[dict[str, str]],
+) -> dict[str, Any]:
     pw_count = len(password_lengths)
+    has_upper, has_lower, has_digit, has_special = flag_counts
 
     # Username class distribution
     class_counts: Counter[str] = Counter(username_classes)
@@ -425,10 +623,6 @@ def compute_credential_features(events: list[dict[str, Any]]) -> dict[str, Any]
     # Password length stats
     pw_length_mean = round(statistics.mean(password_lengths), 3) if password_lengths else None
 
-    # Credential sequence (pattern-only)
-    sorted_events = sorted(cred_events, key=lambda e: e["ts"])
-    cred_sequence = _extract_credential_sequence(sorted_events)
-
     return {
         "credential_count": cred_count,
         "username_class_dist": username_class_dist,
@@ -459,6 +653,10 @@ def compute_target_features(events: list[dict[str, Any]]) -> dict[str, Any] | No
         if isinstance(p, int):
             port_counts[p] += 1
 
+    return _target_result(port_counts)
+
+
+def _target_result(port_counts: Counter[int]) -> dict[str, Any] | None:
     if not port_counts:
         return None
 
@@ -498,8 +696,12 @@ def compute_tool_signals(events: list[dict[str, Any]]) -> dict[str, Any] | None:
 
     source_counts: Counter[str] = Counter(e.get("source", "unknown") for e in events)
     type_counts: Counter[str] = Counter(e["event_type"] for e in events)
+    return _tool_result(source_counts, type_counts, len(events))
 
-    total = len(events)
+
+def _tool_result(
+    source_counts: Counter[str], type_counts: Counter[str], total: int
+) -> dict[str, Any]:
     source_dist = {src: round(cnt / total, 6) for src, cnt in source_counts.most_common()}
     event_type_dist = {et: round(cnt / total, 6) for et, cnt in type_counts.most_common()}
 
@@ -553,15 +755,129 @@ def extract_all_features(events: list[dict[str, Any]]) -> dict[str, Any]:
     to similarity scoring (§8.1 — null dimensions excluded from both
     numerator and denominator).
 
+    Output is identical to calling the six compute_* functions, but the
+    events are sorted once and each timestamp is parsed once: a first loop in
+    input order fills the order-insensitive accumulators (and the first-seen
+    order Counter.most_common() uses to break ties), a second loop in
+    timestamp order builds sessions, intervals and the sequences.
+
     Returns a dict with exactly these six keys:
         timing_features, sequence_features, protocol_features,
         credential_features, target_features, tool_signals
     """
+    n = len(events)
+    epochs: list[float] = []
+    credentials: list[tuple[str | None, str | None] | None] = []
+    tod: list[float] = [0.0] * 24
+    dow: list[float] = [0.0] * 7
+    service_counts: Counter[str] = Counter()
+    port_counts: Counter[int] = Counter()
+    source_counts: Counter[str] = Counter()
+    type_counts: Counter[str] = Counter()
+    ssh_kex: list[str] | None = None
+    tls_ciphers: list[str] | None = None
+    cred_count = 0
+    username_classes: list[str] = []
+    password_lengths: list[int] = []
+    bit_counts: Counter[int] = Counter()
+    username_cache: dict[str, str] = {}
+    password_cache: dict[str, tuple[str, int, int]] = {}
+
+    for e in events:
+        dt = _parse_dt(e["ts"])
+        epochs.append(dt.timestamp())
+        tod[dt.hour] += 1.0
+        dow[dt.weekday()] += 1.0
+
+        svc = e.get("service")
+        if svc:
+            service_counts[svc] += 1
+        p = e.get("dst_port")
+        if isinstance(p, int):
+            port_counts[p] += 1
+        source_counts[e.get("source", "unknown")] += 1
+        type_counts[e["event_type"]] += 1
+
+        raw = e.get("raw_data")
+        if raw is None:
+            if ssh_kex is None:
+                ssh_kex = e.get("ssh_kex")
+            if tls_ciphers is None:
+                tls_ciphers = e.get("tls_ciphers")
+        else:
+            if ssh_kex is None and ("kex_algs" in raw or "kex_algorithms" in raw):
+                ssh_kex = _ssh_kex(raw)
+            if tls_ciphers is None and ("tls_cipher_suites" in raw or "ja3_ciphers" in raw):
+                tls_ciphers = _tls_ciphers(raw)
+
+        username_class, password_class, password_length, password_flags = _event_credential(
+            e, username_cache, password_cache
+        )
+        if username_class is None and password_class is None:
+            credentials.append(None)
+            continue
+        credentials.append((username_class, password_class))
+        cred_count += 1
+        if username_class is not None:
+            username_classes.append(username_class)
+        if password_class is not None:
+            password_lengths.append(password_length)
+            bit_counts[password_flags] += 1
+
+    # Timestamp-ordered pass — the stable sort matches sorted(events, key=ts).
+    order = sorted(range(n), key=lambda i: events[i]["ts"])
+    seen_ports: set[int] = set()
+    port_sequence: list[int] = []
+    event_type_sequence: list[str] = []
+    cred_sequence: list[dict[str, str]] = []
+
+    for i in order:
+        e = events[i]
+        p = e.get("dst_port")
+        if len(port_sequence) < TOP_PORT_SEQUENCE_N and isinstance(p, int) and p not in seen_ports:
+            seen_ports.add(p)
+            port_sequence.append(p)
+        event_type_sequence.append(e["event_type"])
+        cred = credentials[i]
+        if cred is not None and len(cred_sequence) < MAX_CREDENTIAL_SEQUENCE:
+            cred_sequence.append(_credential_entry(*cred))
+
+    timing = None
+    if n >= 2:
+        sorted_epochs = [epochs[i] for i in order]
+        numpy_timing = _numpy_timing_backend(n)
+        if numpy_timing is not None:
+            timing = numpy_timing(sorted_epochs)
+        else:
+            interval_ms, session_durations_s = _session_intervals(sorted_epochs)
+            if interval_ms:
+                timing = _timing_result(interval_ms, session_durations_s, tod, dow)
+
+    sequence = None
+    if port_sequence or cred_sequence:
+        sequence = {
+            "port_sequence": port_sequence,
+            "event_type_sequence": event_type_sequence,
+            "credential_sequence": cred_sequence,
+        }
+
+    credential = None
+    if cred_count:
+        credential = _credential_result(
+            cred_count,
+            username_classes,
+            password_lengths,
+            _flag_counts(bit_counts),
+            [dict(entry) for entry in cred_sequence],
+        )
+
     return {
-        "timing_features": compute_timing_features(events),
-        "sequence_features": compute_sequence_features(events),
-        "protocol_features": compute_protocol_features(events),
-        "credential_features": compute_credential_features(events),
-        "target_features": compute_target_features(events),
-        "tool_signals": compute_tool_signals(events),
+        "timing_features": timing,
+        "sequence_features": sequence,
+        "protocol_features": (
+            _protocol_result(service_counts, ssh_kex, tls_ciphers) if n else None
+        ),
+        "credential_features": credential,
+        "target_features": _target_result(port_counts),
+        "tool_signals": _tool_result(source_counts, type_counts, n) if n else None,
     }
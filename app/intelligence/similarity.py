@@ -31,6 +31,7 @@ from app.intelligence.constants import (
     WEIGHT_TARGET,
     WEIGHT_TIMING,
 )
+from app.intelligence.edit_distance import levenshtein
 
 # ---------------------------------------------------------------------------
 # Result dataclass
@@ -82,21 +83,12 @@ def _cv_sim(a: float, b: float) -> float:
 
 
 def _levenshtein(a: list, b: list) -> int:
-    """Standard Levenshtein distance over arbitrary list elements."""
-    m, n = len(a), len(b)
-    if m == 0:
-        return n
-    if n == 0:
-        return m
-    dp = list(range(n + 1))
-    for i in range(1, m + 1):
-        prev = dp[0]
-        dp[0] = i
-        for j in range(1, n + 1):
-            temp = dp[j]
-            dp[j] = prev if a[i - 1] == b[j - 1] else 1 + min(prev, dp[j], dp[j - 1])
-            prev = temp
-    return dp[n]
+    """Standard Levenshtein distance over arbitrary list elements.
+
+    Computed by app/intelligence/edit_distance.py (interned, memoised,
+    bit-parallel); the result is that of the textbook dynamic programme.
+    """
+    return levenshtein(a, b)
 
 
 def _normalized_edit_sim(a: list, b: list) -> float:
@@ -142,6 +134,16 @@ def _histogram_sim(p: list[float] | None, q: list[float] | None) -> float | None
     return 1.0 - _jsd(p, q)
 
 
+def _credential_patterns(cred: list[dict[str, Any]]) -> list[tuple[str, str]]:
+    """credential_sequence entries as the (username_pattern, password_class) compared."""
+    return [(c.get("username_pattern", ""), c.get("password_class", "")) for c in cred]
+
+
+def _top_ports(port_freq: dict[str, float]) -> set[str]:
+    """The 10 most frequent ports of a port_freq dict (Appendix)."""
+    return set(sorted(port_freq, key=lambda k: port_freq[k], reverse=True)[:10])
+
+
 def _dict_jaccard(a: dict[str, float], b: dict[str, float]) -> float:
     """Jaccard similarity over the key sets of two frequency dicts."""
     return _jaccard(set(a.keys()), set(b.keys()))
@@ -151,6 +153,10 @@ def _dict_jaccard(a: dict[str, float], b: dict[str, float]) -> float:
 # Per-dimension similarity functions
 # ---------------------------------------------------------------------------
 
+# Leading event types compared by sequence_similarity().
+_MAX_EVENT_TYPES = 50
+_INTERVAL_STATS = ("mean", "stddev", "p25", "p75", "p95")
+
 
 def timing_similarity(
     t1: dict[str, Any] | None,
@@ -176,8 +182,7 @@ def timing_similarity(
     i2 = t2.get("interval") or {}
     if i1 and i2:
         stat_sims = [
-            _stat_sim(float(i1.get(k, 0.0)), float(i2.get(k, 0.0)))
-            for k in ("mean", "stddev", "p25", "p75", "p95")
+            _stat_sim(float(i1.get(k, 0.0)), float(i2.get(k, 0.0))) for k in _INTERVAL_STATS
         ]
         scores.append(sum(stat_sims) / len(stat_sims))
 
@@ -222,18 +227,17 @@ def sequence_similarity(
     if p1 or p2:
         scores.append(_normalized_edit_sim(p1, p2))
 
-    _MAX_ET = 50
-    et1 = (s1.get("event_type_sequence") or [])[:_MAX_ET]
-    et2 = (s2.get("event_type_sequence") or [])[:_MAX_ET]
+    et1 = (s1.get("event_type_sequence") or [])[:_MAX_EVENT_TYPES]
+    et2 = (s2.get("event_type_sequence") or [])[:_MAX_EVENT_TYPES]
     if et1 or et2:
         scores.append(_normalized_edit_sim(et1, et2))
 
     cred1 = s1.get("credential_sequence") or []
     cred2 = s2.get("credential_sequence") or []
     if cred1 or cred2:
-        c1t = [(c.get("username_pattern", ""), c.get("password_class", "")) for c in cred1]
-        c2t = [(c.get("username_pattern", ""), c.get("password_class", "")) for c in cred2]
-        scores.append(_normalized_edit_sim(c1t, c2t))
+        scores.append(
+            _normalized_edit_sim(_credential_patterns(cred1), _credential_patterns(cred2))
+        )
 
     if not scores:
         return 0.0
@@ -311,9 +315,9 @@ def credential_similarity(
     cred1 = c1.get("credential_sequence") or []
     cred2 = c2.get("credential_sequence") or []
     if cred1 or cred2:
-        c1t = [(c.get("username_pattern", ""), c.get("password_class", "")) for c in cred1]
-        c2t = [(c.get("username_pattern", ""), c.get("password_class", "")) for c in cred2]
-        scores.append(_normalized_edit_sim(c1t, c2t))
+        scores.append(
+            _normalized_edit_sim(_credential_patterns(cred1), _credential_patterns(cred2))
+        )
 
     if not scores:
         return 0.0
@@ -340,9 +344,7 @@ def target_similarity(
     pf1 = t1.get("port_freq") or {}
     pf2 = t2.get("port_freq") or {}
     if pf1 or pf2:
-        top10_1 = set(sorted(pf1, key=lambda k: pf1[k], reverse=True)[:10])
-        top10_2 = set(sorted(pf2, key=lambda k: pf2[k], reverse=True)[:10])
-        scores.append(_jaccard(top10_1, top10_2))
+        scores.append(_jaccard(_top_ports(pf1), _top_ports(pf2)))
 
     td1 = t1.get("top_dst_ports") or []
     td2 = t2.get("top_dst_ports") or []
@@ -359,6 +361,88 @@ def target_similarity(
 # ---------------------------------------------------------------------------
 
 
+@dataclass(frozen=True)
+class ParsedFingerprint:
+    """The five feature columns of a fingerprint, parsed from their JSON strings.
+
+    A column that is NULL, not valid JSON or not a JSON object is None — the
+    null dimension of §8.1.  Built once by parse_fingerprint() so that one
+    fingerprint compared against many candidates is parsed only once.
+    """
+
+    timing: dict[str, Any] | None
+    sequence: dict[str, Any] | None
+    protocol: dict[str, Any] | None
+    credential: dict[str, Any] | None
+    target: dict[str, Any] | None
+
+
+def _parse_feature(s: str | None) -> dict | None:
+    if s is None:
+        return None
+    try:
+        v = json.loads(s)
+        return v if isinstance(v, dict) else None
+    except (json.JSONDecodeError, TypeError):
+        return None
+
+
+def parse_fingerprint(fp: dict[str, Any]) -> ParsedFingerprint:
+    """Parse the feature columns of a behavioral_fingerprint-shaped dict."""
+    return ParsedFingerprint(
+        timing=_parse_feature(fp.get("timing_features")),
+        sequence=_parse_feature(fp.get("sequence_features")),
+        protocol=_parse_feature(fp.get("protocol_features")),
+        credential=_parse_feature(fp.get("credential_features")),
+        target=_parse_feature(fp.get("target_features")),
+    )
+
+
+def compared_features(fp: ParsedFingerprint) -> dict[str, Any]:
+    """The parts of fp the per-dimension similarity functions read, canonicalised.
+
+    Two fingerprints with equal compared_features() score the same against
+    any other fingerprint, whatever else differs between them — e.g. event
+    types past the first 50, or service and port frequencies that shift with
+    the event count while the key sets and top-10 ports stay put.  A None
+    dimension stays None.
+    """
+    t, s, p, c, g = fp.timing, fp.sequence, fp.protocol, fp.credential, fp.target
+    interval = (t.get("interval") or {}) if t is not None else {}
+    return {
+        "timing": t
+        and {
+            "interval": {k: interval.get(k, 0.0) for k in _INTERVAL_STATS} if interval else None,
+            "tod_histogram": t.get("tod_histogram"),
+            "dow_histogram": t.get("dow_histogram"),
+            "burst_cv": t.get("burst_cv"),
+        },
+        "sequence": s
+        and {
+            "port_sequence": s.get("port_sequence") or [],
+            "event_type_sequence": (s.get("event_type_sequence") or [])[:_MAX_EVENT_TYPES],
+            "credential_sequence": _credential_patterns(s.get("credential_sequence") or []),
+        },
+        "protocol": p
+        and {
+            "services": sorted(p.get("service_distribution") or {}),
+            "ssh_kex_ordering": p.get("ssh_kex_ordering"),
+            "tls_cipher_ordering": p.get("tls_cipher_ordering"),
+        },
+        "credential": c
+        and {
+            "username_classes": sorted(c.get("username_class_dist") or {}),
+            "password_char_class": c.get("password_char_class") or {},
+            "credential_sequence": _credential_patterns(c.get("credential_sequence") or []),
+        },
+        "target": g
+        and {
+            "top_ports": sorted(_top_ports(g.get("port_freq") or {})),
+            "top_dst_ports": g.get("top_dst_ports") or [],
+        },
+    }
+
+
 def compute_weighted_similarity(
     fp1: dict[str, Any],
     fp2: dict[str, Any],
@@ -368,7 +452,9 @@ def compute_weighted_similarity(
     """Weighted fingerprint similarity per §8.1 and §3.2.
 
     fp1 and fp2 are behavioral_fingerprint dicts whose feature columns are
-    stored JSON strings (or None).  Parsing happens here.
+    stored JSON strings (or None).  Parsing happens here; callers comparing
+    one fingerprint against many parse once with parse_fingerprint() and call
+    parsed_weighted_similarity() instead.
 
     Null dimensions contribute zero to both numerator and denominator so that
     sparse fingerprints are not artificially penalised (§8.1).
@@ -381,54 +467,150 @@ def compute_weighted_similarity(
     Values must be positive and sum to ~1.0.  When None, global constants are
     used.  Same fingerprints + same weights = same result (deterministic).
     """
+    return parsed_weighted_similarity(
+        parse_fingerprint(fp1), parse_fingerprint(fp2), weights=weights
+    )
 
-    def _parse(s: str | None) -> dict | None:
-        if s is None:
-            return None
-        try:
-            v = json.loads(s)
-            return v if isinstance(v, dict) else None
-        except (json.JSONDecodeError, TypeError):
-            return None
 
-    ts = timing_similarity(_parse(fp1.get("timing_features")), _parse(fp2.get("timing_features")))
-    ss = sequence_similarity(
-        _parse(fp1.get("sequence_features")), _parse(fp2.get("sequence_features"))
-    )
-    ps = protocol_similarity(
-        _parse(fp1.get("protocol_features")), _parse(fp2.get("protocol_features"))
-    )
-    cs = credential_similarity(
-        _parse(fp1.get("credential_features")), _parse(fp2.get("credential_features"))
+def _dimension_weights(weights: dict[str, float] | None) -> tuple[float, ...]:
+    """Weights of the five dimensions in aggregation order."""
+    _w = weights or {}
+    return (
+        _w.get("timing", WEIGHT_TIMING),
+        _w.get("sequence", WEIGHT_SEQUENCE),
+        _w.get("protocol", WEIGHT_PROTOCOL),
+        _w.get("credential", WEIGHT_CREDENTIAL),
+        _w.get("target", WEIGHT_TARGET),
     )
-    tgs = target_similarity(_parse(fp1.get("target_features")), _parse(fp2.get("target_features")))
 
-    _w = weights or {}
-    _WEIGHTS: dict[str, tuple[float | None, float]] = {
-        "timing": (ts, _w.get("timing", WEIGHT_TIMING)),
-        "sequence": (ss, _w.get("sequence", WEIGHT_SEQUENCE)),
-        "protocol": (ps, _w.get("protocol", WEIGHT_PROTOCOL)),
-        "credential": (cs, _w.get("credential", WEIGHT_CREDENTIAL)),
-        "target": (tgs, _w.get("target", WEIGHT_TARGET)),
-    }
 
+def _weighted_total(sims: tuple[float | None, ...], weights: tuple[float, ...]) -> float:
+    """Weighted mean of the non-null dimensions, rounded as in SimilarityResult."""
     numerator = 0.0
     denominator = 0.0
-    dimensions_used = 0
-    for _dim, (sim, weight) in _WEIGHTS.items():
+    for sim, weight in zip(sims, weights, strict=True):
         if sim is not None:
             numerator += weight * sim
             denominator += weight
-            dimensions_used += 1
 
     weighted_total = numerator / denominator if denominator > 0.0 else 0.0
+    return round(weighted_total, 6)
 
+
+def _result(sims: tuple[float | None, ...], weights: tuple[float, ...]) -> SimilarityResult:
+    ts, ss, ps, cs, tgs = sims
     return SimilarityResult(
         timing_similarity=ts,
         sequence_similarity=ss,
         protocol_similarity=ps,
         credential_similarity=cs,
         target_similarity=tgs,
-        weighted_total=round(weighted_total, 6),
-        dimensions_used=dimensions_used,
+        weighted_total=_weighted_total(sims, weights),
+        dimensions_used=sum(sim is not None for sim in sims),
+    )
+
+
+def parsed_weighted_similarity(
+    fp1: ParsedFingerprint,
+    fp2: ParsedFingerprint,
+    *,
+    weights: dict[str, float] | None = None,
+) -> SimilarityResult:
+    """compute_weighted_similarity() for fingerprints already parsed."""
+    sims = (
+        timing_similarity(fp1.timing, fp2.timing),
+        sequence_similarity(fp1.sequence, fp2.sequence),
+        protocol_similarity(fp1.protocol, fp2.protocol),
+        credential_similarity(fp1.credential, fp2.credential),
+        target_similarity(fp1.target, fp2.target),
+    )
+    return _result(sims, _dimension_weights(weights))
+
+
+# ---------------------------------------------------------------------------
+# Early-exit evaluation
+# ---------------------------------------------------------------------------
+
+# Dimension functions in aggregation order, and the order bounded evaluation
+# visits them: cheapest first.  Timing compares fixed-size vectors, target and
+# protocol short lists; credential and sequence run edit distances over the
+# credential pattern list and up to 50 event types.  Timing also comes first
+# because negative interval stats can score it above 1.0 — it is never left
+# to the bound.
+_DIMENSIONS = (
+    timing_similarity,
+    sequence_similarity,
+    protocol_similarity,
+    credential_similarity,
+    target_similarity,
+)
+_EVALUATION_ORDER = (0, 4, 2, 3, 1)
+
+
+def _positive(weight: Any) -> bool:
+    return isinstance(weight, int | float) and weight > 0.0
+
+
+def _unit_bounded_credential(c: dict[str, Any] | None) -> bool:
+    """Whether credential_similarity() against c cannot exceed 1.0.
+
+    _stat_sim() stays in [0, 1] for non-negative inputs only; a negative
+    password_char_class ratio can push the credential score above 1.
+    """
+    if c is None:
+        return True
+    pcc = c.get("password_char_class") or {}
+    if not isinstance(pcc, dict):
+        return False
+    return all(isinstance(v, int | float) and v >= 0.0 for v in pcc.values())
+
+
+def bounded_weighted_similarity(
+    fp1: ParsedFingerprint,
+    fp2: ParsedFingerprint,
+    *,
+    floor: float,
+    weights: dict[str, float] | None = None,
+) -> SimilarityResult | None:
+    """parsed_weighted_similarity(), abandoned once it cannot reach floor.
+
+    Dimensions are evaluated cheapest first.  After each one the best
+    achievable weighted_total is the same aggregation with every dimension
+    still to be evaluated scored 1.0; as soon as that bound is below floor
+    the comparison stops and None is returned.  Otherwise the result is
+    identical to parsed_weighted_similarity(), including when it turns out
+    below floor after all.
+
+    None therefore means weighted_total < floor, never a different score.
+    The bound is exact because every dimension score is at most 1.0 and the
+    aggregation is monotone in each score when all weights are positive;
+    with a non-positive weight, or credential features that can score above
+    1.0, every dimension is evaluated.  Features of a dimension that was never
+    evaluated are not inspected, so an abandoned comparison does not raise on
+    malformed features there.
+    """
+    fps = (
+        (fp1.timing, fp2.timing),
+        (fp1.sequence, fp2.sequence),
+        (fp1.protocol, fp2.protocol),
+        (fp1.credential, fp2.credential),
+        (fp1.target, fp2.target),
     )
+    dim_weights = _dimension_weights(weights)
+    present = [a is not None and b is not None for a, b in fps]
+    early_exit = (
+        all(_positive(w) for w, p in zip(dim_weights, present, strict=True) if p)
+        and _unit_bounded_credential(fp1.credential)
+        and _unit_bounded_credential(fp2.credential)
+    )
+
+    sims: list[float | None] = [1.0 if p else None for p in present]
+    for step, i in enumerate(_EVALUATION_ORDER, start=1):
+        sims[i] = _DIMENSIONS[i](*fps[i])
+        if (
+            early_exit
+            and step < len(_EVALUATION_ORDER)
+            and _weighted_total(tuple(sims), dim_weights) < floor
+        ):
+            return None
+    return _result(tuple(sims), dim_weights)
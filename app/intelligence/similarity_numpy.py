@@ -0,0 +1,587 @@
+"""Vectorised one-against-many fingerprint similarity for campaign clustering.
+
+assign_to_campaign() scores every new fingerprint against every candidate
+campaign.  With thousands of campaigns the per-candidate Python work of
+candidate_index.py and similarity.py dominates a clustering run, even though
+only a handful of candidates come anywhere near SIMILARITY_UNCERTAIN_LOW.
+PackedCandidates keeps the candidates' features in NumPy arrays, one row per
+campaign, and score_against_many() computes for all rows at once:
+
+  timing      interval _stat_sim, tod/dow 1 - JSD and burst_cv _cv_sim over
+              float64 columns
+  Jaccard     service, username-class and top-10 port_freq key sets, packed as
+              padded arrays of interned ids; intersections are integer counts
+  char class  _stat_sim over the four has_*_ratio keys of password_char_class
+  edit terms  first bounded from per-bucket element counts — the multiset
+              bound of candidate_index.py with elements hashed into
+              _BUCKETS buckets, which can only raise the overlap; only rows
+              whose weighted bound reaches the floor have their edit
+              distances computed, one by one
+
+The scores agree with parsed_weighted_similarity() to within SCORE_TOLERANCE
+but are not guaranteed bit-identical: np.log2 and NumPy rounding may differ
+from math.log2 and round() in the last place, which the 6-digit rounding of a
+dimension can turn into one unit of 1e-6.  Decisions are therefore made on
+exact scores: contenders() keeps every candidate within SCORE_TOLERANCE of
+the best, and the caller re-scores those with the pure-Python functions.
+
+A fingerprint the arithmetic does not cover is not packed and stays on the
+pure-Python path: negative or non-finite timing and char-class values,
+non-positive weights, histograms that are not 24 / 7 numbers, unhashable or
+over-long sequences, key sets wider than the packed width, and features of
+the wrong type.
+
+PackedCandidates is immutable; synced() returns a copy with the changed rows
+repacked, as CandidateIndex.changed() does for the index.  NumPy is an
+optional dependency, imported lazily; enabled() reports whether the kernel is
+configured and importable, use_for() whether it applies to a given number of
+candidates (CLUSTERING_NUMPY_MIN_CANDIDATES).
+
+No FastAPI, SQLAlchemy, or router imports belong in this module.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Any
+
+from app.core.config import settings
+from app.intelligence import similarity as _similarity
+from app.intelligence.similarity import ParsedFingerprint
+from app.intelligence.timing_numpy import available
+
+# Margin between a packed score or bound and the exact weighted_total.
+SCORE_TOLERANCE = 1e-5
+
+_BUCKETS = 32
+_MAX_SEQUENCE = 255  # bucket counts are uint8
+_SET_WIDTH = {"services": 16, "usernames": 16, "top_ports": 10}
+_CHAR_CLASS_KEYS = ("has_upper_ratio", "has_lower_ratio", "has_digit_ratio", "has_special_ratio")
+_INTERVAL_KEYS = ("mean", "stddev", "p25", "p75", "p95")
+_MAX_EVENT_TYPES = 50  # sequence_similarity() compares the first 50 event types
+
+# Edit-distance terms: (name, dimension index, compared when both are non-empty
+# rather than when both are present).  Dimension indices follow the
+# aggregation order timing, sequence, protocol, credential, target.
+_EDIT_TERMS = (
+    ("ports", 1, True),
+    ("event_types", 1, True),
+    ("sequence_credentials", 1, True),
+    ("kex", 2, False),
+    ("tls", 2, False),
+    ("credentials", 3, True),
+    ("top_dst_ports", 4, True),
+)
+
+
+class _Unpackable(Exception):
+    """The fingerprint falls outside what the packed arithmetic covers."""
+
+
+def enabled() -> bool:
+    """Return True when the kernel is configured and NumPy can be imported."""
+    return settings.CLUSTERING_NUMPY_MIN_CANDIDATES > 0 and available()
+
+
+def use_for(candidate_count: int) -> bool:
+    """Return True when candidate_count candidates should be scored by the kernel."""
+    return enabled() and candidate_count >= settings.CLUSTERING_NUMPY_MIN_CANDIDATES
+
+
+# ---------------------------------------------------------------------------
+# Packing
+# ---------------------------------------------------------------------------
+
+
+def _number(v: Any, *, signed: bool = False) -> float:
+    """float(v) as the similarity code converts it; finite, and non-negative unless signed."""
+    try:
+        f = float(v)
+    except (TypeError, ValueError) as exc:
+        raise _Unpackable from exc
+    if not math.isfinite(f) or (f < 0.0 and not signed):
+        raise _Unpackable
+    return f
+
+
+def _dict(v: Any) -> dict:
+    if not isinstance(v, dict):
+        raise _Unpackable
+    return v
+
+
+def _histogram(v: Any, size: int) -> list[float] | None:
+    if v is None:
+        return None
+    if not isinstance(v, list) or len(v) != size:
+        raise _Unpackable
+    if not all(isinstance(x, int | float) for x in v):
+        raise _Unpackable
+    return [_number(x) for x in v]
+
+
+def _credential_tuples(v: Any) -> list[tuple]:
+    return [(_dict(c).get("username_pattern", ""), c.get("password_class", "")) for c in (v or [])]
+
+
+def _edit_sequences(fp: ParsedFingerprint) -> dict[str, list | None]:
+    """The lists each edit term compares, as the dimension functions build them."""
+    s, p, c, t = fp.sequence, fp.protocol, fp.credential, fp.target
+    return {
+        "ports": (s.get("port_sequence") or []) if s is not None else None,
+        "event_types": (
+            (s.get("event_type_sequence") or [])[:_MAX_EVENT_TYPES] if s is not None else None
+        ),
+        "sequence_credentials": (
+            _credential_tuples(s.get("credential_sequence")) if s is not None else None
+        ),
+        "kex": p.get("ssh_kex_ordering") if p is not None else None,
+        "tls": p.get("tls_cipher_ordering") if p is not None else None,
+        "credentials": _credential_tuples(c.get("credential_sequence")) if c is not None else None,
+        "top_dst_ports": (t.get("top_dst_ports") or []) if t is not None else None,
+    }
+
+
+def _top_ports(t: dict[str, Any]) -> list:
+    pf = _dict(t.get("port_freq") or {})
+    try:
+        return sorted(pf, key=lambda k: pf[k], reverse=True)[:10]
+    except TypeError as exc:
+        raise _Unpackable from exc
+
+
+def _key_set(v: Any) -> list:
+    return list(_dict(v or {}).keys())
+
+
+def _row(fp: ParsedFingerprint, weights: dict[str, float] | None) -> dict[str, Any]:
+    """One fingerprint's features in the packed layout; raises _Unpackable."""
+    t, p, c, tg = fp.timing, fp.protocol, fp.credential, fp.target
+    row: dict[str, Any] = {
+        "dims": [d is not None for d in (t, fp.sequence, p, c, tg)],
+        "weights": [math.nan] * 5,
+    }
+    for i, name in enumerate(("timing", "sequence", "protocol", "credential", "target")):
+        if weights and name in weights:
+            w = weights[name]
+            if not isinstance(w, int | float) or not w > 0.0 or not math.isfinite(w):
+                raise _Unpackable
+            row["weights"][i] = float(w)
+
+    interval = _dict(t.get("interval") or {}) if t is not None else {}
+    row["has_interval"] = bool(interval)
+    row["interval"] = (
+        [_number(interval.get(k, 0.0)) for k in _INTERVAL_KEYS] if interval else [0.0] * 5
+    )
+    tod = _histogram(t.get("tod_histogram"), 24) if t is not None else None
+    dow = _histogram(t.get("dow_histogram"), 7) if t is not None else None
+    row["has_tod"], row["tod"] = tod is not None, tod or [0.0] * 24
+    row["has_dow"], row["dow"] = dow is not None, dow or [0.0] * 7
+    cv = t.get("burst_cv") if t is not None else None
+    row["has_cv"], row["cv"] = cv is not None, _number(cv, signed=True) if cv is not None else 0.0
+
+    row["services"] = _key_set(p.get("service_distribution")) if p is not None else []
+    row["usernames"] = _key_set(c.get("username_class_dist")) if c is not None else []
+    row["top_ports"] = _top_ports(tg) if tg is not None else []
+    for name, width in _SET_WIDTH.items():
+        if len(row[name]) > width:
+            raise _Unpackable
+
+    pcc = _dict(c.get("password_char_class") or {}) if c is not None else {}
+    if not set(pcc) <= set(_CHAR_CLASS_KEYS):
+        raise _Unpackable
+    row["has_pcc"] = [k in pcc for k in _CHAR_CLASS_KEYS]
+    row["pcc"] = [_number(pcc[k]) if k in pcc else 0.0 for k in _CHAR_CLASS_KEYS]
+
+    try:
+        sequences = _edit_sequences(fp)
+    except (AttributeError, TypeError) as exc:
+        raise _Unpackable from exc
+    row["sequences"] = sequences
+    for name, seq in sequences.items():
+        counts = [0] * _BUCKETS
+        if seq is not None:
+            if not isinstance(seq, list) or len(seq) > _MAX_SEQUENCE:
+                raise _Unpackable
+            try:
+                for x in seq:
+                    counts[hash(x) % _BUCKETS] += 1
+            except TypeError as exc:  # unhashable element
+                raise _Unpackable from exc
+        row[f"{name}_present"] = seq is not None
+        row[f"{name}_len"] = len(seq) if seq is not None else 0
+        row[f"{name}_counts"] = counts
+    return row
+
+
+# Column name → NumPy dtype; every other row key stays in Python.
+_COLUMNS: dict[str, str] = {
+    "dims": "bool",
+    "weights": "float64",
+    "has_interval": "bool",
+    "interval": "float64",
+    "has_tod": "bool",
+    "tod": "float64",
+    "has_dow": "bool",
+    "dow": "float64",
+    "has_cv": "bool",
+    "cv": "float64",
+    "has_pcc": "bool",
+    "pcc": "float64",
+    **{f"{name}_ids": "int32" for name in _SET_WIDTH},
+    **{f"{name}_size": "int32" for name in _SET_WIDTH},
+    **{f"{name}_present": "bool" for name, _, _ in _EDIT_TERMS},
+    **{f"{name}_len": "int32" for name, _, _ in _EDIT_TERMS},
+    **{f"{name}_counts": "uint8" for name, _, _ in _EDIT_TERMS},
+}
+
+
+def _set_ids(keys: list, vocabulary: dict[Any, int], width: int) -> list[int]:
+    """Interned ids of keys padded with -1; new keys are added to vocabulary."""
+    ids = [vocabulary.setdefault(k, len(vocabulary)) for k in keys]
+    return ids + [-1] * (width - len(ids))
+
+
+def _columns(rows: list[dict[str, Any]], vocabulary: dict[Any, int]) -> dict[str, Any]:
+    import numpy as np
+
+    for row in rows:
+        for name, width in _SET_WIDTH.items():
+            row[f"{name}_ids"] = _set_ids(row[name], vocabulary, width)
+            row[f"{name}_size"] = len(row[name])
+    shapes = {
+        "dims": (5,),
+        "weights": (5,),
+        "interval": (5,),
+        "tod": (24,),
+        "dow": (7,),
+        "has_pcc": (4,),
+        "pcc": (4,),
+        **{f"{name}_ids": (width,) for name, width in _SET_WIDTH.items()},
+        **{f"{name}_counts": (_BUCKETS,) for name, _, _ in _EDIT_TERMS},
+    }
+    return {
+        col: np.array([row[col] for row in rows], dtype=dtype).reshape(
+            (len(rows), *shapes.get(col, ()))
+        )
+        for col, dtype in _COLUMNS.items()
+    }
+
+
+class PackedCandidates:
+    """Packed features of the candidates, one row per campaign; immutable.
+
+    Rows are in no particular order: the kernel works by campaign id.
+    """
+
+    def __init__(self) -> None:
+        self._ids: list[str] = []
+        self._rows: dict[str, int] = {}
+        self._sequences: list[dict[str, list | None]] = []
+        self._columns: dict[str, Any] | None = None
+        # campaign_id → (fingerprint, weights) the row was packed from; also
+        # remembers fingerprints that could not be packed.
+        self._sources: dict[str, tuple[ParsedFingerprint, dict[str, float] | None]] = {}
+        self._vocabulary: dict[Any, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, campaign_id: object) -> bool:
+        return campaign_id in self._rows
+
+    def synced(
+        self, sources: dict[str, tuple[ParsedFingerprint, dict[str, float] | None]]
+    ) -> PackedCandidates:
+        """Return the packing of sources, repacking only campaigns whose source changed.
+
+        A source is unchanged when it is the same ParsedFingerprint object with
+        equal weights.  Returns self when nothing changed.  Repacked rows keep
+        their position; rows are gathered anew only when campaigns leave.
+        """
+        import numpy as np
+
+        old = self._sources
+        changed = [
+            cid
+            for cid, (fp, weights) in sources.items()
+            if (prev := old.get(cid)) is None or prev[0] is not fp or prev[1] != weights
+        ]
+        gone = [cid for cid in old if cid not in sources]
+        if not changed and not gone:
+            return self
+
+        rows: dict[str, dict[str, Any]] = {}
+        for cid in changed:
+            try:
+                rows[cid] = _row(*sources[cid])
+            except _Unpackable:
+                continue
+
+        ids, sequences, columns = self._ids, self._sequences, self._columns
+        delete = {
+            self._rows[cid] for cid in (*gone, *changed) if cid in self._rows and cid not in rows
+        }
+        if delete:
+            keep = [i for i in range(len(ids)) if i not in delete]
+            index = np.array(keep, dtype=np.intp)
+            ids = [ids[i] for i in keep]
+            sequences = [sequences[i] for i in keep]
+            columns = {col: v[index] for col, v in columns.items()} if columns else None
+        row_of = {cid: i for i, cid in enumerate(ids)} if delete else self._rows
+
+        replaced = {row_of[cid]: row for cid, row in rows.items() if cid in row_of}
+        appended = {cid: row for cid, row in rows.items() if cid not in row_of}
+        if replaced:
+            positions = np.array(list(replaced), dtype=np.intp)
+            values = _columns(list(replaced.values()), self._vocabulary)
+            if not delete:
+                columns = {col: v.copy() for col, v in columns.items()}
+                sequences = list(sequences)
+            for col, v in columns.items():
+                v[positions] = values[col]
+            for pos, row in replaced.items():
+                sequences[pos] = row["sequences"]
+        if appended or columns is None:
+            added = _columns(list(appended.values()), self._vocabulary)
+            columns = (
+                added
+                if columns is None
+                else {col: np.concatenate((columns[col], added[col])) for col in _COLUMNS}
+            )
+            ids = [*ids, *appended]
+            sequences = [*sequences, *(row["sequences"] for row in appended.values())]
+
+        packed = PackedCandidates()
+        packed._vocabulary = self._vocabulary
+        packed._sources = dict(sources)
+        packed._ids = ids
+        packed._rows = row_of if not appended else {cid: i for i, cid in enumerate(ids)}
+        packed._sequences = sequences
+        packed._columns = columns
+        return packed
+
+
+# ---------------------------------------------------------------------------
+# Scoring
+# ---------------------------------------------------------------------------
+
+
+def _stat_sim(a: Any, b: Any) -> Any:
+    import numpy as np
+
+    return 1.0 - np.abs(a - b) / (np.maximum(a, b) + 1.0)
+
+
+def _histogram_sim(p: Any, q: list[float]) -> Any:
+    """1 - JSD between each row of p and q, summed in _kl_divergence() order."""
+    import numpy as np
+
+    kl_p = np.zeros(p.shape[0])
+    kl_q = np.zeros(p.shape[0])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for i, qi in enumerate(q):
+            pi = p[:, i]
+            mi = (pi + qi) / 2.0
+            kl_p += np.where((pi > 0.0) & (mi > 0.0), pi * np.log2(pi / mi), 0.0)
+            kl_q += np.where((qi > 0.0) & (mi > 0.0), qi * np.log2(qi / mi), 0.0)
+    return 1.0 - (kl_p + kl_q) / 2.0
+
+
+def _jaccard(ids: Any, size: Any, query_ids: list[int], query_size: int) -> Any:
+    import numpy as np
+
+    inter = np.isin(ids, query_ids).sum(axis=1) if query_ids else np.zeros(ids.shape[0])
+    union = size + query_size - inter
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(union > 0, inter / np.maximum(union, 1), 0.0)
+
+
+def _mean(parts: list[tuple[Any, Any]], n: int) -> Any:
+    """round(mean of the applicable parts, 6) per row; 0.0 where none applies."""
+    import numpy as np
+
+    total = np.zeros(n)
+    count = np.zeros(n)
+    for value, mask in parts:
+        total = total + np.where(mask, value, 0.0)
+        count = count + mask
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(count > 0, np.round(total / np.maximum(count, 1), 6), 0.0)
+
+
+class _Query:
+    """The new fingerprint packed against one PackedCandidates' vocabulary."""
+
+    def __init__(self, fp: ParsedFingerprint, vocabulary: dict[Any, int]) -> None:
+        row = _row(fp, None)
+        self.row = row
+        self.set_ids = {
+            name: [vocabulary[k] for k in row[name] if k in vocabulary] for name in _SET_WIDTH
+        }
+
+
+def _components(
+    q: _Query, cols: dict[str, Any], n: int
+) -> tuple[list[list[tuple[Any, Any]]], dict[str, tuple[Any, Any]]]:
+    """Packed sub-components per dimension, and each edit term's (bound, mask)."""
+    import numpy as np
+
+    row = q.row
+    dims: list[list[tuple[Any, Any]]] = [[] for _ in range(5)]
+
+    stats = [_stat_sim(cols["interval"][:, k], row["interval"][k]) for k in range(5)]
+    interval = (stats[0] + stats[1] + stats[2] + stats[3] + stats[4]) / 5
+    dims[0].append((interval, cols["has_interval"] & row["has_interval"]))
+    for name in ("tod", "dow"):
+        mask = cols[f"has_{name}"] & row[f"has_{name}"]
+        dims[0].append((_histogram_sim(cols[name], row[name]) if row[f"has_{name}"] else 0.0, mask))
+    cv = 1.0 - np.minimum(np.abs(cols["cv"] - row["cv"]), 1.0)
+    dims[0].append((cv, cols["has_cv"] & row["has_cv"]))
+
+    def _set_part(name: str) -> tuple[Any, Any]:
+        size = cols[f"{name}_size"]
+        value = _jaccard(cols[f"{name}_ids"], size, q.set_ids[name], len(row[name]))
+        return value, (size > 0) | (len(row[name]) > 0)
+
+    edits: dict[str, tuple[Any, Any]] = {}
+    for name, _, nonempty in _EDIT_TERMS:
+        length = cols[f"{name}_len"]
+        q_len = row[f"{name}_len"]
+        mask = cols[f"{name}_present"] & row[f"{name}_present"]
+        if nonempty:
+            mask = mask & ((length > 0) | (q_len > 0))
+        q_counts = np.array(row[f"{name}_counts"])
+        nz = np.flatnonzero(q_counts)
+        overlap = np.minimum(cols[f"{name}_counts"][:, nz], q_counts[nz]).sum(axis=1)
+        longest = np.maximum(length, q_len)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            bound = np.where(longest > 0, 1.0 - (longest - overlap) / np.maximum(longest, 1), 1.0)
+        edits[name] = (bound, mask)
+
+    pcc_shared = cols["has_pcc"] & np.array(row["has_pcc"])
+    pcc_total = np.zeros(n)
+    for k in range(len(_CHAR_CLASS_KEYS)):
+        sim = _stat_sim(cols["pcc"][:, k], row["pcc"][k])
+        pcc_total = pcc_total + np.where(pcc_shared[:, k], sim, 0.0)
+    pcc_count = pcc_shared.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pcc = pcc_total / np.maximum(pcc_count, 1)
+
+    # Sub-components in each dimension function's order; edit terms are
+    # filled in by _dimension_parts().
+    dims[2].append(_set_part("services"))
+    dims[3].append(_set_part("usernames"))
+    dims[3].append((pcc, pcc_count > 0))
+    dims[4].append(_set_part("top_ports"))
+    return dims, edits
+
+
+_PART_ORDER = (
+    ("ports", "event_types", "sequence_credentials"),
+    ("services", "kex", "tls"),
+    ("usernames", "pcc", "credentials"),
+    ("top_ports", "top_dst_ports"),
+)
+
+
+def _dimension_parts(
+    dims: list[list[tuple[Any, Any]]], edits: dict[str, tuple[Any, Any]]
+) -> list[list[tuple[Any, Any]]]:
+    """Merge edit terms into the packed parts in each dimension function's order."""
+    merged = [list(dims[0])]
+    for d, order in enumerate(_PART_ORDER, start=1):
+        packed = iter(dims[d])
+        merged.append([edits[name] if name in edits else next(packed) for name in order])
+    return merged
+
+
+def _weighted_totals(parts: list[list[tuple[Any, Any]]], present: Any, weights: Any) -> Any:
+    import numpy as np
+
+    n = present.shape[0]
+    numerator = np.zeros(n)
+    denominator = np.zeros(n)
+    for d in range(5):
+        sim = _mean(parts[d], n)
+        numerator = numerator + np.where(present[:, d], weights[:, d] * sim, 0.0)
+        denominator = denominator + np.where(present[:, d], weights[:, d], 0.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        totals = np.where(
+            denominator > 0.0, numerator / np.where(denominator > 0.0, denominator, 1.0), 0.0
+        )
+    return np.round(totals, 6)
+
+
+def _take(parts: list[list[tuple[Any, Any]]], index: Any) -> list[list[tuple[Any, Any]]]:
+    import numpy as np
+
+    return [[(np.broadcast_to(v, m.shape)[index], m[index]) for v, m in dim] for dim in parts]
+
+
+def score_against_many(
+    fp: ParsedFingerprint,
+    candidates: PackedCandidates,
+    *,
+    floor: float | None = None,
+) -> dict[str, float] | None:
+    """weighted_total of fp against every packed candidate, within SCORE_TOLERANCE.
+
+    With floor, candidates whose bound is more than SCORE_TOLERANCE below
+    floor are left out without computing their edit distances; every
+    candidate whose exact score reaches floor is present.  Returns None when
+    fp itself cannot be packed — score it with the pure-Python functions.
+    """
+    import numpy as np
+
+    try:
+        q = _Query(fp, candidates._vocabulary)
+    except _Unpackable:
+        return None
+    n = len(candidates)
+    cols = candidates._columns
+    if n == 0 or cols is None:
+        return {}
+
+    defaults = np.array(_similarity._dimension_weights(None), dtype=np.float64)
+    if not (defaults > 0.0).all():
+        return None
+    weights = np.where(np.isnan(cols["weights"]), defaults, cols["weights"])
+    present = cols["dims"] & np.array(q.row["dims"])
+    dims, edits = _components(q, cols, n)
+
+    if floor is None:
+        rows = np.arange(n)
+    else:
+        bounds = _weighted_totals(_dimension_parts(dims, edits), present, weights)
+        rows = np.flatnonzero(bounds >= floor - SCORE_TOLERANCE)
+    if rows.size == 0:
+        return {}
+
+    exact_edits: dict[str, tuple[Any, Any]] = {}
+    for name, (_, mask) in edits.items():
+        sub_mask = mask[rows]
+        values = np.ones(rows.size)
+        q_seq = q.row["sequences"][name]
+        for j in np.flatnonzero(sub_mask):
+            seq = candidates._sequences[rows[j]][name]
+            values[j] = _similarity._normalized_edit_sim(q_seq, seq)
+        exact_edits[name] = (values, sub_mask)
+
+    totals = _weighted_totals(
+        _dimension_parts(_take(dims, rows), exact_edits), present[rows], weights[rows]
+    )
+    return {candidates._ids[r]: float(s) for r, s in zip(rows, totals, strict=True)}
+
+
+def contenders(scores: dict[str, float], floor: float) -> set[str]:
+    """Campaign ids whose exact score may be the best one at or above floor.
+
+    Every candidate scoring exactly the maximum (≥ floor) is included, so
+    re-scoring the contenders in candidate order selects what a full scan
+    would.
+    """
+    if not scores:
+        return set()
+    cutoff = max(floor, max(scores.values())) - SCORE_TOLERANCE
+    return {cid for cid, score in scores.items() if score >= cutoff}
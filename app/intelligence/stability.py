@@ -24,10 +24,16 @@ Stability model:
   records have NULL feature values contribute zero to both numerator and
   denominator.  Sparse fingerprints are not penalised.
 
+Fingerprint windows:
+  A consecutive pair is compared only when both snapshots were built from the
+  same fingerprint_window (NULL = "all", see FINGERPRINT_WINDOW).  A change of
+  window is a change of input, not behavioral drift; skipped pairs are
+  counted in the explanation as window_mismatch_pairs.
+
 Insufficient-data handling:
-  Fewer than MIN_HISTORY_RECORDS (2) records → status = "insufficient_data",
-  all scores = None, composite_score = 0.0.  Cannot compute a change from
-  a single snapshot.
+  Fewer than MIN_HISTORY_RECORDS (2) records, or no consecutive pair sharing a
+  window → status = "insufficient_data", all scores = None,
+  composite_score = 0.0.  Cannot compute a change from a single snapshot.
 
 No AI imports.  No learned embeddings.  No vector DB.  Deterministic only.
 """
@@ -122,6 +128,10 @@ def _mean(values: list[float]) -> float:
     return sum(values) / len(values)
 
 
+def _window(record: dict[str, Any]) -> str:
+    return record.get("fingerprint_window") or "all"
+
+
 def compute_campaign_stability(history: list[dict[str, Any]]) -> StabilityResult:
     """Compute behavioral stability from a list of fingerprint_history rows.
 
@@ -135,7 +145,15 @@ def compute_campaign_stability(history: list[dict[str, Any]]) -> StabilityResult
     """
     now = datetime.now(UTC).isoformat()
 
-    if len(history) < MIN_HISTORY_RECORDS:
+    consecutive = list(zip(history[:-1], history[1:], strict=False))
+    pairs = [(a, b) for a, b in consecutive if _window(a) == _window(b)]
+    window_mismatch_pairs = len(consecutive) - len(pairs)
+
+    if len(history) < MIN_HISTORY_RECORDS or not pairs:
+        if len(history) < MIN_HISTORY_RECORDS:
+            reason = f"Fewer than {MIN_HISTORY_RECORDS} history records available"
+        else:
+            reason = "No consecutive history records share a fingerprint window"
         return StabilityResult(
             status=_STATUS_INSUFFICIENT,
             composite_score=0.0,
@@ -149,7 +167,7 @@ def compute_campaign_stability(history: list[dict[str, Any]]) -> StabilityResult
             dimensions_used=0,
             calculated_at=now,
             explanation={
-                "reason": f"Fewer than {MIN_HISTORY_RECORDS} history records available",
+                "reason": reason,
                 "records_available": len(history),
             },
         )
@@ -160,8 +178,6 @@ def compute_campaign_stability(history: list[dict[str, Any]]) -> StabilityResult
     credential_sims: list[float] = []
     target_sims: list[float] = []
 
-    pairs = list(zip(history[:-1], history[1:], strict=False))
-
     for a, b in pairs:
         ts = timing_similarity(
             _parse_feature(a.get("timing_features")),
@@ -246,7 +262,10 @@ def compute_campaign_stability(history: list[dict[str, Any]]) -> StabilityResult
         pair_count=len(pairs),
         dimensions_used=dimensions_used,
         calculated_at=now,
-        explanation={"dimensions": explanation_dims},
+        explanation={
+            "dimensions": explanation_dims,
+            "window_mismatch_pairs": window_mismatch_pairs,
+        },
     )
 
 
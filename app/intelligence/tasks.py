@@ -1,8 +1,9 @@
 """Background fingerprint computation tasks — Phase 6 PR A1 refactor.
 
-Provides schedule_fingerprint_if_not_pending(), the only entry point called
-from the ingest router. All fingerprint computation runs asynchronously via
-FastAPI BackgroundTasks — never in the synchronous ingest request path (§12.5).
+Provides schedule_fingerprint_if_not_pending() and its per-batch form
+schedule_fingerprints_for_batch(), the only entry points called from ingest.
+All fingerprint computation runs asynchronously via FastAPI BackgroundTasks —
+never in the synchronous ingest request path (§12.5).
 
 Deduplication model (Phase 6):
   A processing_jobs row with deduplication_key='fingerprint:{ip}' replaces
@@ -22,29 +23,65 @@ Phase 6 Group B additions:
   - _compute_and_store() appends a fingerprint_history row on each computation.
   - _run_campaign_clustering() updates representative_fingerprint_json on the
     assigned campaign after a successful association.
-  - _build_representative_fp_json() packages feature columns for the cache;
+  - build_representative_fp_json() packages feature columns for the cache;
     tool_signals is excluded (§11.2).
+
+Incremental fingerprints:
+  - _compute_and_store() folds only newly ingested events into the IP's
+    persisted FingerprintState (fingerprint_state) and falls back to a full
+    rebuild from all events when the state cannot be extended.
+
+Worker mode:
+  - With FINGERPRINT_EXECUTOR=worker the API process only writes pending
+    fingerprint_clustering jobs; app/jobs/worker.py claims and runs them,
+    building fingerprints on a process pool.
+
+Debounced scheduling:
+  - With FINGERPRINT_MIN_INTERVAL_SECONDS set, schedule_fingerprint_if_not_pending()
+    hands ips to FingerprintScheduler (app/intelligence/scheduler.py), which
+    refreshes each ip at most once per interval through create_fingerprint_job(),
+    runs_inline() and run_fingerprint_task().
+
+Fingerprint windows:
+  - With a bounded FINGERPRINT_WINDOW, _compute_and_store() builds the
+    fingerprint from the window's events only (streamed from the cursor), and
+    records the window label on the fingerprint_history row.
+
+Unchanged recomputes:
+  - _compute_and_store() stores a content hash of the feature columns with
+    the fingerprint.  When a recompute reproduces the stored hash, only the
+    event count and state are written: no fingerprint_history row, and
+    _run_campaign_clustering() keeps the membership bookkeeping but skips the
+    representative update and the stability refresh.
 """
 
 from __future__ import annotations
 
 import json
 import logging
-from datetime import UTC, datetime
+from datetime import UTC, datetime, timedelta
 from typing import TYPE_CHECKING, Any
 
 if TYPE_CHECKING:
+    from collections.abc import Iterable
+    from concurrent.futures import Executor
+
     from fastapi import BackgroundTasks
 
+    from app.db.repository import EventRepository
+    from app.intelligence.fingerprint import FingerprintWindow
+    from app.intelligence.incremental import FingerprintState
+
 logger = logging.getLogger(__name__)
 
 
-def _build_representative_fp_json(fp: dict[str, Any]) -> str:
+def build_representative_fp_json(fp: dict[str, Any]) -> str:
     """Serialize fingerprint feature columns to JSON for representative_fingerprint_json.
 
-    tool_signals is excluded — it is not a stability-relevant dimension and
-    may contain tool-name strings that could encode identifiable information
-    across versions (§11.2).
+    fp is a stored behavioral_fingerprints row or a freshly built fingerprint
+    dict.  tool_signals is excluded — it is not a stability-relevant dimension
+    and may contain tool-name strings that could encode identifiable
+    information across versions (§11.2).
     """
     return json.dumps(
         {
@@ -58,99 +95,265 @@ def _build_representative_fp_json(fp: dict[str, Any]) -> str:
     )
 
 
-def schedule_fingerprint_if_not_pending(ip: str, background_tasks: BackgroundTasks) -> None:
+def schedule_fingerprint_if_not_pending(
+    ip: str, background_tasks: BackgroundTasks, *, priority: bool = False
+) -> None:
     """Enqueue a fingerprint computation job for ip unless one is already active.
 
     Creates a processing_jobs row in 'pending' state before enqueuing the
     background task. If a pending or running job for this ip already exists
     (by deduplication_key), the new request is silently dropped.
+
+    With FINGERPRINT_MIN_INTERVAL_SECONDS set, ip is only marked dirty on the
+    process-wide FingerprintScheduler (app/intelligence/scheduler.py), which
+    coalesces refreshes per ip; background_tasks is not used.  priority marks
+    an ip whose event count just reached MIN_EVENTS_FOR_CLUSTERING — the
+    scheduler refreshes it ahead of the others without waiting.
+
+    With FINGERPRINT_EXECUTOR=worker only the job row is written; a
+    fingerprint worker process (python -m app.jobs.worker) claims and runs it.
     """
-    from app.db.connection import get_session
+    from app.intelligence.scheduler import get_fingerprint_scheduler
+
+    scheduler = get_fingerprint_scheduler()
+    if scheduler is not None:
+        scheduler.mark_dirty(ip, priority=priority)
+        return
+
+    job_id = create_fingerprint_job(ip)
+    if job_id is None or not runs_inline():
+        return
+
+    background_tasks.add_task(run_fingerprint_task, ip, job_id)
+
+
+def runs_inline() -> bool:
+    """Return True when fingerprint jobs run in this process after being created.
+
+    False when FINGERPRINT_EXECUTOR=worker: jobs wait for app/jobs/worker.py.
+    Callers that create jobs themselves (FingerprintScheduler) check this before
+    handing the job to run_fingerprint_task().
+    """
+    from app.core.config import settings
+
+    return settings.FINGERPRINT_EXECUTOR == "inline"
+
+
+def schedule_fingerprints_for_batch(
+    accepted_ips: Iterable[str], threshold_ips: Iterable[str], background_tasks: BackgroundTasks
+) -> None:
+    """Schedule a refresh for every accepted ip, threshold_ips first and with priority."""
+    first = set(threshold_ips)
+    for ip in sorted(first):
+        schedule_fingerprint_if_not_pending(ip, background_tasks, priority=True)
+    for ip in accepted_ips:
+        if ip not in first:
+            schedule_fingerprint_if_not_pending(ip, background_tasks)
+
+
+def create_fingerprint_job(ip: str) -> str | None:
+    """Insert a pending fingerprint job for ip and return its id.
+
+    Uses the same deduplication_key ('fingerprint:{ip}') as every other
+    fingerprint entry point.  Returns None when a pending or running job for ip
+    already exists, or when the insert fails (logged).
+    """
+    from app.db.connection import run_write
     from app.db.repository import EventRepository
 
     dedup_key = f"fingerprint:{ip}"
     now = datetime.now(UTC).isoformat()
-    job_id: str | None = None
+
+    def _create(session) -> str | None:
+        repo = EventRepository(session)
+        if repo.get_active_job_by_dedup_key(dedup_key) is not None:
+            return None
+        job = repo.create_job(
+            job_type="fingerprint_clustering",
+            triggered_by="system:ingest",
+            resource_type="ip",
+            resource_id=ip,
+            deduplication_key=dedup_key,
+            created_at=now,
+        )
+        return job["id"]
 
     try:
-        with get_session() as session:
-            repo = EventRepository(session)
-            existing = repo.get_active_job_by_dedup_key(dedup_key)
-            if existing is not None:
-                return
-            job = repo.create_job(
-                job_type="fingerprint_clustering",
-                triggered_by="system:ingest",
-                resource_type="ip",
-                resource_id=ip,
-                deduplication_key=dedup_key,
-                created_at=now,
-            )
-            job_id = job["id"]
+        return run_write(_create)
     except Exception:
         logger.exception("Failed to create fingerprint job for ip=%s", ip)
-        return
+        return None
 
-    background_tasks.add_task(_run_fingerprint_task, ip, job_id)
 
-
-def _run_fingerprint_task(ip: str, job_id: str) -> None:
+def run_fingerprint_task(ip: str, job_id: str) -> None:
     """Execute fingerprint computation for ip in a background context.
 
     Manages job lifecycle: pending → running → completed | failed.
     Failures are logged but do not propagate — a fingerprint failure must
     never surface as an ingest error to the sensor (§3.3 / §11).
     """
-    from app.db.connection import get_session
+    from app.db.connection import run_write
     from app.db.repository import EventRepository
 
     try:
-        with get_session() as session:
-            repo = EventRepository(session)
-            started = repo.start_job(job_id, started_at=datetime.now(UTC).isoformat())
-            if not started:
-                # Job was cancelled or already started by another executor.
-                logger.debug("Fingerprint job %s not in pending state, skipping", job_id)
-                return
-        _compute_and_store(ip)
-        with get_session() as session:
-            repo = EventRepository(session)
-            repo.complete_job(job_id, result_summary_json={"ip": ip, "outcome": "computed"})
+        started_at = datetime.now(UTC).isoformat()
+        started = run_write(lambda s: EventRepository(s).start_job(job_id, started_at=started_at))
+    except Exception:
+        logger.exception("Failed to start fingerprint job %s", job_id)
+        return
+    if not started:
+        # Job was cancelled or already started by another executor.
+        logger.debug("Fingerprint job %s not in pending state, skipping", job_id)
+        return
+    execute_fingerprint_job(ip, job_id)
+
+
+def execute_fingerprint_job(
+    ip: str, job_id: str, executor: Executor | None = None, *, worker_id: str | None = None
+) -> None:
+    """Compute the fingerprint for an already running job and complete or fail it.
+
+    The job must already be in 'running' state — started by
+    run_fingerprint_task() or claimed by a fingerprint worker
+    (app/jobs/worker.py).  Failures are logged and recorded on the job; they
+    never propagate.  executor, when given, runs the fingerprint build (the
+    worker passes its process pool); the database work stays in the caller.
+    worker_id, for a leased job, is the claiming worker: the job is only
+    completed or failed while that worker still holds it.
+    """
+    from app.db.connection import run_write
+    from app.db.repository import EventRepository
+
+    try:
+        _compute_and_store(ip, executor=executor)
+        completed = run_write(
+            lambda s: EventRepository(s).complete_job(
+                job_id, result_summary_json={"ip": ip, "outcome": "computed"}, worker_id=worker_id
+            )
+        )
+        if not completed and worker_id is not None:
+            logger.warning(
+                "Fingerprint job %s no longer held by %s; not completed", job_id, worker_id
+            )
     except Exception:
         logger.exception("Fingerprint computation failed for ip=%s job_id=%s", ip, job_id)
         try:
-            with get_session() as session:
-                repo = EventRepository(session)
-                repo.fail_job(job_id, error_message="Fingerprint computation error")
+            run_write(
+                lambda s: EventRepository(s).fail_job(
+                    job_id, error_message="Fingerprint computation error", worker_id=worker_id
+                )
+            )
         except Exception:
             logger.exception("Failed to record fingerprint job failure for job_id=%s", job_id)
 
 
-def _compute_and_store(ip: str) -> None:
+def _compute_and_store(
+    ip: str, full_rebuild: bool = False, *, executor: Executor | None = None
+) -> None:
     """Fetch events, compute fingerprint, write to behavioral_fingerprints.
 
-    Appends a fingerprint_history row in the same session as the upsert so
+    Appends a fingerprint_history row in the same write unit as the upsert so
     the history write is atomic with the fingerprint update (§11.2, §11.3).
+    Events are read and the fingerprint built before the write unit runs, so
+    the CPU work never holds the write path (run_write, app/db/connection.py).
+
+    With FINGERPRINT_INCREMENTAL on, only events ingested after the IP's
+    fingerprint_state watermark are read; they are folded into the stored
+    state and the fingerprint is rendered from it (app/intelligence/
+    incremental.py documents the tolerance against a full scan).  The state
+    is rebuilt from all events, and the fingerprint computed by
+    build_fingerprint(), when full_rebuild is set or the stored state cannot
+    be extended — see _fold_new_events().  The updated state is written in
+    the same write unit as the fingerprint.
+
+    With a bounded FINGERPRINT_WINDOW the fingerprint is built from that
+    window's events alone — no incremental state, which only describes all
+    events — and the history row records the window's label.
+
+    A full build (fingerprint plus fresh state) runs on executor when one is
+    given — events and results are pickled across to a worker process.
+
+    When the content hash of the new features (fingerprint_content_hash())
+    equals the stored features_hash, the recompute changed nothing but the
+    event count: the fingerprint row and state are still updated, but no
+    history row is appended and clustering runs with features_changed=False.
 
     After a successful fingerprint commit, triggers campaign clustering when
     the fingerprint meets the minimum confidence threshold (§12.6). The
     fingerprint session commits before clustering — a clustering failure
     cannot roll back the stored fingerprint.
     """
+    from app.core.config import settings
     from app.db.connection import get_session
     from app.db.repository import EventRepository
-    from app.intelligence.constants import FINGERPRINT_VERSION
-    from app.intelligence.fingerprint import build_fingerprint
+    from app.intelligence.fingerprint import FingerprintWindow, build_fingerprint_from_state
 
-    fp_confidence: float = 0.0
+    window = FingerprintWindow.from_settings()
+    incremental = settings.FINGERPRINT_INCREMENTAL and not window.bounded
+    state: FingerprintState | None = None
+    watermark: str | None = None
 
+    # Read and compute outside the write path; only the writes below need
+    # SQLite's write lock.
     with get_session() as session:
         repo = EventRepository(session)
-        events = repo.get_events_for_fingerprint(ip)
+        if window.bounded:
+            events = _fetch_window_events(repo, ip, window)
+        else:
+            if incremental and not full_rebuild:
+                folded = _fold_new_events(repo, ip)
+                if folded is not None:
+                    state, watermark = folded
+            if state is None:
+                events, watermark = repo.get_fingerprint_events_since(ip, None)
+    if state is not None:
+        fp = build_fingerprint_from_state(state)
+    else:
         if not events:
             return
-        fp = build_fingerprint(events)
-        computed_at = datetime.now(UTC).isoformat()
+        if executor is None:
+            fp, state = build_full(events, incremental)
+        else:
+            fp, state = executor.submit(build_full, events, incremental).result()
+    changed = store_fingerprint(ip, fp, state, watermark, window.label)
+    if not changed:
+        logger.debug("Fingerprint for ip=%s unchanged; history and stability skipped", ip)
+    fp_confidence = fp["confidence"]
+
+    if fp_confidence >= 0.20:
+        _run_campaign_clustering(ip, features_changed=changed)
+
+
+def store_fingerprint(
+    ip: str,
+    fp: dict[str, Any],
+    state: FingerprintState | None,
+    watermark: str | None,
+    window_label: str,
+) -> bool:
+    """Write fp (and state, when given) for ip in one write unit.
+
+    Upserts behavioral_fingerprints under FINGERPRINT_VERSION with fp's
+    content hash, writes state with watermark to fingerprint_state, and
+    appends the fingerprint_history row (labelled window_label) unless fp's
+    content hash equals the stored one.  Returns True when the features
+    changed.  Shared by the ingest path and the refingerprint job
+    (app/jobs/refingerprint.py); campaign clustering is left to the caller.
+    """
+    from app.db.connection import run_write
+    from app.db.repository import EventRepository
+    from app.intelligence.constants import FINGERPRINT_STATE_VERSION, FINGERPRINT_VERSION
+    from app.intelligence.fingerprint import fingerprint_content_hash
+
+    computed_at = datetime.now(UTC).isoformat()
+    features_hash = fingerprint_content_hash(
+        fp, fingerprint_version=FINGERPRINT_VERSION, window_label=window_label
+    )
+
+    def _store(session) -> bool:
+        repo = EventRepository(session)
+        previous = repo.get_behavioral_fingerprint(ip)
+        changed = previous is None or previous["features_hash"] != features_hash
         repo.upsert_behavioral_fingerprint(
             ip=ip,
             fingerprint_version=FINGERPRINT_VERSION,
@@ -163,7 +366,20 @@ def _compute_and_store(ip: str) -> None:
             target_features=fp["target_features"],
             tool_signals=fp["tool_signals"],
             confidence=fp["confidence"],
+            features_hash=features_hash,
         )
+        if state is not None:
+            repo.upsert_fingerprint_state(
+                ip=ip,
+                fingerprint_version=FINGERPRINT_VERSION,
+                state_version=FINGERPRINT_STATE_VERSION,
+                event_count=state.event_count,
+                watermark=watermark,
+                state_json=json.dumps(state.to_dict(), separators=(",", ":")),
+                updated_at=computed_at,
+            )
+        if not changed:
+            return False
         stored = repo.get_behavioral_fingerprint(ip)
         member = repo.get_campaign_member_by_ip(ip)
         if stored is not None:
@@ -180,14 +396,90 @@ def _compute_and_store(ip: str) -> None:
                 protocol_features=fp["protocol_features"],
                 credential_features=fp["credential_features"],
                 target_features=fp["target_features"],
+                fingerprint_window=window_label,
             )
-        fp_confidence = fp["confidence"]
+        return True
 
-    if fp_confidence >= 0.20:
-        _run_campaign_clustering(ip)
+    return run_write(_store)
 
 
-def _run_campaign_clustering(ip: str) -> None:
+def build_full(
+    events: list[dict[str, Any]], with_state: bool
+) -> tuple[dict[str, Any], FingerprintState | None]:
+    """build_fingerprint(events) and, when with_state, a state folded from them.
+
+    Returns (fingerprint, state); state is None unless with_state.  Module-level
+    and free of database access so a ProcessPoolExecutor can run it — the
+    fingerprint worker and the refingerprint job submit it to their pools.
+    """
+    from app.intelligence.fingerprint import build_fingerprint
+    from app.intelligence.incremental import FingerprintState
+
+    fp = build_fingerprint(events)
+    if not with_state:
+        return fp, None
+    state = FingerprintState()
+    state.fold(events)
+    return fp, state
+
+
+def _fold_new_events(repo: EventRepository, ip: str) -> tuple[FingerprintState, str | None] | None:
+    """Extend ip's stored FingerprintState with the events ingested since it.
+
+    Returns (state, new watermark), or None when the state must be rebuilt
+    from all events:
+      - no state row, or one written under another FINGERPRINT_VERSION or
+        FINGERPRINT_STATE_VERSION;
+      - the stored event count plus the new events does not equal the events
+        table's count for ip — rows were pruned, or an event was committed
+        with an ingested_at behind the watermark;
+      - a new event predates the last event folded into the state.
+    """
+    from app.intelligence.constants import FINGERPRINT_STATE_VERSION, FINGERPRINT_VERSION
+    from app.intelligence.incremental import FingerprintState
+
+    row = repo.get_fingerprint_state(ip)
+    if (
+        row is None
+        or row["fingerprint_version"] != FINGERPRINT_VERSION
+        or row["state_version"] != FINGERPRINT_STATE_VERSION
+    ):
+        return None
+    events, watermark = repo.get_fingerprint_events_since(ip, row["watermark"])
+    if row["event_count"] + len(events) != repo.count_events_for_ip(ip):
+        logger.debug("Fingerprint state for ip=%s is out of step with events; rebuilding", ip)
+        return None
+    state = FingerprintState.from_dict(json.loads(row["state_json"]))
+    if not state.fold(events):
+        logger.debug("Out-of-order events for ip=%s; rebuilding fingerprint state", ip)
+        return None
+    return state, watermark
+
+
+def _fetch_window_events(
+    repo: EventRepository, ip: str, window: FingerprintWindow
+) -> list[dict[str, Any]]:
+    """Load the events of ip in a bounded window, streamed from the cursor.
+
+    Every bounded window caps the list at window.events events in SQL, so a
+    hot IP never loads more than that however much history it has.
+    last_days counts back from the IP's newest event, not from now, so a
+    re-fingerprint of a quiet IP still covers its last active period.
+    """
+    if window.mode == "last_days":
+        newest = repo.get_newest_event_ts(ip)
+        if newest is None:
+            return []
+        since = datetime.fromisoformat(newest).astimezone(UTC) - timedelta(days=window.days or 0)
+        return list(
+            repo.iter_fingerprint_events(ip, since_ts=since.isoformat(), last_events=window.events)
+        )
+    if window.mode == "sample":
+        return list(repo.iter_fingerprint_events(ip, sample_events=window.events))
+    return list(repo.iter_fingerprint_events(ip, last_events=window.events))
+
+
+def _run_campaign_clustering(ip: str, *, features_changed: bool = True) -> None:
     """Run campaign assignment for ip in a fresh session.
 
     After assignment:
@@ -196,6 +488,12 @@ def _run_campaign_clustering(ip: str) -> None:
         separate failure domain — a stability failure must never mask a
         clustering success.
 
+    With features_changed=False (the recompute reproduced the stored
+    features) both are skipped for an existing member: the representative and
+    the history that stability scores are unchanged.  Assignment itself still
+    runs — for a member it only records the activity that drives dormancy,
+    and an IP whose earlier clustering failed gets another try.
+
     Failures are logged but do not propagate — a clustering failure must
     never surface as a fingerprint-computation error (§3.3 / §11).
     """
@@ -204,7 +502,7 @@ def _run_campaign_clustering(ip: str) -> None:
     try:
         from app.db.connection import get_session
         from app.db.repository import EventRepository
-        from app.intelligence.clustering import assign_to_campaign
+        from app.intelligence.clustering import DECISION_EXISTING_MEMBER, assign_to_campaign
 
         with get_session() as session:
             repo = EventRepository(session)
@@ -212,8 +510,9 @@ def _run_campaign_clustering(ip: str) -> None:
             if stored_fp is None:
                 return
             decision = assign_to_campaign(ip, stored_fp, repo)
-            if decision.campaign_id is not None:
-                rep_fp_json = _build_representative_fp_json(stored_fp)
+            joined = decision.decision != DECISION_EXISTING_MEMBER
+            if decision.campaign_id is not None and (features_changed or joined):
+                rep_fp_json = build_representative_fp_json(stored_fp)
                 repo.update_representative_fingerprint(decision.campaign_id, rep_fp_json)
                 assigned_campaign_id = decision.campaign_id
     except Exception:
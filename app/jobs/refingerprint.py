@@ -0,0 +1,441 @@
+"""Bulk re-fingerprint job — python -m app.jobs.refingerprint.
+
+A fingerprint is otherwise only recomputed when its IP sends new events, so
+after a FINGERPRINT_VERSION bump (app/intelligence/constants.py) quiet IPs
+keep fingerprints built by the old code.  A refingerprint job recomputes them:
+
+  Selection  — every source IP with no fingerprint or one older than
+               FINGERPRINT_VERSION; every source IP with --all
+  Fields     — before a batch is scanned, its events' event_fingerprint_fields
+               rows that are missing or older than FINGERPRINT_FIELDS_VERSION
+               are re-derived from raw_events.raw_json (FIELDS_REFRESH_ROWS
+               rows per write unit)
+  Scan       — IPs are taken in src_ip order, --batch-size at a time; the
+               events of a batch come from one ordered scan of events JOIN
+               raw_events over the batch's src_ip range
+               (iter_fingerprint_event_groups), not one query per IP.  A
+               bounded FINGERPRINT_WINDOW is applied while streaming, so at
+               most the window of each IP is held
+  Build      — a batch's fingerprints are built in parallel on a process pool
+               (--processes), at most --max-in-flight of them submitted and
+               not yet collected, and written one IP per write unit, with the
+               history row and incremental state of the ingest path
+               (store_fingerprint in app/intelligence/tasks.py)
+  Campaigns  — a changed member fingerprint becomes its campaign's
+               representative, and each touched campaign's stability is
+               refreshed once per batch.  Campaign assignment is not run: it
+               would record activity for IPs that sent nothing.  IPs that are
+               in no campaign are clustered on their next ingest refresh
+  Checkpoint — after each batch the last src_ip done is saved on the job row
+               (backend_metadata_json) with progress_percent
+  Rate limit — at most --max-ips-per-second IPs per second, so live ingest
+               keeps getting the write lock between the job's write units
+
+Fingerprints are therefore always rebuilt from fields of the current
+FINGERPRINT_FIELDS_VERSION, never from rows derived by older code.  A change
+to fingerprint_fields() (app/intelligence/sequence.py) bumps
+FINGERPRINT_FIELDS_VERSION together with FINGERPRINT_VERSION, so the IPs whose
+fields changed are selected.
+
+The job holds a lease (JobRepository.claim_jobs) that is renewed every batch.
+A run that dies leaves the job leased; once the lease expires the next run
+re-queues and claims it and continues after the checkpoint.  A failed or
+cancelled job is continued with --resume JOB_ID, which starts a new job from
+its checkpoint.  Cancelling the job (cancel_job) stops a run after the
+current batch.
+
+POST /api/admin/run-refingerprint-job only enqueues a job; the web process
+never runs it.  The next run of this command picks the pending job up (with
+the selection it was enqueued with) instead of creating another.
+
+Usage:
+    python -m app.jobs.refingerprint
+    python -m app.jobs.refingerprint --all --processes 4 --max-ips-per-second 20
+    python -m app.jobs.refingerprint --resume 3f0c...   # continue a failed job
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any
+
+from app.db.connection import get_session, run_write
+from app.db.repository import EventRepository
+from app.intelligence.constants import FINGERPRINT_FIELDS_VERSION, FINGERPRINT_VERSION
+from app.intelligence.tasks import build_full, build_representative_fp_json, store_fingerprint
+from app.jobs.worker import default_worker_id
+
+logger = logging.getLogger(__name__)
+
+JOB_TYPE = "refingerprint"
+DEDUP_KEY = "refingerprint"
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_MAX_IPS_PER_SECOND = 50.0
+# Builds submitted to the executor and not yet collected; each holds its IP's
+# (windowed) event list until the worker process has taken it.
+DEFAULT_MAX_IN_FLIGHT = 8
+LEASE_SECONDS = 300
+# event_fingerprint_fields rows re-derived per write unit.
+FIELDS_REFRESH_ROWS = 1000
+# Each resumed run is a claim; allow several before an expired lease fails the job.
+MAX_ATTEMPTS = 10
+
+
+def enqueue_refingerprint_job(
+    *,
+    all_ips: bool = False,
+    resume_job_id: str | None = None,
+    triggered_by: str | None = None,
+) -> dict[str, Any]:
+    """Create a pending refingerprint job, or return the one already active.
+
+    With resume_job_id the new job starts after that job's checkpoint and
+    keeps its selection.  Raises ValueError when resume_job_id is not a
+    refingerprint job.
+    """
+
+    def _enqueue(session) -> dict[str, Any]:
+        repo = EventRepository(session)
+        metadata = {"target_version": FINGERPRINT_VERSION, "all": all_ips, "checkpoint": None}
+        if resume_job_id is not None:
+            previous = repo.get_job(resume_job_id)
+            if previous is None or previous["job_type"] != JOB_TYPE:
+                raise ValueError(f"{resume_job_id!r} is not a {JOB_TYPE} job")
+            metadata = {**_metadata(previous), "target_version": FINGERPRINT_VERSION}
+        active = repo.get_active_job_by_dedup_key(DEDUP_KEY)
+        if active is not None:
+            return active
+        return repo.create_job(
+            job_type=JOB_TYPE,
+            triggered_by=triggered_by,
+            deduplication_key=DEDUP_KEY,
+            backend_metadata_json=metadata,
+        )
+
+    return run_write(_enqueue)
+
+
+def run_refingerprint_job(
+    *,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    max_ips_per_second: float = DEFAULT_MAX_IPS_PER_SECOND,
+    executor: Executor | None = None,
+    max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+    worker_id: str | None = None,
+    sleep: Callable[[float], None] = time.sleep,
+    clock: Callable[[], float] = time.monotonic,
+) -> dict[str, Any] | None:
+    """Claim the pending refingerprint job and run it to the end.
+
+    Returns the job's result summary, or None when no job was pending or the
+    run stopped early (job cancelled or lease lost).  Builds run on executor
+    when one is given, at most max_in_flight at a time, inline otherwise.
+    """
+    if batch_size < 1:
+        raise ValueError(f"batch_size must be >= 1; got {batch_size}")
+    if max_in_flight < 1:
+        raise ValueError(f"max_in_flight must be >= 1; got {max_in_flight}")
+    worker_id = worker_id or default_worker_id()
+    claimed = run_write(
+        lambda session: EventRepository(session).claim_jobs(
+            JOB_TYPE, worker_id, 1, LEASE_SECONDS, max_attempts=MAX_ATTEMPTS
+        )
+    )
+    if not claimed:
+        return None
+    job = claimed[0]
+    try:
+        return _RefingerprintRun(
+            job, worker_id, batch_size, max_ips_per_second, executor, max_in_flight, sleep, clock
+        ).run()
+    except Exception as exc:
+        logger.exception("Refingerprint job %s failed", job["id"])
+        error_message = f"Refingerprint failed: {type(exc).__name__}"
+        run_write(
+            lambda session: EventRepository(session).fail_job(
+                job["id"], error_message=error_message, worker_id=worker_id
+            )
+        )
+        return None
+
+
+def _metadata(job: dict[str, Any]) -> dict[str, Any]:
+    raw = job.get("backend_metadata_json")
+    return json.loads(raw) if raw else {}
+
+
+class _RefingerprintRun:
+    def __init__(
+        self,
+        job: dict[str, Any],
+        worker_id: str,
+        batch_size: int,
+        max_ips_per_second: float,
+        executor: Executor | None,
+        max_in_flight: int,
+        sleep: Callable[[float], None],
+        clock: Callable[[], float],
+    ) -> None:
+        from app.core.config import settings
+        from app.intelligence.fingerprint import FingerprintWindow
+
+        self._job_id = job["id"]
+        self._worker_id = worker_id
+        self._batch_size = batch_size
+        self._rate = max_ips_per_second
+        self._executor = executor
+        self._max_in_flight = max_in_flight
+        self._sleep = sleep
+        self._clock = clock
+        self._meta = _metadata(job)
+        self._below_version = None if self._meta.get("all") else FINGERPRINT_VERSION
+        self._window = FingerprintWindow.from_settings()
+        # The same bound iter_fingerprint_events() is given by the ingest path
+        # (_fetch_window_events); the window itself is applied per group.
+        self._scan_window: dict[str, int | None] = {}
+        if self._window.mode in ("last_events", "last_days"):
+            self._scan_window = {"last_events": self._window.events}
+        elif self._window.mode == "sample":
+            self._scan_window = {"sample_events": self._window.events}
+        self._with_state = settings.FINGERPRINT_INCREMENTAL and not self._window.bounded
+        self.recomputed = self._meta.get("recomputed", 0)
+        self.unchanged = self._meta.get("unchanged", 0)
+        self.fields_refreshed = self._meta.get("fields_refreshed", 0)
+
+    def run(self) -> dict[str, Any] | None:
+        checkpoint = self._meta.get("checkpoint")
+        with get_session() as session:
+            remaining = EventRepository(session).count_source_ips_to_refingerprint(
+                after_ip=checkpoint, below_version=self._below_version
+            )
+        done_before = self.recomputed + self.unchanged
+        total = done_before + remaining
+        started = self._clock()
+        done = 0
+        logger.info("Refingerprint job %s: %d IP(s) to recompute", self._job_id, remaining)
+
+        while True:
+            with get_session() as session:
+                ips = EventRepository(session).list_source_ips_to_refingerprint(
+                    after_ip=checkpoint, limit=self._batch_size, below_version=self._below_version
+                )
+            if not ips:
+                break
+            self._run_batch(checkpoint, ips[-1])
+            checkpoint = ips[-1]
+            done += len(ips)
+            progress = int(100 * (done_before + done) / total) if total else 100
+            if not self._save_checkpoint(checkpoint, progress):
+                logger.warning(
+                    "Refingerprint job %s stopped: cancelled or lease lost", self._job_id
+                )
+                return None
+            if self._rate > 0:
+                self._sleep(max(0.0, done / self._rate - (self._clock() - started)))
+
+        result = {
+            "target_version": FINGERPRINT_VERSION,
+            "recomputed": self.recomputed,
+            "unchanged": self.unchanged,
+            "fields_refreshed": self.fields_refreshed,
+        }
+        completed = run_write(
+            lambda session: EventRepository(session).complete_job(
+                self._job_id,
+                result_summary_json=result,
+                backend_metadata_json=self._meta,
+                worker_id=self._worker_id,
+            )
+        )
+        if not completed:
+            logger.warning(
+                "Refingerprint job %s not completed: cancelled or lease lost", self._job_id
+            )
+            return None
+        logger.info("Refingerprint job %s completed: %s", self._job_id, result)
+        return result
+
+    def _run_batch(self, after_ip: str | None, through_ip: str) -> None:
+        """Rebuild and store the fingerprints of the IPs in (after_ip, through_ip]."""
+        self._refresh_fields(after_ip, through_ip)
+        builds: list[tuple[str, Any, str | None]] = []
+        in_flight: deque[int] = deque()
+        with get_session() as session:
+            groups = EventRepository(session).iter_fingerprint_event_groups(
+                after_ip=after_ip,
+                through_ip=through_ip,
+                below_version=self._below_version,
+                **self._scan_window,
+            )
+            for ip, events, watermark in groups:
+                events = self._window.apply(events)
+                if self._executor is None:
+                    builds.append((ip, build_full(events, self._with_state), watermark))
+                    continue
+                if len(in_flight) >= self._max_in_flight:
+                    _collect(builds, in_flight.popleft())
+                in_flight.append(len(builds))
+                future = self._executor.submit(build_full, events, self._with_state)
+                builds.append((ip, future, watermark))
+        while in_flight:
+            _collect(builds, in_flight.popleft())
+
+        campaigns: set[str] = set()
+        for ip, (fp, state), watermark in builds:
+            if not store_fingerprint(ip, fp, state, watermark, self._window.label):
+                self.unchanged += 1
+                continue
+            self.recomputed += 1
+            campaign_id = run_write(lambda session, ip=ip: _update_representative(session, ip))
+            if campaign_id is not None:
+                campaigns.add(campaign_id)
+
+        from app.intelligence.stability import refresh_campaign_stability
+
+        for campaign_id in sorted(campaigns):
+            try:
+                refresh_campaign_stability(campaign_id)
+            except Exception:
+                logger.exception("Stability refresh failed for campaign_id=%s", campaign_id)
+
+    def _refresh_fields(self, after_ip: str | None, through_ip: str) -> None:
+        """Re-derive the stale event_fingerprint_fields rows of (after_ip, through_ip]."""
+        while True:
+            with get_session() as session:
+                stale = EventRepository(session).list_stale_fingerprint_field_sources(
+                    after_ip=after_ip,
+                    through_ip=through_ip,
+                    fields_version=FINGERPRINT_FIELDS_VERSION,
+                    limit=FIELDS_REFRESH_ROWS,
+                    below_version=self._below_version,
+                )
+            if not stale:
+                return
+            run_write(
+                lambda session, stale=stale: EventRepository(session).refresh_fingerprint_fields(
+                    stale
+                )
+            )
+            self.fields_refreshed += len(stale)
+
+    def _save_checkpoint(self, checkpoint: str, progress: int) -> bool:
+        """Record progress and renew the lease; False when the job is no longer ours."""
+        self._meta.update(
+            checkpoint=checkpoint,
+            recomputed=self.recomputed,
+            unchanged=self.unchanged,
+            fields_refreshed=self.fields_refreshed,
+        )
+
+        def _save(session) -> bool:
+            repo = EventRepository(session)
+            if not repo.heartbeat(self._job_id, self._worker_id, LEASE_SECONDS):
+                return False
+            repo.update_backend_metadata(self._job_id, self._meta)
+            repo.update_progress(self._job_id, progress)
+            return True
+
+        return run_write(_save)
+
+
+def _collect(builds: list[tuple[str, Any, str | None]], index: int) -> None:
+    """Replace the future at builds[index] with its (fingerprint, state) result."""
+    ip, future, watermark = builds[index]
+    builds[index] = (ip, future.result(), watermark)
+
+
+def _update_representative(session, ip: str) -> str | None:
+    """Make ip's fingerprint its campaign's representative; return the campaign id."""
+    repo = EventRepository(session)
+    member = repo.get_campaign_member_by_ip(ip)
+    stored = repo.get_behavioral_fingerprint(ip)
+    if member is None or stored is None:
+        return None
+    repo.update_representative_fingerprint(
+        member["campaign_id"], build_representative_fp_json(stored)
+    )
+    return member["campaign_id"]
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Recompute stored fingerprints, e.g. after a FINGERPRINT_VERSION bump."
+    )
+    parser.add_argument(
+        "--all",
+        action="store_true",
+        help="recompute every source IP, not only those below FINGERPRINT_VERSION",
+    )
+    parser.add_argument(
+        "--resume", metavar="JOB_ID", help="continue a failed or cancelled job from its checkpoint"
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="fingerprint builds run in parallel (default: CPU count)",
+    )
+    parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        default=None,
+        help="builds submitted and not yet collected (default: twice --processes)",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help=f"IPs per scan and checkpoint (default: {DEFAULT_BATCH_SIZE})",
+    )
+    parser.add_argument(
+        "--max-ips-per-second",
+        type=float,
+        default=DEFAULT_MAX_IPS_PER_SECOND,
+        help=f"rate limit, 0 for none (default: {DEFAULT_MAX_IPS_PER_SECOND:g})",
+    )
+    args = parser.parse_args(argv)
+    if args.processes < 1:
+        parser.error("--processes must be >= 1")
+    if args.batch_size < 1:
+        parser.error("--batch-size must be >= 1")
+    if args.max_in_flight is None:
+        args.max_in_flight = 2 * args.processes
+    if args.max_in_flight < 1:
+        parser.error("--max-in-flight must be >= 1")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+    try:
+        job = enqueue_refingerprint_job(
+            all_ips=args.all, resume_job_id=args.resume, triggered_by="cli"
+        )
+    except ValueError as exc:
+        parser.error(str(exc))
+    logger.info("Refingerprint job %s (%s)", job["id"], job["status"])
+
+    # spawn: children must not inherit this process's threads or SQLite handles.
+    builder = ProcessPoolExecutor(
+        max_workers=args.processes, mp_context=multiprocessing.get_context("spawn")
+    )
+    try:
+        result = run_refingerprint_job(
+            batch_size=args.batch_size,
+            max_ips_per_second=args.max_ips_per_second,
+            executor=builder,
+            max_in_flight=args.max_in_flight,
+        )
+    finally:
+        builder.shutdown(wait=True)
+    if result is None:
+        logger.info("No refingerprint job completed in this run")
+
+
+if __name__ == "__main__":
+    main()
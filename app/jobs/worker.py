@@ -0,0 +1,238 @@
+"""Fingerprint worker process — python -m app.jobs.worker.
+
+With FINGERPRINT_EXECUTOR=worker the API process only writes pending
+fingerprint_clustering jobs to processing_jobs. One or more workers run beside
+it, against the same database, and do the computation off the web process:
+
+  Claim      — up to one job per free slot, oldest first, moved from pending
+               to running by JobRepository.claim_jobs() in one conditional
+               UPDATE, so two workers can never both claim a job; each claim
+               carries this worker's id and a lease of --lease-seconds
+  Heartbeat  — a thread extends the lease of every in-flight job every
+               lease/3 seconds while the job runs
+  Execute    — each claimed job runs on a worker thread: event fetch and the
+               fingerprint/history/clustering writes happen in this process,
+               the fingerprint build itself (build_full in
+               app/intelligence/tasks.py) on a ProcessPoolExecutor, so builds
+               for different IPs use separate cores
+  Stop       — SIGINT/SIGTERM stop claiming; jobs already claimed finish
+               before the process exits
+
+A worker that dies mid-job stops heartbeating; once the lease expires the
+next claim_jobs() call (from any worker) re-queues the job to pending, and a
+job whose lease has expired MAX_ATTEMPTS times is failed instead.
+
+Usage:
+    python -m app.jobs.worker
+    python -m app.jobs.worker --processes 4 --poll-seconds 2 --lease-seconds 120
+    python -m app.jobs.worker --once        # drain what is pending, then exit
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+
+from app.db.connection import run_write
+from app.db.repository import EventRepository
+from app.intelligence.tasks import execute_fingerprint_job
+
+logger = logging.getLogger(__name__)
+
+JOB_TYPE = "fingerprint_clustering"
+DEFAULT_LEASE_SECONDS = 60
+MAX_ATTEMPTS = 3
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def claim_fingerprint_jobs(
+    limit: int, worker_id: str, lease_seconds: int = DEFAULT_LEASE_SECONDS
+) -> list[dict]:
+    """Lease up to limit pending fingerprint jobs to worker_id and return them."""
+    if limit <= 0:
+        return []
+    return run_write(
+        lambda session: EventRepository(session).claim_jobs(
+            JOB_TYPE, worker_id, limit, lease_seconds, max_attempts=MAX_ATTEMPTS
+        )
+    )
+
+
+class FingerprintWorker:
+    """Claims fingerprint jobs and runs them with builds on a process pool."""
+
+    def __init__(
+        self,
+        slots: int,
+        builder: Executor,
+        *,
+        worker_id: str | None = None,
+        lease_seconds: int = DEFAULT_LEASE_SECONDS,
+    ) -> None:
+        if slots < 1:
+            raise ValueError(f"slots must be >= 1; got {slots}")
+        if lease_seconds < 1:
+            raise ValueError(f"lease_seconds must be >= 1; got {lease_seconds}")
+        self.worker_id = worker_id or default_worker_id()
+        self._slots = slots
+        self._builder = builder
+        self._lease_seconds = lease_seconds
+        self._threads = ThreadPoolExecutor(max_workers=slots, thread_name_prefix="fp-worker")
+        self._in_flight: dict[Future, str] = {}
+        self._lock = threading.Lock()
+        self._slot_freed = threading.Event()
+        self._closing = threading.Event()
+        self._heartbeat_thread = threading.Thread(
+            target=self._heartbeat_loop, name="fp-worker-heartbeat", daemon=True
+        )
+        self._heartbeat_thread.start()
+
+    @property
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._in_flight)
+
+    def run_once(self) -> int:
+        """Claim jobs for the free slots and start them; return how many were claimed."""
+        jobs = claim_fingerprint_jobs(
+            self._slots - self.in_flight, self.worker_id, self._lease_seconds
+        )
+        for job in jobs:
+            future = self._threads.submit(
+                execute_fingerprint_job,
+                job["resource_id"],
+                job["id"],
+                self._builder,
+                worker_id=self.worker_id,
+            )
+            with self._lock:
+                self._in_flight[future] = job["id"]
+            future.add_done_callback(self._done)
+        return len(jobs)
+
+    def heartbeat(self) -> list[str]:
+        """Extend the lease of every in-flight job; return the ids whose lease was lost."""
+        with self._lock:
+            job_ids = list(self._in_flight.values())
+        if not job_ids:
+            return []
+
+        def _extend(session) -> list[str]:
+            repo = EventRepository(session)
+            return [
+                job_id
+                for job_id in job_ids
+                if not repo.heartbeat(job_id, self.worker_id, self._lease_seconds)
+            ]
+
+        lost = run_write(_extend)
+        for job_id in lost:
+            logger.warning("Lost lease on job %s; it may be re-run by another worker", job_id)
+        return lost
+
+    def run(self, stop: threading.Event, poll_seconds: float) -> None:
+        """Claim and run jobs until stop is set."""
+        while not stop.is_set():
+            self._slot_freed.clear()
+            if self.run_once() and self.in_flight < self._slots:
+                continue
+            self._slot_freed.wait(poll_seconds)
+
+    def drain(self) -> None:
+        """Run until nothing is pending and every claimed job has finished."""
+        while self.run_once() or self.in_flight:
+            with self._lock:
+                waiting = list(self._in_flight)
+            for future in waiting:
+                future.result()
+
+    def close(self) -> None:
+        """Wait for the claimed jobs to finish, then stop heartbeating."""
+        self._threads.shutdown(wait=True)
+        self._closing.set()
+        self._heartbeat_thread.join()
+
+    def _heartbeat_loop(self) -> None:
+        interval = self._lease_seconds / 3
+        while not self._closing.wait(interval):
+            try:
+                self.heartbeat()
+            except Exception:
+                logger.exception("Heartbeat failed")
+
+    def _done(self, future: Future) -> None:
+        with self._lock:
+            self._in_flight.pop(future, None)
+        self._slot_freed.set()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Claim and run fingerprint_clustering jobs outside the API process."
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="fingerprint builds run in parallel (default: CPU count)",
+    )
+    parser.add_argument(
+        "--poll-seconds",
+        type=float,
+        default=1.0,
+        help="wait between claims when no job is pending (default: 1.0)",
+    )
+    parser.add_argument(
+        "--lease-seconds",
+        type=int,
+        default=DEFAULT_LEASE_SECONDS,
+        help=(
+            "how long a claimed job stays leased without a heartbeat before "
+            f"another worker may take it (default: {DEFAULT_LEASE_SECONDS})"
+        ),
+    )
+    parser.add_argument("--once", action="store_true", help="run the pending jobs, then exit")
+    args = parser.parse_args(argv)
+    if args.processes < 1:
+        parser.error("--processes must be >= 1")
+    if args.lease_seconds < 1:
+        parser.error("--lease-seconds must be >= 1")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+    # spawn: children must not inherit this process's threads or SQLite handles.
+    builder = ProcessPoolExecutor(
+        max_workers=args.processes, mp_context=multiprocessing.get_context("spawn")
+    )
+    worker = FingerprintWorker(args.processes, builder, lease_seconds=args.lease_seconds)
+    stop = threading.Event()
+    previous = {
+        sig: signal.signal(sig, lambda *_: stop.set()) for sig in (signal.SIGINT, signal.SIGTERM)
+    }
+
+    logger.info(
+        "Fingerprint worker %s started with %d process(es)", worker.worker_id, args.processes
+    )
+    try:
+        if args.once:
+            worker.drain()
+        else:
+            worker.run(stop, args.poll_seconds)
+    finally:
+        worker.close()
+        builder.shutdown(wait=True)
+        for sig, handler in previous.items():
+            signal.signal(sig, handler)
+    logger.info("Fingerprint worker stopped")
+
+
+if __name__ == "__main__":
+    main()
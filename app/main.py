@@ -9,6 +9,8 @@
 #   - Configure global middleware (e.g., CORS)
 # -----------------------------------------------------------------------------
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
@@ -16,6 +18,9 @@ from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 
 from app.core.config import settings
+from app.db.connection import shutdown_group_commit_writer
+from app.ingest.queue import get_ingest_queue, shutdown_ingest_queue
+from app.intelligence.scheduler import shutdown_fingerprint_scheduler
 from app.limiter import limiter
 
 # --- Import routers ----------------------------------------------------------
@@ -36,13 +41,30 @@ from app.routers.ingest import router as ingest_router  # POST /api/ingest
 from app.routers.intelligence import router as intelligence_router  # GET /api/intelligence/*
 from app.routers.iocs_pf import router as iocs_pf_router  # pf.conf generator
 from app.routers.jobs import router as jobs_router  # GET /api/jobs/*
+from app.routers.metrics import router as metrics_router  # GET /api/metrics
 from app.routers.stats import router as stats_router  # Stats & counters
 
+
+# --- Lifespan ----------------------------------------------------------------
+# Starts the write-behind ingest queue (replaying its spool) when enabled, and
+# drains it on shutdown so no 202-acknowledged batch is lost. The fingerprint
+# scheduler is stopped after the drain (which may still mark IPs dirty) and
+# the group-commit writer last so both can still route through it.
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    get_ingest_queue()
+    yield
+    shutdown_ingest_queue()
+    shutdown_fingerprint_scheduler()
+    shutdown_group_commit_writer()
+
+
 # --- Create FastAPI instance -------------------------------------------------
 app = FastAPI(
     title="LegionTrap TI",
     version="0.2.2",
     description="Honeypot threat intelligence dashboard backend",
+    lifespan=lifespan,
 )
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
@@ -73,6 +95,7 @@ app.include_router(ai_outputs_router)  # /api/ai/outputs/* + /api/campaigns/*/ai
 app.include_router(exports_router)  # /api/exports/*
 app.include_router(iocs_pf_router, prefix="/api/iocs")  # pf.conf generator
 app.include_router(stats_router)  # /api/stats
+app.include_router(metrics_router)  # /api/metrics
 app.include_router(events.router)  # /api/events
 
 
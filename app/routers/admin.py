@@ -6,7 +6,7 @@ dashboard sessions from triggering maintenance operations accidentally.
 
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 
 from app.db.connection import get_session
 from app.db.repository import EventRepository
@@ -54,6 +54,41 @@ def run_analytics_job(
     return result
 
 
+@router.post("/run-refingerprint-job", status_code=status.HTTP_202_ACCEPTED)
+def start_refingerprint_job(
+    all_ips: bool = Query(default=False),
+    resume_job_id: str | None = Query(default=None),
+    _: dict = Depends(require_api_key),
+) -> dict:
+    """Recompute stored fingerprints, e.g. after a FINGERPRINT_VERSION bump.
+
+    Enqueues a refingerprint job (app/jobs/refingerprint.py) and returns 202
+    with the job id; poll GET /api/jobs/{job_id} for progress. When a
+    refingerprint job is already pending or running it is returned instead of
+    a new one.
+
+    Query params:
+      all_ips        — recompute every source IP, not only fingerprints older
+                       than FINGERPRINT_VERSION
+      resume_job_id  — continue a failed or cancelled job from its checkpoint
+
+    The job is not run in the web process: the CLI (python -m
+    app.jobs.refingerprint, or make refingerprint) claims the pending job and
+    runs it, building fingerprints on a process pool.
+    """
+    # Imported here: app.jobs.refingerprint is also run as a script (-m), and
+    # importing it with the app would load it twice.
+    from app.jobs.refingerprint import enqueue_refingerprint_job
+
+    try:
+        job = enqueue_refingerprint_job(
+            all_ips=all_ips, resume_job_id=resume_job_id, triggered_by="api_key"
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+    return {"job_id": job["id"], "status": job["status"], "poll_url": f"/api/jobs/{job['id']}"}
+
+
 @router.get("/ai-audit")
 def list_ai_audit_logs(
     limit: int = Query(default=50, ge=1, le=500),
@@ -5,42 +5,74 @@ Pipeline stages per INGESTION_PIPELINE.md:
   1. Authentication  — API key only (no JWT for machine-to-machine sensors)
   2. Validation      — Pydantic RawEvent model (handled by FastAPI request parsing)
   3. Normalization   — extract_src_ip, normalize_event_type, parse_timestamp
-  4. Deduplication   — event_exists() check before every write
-  5. Persistence     — insert_raw_event + insert_event + upsert_source_ip (atomic)
+  4. Deduplication   — optional recent-id LRU, then one events_exist() IN (...)
+                       query for the whole batch
+  5. Persistence     — bulk raw_events + events inserts, one aggregated
+                       source_ips upsert and one scoring update per distinct IP
   6. Receipt         — IngestReceipt response
 
-Transaction model: one SQLAlchemy session per batch. Each event is wrapped
-in a SAVEPOINT so a duplicate PK (race condition after the dedup check) rolls
-back only that event without poisoning the session.
+Stages 3–5 are implemented set-based in app/ingest/batch.py.
+
+Write-behind mode (INGEST_ASYNC_QUEUE_BATCHES > 0): the request only runs
+timestamp validation, then queues the batch for the writer thread in
+app/ingest/queue.py and answers 202. Duplicates are resolved by the writer, so
+the 202 receipt counts every queued event as accepted and reports
+duplicate=0; the per-batch outcome is written to the audit log. A full queue
+answers 503 with Retry-After.
+
+Transaction model: one write unit per batch, run through run_write() — its own
+session, or a SAVEPOINT inside a group commit when DB_GROUP_COMMIT is on
+(app/db/connection.py). The bulk inserts run in a SAVEPOINT; a duplicate PK
+(race condition after the dedup check) rolls it back and the batch is retried
+per event, so only the racing event is lost.
+
+POST /api/ingest/stream accepts an NDJSON body (optionally gzip-encoded) of
+any length. Lines are parsed and validated as the body arrives and committed
+in rolling chunks of INGEST_STREAM_CHUNK_EVENTS through the same
+ingest_batch() unit; one receipt covers the whole stream, with error indices
+counting body lines (0-based, blank lines included). Chunks committed before
+a mid-stream failure stay committed — a sensor retrying the stream gets them
+back as duplicates.
+
+With METRICS_ENABLED, stages are timed into the histograms served by
+GET /api/metrics (app/ingest/metrics.py, app/routers/metrics.py).
 
 No FastAPI dependency on JWT flow. No async database code.
 """
 
 from __future__ import annotations
 
+import contextlib
 import json
+import time
 import uuid
+import zlib
 from datetime import UTC, datetime
 
-from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Request, status
-from sqlalchemy.exc import IntegrityError
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    Header,
+    HTTPException,
+    Request,
+    Response,
+    status,
+)
+from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
 
 from app.core.config import settings
-from app.db.connection import get_session
+from app.db.connection import run_write
 from app.db.repository import EventRepository
-from app.intelligence.tasks import schedule_fingerprint_if_not_pending
+from app.ingest.batch import BatchOutcome, ingest_batch, split_unparseable
+from app.ingest.dedup import RecentEventIds, get_recent_event_ids
+from app.ingest.metrics import commit_timer, observe_stage, record_outcome, stage_timer
+from app.ingest.ndjson import NDJSONDecoder
+from app.ingest.queue import QueuedBatch, get_ingest_queue
+from app.intelligence.tasks import schedule_fingerprints_for_batch
 from app.limiter import limiter
-from app.schemas.models import (
-    EnrichedEvent,
-    HoneypotEvent,
-    IngestError,
-    IngestReceipt,
-    IngestRequest,
-)
-from app.utils.asn import enrich_asn
-from app.utils.event_utils import extract_src_ip, normalize_event_type, parse_timestamp
-from app.utils.geoip import enrich_ip
-from app.utils.scoring import compute_reputation_score, compute_tags
+from app.schemas.models import IngestError, IngestReceipt, IngestRequest, RawEvent
 
 router = APIRouter()
 
@@ -60,6 +92,7 @@ def _require_api_key(
 @limiter.limit("1000/minute")
 def ingest_events(
     request: Request,
+    response: Response,
     body: IngestRequest,
     background_tasks: BackgroundTasks,
     _: None = Depends(_require_api_key),
@@ -67,137 +100,235 @@ def ingest_events(
     """
     Ingest a batch of raw sensor events.
 
-    Accepts 1–500 events per request. Processes each event independently:
+    Accepts 1–500 events per request. Each event gets an independent outcome:
     - Validation failures (unparseable timestamp) → rejected, error recorded
     - Duplicate event IDs → counted as duplicate, silently skipped
-    - Successful writes → raw_events + events + source_ips in one savepoint
+    - Successful writes → raw_events + events + source_ips
 
-    The entire batch is processed in a single database session. A per-event
-    SAVEPOINT handles the rare race condition where event_exists() returns
-    False but the INSERT fails with IntegrityError (concurrent ingest from
-    another process). Non-IntegrityError database errors propagate as HTTP 500.
+    The entire batch is processed in a single database session by
+    ingest_batch(). The rare race where events_exist() misses an id but the
+    INSERT fails with IntegrityError (concurrent ingest from another process)
+    is handled by a per-event SAVEPOINT fallback. Non-IntegrityError database
+    errors propagate as HTTP 500.
+
+    In write-behind mode the batch is queued instead and the response is 202
+    (see module docstring).
     """
     batch_id = str(uuid.uuid4())
     ingested_at = datetime.now(UTC)
-    accepted = rejected = duplicate = 0
-    errors: list[IngestError] = []
-    accepted_ips: set[str] = set()  # unique IPs from accepted events this batch
-
-    with get_session() as session:
-        repo = EventRepository(session)
-
-        for i, raw in enumerate(body.events):
-            # Stage 3a: timestamp (rejection condition — required for time-series)
-            ts = parse_timestamp(raw.ts)
-            if ts is None:
-                rejected += 1
-                errors.append(IngestError(index=i, reason=f"unparseable timestamp: {raw.ts!r}"))
-                continue
-
-            # Stage 3b: normalization
-            event_type = normalize_event_type(raw.type, raw.source)
-            src_ip = extract_src_ip(raw.model_dump())
-
-            # Stage 3.5: GeoIP + ASN enrichment (cache-first; never blocks ingest)
-            geo: dict | None = None
-            if src_ip:
-                geo = repo.get_source_ip_geo(src_ip)  # cache hit → skip mmdb reads
-                if geo is None:
-                    city_geo = enrich_ip(src_ip)  # {country_code, country_name, city}
-                    asn_geo = enrich_asn(src_ip)  # {asn, asn_org}
-                    geo = {**city_geo, **asn_geo}
-
-            # Construct canonical event object
-            if geo is not None:
-                event: HoneypotEvent = EnrichedEvent(
-                    id=raw.id,
-                    ts=ts,
-                    ingested_at=ingested_at,
-                    source=raw.source,
-                    event_type=event_type,
-                    src_ip=src_ip,
-                    **geo,
-                )
-            else:
-                event = HoneypotEvent(
-                    id=raw.id,
-                    ts=ts,
-                    ingested_at=ingested_at,
-                    source=raw.source,
-                    event_type=event_type,
-                    src_ip=src_ip,
-                )
-
-            # Stage 4: deduplication (optimistic check; SAVEPOINT handles races)
-            if repo.event_exists(raw.id):
-                duplicate += 1
-                continue
-
-            # Stage 5: persistence — atomic per-event via SAVEPOINT
-            sp = session.begin_nested()
-            try:
-                repo.insert_raw_event(raw)
-                repo.insert_event(event)
-                if src_ip:
-                    repo.upsert_source_ip(
-                        src_ip,
-                        ts,
-                        country_code=geo["country_code"] if geo else None,
-                        country_name=geo["country_name"] if geo else None,
-                        asn=geo.get("asn") if geo else None,
-                        asn_org=geo.get("asn_org") if geo else None,
-                    )
-                sp.commit()
-            except IntegrityError:
-                # Race: another process inserted this ID between the check and write.
-                sp.rollback()
-                duplicate += 1
-                continue
-
-            # Stage 5.5: intelligence scoring (best-effort; isolated via SAVEPOINT)
-            # Failure here must never block ingest — the event is already committed.
-            if src_ip:
-                score_sp = session.begin_nested()
-                try:
-                    intel = repo.get_source_ip_intelligence(src_ip)
-                    if intel is not None:
-                        new_tags = compute_tags(intel["tags"], event_type)
-                        new_score = compute_reputation_score(new_tags, intel["event_count"])
-                        repo.update_source_ip_intelligence(src_ip, new_tags, new_score)
-                    score_sp.commit()
-                except Exception:
-                    score_sp.rollback()
-
-            accepted += 1
-            if src_ip:
-                accepted_ips.add(src_ip)
 
-    # Stage 6: Audit log — best-effort, isolated session (never fails ingest).
-    try:
-        with get_session() as audit_session:
-            EventRepository(audit_session).insert_audit_log(
-                event_type="ingest",
-                detail=json.dumps(
-                    {
-                        "batch_id": batch_id,
-                        "accepted": accepted,
-                        "rejected": rejected,
-                        "duplicate": duplicate,
-                    }
-                ),
+    ingest_queue = get_ingest_queue()
+    if ingest_queue is not None:
+        valid, errors = split_unparseable(body.events)
+        record_outcome("async", 0, len(errors), 0)
+        if valid and not ingest_queue.submit(QueuedBatch(batch_id, ingested_at, valid)):
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Ingest queue full; retry later",
+                headers={"Retry-After": str(settings.INGEST_ASYNC_RETRY_AFTER_SECONDS)},
             )
-    except Exception:
-        pass
+        response.status_code = status.HTTP_202_ACCEPTED
+        return IngestReceipt(
+            batch_id=batch_id,
+            accepted=len(valid),
+            rejected=len(errors),
+            duplicate=0,
+            errors=errors,
+        )
+
+    outcome = _commit_batch(body.events, ingested_at, get_recent_event_ids())
+    record_outcome("sync", outcome.accepted, outcome.rejected, outcome.duplicate)
+
+    # Stage 6: Audit log — best-effort, isolated session (never fails ingest).
+    _record_audit(
+        {
+            "batch_id": batch_id,
+            "accepted": outcome.accepted,
+            "rejected": outcome.rejected,
+            "duplicate": outcome.duplicate,
+        }
+    )
 
     # Stage 7: Schedule fingerprint recomputation for each unique accepted IP.
     # Runs after the ingest session is committed; never blocks the response.
-    for ip in accepted_ips:
-        schedule_fingerprint_if_not_pending(ip, background_tasks)
+    with stage_timer("scheduling"):
+        schedule_fingerprints_for_batch(
+            outcome.accepted_ips, outcome.threshold_ips, background_tasks
+        )
 
     return IngestReceipt(
         batch_id=batch_id,
-        accepted=accepted,
-        rejected=rejected,
-        duplicate=duplicate,
-        errors=errors,
+        accepted=outcome.accepted,
+        rejected=outcome.rejected,
+        duplicate=outcome.duplicate,
+        errors=outcome.errors,
     )
+
+
+_NDJSON_CONTENT_TYPES = {"application/x-ndjson", "application/jsonl"}
+
+
+@router.post("/api/ingest/stream", response_model=IngestReceipt)
+@limiter.limit("60/minute")
+async def ingest_stream(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    _: None = Depends(_require_api_key),
+) -> IngestReceipt:
+    """
+    Ingest an NDJSON stream of raw sensor events (one RawEvent per line).
+
+    The body may be gzip-encoded (Content-Encoding: gzip) and has no event
+    limit: memory is bounded by one chunk of INGEST_STREAM_CHUNK_EVENTS events
+    plus one line. Each line gets the same outcome rules as POST /api/ingest;
+    invalid JSON, schema failures and lines over INGEST_STREAM_MAX_LINE_BYTES
+    are rejected with their line index. At most INGEST_STREAM_MAX_ERRORS error
+    records are returned; the rejected counter is always exact.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type not in _NDJSON_CONTENT_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Expected Content-Type application/x-ndjson",
+        )
+    encoding = request.headers.get("content-encoding", "identity").strip().lower()
+    if encoding not in ("identity", "gzip"):
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Unsupported Content-Encoding: {encoding}",
+        )
+
+    batch_id = str(uuid.uuid4())
+    ingested_at = datetime.now(UTC)
+    recent_ids = get_recent_event_ids()
+    decoder = NDJSONDecoder(settings.INGEST_STREAM_MAX_LINE_BYTES, gzip=encoding == "gzip")
+    chunk_size = settings.INGEST_STREAM_CHUNK_EVENTS
+
+    totals = BatchOutcome()
+    chunks = 0
+    pending: list[RawEvent] = []
+    pending_lines: list[int] = []
+    line_no = 0
+    validation_seconds = 0.0
+
+    def _reject(index: int, reason: str) -> None:
+        totals.rejected += 1
+        if len(totals.errors) < settings.INGEST_STREAM_MAX_ERRORS:
+            totals.errors.append(IngestError(index=index, reason=reason))
+
+    def _take(line: bytes | None) -> None:
+        nonlocal line_no, validation_seconds
+        index = line_no
+        line_no += 1
+        if line is None:
+            _reject(index, f"line exceeds {settings.INGEST_STREAM_MAX_LINE_BYTES} bytes")
+            return
+        if not line.strip():
+            return
+        started = time.perf_counter()
+        try:
+            pending.append(RawEvent.from_json_line(line))
+        except ValidationError as exc:
+            _reject(index, _validation_reason(exc))
+            return
+        finally:
+            validation_seconds += time.perf_counter() - started
+        pending_lines.append(index)
+
+    async def _flush() -> None:
+        nonlocal chunks, validation_seconds
+        if validation_seconds:
+            observe_stage("validation", validation_seconds)
+            validation_seconds = 0.0
+        if not pending:
+            return
+        outcome = await run_in_threadpool(_commit_batch, list(pending), ingested_at, recent_ids)
+        chunks += 1
+        totals.accepted += outcome.accepted
+        totals.duplicate += outcome.duplicate
+        totals.accepted_ips |= outcome.accepted_ips
+        totals.threshold_ips |= outcome.threshold_ips
+        for err in outcome.errors:
+            _reject(pending_lines[err.index], err.reason)
+        pending.clear()
+        pending_lines.clear()
+
+    try:
+        async for data in request.stream():
+            for line in decoder.feed(data):
+                _take(line)
+                if len(pending) >= chunk_size:
+                    await _flush()
+        for line in decoder.close():
+            _take(line)
+    except zlib.error as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid gzip body after line {line_no}: {exc}",
+        ) from exc
+    await _flush()
+    record_outcome("stream", totals.accepted, totals.rejected, totals.duplicate)
+
+    # Both are synchronous database writes (run_write): keep them off the event loop.
+    await run_in_threadpool(
+        _record_audit,
+        {
+            "batch_id": batch_id,
+            "accepted": totals.accepted,
+            "rejected": totals.rejected,
+            "duplicate": totals.duplicate,
+            "mode": "stream",
+            "lines": line_no,
+            "chunks": chunks,
+        },
+    )
+
+    with stage_timer("scheduling"):
+        await run_in_threadpool(
+            schedule_fingerprints_for_batch,
+            totals.accepted_ips,
+            totals.threshold_ips,
+            background_tasks,
+        )
+
+    return IngestReceipt(
+        batch_id=batch_id,
+        accepted=totals.accepted,
+        rejected=totals.rejected,
+        duplicate=totals.duplicate,
+        errors=sorted(totals.errors, key=lambda e: e.index),
+    )
+
+
+def _commit_batch(
+    events: list[RawEvent],
+    ingested_at: datetime,
+    recent_ids: RecentEventIds | None,
+) -> BatchOutcome:
+    """Write events as one ingest unit and remember their ids after commit."""
+    with commit_timer() as timer:
+        outcome = run_write(
+            timer.wrap(lambda session: ingest_batch(session, events, ingested_at, recent_ids))
+        )
+    # Populated only after commit: a rolled-back batch must never mark its ids as seen.
+    if recent_ids is not None:
+        recent_ids.remember(outcome.committed_ids)
+    return outcome
+
+
+def _validation_reason(exc: ValidationError) -> str:
+    """Condense a RawEvent validation error into a one-line receipt reason."""
+    err = exc.errors()[0]
+    loc = ".".join(str(p) for p in err.get("loc", ()))
+    return f"{loc}: {err['msg']}" if loc else err["msg"]
+
+
+def _record_audit(detail: dict) -> None:
+    """Write one ingest audit row — best-effort, never fails ingest."""
+    payload = json.dumps(detail)
+    with stage_timer("audit"), contextlib.suppress(Exception):
+        run_write(
+            lambda session: EventRepository(session).insert_audit_log(
+                event_type="ingest", detail=payload
+            )
+        )
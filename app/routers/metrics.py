@@ -0,0 +1,107 @@
+"""
+GET /api/metrics — ingest pipeline metrics in Prometheus text format.
+
+Served only when METRICS_ENABLED is on (404 otherwise). Combines the stage
+histograms and outcome counters from app/ingest/metrics.py with point-in-time
+gauges read from the modules that own them:
+
+  legiontrap_geoip_cache_*            enrichment_cache_stats() counters and size
+  legiontrap_ingest_recent_ids_*      RecentEventIds hits, misses and size
+  legiontrap_ingest_queue_depth       write-behind batches waiting for the writer
+  legiontrap_fingerprint_scheduler_*  debounced scheduler marks, coalesced
+                                      marks, dispatched refreshes, dirty IPs
+
+All values are per process; scrape every worker.  A scrape never starts the
+ingest queue or the scheduler: one that is not running reports zeros. API key only (x-api-key),
+like the admin endpoints — a Prometheus job cannot hold a dashboard JWT.
+"""
+
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import PlainTextResponse
+
+from app.core.config import settings
+from app.ingest.dedup import get_recent_event_ids
+from app.ingest.metrics import format_sample, get_ingest_metrics
+from app.ingest.queue import current_ingest_queue
+from app.intelligence.scheduler import current_fingerprint_scheduler
+from app.utils.auth import require_api_key
+from app.utils.enrichment import enrichment_cache_stats
+
+router = APIRouter()
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# enrichment_cache_stats() key → (metric suffix, type, help)
+_GEOIP_CACHE_METRICS = {
+    "hits": ("hits_total", "counter", "GeoIP/ASN cache hits with a resolved record."),
+    "negative_hits": ("negative_hits_total", "counter", "Cache hits for IPs with no record."),
+    "misses": ("misses_total", "counter", "Lookups that went to the mmdb readers."),
+    "evictions": ("evictions_total", "counter", "Entries evicted by capacity."),
+    "expirations": ("expirations_total", "counter", "Entries dropped after their TTL."),
+    "invalidations": ("invalidations_total", "counter", "Full flushes after an mmdb update."),
+    "size": ("size", "gauge", "Entries currently cached."),
+    "capacity": ("capacity", "gauge", "Configured cache capacity (0 = off)."),
+}
+
+# (metric suffix, type, help, FingerprintScheduler attribute)
+_SCHEDULER_METRICS = (
+    ("marks_total", "counter", "IPs marked dirty by ingest.", "marks"),
+    ("coalesced_total", "counter", "Marks absorbed by a refresh already owed.", "coalesced"),
+    ("dispatched_total", "counter", "Fingerprint refreshes dispatched.", "dispatched"),
+    ("dirty", "gauge", "IPs waiting for a refresh.", "dirty_count"),
+)
+
+
+@router.get("/api/metrics", response_class=PlainTextResponse)
+def get_metrics(_: dict = Depends(require_api_key)) -> PlainTextResponse:
+    """Render ingest metrics for a Prometheus scrape."""
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Metrics disabled")
+
+    lines = get_ingest_metrics().render()
+
+    stats = enrichment_cache_stats()
+    for key, (suffix, kind, help_text) in _GEOIP_CACHE_METRICS.items():
+        lines += _family(f"legiontrap_geoip_cache_{suffix}", kind, help_text, stats[key])
+
+    recent_ids = get_recent_event_ids()
+    lines += _family(
+        "legiontrap_ingest_recent_ids_hits_total",
+        "counter",
+        "Dedup ids answered by the recent-id filter.",
+        recent_ids.hits if recent_ids else 0,
+    )
+    lines += _family(
+        "legiontrap_ingest_recent_ids_misses_total",
+        "counter",
+        "Dedup ids sent on to the database.",
+        recent_ids.misses if recent_ids else 0,
+    )
+    lines += _family(
+        "legiontrap_ingest_recent_ids_size",
+        "gauge",
+        "Ids held by the recent-id filter.",
+        len(recent_ids) if recent_ids else 0,
+    )
+
+    ingest_queue = current_ingest_queue()
+    lines += _family(
+        "legiontrap_ingest_queue_depth",
+        "gauge",
+        "Write-behind batches waiting for the writer.",
+        ingest_queue.depth if ingest_queue else 0,
+    )
+
+    scheduler = current_fingerprint_scheduler()
+    for suffix, kind, help_text, attr in _SCHEDULER_METRICS:
+        value = getattr(scheduler, attr) if scheduler else 0
+        lines += _family(f"legiontrap_fingerprint_scheduler_{suffix}", kind, help_text, value)
+
+    return PlainTextResponse("\n".join(lines) + "\n", media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+def _family(name: str, kind: str, help_text: str, value: float) -> list[str]:
+    """HELP/TYPE header plus one unlabelled sample."""
+    return [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", format_sample(name, value)]
@@ -17,7 +17,7 @@ from __future__ import annotations
 import uuid
 from typing import Any
 
-from pydantic import AwareDatetime, BaseModel, ConfigDict, Field
+from pydantic import AwareDatetime, BaseModel, ConfigDict, Field, PrivateAttr
 
 
 class RawEvent(BaseModel):
@@ -38,6 +38,39 @@ class RawEvent(BaseModel):
     type: str  # sensor-native event type; mapped to canonical event_type in normalization
     data: dict[str, Any] = Field(default_factory=dict)
 
+    # Received JSON text, kept by from_json_line() so raw_json() need not
+    # re-serialise the event. Not a field: never dumped, never validated.
+    _received_json: str | None = PrivateAttr(default=None)
+
+    @classmethod
+    def from_json_line(cls, line: bytes) -> RawEvent:
+        """
+        Validate one JSON-encoded event and keep its text for raw_json().
+
+        The text is kept only when the sensor supplied an id; otherwise the id
+        is generated here and the received text would not contain it.
+        """
+        raw = cls.model_validate_json(line)
+        if "id" in raw.model_fields_set:
+            raw.__pydantic_private__["_received_json"] = line.decode("utf-8")
+        return raw
+
+    def raw_json(self) -> str:
+        """Provenance text for raw_events.raw_json: as received, else serialised."""
+        # Read the private slot directly: attribute access to a private attr
+        # goes through BaseModel.__getattr__, which costs more than the dump.
+        received = self.__pydantic_private__["_received_json"]
+        return received if received is not None else self.model_dump_json()
+
+    def normalization_view(self) -> dict[str, Any]:
+        """
+        The event as a dict for extract_src_ip(), without copying data.
+
+        Holds the sensor extras plus data — the only keys the extractors read —
+        so the hot path avoids a full model_dump() per event.
+        """
+        return {**(self.model_extra or {}), "data": self.data}
+
 
 class HoneypotEvent(BaseModel):
     """
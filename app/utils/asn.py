@@ -6,6 +6,9 @@ using a local GeoLite2-ASN.mmdb file. The database file is never committed
 to the repository (storage/ is gitignored) and must be provisioned by each
 operator alongside GeoLite2-City.mmdb.
 
+Lookups use the same memory-mapped maxminddb reader as app/utils/geoip.py
+and read the two stored fields directly from the decoded record.
+
 Enrichment is best-effort: any failure (missing file, IP not in database,
 reader error) returns a dict of all-None values without raising. The ingest
 pipeline must never fail because of an enrichment error.
@@ -19,15 +22,17 @@ import contextlib
 import threading
 from pathlib import Path
 
-import geoip2.database
+import maxminddb
+
+from app.utils.geoip import open_mmdb
 
 ASN_DB_PATH = Path("storage/GeoLite2-ASN.mmdb")
 
-_asn_reader: geoip2.database.Reader | None = None
+_asn_reader: maxminddb.Reader | None = None
 _reader_lock = threading.Lock()
 
 
-def _get_reader() -> geoip2.database.Reader | None:
+def _get_reader() -> maxminddb.Reader | None:
     """Return the module-level singleton ASN reader, initializing on first call.
 
     Returns None if the mmdb file is absent or fails to open. Subsequent calls
@@ -43,14 +48,17 @@ def _get_reader() -> geoip2.database.Reader | None:
         if not ASN_DB_PATH.exists():
             return None
         try:
-            _asn_reader = geoip2.database.Reader(str(ASN_DB_PATH))
+            _asn_reader = open_mmdb(ASN_DB_PATH)
         except Exception:
             return None
     return _asn_reader
 
 
-def reset_asn_reader_for_testing() -> None:
-    """Close and clear the cached reader. Call from test fixtures only."""
+def close_asn_reader() -> None:
+    """Close and clear the cached reader so the next lookup reopens the file.
+
+    Called by app.utils.enrichment when the mmdb file changes on disk.
+    """
     global _asn_reader
     with _reader_lock:
         if _asn_reader is not None:
@@ -59,6 +67,11 @@ def reset_asn_reader_for_testing() -> None:
             _asn_reader = None
 
 
+def reset_asn_reader_for_testing() -> None:
+    """Close and clear the cached reader. Call from test fixtures only."""
+    close_asn_reader()
+
+
 def enrich_asn(ip: str) -> dict[str, int | str | None]:
     """Return ASN context for a public IPv4 address.
 
@@ -70,10 +83,16 @@ def enrich_asn(ip: str) -> dict[str, int | str | None]:
     if reader is None:
         return {"asn": None, "asn_org": None}
     try:
-        response = reader.asn(ip)
-        return {
-            "asn": response.autonomous_system_number,
-            "asn_org": response.autonomous_system_organization,
-        }
+        return asn_fields(reader.get(ip))
     except Exception:
         return {"asn": None, "asn_org": None}
+
+
+def asn_fields(record: dict | None) -> dict[str, int | str | None]:
+    """Extract asn and asn_org from a decoded ASN record (all-None if missing)."""
+    if not record:
+        return {"asn": None, "asn_org": None}
+    return {
+        "asn": record.get("autonomous_system_number"),
+        "asn_org": record.get("autonomous_system_organization"),
+    }
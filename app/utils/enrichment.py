@@ -0,0 +1,251 @@
+"""
+Process-wide GeoIP + ASN enrichment cache for LegionTrap TI.
+
+Honeypot traffic is dominated by a small set of scanning IPs, so the same
+addresses are looked up in GeoLite2-City.mmdb and GeoLite2-ASN.mmdb over and
+over. enrich() and enrich_many() answer repeat lookups from a bounded
+in-process LRU keyed by IP (or by IPv4 network when GEOIP_CACHE_PREFIX_LEN
+< 32), so the mmdb readers are only touched on a miss. enrich_many() is the
+batch entry point: it deduplicates the IPs (by cache key) before any lookup.
+
+Caching rules:
+  - Negative results (all-None: IP not in the database, or no mmdb present)
+    are cached like any other result, so unresolvable IPs do not re-hit the
+    reader on every event.
+  - Entries expire after GEOIP_CACHE_TTL_SECONDS.
+  - The (path, mtime) of both mmdb files is re-checked at most every
+    _SIGNATURE_CHECK_SECONDS; when either changes (file provisioned, updated
+    or removed) the cache is cleared and both readers are closed so the next
+    miss opens the new file.
+
+Hit/miss/eviction counters are available from enrichment_cache_stats().
+GEOIP_CACHE_SIZE=0 disables the cache and every call goes to the readers.
+
+Enrichment stays best-effort: enrich() and enrich_many() never raise.
+
+No FastAPI, SQLAlchemy, or router imports belong in this module.
+"""
+
+from __future__ import annotations
+
+import ipaddress
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Iterable
+from pathlib import Path
+
+from app.core.config import settings
+from app.utils import asn as asn_module
+from app.utils import geoip as geoip_module
+from app.utils.asn import enrich_asn
+from app.utils.geoip import enrich_ip
+
+# How often enrich() stats the mmdb files to detect an update on disk.
+_SIGNATURE_CHECK_SECONDS = 5.0
+
+
+class EnrichmentCache:
+    """Thread-safe bounded LRU of enrichment results with a per-entry TTL."""
+
+    def __init__(self, capacity: int, ttl_seconds: float) -> None:
+        if capacity < 1:
+            raise ValueError(f"capacity must be >= 1; got {capacity}")
+        self._capacity = capacity
+        self._ttl = ttl_seconds
+        self._entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> dict | None:
+        """Return a copy of the cached result for key, or None on a miss."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, geo = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            if _is_negative(geo):
+                self.negative_hits += 1
+            return dict(geo)
+
+    def put(self, key: str, geo: dict) -> None:
+        """Store a copy of geo under key, evicting the least recently used entry."""
+        expires_at = time.monotonic() + self._ttl
+        with self._lock:
+            self._entries[key] = (expires_at, dict(geo))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._capacity:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self) -> None:
+        """Drop every entry (mmdb changed); counters are kept."""
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "capacity": self._capacity,
+                "hits": self.hits,
+                "negative_hits": self.negative_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+def _is_negative(geo: dict) -> bool:
+    return all(v is None for v in geo.values())
+
+
+_cache: EnrichmentCache | None = None
+_init_lock = threading.Lock()
+_db_signature: tuple | None = None
+_next_signature_check = 0.0
+
+
+def _get_cache() -> EnrichmentCache | None:
+    """Return the process-wide cache, or None when GEOIP_CACHE_SIZE is 0."""
+    global _cache
+    if settings.GEOIP_CACHE_SIZE <= 0:
+        return None
+    if _cache is None:
+        with _init_lock:
+            if _cache is None:
+                _cache = EnrichmentCache(
+                    settings.GEOIP_CACHE_SIZE, settings.GEOIP_CACHE_TTL_SECONDS
+                )
+    return _cache
+
+
+def _file_signature(path: Path) -> tuple[str, int | None]:
+    try:
+        return str(path), path.stat().st_mtime_ns
+    except OSError:
+        return str(path), None
+
+
+def _current_db_signature() -> tuple:
+    return (
+        _file_signature(geoip_module.CITY_DB_PATH),
+        _file_signature(asn_module.ASN_DB_PATH),
+    )
+
+
+def _check_db_signature(cache: EnrichmentCache) -> None:
+    """Invalidate the cache and reopen readers when either mmdb file changed."""
+    global _db_signature, _next_signature_check
+    now = time.monotonic()
+    if now < _next_signature_check:
+        return
+    with _init_lock:
+        if now < _next_signature_check:
+            return
+        signature = _current_db_signature()
+        if _db_signature is not None and signature != _db_signature:
+            cache.invalidate()
+            geoip_module.close_reader()
+            asn_module.close_asn_reader()
+        _db_signature = signature
+        _next_signature_check = now + _SIGNATURE_CHECK_SECONDS
+
+
+def _cache_key(ip: str) -> str:
+    """Return the cache key for ip: the address itself, or its IPv4 network."""
+    prefix_len = settings.GEOIP_CACHE_PREFIX_LEN
+    if prefix_len >= 32:
+        return ip
+    try:
+        addr = ipaddress.ip_address(ip)
+    except ValueError:
+        return ip
+    if addr.version != 4:
+        return ip
+    return str(ipaddress.ip_network(f"{addr}/{prefix_len}", strict=False))
+
+
+def enrich(ip: str) -> dict:
+    """Return merged GeoIP + ASN context for ip, served from the cache when possible.
+
+    Keys: country_code, country_name, city, asn, asn_org — exactly the union of
+    enrich_ip() and enrich_asn(). Never raises.
+    """
+    return enrich_many([ip])[ip]
+
+
+def enrich_many(ips: Iterable[str]) -> dict[str, dict]:
+    """Return {ip: geo} for every distinct ip in ips (see enrich() for the keys).
+
+    The batch is deduplicated first — by cache key, so with a /24 prefix one
+    lookup serves every address in the network — and the cache and the mmdb
+    files are each consulted at most once per key. Never raises.
+    """
+    unique_ips = list(dict.fromkeys(ips))
+    cache = _get_cache()
+    if cache is None:
+        return {ip: _lookup(ip) for ip in unique_ips}
+    _check_db_signature(cache)
+    by_key: dict[str, dict] = {}
+    result: dict[str, dict] = {}
+    for ip in unique_ips:
+        key = _cache_key(ip)
+        geo = by_key.get(key)
+        if geo is None:
+            geo = cache.get(key)
+            if geo is None:
+                geo = _lookup(ip)
+                cache.put(key, geo)
+            by_key[key] = geo
+        result[ip] = dict(geo)
+    return result
+
+
+def _lookup(ip: str) -> dict:
+    return {**enrich_ip(ip), **enrich_asn(ip)}
+
+
+def enrichment_cache_stats() -> dict[str, int]:
+    """Return cache counters (all zero with capacity 0 when the cache is off)."""
+    cache = _get_cache()
+    if cache is None:
+        return {
+            "size": 0,
+            "capacity": 0,
+            "hits": 0,
+            "negative_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0,
+        }
+    return cache.stats()
+
+
+def reset_enrichment_cache_for_testing() -> None:
+    """Drop the process-wide cache so the next call re-reads settings."""
+    global _cache, _db_signature, _next_signature_check
+    with _init_lock:
+        _cache = None
+        _db_signature = None
+        _next_signature_check = 0.0
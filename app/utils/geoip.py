@@ -6,6 +6,11 @@ GeoLite2-City.mmdb file. The database file is never committed to the
 repository (storage/ is gitignored) and must be provisioned by each
 operator. See docs/PHASE_2_BLUEPRINT.md Section 5 for provisioning steps.
 
+Lookups use the low-level maxminddb reader in memory-mapped mode (the C
+extension when available, pure-Python MODE_MMAP otherwise) and pull only the
+fields LegionTrap stores straight out of the decoded record, instead of
+building full geoip2 model objects per IP.
+
 Enrichment is best-effort: any failure (missing file, IP not in database,
 reader error) returns a dict of all-None values without raising. The ingest
 pipeline must never fail because of an enrichment error.
@@ -19,15 +24,15 @@ import contextlib
 import threading
 from pathlib import Path
 
-import geoip2.database
+import maxminddb
 
 CITY_DB_PATH = Path("storage/GeoLite2-City.mmdb")
 
-_city_reader: geoip2.database.Reader | None = None
+_city_reader: maxminddb.Reader | None = None
 _reader_lock = threading.Lock()
 
 
-def _get_reader() -> geoip2.database.Reader | None:
+def _get_reader() -> maxminddb.Reader | None:
     """Return the module-level singleton City reader, initializing on first call.
 
     Returns None if the mmdb file is absent or fails to open. Subsequent calls
@@ -43,14 +48,25 @@ def _get_reader() -> geoip2.database.Reader | None:
         if not CITY_DB_PATH.exists():
             return None
         try:
-            _city_reader = geoip2.database.Reader(str(CITY_DB_PATH))
+            _city_reader = open_mmdb(CITY_DB_PATH)
         except Exception:
             return None
     return _city_reader
 
 
-def reset_reader_for_testing() -> None:
-    """Close and clear the cached reader. Call from test fixtures only."""
+def open_mmdb(path: Path) -> maxminddb.Reader:
+    """Open an mmdb file memory-mapped, via the C extension when it is installed."""
+    try:
+        return maxminddb.open_database(str(path), maxminddb.MODE_MMAP_EXT)
+    except ValueError:  # extension unavailable
+        return maxminddb.open_database(str(path), maxminddb.MODE_MMAP)
+
+
+def close_reader() -> None:
+    """Close and clear the cached reader so the next lookup reopens the file.
+
+    Called by app.utils.enrichment when the mmdb file changes on disk.
+    """
     global _city_reader
     with _reader_lock:
         if _city_reader is not None:
@@ -59,6 +75,11 @@ def reset_reader_for_testing() -> None:
             _city_reader = None
 
 
+def reset_reader_for_testing() -> None:
+    """Close and clear the cached reader. Call from test fixtures only."""
+    close_reader()
+
+
 def enrich_ip(ip: str) -> dict[str, str | None]:
     """Return geographic context for a public IPv4 address.
 
@@ -70,11 +91,23 @@ def enrich_ip(ip: str) -> dict[str, str | None]:
     if reader is None:
         return {"country_code": None, "country_name": None, "city": None}
     try:
-        response = reader.city(ip)
-        return {
-            "country_code": response.country.iso_code,
-            "country_name": response.country.name,
-            "city": response.city.name,
-        }
+        return city_fields(reader.get(ip))
     except Exception:
         return {"country_code": None, "country_name": None, "city": None}
+
+
+def city_fields(record: dict | None) -> dict[str, str | None]:
+    """Extract country_code, country_name and city from a decoded City record.
+
+    Names are the English ("en") entries, matching geoip2's default locale.
+    A missing record (IP not in the database) yields all-None values.
+    """
+    if not record:
+        return {"country_code": None, "country_name": None, "city": None}
+    country = record.get("country") or {}
+    city = record.get("city") or {}
+    return {
+        "country_code": country.get("iso_code"),
+        "country_name": (country.get("names") or {}).get("en"),
+        "city": (city.get("names") or {}).get("en"),
+    }
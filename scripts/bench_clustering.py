@@ -0,0 +1,214 @@
+"""
+Benchmark: choosing the best candidate campaign for one fingerprint, as step 4
+of assign_to_campaign() does, over a large synthetic candidate set.
+
+Three paths are timed per new fingerprint:
+  exhaustive  parsed_weighted_similarity() against every candidate
+  pruned      viable_candidates() then bounded_weighted_similarity(), the
+              pure-Python path (CLUSTERING_NUMPY_MIN_CANDIDATES=0)
+  numpy       score_against_many() and contenders() first, then the pruned
+              path over the contenders (needs NumPy)
+
+Campaigns are drawn from --templates behaviour templates with per-campaign
+noise, so each new fingerprint has a few close candidates among many distant
+ones.  All paths must select the same campaign with the same score.  Packing
+the candidates is a one-time cost per cache (reported separately); later runs
+repack only changed campaigns.
+
+Usage (from project root):
+    PYTHONPATH=. python scripts/bench_clustering.py
+    PYTHONPATH=. python scripts/bench_clustering.py --campaigns 20000 --queries 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import functools
+import json
+import math
+import random
+import time
+import timeit
+from collections.abc import Callable
+
+from app.core.config import settings
+from app.intelligence import similarity_numpy
+from app.intelligence.candidate_cache import CandidateSet, ClusteringCandidate
+from app.intelligence.candidate_index import CandidateIndex, summarize
+from app.intelligence.clustering import _candidates_to_score
+from app.intelligence.constants import SIMILARITY_UNCERTAIN_LOW
+from app.intelligence.similarity import (
+    ParsedFingerprint,
+    bounded_weighted_similarity,
+    parse_fingerprint,
+    parsed_weighted_similarity,
+)
+from app.intelligence.similarity_numpy import PackedCandidates
+
+_PORTS = [21, 22, 23, 25, 80, 110, 443, 445, 1433, 2222, 3306, 3389, 5900, 6379, 8080, 9200]
+_EVENTS = ["auth_failed", "auth_success", "command", "connect", "download", "http_probe"]
+_SERVICES = ["ssh", "telnet", "http", "smb", "ftp", "mysql", "rdp", "redis"]
+_KEX = ["curve25519-sha256", "ecdh-sha2-nistp256", "diffie-hellman-group14-sha1"]
+_CLASSES = ["lower", "digits", "mixed", "dict", "root", "admin"]
+_CHAR_CLASS = ("has_upper_ratio", "has_lower_ratio", "has_digit_ratio", "has_special_ratio")
+
+Best = tuple[str, float] | None
+
+
+def _template(rng: random.Random) -> dict:
+    return {
+        "ports": rng.sample(_PORTS, rng.randint(1, 5)),
+        "events": rng.sample(_EVENTS, rng.randint(1, 3)),
+        "services": rng.sample(_SERVICES, rng.randint(1, 3)),
+        "kex": rng.sample(_KEX, rng.randint(2, 3)),
+        "creds": [(rng.choice(_CLASSES), rng.choice(_CLASSES)) for _ in range(rng.randint(1, 5))],
+        "mean": rng.uniform(100, 20000),
+        "peak_hour": rng.randrange(24),
+        "cv": rng.uniform(0, 2),
+    }
+
+
+def _histogram(rng: random.Random, size: int, peak: int) -> list[float]:
+    raw = [rng.random() * 0.2 + (2.0 if i == peak else 0.0) for i in range(size)]
+    return [round(v / sum(raw), 6) for v in raw]
+
+
+def _fingerprint(rng: random.Random, t: dict, noise: float = 0.3) -> ParsedFingerprint:
+    def _mutate(seq: list, pool: list) -> list:
+        return [rng.choice(pool) if rng.random() < noise else x for x in seq]
+
+    ports = _mutate(t["ports"], _PORTS)
+    creds = [{"username_pattern": u, "password_class": p} for u, p in t["creds"]]
+    mean = t["mean"] * rng.uniform(0.7, 1.3)
+    features = {
+        "timing": {
+            "interval": {"mean": mean, "stddev": mean * 0.3, "p95": mean * 2},
+            "tod_histogram": _histogram(rng, 24, t["peak_hour"]),
+            "burst_cv": t["cv"] + rng.uniform(-0.1, 0.1),
+        },
+        "sequence": {
+            "port_sequence": ports * rng.randint(1, 3),
+            "event_type_sequence": [
+                rng.choice(t["events"] if rng.random() > noise else _EVENTS)
+                for _ in range(rng.randint(20, 50))
+            ],
+            "credential_sequence": creds,
+        },
+        "protocol": {
+            "service_distribution": {s: rng.random() for s in _mutate(t["services"], _SERVICES)},
+            "ssh_kex_ordering": _mutate(t["kex"], _KEX),
+        },
+        "credential": {
+            "username_class_dist": {u: 1.0 for u, _ in t["creds"]},
+            "password_char_class": {k: rng.random() for k in _CHAR_CLASS},
+            "credential_sequence": creds,
+        },
+        "target": {"port_freq": {str(p): rng.random() for p in ports}, "top_dst_ports": ports},
+    }
+    return parse_fingerprint({f"{k}_features": json.dumps(v) for k, v in features.items()})
+
+
+def _candidate_set(rng: random.Random, templates: list[dict], n: int) -> CandidateSet:
+    candidates = []
+    for i in range(n):
+        fp = _fingerprint(rng, rng.choice(templates))
+        candidates.append(
+            ClusteringCandidate(
+                campaign_id=f"campaign-{i}",
+                status="active",
+                last_seen="2025-06-15T12:00:00+00:00",
+                weight_profile=None,
+                fingerprint=fp,
+                summary=summarize(fp),
+            )
+        )
+    summaries = {c.campaign_id: c.summary for c in candidates if c.summary is not None}
+    return CandidateSet(
+        candidates=candidates,
+        index=CandidateIndex().changed({}, summaries),
+        indexed=frozenset(summaries),
+    )
+
+
+def _exhaustive(fp: ParsedFingerprint, candidate_set: CandidateSet) -> Best:
+    best: Best = None
+    for c in candidate_set.candidates:
+        score = parsed_weighted_similarity(fp, c.fingerprint).weighted_total
+        if score >= SIMILARITY_UNCERTAIN_LOW and (best is None or score > best[1]):
+            best = (c.campaign_id, score)
+    return best
+
+
+def _bounded(fp: ParsedFingerprint, candidate_set: CandidateSet) -> Best:
+    best: Best = None
+    for c in _candidates_to_score(fp, candidate_set):
+        floor = SIMILARITY_UNCERTAIN_LOW if best is None else math.nextafter(best[1], math.inf)
+        sim = bounded_weighted_similarity(fp, c.fingerprint, floor=floor)
+        if sim is None:
+            continue
+        score = sim.weighted_total
+        if score >= SIMILARITY_UNCERTAIN_LOW and (best is None or score > best[1]):
+            best = (c.campaign_id, score)
+    return best
+
+
+def _run(
+    select: Callable[[ParsedFingerprint, CandidateSet], Best],
+    queries: list[ParsedFingerprint],
+    candidate_set: CandidateSet,
+) -> list[Best]:
+    return [select(fp, candidate_set) for fp in queries]
+
+
+def _best_of(fn: Callable[[], object], repeat: int) -> float:
+    return min(timeit.repeat(fn, number=1, repeat=repeat))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--campaigns", type=int, default=10000, help="candidate campaigns")
+    parser.add_argument("--templates", type=int, default=300, help="behaviour templates")
+    parser.add_argument("--queries", type=int, default=20, help="new fingerprints per run")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per path")
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    templates = [_template(rng) for _ in range(args.templates)]
+    pure = _candidate_set(rng, templates, args.campaigns)
+    queries = [_fingerprint(rng, rng.choice(templates)) for _ in range(args.queries)]
+    paths: dict[str, tuple[Callable[..., Best], CandidateSet]] = {
+        "exhaustive": (_exhaustive, pure),
+        "pruned": (_bounded, pure),
+    }
+
+    settings.CLUSTERING_NUMPY_MIN_CANDIDATES = 1
+    if similarity_numpy.enabled():
+        start = time.perf_counter()
+        packed = PackedCandidates().synced(
+            {c.campaign_id: (c.fingerprint, c.weight_profile) for c in pure.candidates}
+        )
+        print(f"packed {len(packed):,} campaigns in {time.perf_counter() - start:.2f}s")
+        paths["numpy"] = (_bounded, CandidateSet(pure.candidates, pure.index, pure.indexed, packed))
+    else:
+        print("numpy not installed; skipping the kernel path")
+
+    results = {name: _run(select, queries, cs) for name, (select, cs) in paths.items()}
+    for name, selected in results.items():
+        if selected != results["exhaustive"]:
+            raise SystemExit(f"{name} selected different campaigns than the exhaustive scan")
+
+    timings = {
+        name: _best_of(functools.partial(_run, select, queries, cs), args.repeat) / args.queries
+        for name, (select, cs) in paths.items()
+    }
+    matched = sum(best is not None for best in results["exhaustive"])
+    print(f"{args.campaigns:,} campaigns, {args.queries} fingerprints ({matched} matched)")
+    for name, seconds in timings.items():
+        print(
+            f"{name:>10}  {seconds * 1000:8.1f} ms per fingerprint  "
+            f"({timings['exhaustive'] / seconds:5.1f}x vs exhaustive)"
+        )
+
+
+if __name__ == "__main__":
+    main()
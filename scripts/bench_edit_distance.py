@@ -0,0 +1,82 @@
+"""
+Benchmark: levenshtein() (interned, memoised, bit-parallel) against the
+textbook dynamic programme it replaced, in sequence pairs per second.
+
+Pairs are drawn like the sequences _normalized_edit_sim() compares: event
+types capped at 50, port sequences, credential pattern tuples and KEX
+orderings.  Both paths are checked to give identical distances, then each is
+timed over the whole pair list (best of --repeat runs).  The engine is timed
+cold (memo cleared before every run) and warm (every pair already memoised,
+as for campaigns compared again on the next clustering run).
+
+Usage (from project root):
+    PYTHONPATH=. python scripts/bench_edit_distance.py
+    PYTHONPATH=. python scripts/bench_edit_distance.py --pairs 20000 --repeat 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import functools
+import random
+import timeit
+from collections.abc import Callable
+
+from app.intelligence.edit_distance import _levenshtein_dp, clear_cache, levenshtein
+
+_KINDS: dict[str, tuple[list, int]] = {
+    "event_type": (["auth_failed", "auth_success", "command", "connect", "download"], 50),
+    "port": ([21, 22, 23, 80, 443, 2222, 3389, 8080], 20),
+    "credential": ([("lower", "digits"), ("root", "dict"), ("admin", "mixed")], 30),
+    "kex": (["curve25519-sha256", "ecdh-sha2-nistp256", "diffie-hellman-group14-sha1"], 8),
+}
+
+
+def _sample_pairs(kind: str, n: int, seed: int = 1) -> list[tuple[list, list]]:
+    rng = random.Random(seed)
+    pool, max_len = _KINDS[kind]
+
+    def _seq() -> list:
+        return [rng.choice(pool) for _ in range(rng.randint(max_len // 2, max_len))]
+
+    return [(_seq(), _seq()) for _ in range(n)]
+
+
+def _run(fn: Callable[[list, list], int], pairs: list[tuple[list, list]]) -> None:
+    for a, b in pairs:
+        fn(a, b)
+
+
+def _cold(pairs: list[tuple[list, list]]) -> None:
+    clear_cache()
+    _run(levenshtein, pairs)
+
+
+def _best_of(fn: Callable[[], None], repeat: int) -> float:
+    return min(timeit.repeat(fn, number=1, repeat=repeat))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pairs", type=int, default=5000, help="sequence pairs per kind")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per path and kind")
+    args = parser.parse_args()
+
+    for kind in _KINDS:
+        pairs = _sample_pairs(kind, args.pairs)
+        if any(levenshtein(a, b) != _levenshtein_dp(a, b) for a, b in pairs):
+            raise SystemExit(f"distances differ for {kind} sequences")
+        dp = _best_of(functools.partial(_run, _levenshtein_dp, pairs), args.repeat)
+        cold = _best_of(functools.partial(_cold, pairs), args.repeat)
+        _run(levenshtein, pairs)
+        warm = _best_of(functools.partial(_run, levenshtein, pairs), args.repeat)
+        n = len(pairs)
+        print(
+            f"{kind:>10}  dp {n / dp:>10,.0f} pairs/s  "
+            f"cold {n / cold:>10,.0f} pairs/s ({dp / cold:5.1f}x)  "
+            f"warm {n / warm:>10,.0f} pairs/s ({dp / warm:5.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark: single-pass extract_all_features() against the six per-category
+feature functions called one after another (the previous implementation).
+
+For each IP size the synthetic event list is built once, both paths are
+checked to produce byte-identical JSON, then each is timed (best of
+--repeat runs). Only in-memory work is timed; no database is touched.
+
+Usage (from project root):
+    PYTHONPATH=. python scripts/bench_fingerprint_features.py
+    PYTHONPATH=. python scripts/bench_fingerprint_features.py --sizes 10000,100000 --repeat 5
+
+The default 1M-event size needs roughly 1.5 GB of memory for the event dicts.
+"""
+
+from __future__ import annotations
+
+import argparse
+import functools
+import json
+import random
+import timeit
+from collections.abc import Callable
+from datetime import UTC, datetime, timedelta
+
+from app.intelligence.sequence import (
+    compute_credential_features,
+    compute_protocol_features,
+    compute_sequence_features,
+    compute_target_features,
+    compute_timing_features,
+    compute_tool_signals,
+    extract_all_features,
+)
+
+
+def _per_category(events: list[dict]) -> dict:
+    return {
+        "timing_features": compute_timing_features(events),
+        "sequence_features": compute_sequence_features(events),
+        "protocol_features": compute_protocol_features(events),
+        "credential_features": compute_credential_features(events),
+        "target_features": compute_target_features(events),
+        "tool_signals": compute_tool_signals(events),
+    }
+
+
+def _sample_events(n: int, seed: int = 1) -> list[dict]:
+    """A brute-forcing scanner: bursts of SSH logins with occasional port sweeps."""
+    rng = random.Random(seed)
+    base = datetime(2025, 1, 1, tzinfo=UTC)
+    offset = 0.0
+    events = []
+    for _ in range(n):
+        offset += rng.choice([0.2, 0.5, 1.0, 2.0]) if rng.random() > 0.001 else 7200.0
+        scan = rng.random() < 0.1
+        events.append(
+            {
+                "ts": (base + timedelta(seconds=offset)).isoformat(),
+                "dst_port": rng.randint(1, 1024) if scan else 22,
+                "event_type": "port_scan" if scan else "auth_failed",
+                "service": None if scan else "ssh",
+                "source": "cowrie",
+                "raw_data": (
+                    {}
+                    if scan
+                    else {"username": rng.choice(["root", "admin"]), "password": "123456"}
+                ),
+            }
+        )
+    return events
+
+
+def _best_of(fn: Callable[[list[dict]], dict], events: list[dict], repeat: int) -> float:
+    return min(timeit.repeat(functools.partial(fn, events), number=1, repeat=repeat))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--sizes", default="10000,100000,1000000", help="comma-separated events per IP"
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per path and size")
+    args = parser.parse_args()
+
+    for size in (int(s) for s in args.sizes.split(",")):
+        events = _sample_events(size)
+        if json.dumps(extract_all_features(events)) != json.dumps(_per_category(events)):
+            raise SystemExit(f"outputs differ at {size} events")
+        before = _best_of(_per_category, events, args.repeat)
+        after = _best_of(extract_all_features, events, args.repeat)
+        print(
+            f"{size:>9} events  per-category {before * 1e3:9.1f} ms  "
+            f"single-pass {after * 1e3:9.1f} ms  speedup {before / after:4.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
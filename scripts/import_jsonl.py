@@ -28,6 +28,7 @@ from sqlalchemy.orm import Session, sessionmaker
 
 from app.db.connection import create_all_tables
 from app.db.repository import EventRepository
+from app.ingest.batch import aggregate_source_ip_rows
 from app.schemas.models import HoneypotEvent, RawEvent
 from app.utils.event_utils import extract_src_ip, normalize_event_type, parse_timestamp
 
@@ -71,7 +72,9 @@ def import_files(paths: list[Path], engine: Engine) -> ImportSummary:
     Import events from JSONL files into the database via the given engine.
 
     Each file is processed in a single session/transaction. Per-event SAVEPOINTs
-    isolate duplicate-key races from poisoning the batch session. Passing the
+    isolate duplicate-key races from poisoning the batch session. source_ips is
+    updated once per distinct IP per file from the aggregated deltas of the
+    imported events (same end state as one upsert per event). Passing the
     same file(s) twice produces zero new rows on the second run (idempotent).
 
     Supports both sensor-native type strings ("cowrie.login.failed") and
@@ -96,6 +99,7 @@ def import_files(paths: list[Path], engine: Engine) -> ImportSummary:
 
         with _open_session(engine) as session:
             repo = EventRepository(session)
+            imported_ips: list[tuple[str | None, datetime]] = []
 
             for lineno, raw_line in enumerate(lines, start=1):
                 line = raw_line.strip()
@@ -158,10 +162,9 @@ def import_files(paths: list[Path], engine: Engine) -> ImportSummary:
                         src_ip=src_ip,
                     )
                     repo.insert_event(honeypot)
-                    if src_ip:
-                        repo.upsert_source_ip(src_ip, ts)
                     sp.commit()
                     summary.imported += 1
+                    imported_ips.append((src_ip, ts))
                 except IntegrityError:
                     sp.rollback()
                     summary.skipped += 1
@@ -173,6 +176,9 @@ def import_files(paths: list[Path], engine: Engine) -> ImportSummary:
                         file=sys.stderr,
                     )
 
+            # Stage 7: one aggregated source_ips upsert per distinct IP.
+            repo.upsert_source_ips_bulk(list(aggregate_source_ip_rows(imported_ips).values()))
+
     return summary
 
 
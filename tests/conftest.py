@@ -31,3 +31,32 @@ def reset_rate_limiter():
 
     limiter._storage.reset()
     yield
+
+
+@pytest.fixture(autouse=True)
+def reset_enrichment_cache():
+    """Drop the process-wide GeoIP/ASN cache around each test.
+
+    Tests stub enrich_ip / point the mmdb paths at temp files; a cached result
+    from one test must not answer a lookup in the next.
+    """
+    from app.utils.enrichment import reset_enrichment_cache_for_testing
+
+    reset_enrichment_cache_for_testing()
+    yield
+    reset_enrichment_cache_for_testing()
+
+
+@pytest.fixture(autouse=True)
+def reset_candidate_cache():
+    """Drop the process-wide clustering candidate cache around each test.
+
+    Tests rewrite representative_fingerprint_json with plain SQL, which does
+    not bump representative_version; a parsed fingerprint cached by one test
+    must not be compared against in the next.
+    """
+    from app.intelligence.candidate_cache import reset_candidate_cache_for_testing
+
+    reset_candidate_cache_for_testing()
+    yield
+    reset_candidate_cache_for_testing()
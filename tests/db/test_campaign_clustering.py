@@ -392,6 +392,69 @@ def test_below_uncertain_threshold_creates_new_campaign(db_session):
     assert decision.decision == DECISION_NEW_CAMPAIGN
 
 
+def test_campaign_that_cannot_reach_uncertain_low_is_not_scored(db_session, monkeypatch):
+    """A cached campaign sharing no port, service or event type is pruned unscored."""
+    import app.intelligence.clustering as clustering_module
+
+    cid = _create_campaign_with_member(db_session, _IP_CAMPAIGN)
+    campaign_fp = _make_fp_dict(ip=_IP_CAMPAIGN)
+    EventRepository(db_session).update_representative_fingerprint(
+        cid,
+        json.dumps({k: campaign_fp[k] for k in ("sequence_features", "target_features")}),
+    )
+    new_fp = _make_fp_dict(
+        sequence_features={
+            "port_sequence": [8080],
+            "event_type_sequence": ["http_probe"] * 10,
+            "credential_sequence": [],
+        },
+        target_features={"port_freq": {"8080": 1.0}, "top_dst_ports": [8080]},
+    )
+    _insert_ip(db_session, _IP_NEW)
+    _store_fp(db_session, _IP_NEW, new_fp)
+    scored: list = []
+    original = clustering_module.bounded_weighted_similarity
+
+    def _counting(*args, **kwargs):
+        scored.append(args)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(clustering_module, "bounded_weighted_similarity", _counting)
+    decision = assign_to_campaign(_IP_NEW, new_fp, EventRepository(db_session), now=_NOW)
+
+    assert decision.decision == DECISION_NEW_CAMPAIGN
+    assert scored == []
+
+
+def test_numpy_kernel_selects_the_same_campaign(db_session, monkeypatch):
+    """With the NumPy kernel screening candidates the best campaign still wins."""
+    pytest.importorskip("numpy")
+    import app.intelligence.clustering as clustering_module
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "CLUSTERING_NUMPY_MIN_CANDIDATES", 1)
+    _create_campaign_with_member(db_session, "192.168.1.2")
+    cid = _create_campaign_with_member(
+        db_session, _IP_CAMPAIGN, fp_override=_identical_fp(_IP_CAMPAIGN)
+    )
+    _insert_ip(db_session, _IP_NEW)
+    fp = _identical_fp(_IP_NEW)
+    _store_fp(db_session, _IP_NEW, fp)
+    screened: list = []
+    original = clustering_module.score_against_many
+
+    def _counting(*args, **kwargs):
+        screened.append(args)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(clustering_module, "score_against_many", _counting)
+    decision = assign_to_campaign(_IP_NEW, fp, EventRepository(db_session), now=_NOW)
+
+    assert len(screened) == 1
+    assert decision.decision == DECISION_AUTO_ASSOCIATION
+    assert decision.campaign_id == cid
+
+
 # ---------------------------------------------------------------------------
 # Existing member
 # ---------------------------------------------------------------------------
@@ -0,0 +1,186 @@
+"""Tests for the clustering candidate cache (app/intelligence/candidate_cache.py).
+
+Verifies that cached candidates match get_campaigns_for_clustering() in
+content and order, that a second run re-reads no fingerprint JSON, that
+update_representative_fingerprint() and status transitions refresh only the
+affected campaign, and that slow-path campaigns are never cached.
+
+Uses the db_session fixture from tests/db/conftest.py.
+"""
+
+from __future__ import annotations
+
+import json
+import uuid
+from datetime import UTC, datetime
+
+from app.db.repository import EventRepository
+from app.intelligence.candidate_cache import CandidateCache
+from app.intelligence.similarity import parse_fingerprint
+
+_TS_STR = datetime(2025, 6, 1, 12, 0, 0, tzinfo=UTC).isoformat()
+_LATER = datetime(2025, 6, 2, 12, 0, 0, tzinfo=UTC).isoformat()
+_LATEST = datetime(2025, 6, 3, 12, 0, 0, tzinfo=UTC).isoformat()
+
+
+def _features(port: int) -> dict:
+    return {
+        "timing_features": None,
+        "sequence_features": json.dumps({"port_sequence": [port], "event_type_sequence": []}),
+        "protocol_features": None,
+        "credential_features": None,
+        "target_features": json.dumps({"port_freq": {str(port): 1.0}, "top_dst_ports": [port]}),
+        "confidence": 0.7,
+    }
+
+
+def _campaign(session, *, port: int | None = 22, status: str = "active") -> str:
+    repo = EventRepository(session)
+    cid = str(uuid.uuid4())
+    repo.create_campaign(
+        campaign_id=cid,
+        name="TEST-WOLF-1",
+        status=status,
+        confidence=0.7,
+        first_seen=_TS_STR,
+        last_seen=_TS_STR,
+        member_ip_count=1,
+        created_at=_TS_STR,
+        updated_at=_TS_STR,
+    )
+    if port is not None:
+        repo.update_representative_fingerprint(cid, json.dumps(_features(port)))
+    session.flush()
+    return cid
+
+
+def _member_with_fingerprint(session, cid: str, ip: str) -> None:
+    repo = EventRepository(session)
+    repo.upsert_source_ip(ip, datetime(2025, 6, 1, tzinfo=UTC))
+    features = _features(80)
+    repo.upsert_behavioral_fingerprint(
+        ip=ip,
+        fingerprint_version=1,
+        computed_at=_TS_STR,
+        event_count=20,
+        timing_features=None,
+        sequence_features=features["sequence_features"],
+        protocol_features=None,
+        credential_features=None,
+        target_features=features["target_features"],
+        tool_signals=None,
+        confidence=0.7,
+    )
+    repo.add_campaign_member(cid, ip, 0.7, _TS_STR, _TS_STR)
+    session.flush()
+
+
+def test_candidates_match_get_campaigns_for_clustering(db_session):
+    _campaign(db_session, port=22)
+    slow = _campaign(db_session, port=None)
+    _member_with_fingerprint(db_session, slow, "10.0.0.9")
+    _campaign(db_session, port=443, status="dormant")
+    weighted = _campaign(db_session, port=8080)
+    _campaign(db_session, port=21, status="historical")
+    weights = {"timing": 0.1, "sequence": 0.2, "protocol": 0.2, "credential": 0.2, "target": 0.3}
+    EventRepository(db_session).upsert_weight_profile(
+        weighted, weights, 5, 4, 1, [], _TS_STR, _TS_STR
+    )
+    db_session.flush()
+
+    expected = EventRepository(db_session).get_campaigns_for_clustering()
+    candidates = CandidateCache().candidates(EventRepository(db_session))
+
+    assert [c.campaign_id for c in candidates] == [e["campaign_id"] for e in expected]
+    for candidate, row in zip(candidates, expected, strict=True):
+        assert candidate.status == row["status"]
+        assert candidate.last_seen == row["last_seen"]
+        assert candidate.weight_profile == row["weight_profile"]
+        assert candidate.fingerprint == parse_fingerprint(row)
+
+
+def test_second_run_reads_no_fingerprint_json(db_session, monkeypatch):
+    _campaign(db_session, port=22)
+    _campaign(db_session, port=80)
+    repo = EventRepository(db_session)
+    cache = CandidateCache()
+    cache.candidates(repo)
+
+    def _unexpected(*args, **kwargs):
+        raise AssertionError("fingerprint JSON re-read")
+
+    monkeypatch.setattr(repo, "get_representative_fingerprints", _unexpected)
+    monkeypatch.setattr(repo, "get_campaigns_for_clustering", _unexpected)
+    assert len(cache.candidates(repo)) == 2
+    assert cache.stats() == {"size": 2, "hits": 2, "misses": 2, "uncached": 0}
+
+
+def test_update_representative_fingerprint_refreshes_only_that_campaign(db_session, monkeypatch):
+    cid_a = _campaign(db_session, port=22)
+    _campaign(db_session, port=80)
+    repo = EventRepository(db_session)
+    cache = CandidateCache()
+    cache.candidates(repo)
+
+    repo.update_representative_fingerprint(cid_a, json.dumps(_features(3389)))
+    db_session.flush()
+    read: list[list[str]] = []
+    original = repo.get_representative_fingerprints
+
+    def _spy(campaign_ids):
+        read.append(list(campaign_ids))
+        return original(campaign_ids)
+
+    monkeypatch.setattr(repo, "get_representative_fingerprints", _spy)
+    candidates = {c.campaign_id: c for c in cache.candidates(repo)}
+
+    assert read == [[cid_a]]
+    assert candidates[cid_a].fingerprint.target["top_dst_ports"] == [3389]
+
+
+def test_status_transitions_are_reflected_without_reparse(db_session):
+    _campaign(db_session, port=22)
+    repo = EventRepository(db_session)
+    cache = CandidateCache()
+    cache.candidates(repo)
+
+    repo.transition_active_to_dormant(_LATER, _LATER, _LATER)
+    db_session.flush()
+    assert [c.status for c in cache.candidates(repo)] == ["dormant"]
+
+    repo.transition_dormant_to_historical(_LATEST, _LATEST)
+    db_session.flush()
+    assert cache.candidates(repo) == []
+    assert len(cache) == 0
+    assert cache.stats()["misses"] == 1
+
+
+def test_slow_path_campaigns_are_never_cached(db_session):
+    cid = _campaign(db_session, port=None)
+    _member_with_fingerprint(db_session, cid, "10.0.0.9")
+    repo = EventRepository(db_session)
+    cache = CandidateCache()
+
+    assert [c.campaign_id for c in cache.candidates(repo)] == [cid]
+    assert [c.campaign_id for c in cache.candidates(repo)] == [cid]
+    assert cache.stats() == {"size": 0, "hits": 0, "misses": 0, "uncached": 2}
+
+
+def test_corrupt_representative_json_falls_back_to_member(db_session):
+    cid = _campaign(db_session, port=None)
+    _member_with_fingerprint(db_session, cid, "10.0.0.9")
+    repo = EventRepository(db_session)
+    repo.update_representative_fingerprint(cid, "NOT VALID JSON }{")
+    db_session.flush()
+
+    candidates = CandidateCache().candidates(repo)
+    assert [c.fingerprint.target["top_dst_ports"] for c in candidates] == [[80]]
+
+
+def test_update_representative_fingerprint_increments_version(db_session):
+    cid = _campaign(db_session, port=22)
+    repo = EventRepository(db_session)
+    repo.update_representative_fingerprint(cid, json.dumps(_features(80)))
+    db_session.flush()
+    (row,) = repo.list_clustering_candidate_versions()
+    assert row["representative_version"] == 2
@@ -7,8 +7,9 @@ in-memory SQLite database per test.  No HTTP, no application startup.
 from __future__ import annotations
 
 import json
+import types
 import uuid
-from datetime import UTC, datetime
+from datetime import UTC, datetime, timedelta
 
 import pytest
 from sqlalchemy import text
@@ -122,15 +123,109 @@ def test_get_events_for_fingerprint_event_dict_keys(db_session):
     events = repo.get_events_for_fingerprint(_IP)
     assert len(events) == 1
     e = events[0]
-    assert set(e.keys()) == {"ts", "dst_port", "event_type", "service", "source", "raw_data"}
+    assert set(e.keys()) == {
+        "ts",
+        "dst_port",
+        "event_type",
+        "service",
+        "source",
+        "username_class",
+        "password_class",
+        "password_length",
+        "password_flags",
+        "ssh_kex",
+        "tls_ciphers",
+    }
 
 
-def test_get_events_for_fingerprint_raw_data_is_dict(db_session):
-    _insert_event_for_ip(db_session, _IP, _TS, username="admin", password="pass")
+def test_get_events_for_fingerprint_returns_typed_fields_not_credentials(db_session):
+    _insert_event_for_ip(db_session, _IP, _TS, username="admin", password="Pass1!")
     db_session.flush()
     repo = EventRepository(db_session)
-    events = repo.get_events_for_fingerprint(_IP)
-    assert isinstance(events[0]["raw_data"], dict)
+    e = repo.get_events_for_fingerprint(_IP)[0]
+    assert e["source"] == "cowrie"
+    assert (e["username_class"], e["password_class"]) == ("alpha", "special")
+    assert (e["password_length"], e["password_flags"]) == (6, 0b1111)
+    assert (e["ssh_kex"], e["tls_ciphers"]) == (None, None)
+    assert "admin" not in json.dumps(e)
+    assert "Pass1!" not in json.dumps(e)
+
+
+def test_get_events_for_fingerprint_does_not_read_raw_json(db_session):
+    _insert_event_for_ip(db_session, _IP, _TS, username="root", password="123456")
+    db_session.execute(text("UPDATE raw_events SET raw_json = 'not json'"))
+    db_session.flush()
+    repo = EventRepository(db_session)
+    e = repo.get_events_for_fingerprint(_IP)[0]
+    assert (e["username_class"], e["password_class"]) == ("alpha", "numeric")
+
+
+def test_get_events_for_fingerprint_decodes_protocol_orderings(db_session):
+    eid = _insert_event_for_ip(db_session, _IP, _TS)
+    db_session.execute(
+        text("""
+            UPDATE event_fingerprint_fields
+            SET ssh_kex = '["curve25519-sha256"]', tls_ciphers = '["c02b"]'
+            WHERE id = :id
+        """),
+        {"id": eid},
+    )
+    db_session.flush()
+    repo = EventRepository(db_session)
+    e = repo.get_events_for_fingerprint(_IP)[0]
+    assert e["ssh_kex"] == ["curve25519-sha256"]
+    assert e["tls_ciphers"] == ["c02b"]
+
+
+def test_get_events_for_fingerprint_features_match_raw_data_events(db_session):
+    from datetime import timedelta
+
+    from app.intelligence.sequence import extract_all_features
+
+    creds = [("root", "123456"), ("admin", "Passw0rd!"), (None, "x"), ("a@b.c", None), (None, None)]
+    raw_events = []
+    for i, (username, password) in enumerate(creds):
+        ts = _TS + timedelta(seconds=i * 7)
+        _insert_event_for_ip(db_session, _IP, ts, username=username, password=password)
+        data = {"ip": _IP}
+        if username is not None:
+            data["username"] = username
+        if password is not None:
+            data["password"] = password
+        raw_events.append(
+            {
+                "ts": ts.isoformat(),
+                "dst_port": 22,
+                "event_type": "auth_failed",
+                "service": "ssh",
+                "source": "cowrie",
+                "raw_data": data,
+            }
+        )
+    db_session.flush()
+    typed = EventRepository(db_session).get_events_for_fingerprint(_IP)
+    assert json.dumps(extract_all_features(typed)) == json.dumps(extract_all_features(raw_events))
+
+
+def test_event_fingerprint_fields_stamped_with_derivation_version(db_session):
+    from app.intelligence.constants import FINGERPRINT_FIELDS_VERSION
+
+    eid = _insert_event_for_ip(db_session, _IP, _TS, username="root", password="toor")
+    version = db_session.execute(
+        text("SELECT derivation_version FROM event_fingerprint_fields WHERE id = :id"),
+        {"id": eid},
+    ).scalar()
+    assert version == FINGERPRINT_FIELDS_VERSION
+
+
+def test_event_fingerprint_fields_removed_with_raw_event(db_session):
+    eid = _insert_event_for_ip(db_session, _IP, _TS, username="root", password="toor")
+    db_session.flush()
+    EventRepository(db_session).delete_events_before(_TS.replace(year=2030))
+    count = db_session.execute(
+        text("SELECT COUNT(*) FROM event_fingerprint_fields WHERE id = :id"), {"id": eid}
+    ).scalar()
+    assert count == 0
 
 
 def test_get_events_for_fingerprint_ordered_chronologically(db_session):
@@ -294,9 +389,20 @@ def test_get_fingerprint_returned_keys(db_session, with_source_ip):
         "target_features",
         "tool_signals",
         "confidence",
+        "features_hash",
     }
 
 
+def test_features_hash_round_trips(db_session, with_source_ip):
+    repo = EventRepository(db_session)
+    repo.upsert_behavioral_fingerprint(**_fp_params(), features_hash="abc")
+    db_session.flush()
+    assert repo.get_behavioral_fingerprint(_IP)["features_hash"] == "abc"
+    repo.upsert_behavioral_fingerprint(**_fp_params())
+    db_session.flush()
+    assert repo.get_behavioral_fingerprint(_IP)["features_hash"] is None
+
+
 def test_get_fingerprint_source_ip_matches(db_session, with_source_ip):
     repo = EventRepository(db_session)
     repo.upsert_behavioral_fingerprint(**_fp_params())
@@ -317,3 +423,221 @@ def test_get_fingerprint_feature_json_is_parseable(db_session, with_source_ip):
         if val is not None:
             parsed = json.loads(val)
             assert isinstance(parsed, dict)
+
+
+# ---------------------------------------------------------------------------
+# Incremental fingerprint reads and fingerprint_state
+# ---------------------------------------------------------------------------
+
+
+def _set_ingested_at(session, event_id: str, ingested_at: str) -> None:
+    session.execute(
+        text("UPDATE raw_events SET ingested_at = :at WHERE id = :id"),
+        {"at": ingested_at, "id": event_id},
+    )
+
+
+def test_get_fingerprint_events_since_none_returns_all_with_watermark(db_session):
+    from datetime import timedelta
+
+    first = _insert_event_for_ip(db_session, _IP, _TS + timedelta(minutes=5))
+    second = _insert_event_for_ip(db_session, _IP, _TS)
+    _set_ingested_at(db_session, first, "2025-06-01T12:00:01+00:00")
+    _set_ingested_at(db_session, second, "2025-06-01T12:00:02+00:00")
+    db_session.flush()
+    repo = EventRepository(db_session)
+    events, watermark = repo.get_fingerprint_events_since(_IP, None)
+    assert events == repo.get_events_for_fingerprint(_IP)
+    assert watermark == "2025-06-01T12:00:02+00:00"
+
+
+def test_get_fingerprint_events_since_returns_only_later_ingests(db_session):
+    from datetime import timedelta
+
+    old = _insert_event_for_ip(db_session, _IP, _TS)
+    new = _insert_event_for_ip(db_session, _IP, _TS + timedelta(minutes=1), dst_port=2222)
+    _set_ingested_at(db_session, old, "2025-06-01T12:00:01+00:00")
+    _set_ingested_at(db_session, new, "2025-06-01T12:00:05+00:00")
+    db_session.flush()
+    repo = EventRepository(db_session)
+    events, watermark = repo.get_fingerprint_events_since(_IP, "2025-06-01T12:00:01+00:00")
+    assert [e["dst_port"] for e in events] == [2222]
+    assert watermark == "2025-06-01T12:00:05+00:00"
+
+    events, watermark = repo.get_fingerprint_events_since(_IP, watermark)
+    assert events == []
+    assert watermark == "2025-06-01T12:00:05+00:00"
+
+
+def test_count_events_for_ip(db_session):
+    _insert_event_for_ip(db_session, _IP, _TS)
+    _insert_event_for_ip(db_session, _IP, _TS)
+    _insert_event_for_ip(db_session, "10.0.0.1", _TS)
+    db_session.flush()
+    repo = EventRepository(db_session)
+    assert repo.count_events_for_ip(_IP) == 2
+    assert repo.count_events_for_ip("192.0.2.99") == 0
+
+
+def test_fingerprint_state_round_trip_and_upsert(db_session):
+    repo = EventRepository(db_session)
+    assert repo.get_fingerprint_state(_IP) is None
+    params = {
+        "ip": _IP,
+        "fingerprint_version": 1,
+        "state_version": 1,
+        "event_count": 3,
+        "watermark": "2025-06-01T12:00:00+00:00",
+        "state_json": '{"event_count":3}',
+        "updated_at": "2025-06-01T12:00:00+00:00",
+    }
+    repo.upsert_fingerprint_state(**params)
+    repo.upsert_fingerprint_state(**{**params, "event_count": 5, "state_json": "{}"})
+    row = repo.get_fingerprint_state(_IP)
+    assert row["event_count"] == 5
+    assert row["state_json"] == "{}"
+    assert row["watermark"] == "2025-06-01T12:00:00+00:00"
+    count = db_session.execute(text("SELECT COUNT(*) FROM fingerprint_state")).scalar()
+    assert count == 1
+
+
+# ---------------------------------------------------------------------------
+# iter_fingerprint_events — bounded windows
+# ---------------------------------------------------------------------------
+
+
+def _insert_series(session, n: int) -> list[str]:
+    """Insert n events for _IP one minute apart; return their ts strings."""
+    stamps = [_TS + timedelta(minutes=i) for i in range(n)]
+    for ts in stamps:
+        _insert_event_for_ip(session, _IP, ts)
+    session.flush()
+    return [ts.isoformat() for ts in stamps]
+
+
+def _ts_list(events) -> list[str]:
+    return [e["ts"] for e in events]
+
+
+def test_iter_fingerprint_events_is_lazy(db_session):
+    _insert_series(db_session, 3)
+    events = EventRepository(db_session).iter_fingerprint_events(_IP)
+    assert isinstance(events, types.GeneratorType)
+    assert len(list(events)) == 3
+
+
+def test_iter_fingerprint_events_last_events_returns_newest_in_order(db_session):
+    stamps = _insert_series(db_session, 10)
+    events = EventRepository(db_session).iter_fingerprint_events(_IP, last_events=4)
+    assert _ts_list(events) == stamps[-4:]
+
+
+def test_iter_fingerprint_events_since_ts(db_session):
+    stamps = _insert_series(db_session, 10)
+    events = EventRepository(db_session).iter_fingerprint_events(_IP, since_ts=stamps[7])
+    assert _ts_list(events) == stamps[7:]
+
+
+def test_iter_fingerprint_events_sample_spreads_over_history(db_session):
+    stamps = _insert_series(db_session, 20)
+    repo = EventRepository(db_session)
+    sampled = _ts_list(repo.iter_fingerprint_events(_IP, sample_events=5))
+    assert len(sampled) == 5
+    # One event from each consecutive slice of four.
+    for k, ts in enumerate(sampled):
+        assert ts in stamps[4 * k : 4 * (k + 1)]
+    assert _ts_list(repo.iter_fingerprint_events(_IP, sample_events=5)) == sampled
+
+
+def test_iter_fingerprint_events_sample_uneven_slices(db_session):
+    _insert_series(db_session, 10)
+    sampled = list(EventRepository(db_session).iter_fingerprint_events(_IP, sample_events=3))
+    assert len(sampled) == 3
+
+
+def test_iter_fingerprint_events_sample_larger_than_history_returns_all(db_session):
+    stamps = _insert_series(db_session, 4)
+    events = EventRepository(db_session).iter_fingerprint_events(_IP, sample_events=10)
+    assert _ts_list(events) == stamps
+
+
+def test_iter_fingerprint_events_only_for_target_ip(db_session):
+    _insert_series(db_session, 3)
+    _insert_event_for_ip(db_session, "10.0.0.1", _TS)
+    db_session.flush()
+    events = EventRepository(db_session).iter_fingerprint_events(_IP, last_events=10)
+    assert len(list(events)) == 3
+
+
+def test_get_newest_event_ts(db_session):
+    repo = EventRepository(db_session)
+    assert repo.get_newest_event_ts(_IP) is None
+    stamps = _insert_series(db_session, 3)
+    assert repo.get_newest_event_ts(_IP) == stamps[-1]
+
+
+# ---------------------------------------------------------------------------
+# Re-fingerprint scans
+# ---------------------------------------------------------------------------
+
+_SCAN_IPS = ["10.0.0.1", "10.0.0.2", "10.0.0.3"]
+
+
+def _insert_scan_events(session) -> None:
+    for n, ip in enumerate(_SCAN_IPS, start=1):
+        for i in range(n):
+            _insert_event_for_ip(session, ip, _TS + timedelta(minutes=5 - i))
+    session.flush()
+
+
+def test_list_and_count_source_ips_to_refingerprint(db_session):
+    _insert_scan_events(db_session)
+    repo = EventRepository(db_session)
+    assert repo.list_source_ips_to_refingerprint(after_ip=None, limit=2) == _SCAN_IPS[:2]
+    assert repo.list_source_ips_to_refingerprint(after_ip=_SCAN_IPS[0], limit=5) == _SCAN_IPS[1:]
+    assert repo.count_source_ips_to_refingerprint() == 3
+    assert repo.count_source_ips_to_refingerprint(after_ip=_SCAN_IPS[1]) == 1
+
+
+def test_refingerprint_scans_skip_current_version(db_session):
+    _insert_scan_events(db_session)
+    repo = EventRepository(db_session)
+    repo.upsert_behavioral_fingerprint(**{**_fp_params(_SCAN_IPS[1]), "fingerprint_version": 2})
+    repo.upsert_behavioral_fingerprint(**_fp_params(_SCAN_IPS[2]))
+    db_session.flush()
+    assert repo.list_source_ips_to_refingerprint(after_ip=None, limit=5, below_version=2) == [
+        _SCAN_IPS[0],
+        _SCAN_IPS[2],
+    ]
+    assert repo.count_source_ips_to_refingerprint(below_version=2) == 2
+    groups = repo.iter_fingerprint_event_groups(
+        after_ip=None, through_ip=_SCAN_IPS[2], below_version=2
+    )
+    assert [ip for ip, _, _ in groups] == [_SCAN_IPS[0], _SCAN_IPS[2]]
+
+
+def test_iter_fingerprint_event_groups_matches_per_ip_fetch(db_session):
+    _insert_scan_events(db_session)
+    repo = EventRepository(db_session)
+    groups = list(repo.iter_fingerprint_event_groups(after_ip=_SCAN_IPS[0], through_ip="10.0.0.3"))
+    assert [ip for ip, _, _ in groups] == _SCAN_IPS[1:]
+    for ip, events, watermark in groups:
+        expected, expected_watermark = repo.get_fingerprint_events_since(ip, None)
+        assert events == expected
+        assert watermark == expected_watermark
+
+
+def test_iter_fingerprint_event_groups_applies_window_like_per_ip_fetch(db_session):
+    _insert_scan_events(db_session)
+    for i in range(7):
+        _insert_event_for_ip(db_session, _SCAN_IPS[2], _TS + timedelta(hours=1, minutes=i))
+    db_session.flush()
+    repo = EventRepository(db_session)
+    for window in ({"last_events": 2}, {"sample_events": 3}, {"sample_events": 10}):
+        groups = list(
+            repo.iter_fingerprint_event_groups(after_ip=None, through_ip=_SCAN_IPS[2], **window)
+        )
+        assert [ip for ip, _, _ in groups] == _SCAN_IPS
+        for ip, events, watermark in groups:
+            assert events == list(repo.iter_fingerprint_events(ip, **window))
+            assert watermark == repo.get_fingerprint_events_since(ip, None)[1]
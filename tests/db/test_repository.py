@@ -240,6 +240,138 @@ def test_event_exists_false_for_unknown_id(db_session):
     assert repo.event_exists(str(uuid.uuid4())) is False
 
 
+def test_events_exist_returns_only_present_ids(db_session):
+    repo = EventRepository(db_session)
+    present = _raw()
+    repo.insert_raw_event(present)
+    db_session.flush()
+    missing = str(uuid.uuid4())
+    assert repo.events_exist([present.id, missing]) == {present.id}
+
+
+def test_events_exist_empty_input(db_session):
+    repo = EventRepository(db_session)
+    assert repo.events_exist([]) == set()
+
+
+def test_events_exist_chunks_large_id_lists(db_session):
+    """More ids than one IN (...) chunk must still be resolved in full."""
+    repo = EventRepository(db_session)
+    raws = [_raw() for _ in range(3)]
+    repo.insert_raw_events_bulk(raws)
+    db_session.flush()
+    ids = [str(uuid.uuid4()) for _ in range(1200)] + [r.id for r in raws]
+    assert repo.events_exist(ids) == {r.id for r in raws}
+
+
+# ---------------------------------------------------------------------------
+# Bulk ingest writes
+# ---------------------------------------------------------------------------
+
+
+def test_insert_raw_events_bulk_writes_all_rows(db_session):
+    repo = EventRepository(db_session)
+    raws = [_raw() for _ in range(4)]
+    repo.insert_raw_events_bulk(raws)
+    db_session.flush()
+    count = db_session.execute(text("SELECT COUNT(*) FROM raw_events")).scalar()
+    assert count == 4
+
+
+def test_insert_raw_events_bulk_duplicate_raises_integrity_error(db_session):
+    repo = EventRepository(db_session)
+    raw = _raw()
+    repo.insert_raw_event(raw)
+    db_session.flush()
+    with pytest.raises(IntegrityError):
+        repo.insert_raw_events_bulk([_raw(), raw])
+
+
+def test_insert_events_bulk_matches_single_insert(db_session):
+    repo = EventRepository(db_session)
+    ids = [str(uuid.uuid4()) for _ in range(2)]
+    repo.insert_raw_events_bulk([_raw(event_id=i) for i in ids])
+    repo.insert_event(_enriched(ids[0]))
+    repo.insert_events_bulk([_enriched(ids[1])])
+    db_session.flush()
+    rows = db_session.execute(
+        text(
+            "SELECT src_ip, event_type, country_code, city, asn FROM events "
+            "WHERE id IN (:a, :b) ORDER BY id"
+        ),
+        {"a": ids[0], "b": ids[1]},
+    ).fetchall()
+    assert rows[0] == rows[1]
+
+
+def test_insert_events_bulk_coerces_unknown_type(db_session):
+    repo = EventRepository(db_session)
+    eid = str(uuid.uuid4())
+    repo.insert_raw_event(_raw(event_id=eid))
+    repo.insert_events_bulk([_honeypot(eid, event_type="not_a_real_type")])
+    db_session.flush()
+    row = db_session.execute(
+        text("SELECT event_type FROM events WHERE id = :id"), {"id": eid}
+    ).fetchone()
+    assert row[0] == "unknown"
+
+
+def test_upsert_source_ips_bulk_matches_sequential_upserts(db_session):
+    """One aggregated upsert per IP must leave the same row as N single upserts."""
+    repo = EventRepository(db_session)
+    ts = [datetime(2025, 1, 1, h, tzinfo=UTC) for h in range(4)]
+
+    repo.upsert_source_ip("1.1.1.1", ts[0], country_code="US")
+    for t in ts[1:]:
+        repo.upsert_source_ip("1.1.1.1", t)
+
+    repo.upsert_source_ip("2.2.2.2", ts[0], country_code="US")
+    repo.upsert_source_ips_bulk(
+        [
+            {
+                "ip": "2.2.2.2",
+                "first_seen": ts[1].isoformat(),
+                "last_seen": ts[3].isoformat(),
+                "event_count": 3,
+                "country_code": None,
+                "country_name": None,
+                "asn": None,
+                "asn_org": None,
+            }
+        ]
+    )
+    db_session.flush()
+
+    sql = text(
+        "SELECT first_seen, last_seen, event_count, country_code FROM source_ips WHERE ip = :ip"
+    )
+    seq = db_session.execute(sql, {"ip": "1.1.1.1"}).fetchone()
+    bulk = db_session.execute(sql, {"ip": "2.2.2.2"}).fetchone()
+    assert tuple(seq) == tuple(bulk)
+
+
+def test_get_bulk_source_ip_geo_skips_null_country(db_session):
+    repo = EventRepository(db_session)
+    repo.upsert_source_ip("1.1.1.1", datetime(2025, 1, 1, tzinfo=UTC), country_code="AU")
+    repo.upsert_source_ip("2.2.2.2", datetime(2025, 1, 1, tzinfo=UTC))
+    db_session.flush()
+    geo = repo.get_bulk_source_ip_geo(["1.1.1.1", "2.2.2.2", "3.3.3.3"])
+    assert set(geo) == {"1.1.1.1"}
+    assert geo["1.1.1.1"]["country_code"] == "AU"
+
+
+def test_bulk_intelligence_roundtrip(db_session):
+    repo = EventRepository(db_session)
+    repo.upsert_source_ip("1.1.1.1", datetime(2025, 1, 1, tzinfo=UTC))
+    db_session.flush()
+    repo.update_source_ips_intelligence_bulk(
+        [{"ip": "1.1.1.1", "tags": ["brute-force"], "reputation_score": 0.3}]
+    )
+    db_session.flush()
+    intel = repo.get_bulk_source_ip_intelligence(["1.1.1.1", "9.9.9.9"])
+    assert intel == {"1.1.1.1": {"event_count": 1, "tags": ["brute-force"]}}
+
+
 # ---------------------------------------------------------------------------
 # upsert_source_ip
 # ---------------------------------------------------------------------------
@@ -24,6 +24,7 @@ def reset_db_rows():
         conn.execute(text("DELETE FROM ai_outputs"))
         conn.execute(text("DELETE FROM processing_jobs"))
         conn.execute(text("DELETE FROM fingerprint_history"))
+        conn.execute(text("DELETE FROM fingerprint_state"))
         conn.execute(text("DELETE FROM behavioral_fingerprints"))
         conn.execute(text("DELETE FROM campaign_tags"))
         conn.execute(text("DELETE FROM campaign_observations"))
@@ -34,6 +35,7 @@ def reset_db_rows():
         conn.execute(text("DELETE FROM actor_profiles"))
         conn.execute(text("DELETE FROM campaigns"))
         conn.execute(text("DELETE FROM events"))
+        conn.execute(text("DELETE FROM event_fingerprint_fields"))
         conn.execute(text("DELETE FROM raw_events"))
         conn.execute(text("DELETE FROM source_ips"))
         conn.execute(text("DELETE FROM audit_log"))
@@ -21,6 +21,8 @@ Coverage:
     - History row has campaign_id=None for an unassigned IP
     - History row has campaign_id set for an already-assigned IP
     - Multiple _compute_and_store() calls accumulate history rows (append-only)
+    - A recompute that reproduces the stored features appends no history row
+    - More of a repeated pattern appends no history row once it saturates
     - Feature columns in history row are JSON strings, not raw events
 
   Representative fingerprint update:
@@ -28,6 +30,7 @@ Coverage:
       on the assigned campaign
     - Representative fingerprint JSON contains expected feature keys
     - tool_signals is NOT included in representative fingerprint JSON
+    - An existing member's representative is left alone when features_changed=False
 
   No raw credentials:
     - credential_features in history row stores statistical summaries, not raw values
@@ -43,6 +46,7 @@ from sqlalchemy import text
 
 from app.db.connection import get_engine
 from app.db.repository import EventRepository
+from app.intelligence.sequence import fingerprint_fields
 
 _TS = "2026-03-01T00:00:00+00:00"
 
@@ -149,7 +153,7 @@ def _insert_event(
     ts: str = _TS,
     raw_data: dict | None = None,
 ) -> None:
-    """Insert a raw_event + event row for fingerprint computation."""
+    """Insert raw_event, event and event_fingerprint_fields rows, as ingest does."""
     payload = json.dumps({"source": "test-sensor", "data": raw_data or {}})
     with get_engine().connect() as conn:
         conn.execute(
@@ -167,6 +171,23 @@ def _insert_event(
             """),
             {"id": eid, "ts": ts, "src_ip": ip, "dst_port": dst_port, "event_type": event_type},
         )
+        fields = fingerprint_fields(raw_data or {})
+        conn.execute(
+            text("""
+                INSERT INTO event_fingerprint_fields
+                    (id, source, username_class, password_class, password_length,
+                     password_flags)
+                VALUES (:id, 'test-sensor', :username_class, :password_class,
+                        :password_length, :password_flags)
+            """),
+            {
+                "id": eid,
+                "username_class": fields["username_class"],
+                "password_class": fields["password_class"],
+                "password_length": fields["password_length"],
+                "password_flags": fields["password_flags"],
+            },
+        )
         conn.commit()
 
 
@@ -412,11 +433,54 @@ def test_compute_and_store_history_accumulates_multiple_calls():
     from app.intelligence.tasks import _compute_and_store
 
     _compute_and_store(ip)
+    _insert_event(str(uuid.uuid4()), ip, ts="2026-01-09T00:00:00+00:00")
     _compute_and_store(ip)
 
     assert _count_history_for_ip(ip) == 2
 
 
+def test_compute_and_store_unchanged_recompute_skips_history():
+    ip = f"10.54.{uuid.uuid4().int % 256}.2"
+    _insert_source_ip(ip)
+    for i in range(5):
+        ts = f"2026-01-{i+1:02d}T00:00:00+00:00"
+        _insert_event(str(uuid.uuid4()), ip, ts=ts)
+
+    from app.intelligence.tasks import _compute_and_store
+
+    _compute_and_store(ip)
+    _compute_and_store(ip, full_rebuild=True)
+
+    assert _count_history_for_ip(ip) == 1
+    with get_engine().connect() as conn:
+        stored_hash = conn.execute(
+            text("SELECT features_hash FROM behavioral_fingerprints WHERE source_ip = :ip"),
+            {"ip": ip},
+        ).scalar_one()
+    assert stored_hash is not None
+
+
+def test_compute_and_store_repeated_pattern_stops_appending_history():
+    """Once a repeated pattern fills the compared event-type prefix, more of
+    the same behaviour is recognised as unchanged on the ingest path."""
+    ip = f"10.54.{uuid.uuid4().int % 256}.3"
+    _insert_source_ip(ip)
+    creds = {"username": "admin", "password": "admin123"}
+
+    from app.intelligence.tasks import _compute_and_store
+
+    # One login every 20 seconds, all inside the same hour of the same day.
+    for chunk in range(4):
+        for i in range(chunk * 30, chunk * 30 + 30):
+            ts = f"2026-01-05T03:{i // 3:02d}:{i % 3 * 20:02d}+00:00"
+            _insert_event(str(uuid.uuid4()), ip, ts=ts, raw_data=creds)
+        _compute_and_store(ip)
+        if chunk == 1:
+            saturated = _count_history_for_ip(ip)
+
+    assert _count_history_for_ip(ip) == saturated
+
+
 def test_compute_and_store_history_feature_columns_are_json_strings():
     """Feature columns in history must be JSON strings, not raw event data."""
     ip = f"10.55.{uuid.uuid4().int % 256}.1"
@@ -532,8 +596,8 @@ def test_representative_fp_updated_after_clustering_assigns_campaign():
 
 
 def test_representative_fp_json_excludes_tool_signals():
-    """_build_representative_fp_json must not include tool_signals."""
-    from app.intelligence.tasks import _build_representative_fp_json
+    """build_representative_fp_json must not include tool_signals."""
+    from app.intelligence.tasks import build_representative_fp_json
 
     fp = {
         "timing_features": '{"mean_inter_arrival": 1.0}',
@@ -544,7 +608,7 @@ def test_representative_fp_json_excludes_tool_signals():
         "tool_signals": '{"tools": ["masscan", "zmap"]}',
         "confidence": 0.70,
     }
-    result = _build_representative_fp_json(fp)
+    result = build_representative_fp_json(fp)
     parsed = json.loads(result)
     assert "tool_signals" not in parsed
     assert parsed["confidence"] == pytest.approx(0.70)
@@ -552,7 +616,7 @@ def test_representative_fp_json_excludes_tool_signals():
 
 
 def test_representative_fp_json_contains_all_feature_keys():
-    from app.intelligence.tasks import _build_representative_fp_json
+    from app.intelligence.tasks import build_representative_fp_json
 
     fp = {
         "timing_features": "T",
@@ -562,7 +626,7 @@ def test_representative_fp_json_contains_all_feature_keys():
         "target_features": "TG",
         "confidence": 0.90,
     }
-    parsed = json.loads(_build_representative_fp_json(fp))
+    parsed = json.loads(build_representative_fp_json(fp))
     for key in (
         "timing_features",
         "sequence_features",
@@ -572,3 +636,19 @@ def test_representative_fp_json_contains_all_feature_keys():
         "confidence",
     ):
         assert key in parsed
+
+
+def test_unchanged_features_leave_member_representative_alone():
+    ip = f"10.61.{uuid.uuid4().int % 256}.1"
+    _insert_source_ip(ip)
+    _insert_fingerprint(ip)
+    cid = _insert_campaign(representative_fingerprint_json=None)
+    _insert_member(cid, ip)
+
+    from app.intelligence.tasks import _run_campaign_clustering
+
+    _run_campaign_clustering(ip, features_changed=False)
+    assert _get_representative_fp(cid) is None
+
+    _run_campaign_clustering(ip)
+    assert _get_representative_fp(cid) is not None
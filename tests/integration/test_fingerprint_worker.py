@@ -0,0 +1,231 @@
+"""Integration tests for the fingerprint worker (app/jobs/worker.py).
+
+Verifies that FINGERPRINT_EXECUTOR=worker makes ingest scheduling write
+pending jobs only, that the worker leases them oldest first without claiming
+one twice, that heartbeats keep the lease and an expired lease is re-queued
+(and can no longer be completed by the worker that lost it), and that a
+claimed job stores the same fingerprint as the inline path — including with
+builds on a real (spawned) process pool.
+
+Schema is bootstrapped by tests/conftest.py; rows are reset per test by
+tests/integration/conftest.py.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.db.connection import get_session
+from app.db.repository import EventRepository
+from app.intelligence.fingerprint import build_fingerprint
+from app.intelligence.tasks import (
+    create_fingerprint_job,
+    execute_fingerprint_job,
+    schedule_fingerprint_if_not_pending,
+)
+from app.jobs.worker import FingerprintWorker, claim_fingerprint_jobs, main
+from app.schemas.models import HoneypotEvent, RawEvent
+
+_BASE = datetime(2026, 3, 1, 8, 0, 0, tzinfo=UTC)
+
+
+def _insert_events(ip: str, n: int) -> None:
+    with get_session() as session:
+        repo = EventRepository(session)
+        for i in range(n):
+            eid = str(uuid.uuid4())
+            ts = _BASE + timedelta(seconds=30 * i)
+            repo.insert_raw_event(
+                RawEvent(
+                    id=eid,
+                    ts=ts.isoformat(),
+                    source="cowrie",
+                    type="cowrie.login.failed",
+                    data={"ip": ip, "username": "root", "password": f"pw{i % 3}"},
+                )
+            )
+            repo.insert_event(
+                HoneypotEvent(
+                    id=eid,
+                    ts=ts,
+                    ingested_at=ts,
+                    source="cowrie",
+                    event_type="auth_failed",
+                    src_ip=ip,
+                    dst_port=22,
+                    service="ssh",
+                )
+            )
+            repo.upsert_source_ip(ip, ts)
+
+
+def _job(job_id: str) -> dict:
+    with get_session() as session:
+        return EventRepository(session).get_job(job_id)
+
+
+def _fingerprint(ip: str) -> dict | None:
+    with get_session() as session:
+        return EventRepository(session).get_behavioral_fingerprint(ip)
+
+
+class _Tasks:
+    def __init__(self) -> None:
+        self.added: list[tuple] = []
+
+    def add_task(self, func, *args) -> None:
+        self.added.append(args)
+
+
+@pytest.fixture()
+def worker_mode(monkeypatch):
+    monkeypatch.setattr(settings, "FINGERPRINT_EXECUTOR", "worker")
+
+
+def test_worker_mode_schedules_job_without_background_task(worker_mode):
+    background = _Tasks()
+    schedule_fingerprint_if_not_pending("198.51.100.1", background)
+    assert background.added == []
+    with get_session() as session:
+        jobs = EventRepository(session).list_jobs(job_type="fingerprint_clustering")
+    assert [(j["resource_id"], j["status"]) for j in jobs] == [("198.51.100.1", "pending")]
+
+
+def test_claim_takes_oldest_first_and_never_twice():
+    ids = [create_fingerprint_job(f"198.51.100.{i}") for i in range(1, 4)]
+    first = claim_fingerprint_jobs(2, "w1")
+    assert [j["id"] for j in first] == ids[:2]
+    assert all(_job(i)["status"] == "running" for i in ids[:2])
+    assert all(_job(i)["worker_id"] == "w1" for i in ids[:2])
+    assert [j["id"] for j in claim_fingerprint_jobs(5, "w2")] == ids[2:]
+    assert claim_fingerprint_jobs(5, "w1") == []
+    assert claim_fingerprint_jobs(0, "w1") == []
+
+
+def test_expired_lease_is_reclaimed_by_another_worker():
+    job_id = create_fingerprint_job("198.51.100.4")
+    assert [j["id"] for j in claim_fingerprint_jobs(1, "dead", lease_seconds=1)] == [job_id]
+    expired = (datetime.now(UTC) - timedelta(seconds=5)).isoformat()
+    with get_session() as session:
+        session.execute(
+            text("UPDATE processing_jobs SET lease_expires_at = :ts WHERE id = :id"),
+            {"ts": expired, "id": job_id},
+        )
+        session.commit()
+    reclaimed = claim_fingerprint_jobs(1, "alive")
+    assert [(j["id"], j["worker_id"], j["attempts"]) for j in reclaimed] == [(job_id, "alive", 2)]
+
+
+def test_stale_worker_does_not_complete_reclaimed_job():
+    _insert_events("198.51.100.11", 6)
+    job_id = create_fingerprint_job("198.51.100.11")
+    claim_fingerprint_jobs(1, "dead", lease_seconds=1)
+    expired = (datetime.now(UTC) - timedelta(seconds=5)).isoformat()
+    with get_session() as session:
+        session.execute(
+            text("UPDATE processing_jobs SET lease_expires_at = :ts WHERE id = :id"),
+            {"ts": expired, "id": job_id},
+        )
+        session.commit()
+    claim_fingerprint_jobs(1, "alive")
+
+    execute_fingerprint_job("198.51.100.11", job_id, worker_id="dead")
+    job = _job(job_id)
+    assert (job["status"], job["worker_id"]) == ("running", "alive")
+
+    execute_fingerprint_job("198.51.100.11", job_id, worker_id="alive")
+    job = _job(job_id)
+    assert job["status"] == "completed"
+    assert job["lease_expires_at"] is None
+
+
+def test_worker_heartbeat_extends_lease_of_in_flight_jobs():
+    job_id = create_fingerprint_job("198.51.100.5")
+    release = threading.Event()
+    builder = ThreadPoolExecutor(max_workers=1)
+    worker = FingerprintWorker(1, builder, worker_id="w1", lease_seconds=30)
+    worker._threads.submit(release.wait)  # hold the only slot thread
+    try:
+        assert worker.run_once() == 1
+        before = _job(job_id)["lease_expires_at"]
+        time.sleep(0.01)
+        assert worker.heartbeat() == []
+        assert _job(job_id)["lease_expires_at"] > before
+        with get_session() as session:
+            session.execute(
+                text("UPDATE processing_jobs SET worker_id = 'other' WHERE id = :id"),
+                {"id": job_id},
+            )
+            session.commit()
+        assert worker.heartbeat() == [job_id]
+    finally:
+        release.set()
+        worker.close()
+        builder.shutdown()
+
+
+def test_worker_runs_claimed_jobs_to_completion():
+    _insert_events("198.51.100.7", 12)
+    job_id = create_fingerprint_job("198.51.100.7")
+    with ThreadPoolExecutor(max_workers=1) as builder:
+        worker = FingerprintWorker(2, builder)
+        worker.drain()
+        worker.close()
+    assert _job(job_id)["status"] == "completed"
+    stored = _fingerprint("198.51.100.7")
+    with get_session() as session:
+        expected = build_fingerprint(
+            EventRepository(session).get_events_for_fingerprint("198.51.100.7")
+        )
+    assert stored["event_count_at_computation"] == 12
+    assert stored["sequence_features"] == expected["sequence_features"]
+    assert stored["credential_features"] == expected["credential_features"]
+
+
+def test_worker_builds_on_spawned_process_pool():
+    _insert_events("198.51.100.8", 6)
+    job_id = create_fingerprint_job("198.51.100.8")
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as builder:
+        worker = FingerprintWorker(1, builder)
+        worker.drain()
+        worker.close()
+    assert _job(job_id)["status"] == "completed"
+    assert _fingerprint("198.51.100.8")["event_count_at_computation"] == 6
+
+
+def test_worker_fails_job_when_build_raises(monkeypatch):
+    monkeypatch.setattr(
+        "app.intelligence.fingerprint.build_fingerprint",
+        lambda events: (_ for _ in ()).throw(RuntimeError("boom")),
+    )
+    _insert_events("198.51.100.9", 3)
+    job_id = create_fingerprint_job("198.51.100.9")
+    with ThreadPoolExecutor(max_workers=1) as builder:
+        worker = FingerprintWorker(1, builder)
+        worker.drain()
+        worker.close()
+    assert _job(job_id)["status"] == "failed"
+
+
+def test_main_once_drains_pending_jobs():
+    _insert_events("198.51.100.10", 4)
+    job_id = create_fingerprint_job("198.51.100.10")
+    main(["--once", "--processes", "1"])
+    assert _job(job_id)["status"] == "completed"
+
+
+def test_worker_rejects_zero_slots_and_lease():
+    with pytest.raises(ValueError):
+        FingerprintWorker(0, ThreadPoolExecutor(max_workers=1))
+    with pytest.raises(ValueError):
+        FingerprintWorker(1, ThreadPoolExecutor(max_workers=1), lease_seconds=0)
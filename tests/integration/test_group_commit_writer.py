@@ -0,0 +1,280 @@
+"""
+Integration tests for the group-commit writer (app/db/connection.py).
+
+Verifies that write units from many threads are committed in groups by one
+thread, that a failing unit rolls back only itself, that a failed group
+commit (or SAVEPOINT) is retried unit by unit with no future left unresolved,
+that the writer thread survives an unexpected failure, and that ingest and fingerprint jobs still
+work end to end when DB_GROUP_COMMIT is on.
+
+Schema is bootstrapped by tests/conftest.py; rows are reset per test by
+tests/integration/conftest.py.
+"""
+
+from __future__ import annotations
+
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+import app.db.connection as connection_module
+import app.utils.asn as asn_module
+import app.utils.geoip as geoip_module
+from app.core.config import settings
+from app.db.connection import (
+    GroupCommitWriter,
+    get_engine,
+    get_group_commit_writer,
+    run_write,
+    shutdown_group_commit_writer,
+)
+from app.db.repository import EventRepository
+from app.main import app
+
+client = TestClient(app)
+HEADERS = {"x-api-key": "dev-123", "Content-Type": "application/json"}
+
+
+def _audit_unit(tag: str):
+    def _unit(session):
+        EventRepository(session).insert_audit_log(event_type="test", detail=tag)
+        return tag
+
+    return _unit
+
+
+def _audit_details() -> set[str]:
+    with get_engine().connect() as conn:
+        rows = conn.execute(text("SELECT detail FROM audit_log WHERE event_type = 'test'"))
+        return {r[0] for r in rows}
+
+
+@pytest.fixture()
+def group_commit(monkeypatch):
+    monkeypatch.setattr(settings, "DB_GROUP_COMMIT", True)
+    shutdown_group_commit_writer()
+    yield get_group_commit_writer()
+    shutdown_group_commit_writer()
+
+
+# ---------------------------------------------------------------------------
+# GroupCommitWriter
+# ---------------------------------------------------------------------------
+
+
+def test_units_from_many_threads_share_group_commits(monkeypatch):
+    groups: list[int] = []
+    original = GroupCommitWriter._commit_group
+
+    def _spy(self, group):
+        groups.append(len(group))
+        original(self, group)
+
+    monkeypatch.setattr(GroupCommitWriter, "_commit_group", _spy)
+    writer = GroupCommitWriter(max_units=64, window_seconds=0.05)
+    try:
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            futures = list(pool.map(lambda i: writer.submit(_audit_unit(f"u{i}")), range(40)))
+        assert [f.result(timeout=5) for f in futures] == [f"u{i}" for i in range(40)]
+    finally:
+        writer.close()
+
+    assert sum(groups) == 40
+    assert len(groups) < 40
+    assert _audit_details() == {f"u{i}" for i in range(40)}
+
+
+def test_group_size_capped_by_max_units(monkeypatch):
+    groups: list[int] = []
+    original = GroupCommitWriter._commit_group
+
+    def _spy(self, group):
+        groups.append(len(group))
+        original(self, group)
+
+    monkeypatch.setattr(GroupCommitWriter, "_commit_group", _spy)
+    gate = threading.Event()
+    writer = GroupCommitWriter(max_units=3, window_seconds=0.5)
+    try:
+        blocker = writer.submit(lambda session: gate.wait(5))
+        futures = [writer.submit(_audit_unit(f"u{i}")) for i in range(5)]
+        gate.set()
+        blocker.result(timeout=5)
+        for f in futures:
+            f.result(timeout=5)
+    finally:
+        writer.close()
+    assert max(groups) <= 3
+
+
+def test_failing_unit_rolls_back_only_itself():
+    def _boom(session):
+        EventRepository(session).insert_audit_log(event_type="test", detail="boom")
+        raise ValueError("unit failed")
+
+    writer = GroupCommitWriter(max_units=64, window_seconds=0.05)
+    try:
+        ok_before = writer.submit(_audit_unit("before"))
+        bad = writer.submit(_boom)
+        ok_after = writer.submit(_audit_unit("after"))
+        assert ok_before.result(timeout=5) == "before"
+        assert ok_after.result(timeout=5) == "after"
+        with pytest.raises(ValueError, match="unit failed"):
+            bad.result(timeout=5)
+    finally:
+        writer.close()
+    assert _audit_details() == {"before", "after"}
+
+
+def test_failed_group_commit_retried_per_unit(monkeypatch):
+    real_factory = connection_module._get_session_factory()
+    calls = {"n": 0}
+
+    def _factory():
+        session = real_factory()
+        calls["n"] += 1
+        if calls["n"] == 1:
+
+            def _fail_commit():
+                raise RuntimeError("disk I/O error")
+
+            session.commit = _fail_commit
+        return session
+
+    monkeypatch.setattr(connection_module, "_get_session_factory", lambda: _factory)
+    writer = GroupCommitWriter(max_units=64, window_seconds=0.2)
+    try:
+        futures = [writer.submit(_audit_unit(f"u{i}")) for i in range(3)]
+        assert [f.result(timeout=5) for f in futures] == ["u0", "u1", "u2"]
+    finally:
+        writer.close()
+    assert _audit_details() == {"u0", "u1", "u2"}
+
+
+def test_failed_savepoint_begin_leaves_no_unit_unresolved(monkeypatch):
+    real_factory = connection_module._get_session_factory()
+    sessions = {"n": 0}
+
+    def _factory():
+        session = real_factory()
+        sessions["n"] += 1
+        if sessions["n"] == 1:
+            begin_nested = session.begin_nested
+            calls = {"n": 0}
+
+            def _fail_second_savepoint():
+                calls["n"] += 1
+                if calls["n"] == 2:
+                    raise RuntimeError("database is locked")
+                return begin_nested()
+
+            session.begin_nested = _fail_second_savepoint
+        return session
+
+    monkeypatch.setattr(connection_module, "_get_session_factory", lambda: _factory)
+    writer = GroupCommitWriter(max_units=64, window_seconds=0.2)
+    try:
+        futures = [writer.submit(_audit_unit(f"u{i}")) for i in range(3)]
+        assert [f.result(timeout=5) for f in futures] == ["u0", "u1", "u2"]
+    finally:
+        writer.close()
+    assert _audit_details() == {"u0", "u1", "u2"}
+
+
+def test_writer_survives_unexpected_group_failure(monkeypatch):
+    original = GroupCommitWriter._commit_group
+    failures = [RuntimeError("writer bug")]
+
+    def _fail_once(self, group):
+        if failures:
+            raise failures.pop()
+        original(self, group)
+
+    monkeypatch.setattr(GroupCommitWriter, "_commit_group", _fail_once)
+    writer = GroupCommitWriter(max_units=64, window_seconds=0.05)
+    try:
+        with pytest.raises(RuntimeError, match="writer bug"):
+            writer.submit(_audit_unit("lost")).result(timeout=5)
+        assert writer.submit(_audit_unit("after")).result(timeout=5) == "after"
+    finally:
+        writer.close()
+    assert _audit_details() == {"after"}
+
+
+def test_close_commits_pending_units_and_refuses_new_ones():
+    writer = GroupCommitWriter(max_units=64, window_seconds=0.2)
+    futures = [writer.submit(_audit_unit(f"u{i}")) for i in range(5)]
+    writer.close()
+    assert all(f.done() for f in futures)
+    assert _audit_details() == {f"u{i}" for i in range(5)}
+    with pytest.raises(RuntimeError):
+        writer.submit(_audit_unit("late"))
+
+
+def test_unit_may_not_submit_to_writer():
+    writer = GroupCommitWriter(max_units=64, window_seconds=0.0)
+    try:
+        future = writer.submit(lambda session: writer.submit(_audit_unit("nested")))
+        with pytest.raises(RuntimeError, match="must not submit"):
+            future.result(timeout=5)
+    finally:
+        writer.close()
+
+
+# ---------------------------------------------------------------------------
+# run_write routing
+# ---------------------------------------------------------------------------
+
+
+def test_run_write_runs_inline_when_group_commit_off():
+    assert get_group_commit_writer() is None
+    thread = run_write(lambda session: threading.current_thread().name)
+    assert thread == threading.current_thread().name
+
+
+def test_run_write_routes_through_writer_when_enabled(group_commit):
+    thread = run_write(lambda session: threading.current_thread().name)
+    assert thread == "db-writer"
+
+
+def test_run_write_propagates_unit_exception(group_commit):
+    with pytest.raises(KeyError):
+        run_write(lambda session: {}["missing"])
+
+
+def test_ingest_and_fingerprint_job_through_writer(group_commit, monkeypatch, tmp_path):
+    monkeypatch.setattr(geoip_module, "CITY_DB_PATH", tmp_path / "absent-city.mmdb")
+    monkeypatch.setattr(asn_module, "ASN_DB_PATH", tmp_path / "absent-asn.mmdb")
+    geoip_module.reset_reader_for_testing()
+    asn_module.reset_asn_reader_for_testing()
+
+    events = [
+        {
+            "id": str(uuid.uuid4()),
+            "ts": f"2025-10-28T18:31:{i:02d}+00:00",
+            "source": "cowrie",
+            "type": "cowrie.login.failed",
+            "data": {"ip": "8.8.8.8", "username": "root", "password": "bad"},
+        }
+        for i in range(5)
+    ]
+    r = client.post("/api/ingest", json={"events": events}, headers=HEADERS)
+    assert r.status_code == 200
+    assert r.json()["accepted"] == 5
+
+    with get_engine().connect() as conn:
+        status = conn.execute(
+            text(
+                "SELECT status FROM processing_jobs "
+                "WHERE deduplication_key = 'fingerprint:8.8.8.8'"
+            )
+        ).scalar()
+        fp_count = conn.execute(
+            text("SELECT COUNT(*) FROM behavioral_fingerprints WHERE source_ip = '8.8.8.8'")
+        ).scalar()
+    assert status == "completed"
+    assert fp_count == 1
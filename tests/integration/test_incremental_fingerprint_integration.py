@@ -0,0 +1,285 @@
+"""Integration tests for incremental fingerprint refreshes (_compute_and_store).
+
+Verifies that a refresh folds only newly ingested events into the stored
+fingerprint_state, that the result matches a full rebuild, and that the state
+is rebuilt from all events when it cannot be extended (pruned rows, events
+older than the state, version change, full_rebuild).  Bounded
+FINGERPRINT_WINDOW modes build from the window only and record its label.
+
+Schema is bootstrapped by tests/conftest.py; rows are reset per test by
+tests/integration/conftest.py.
+"""
+
+from __future__ import annotations
+
+import json
+import uuid
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from sqlalchemy import text
+
+import app.intelligence.fingerprint as fingerprint_module
+from app.core.config import settings
+from app.db.connection import get_engine, get_session
+from app.db.repository import EventRepository
+from app.intelligence.fingerprint import build_fingerprint
+from app.intelligence.tasks import _compute_and_store
+from app.schemas.models import HoneypotEvent, RawEvent
+
+_IP = "198.51.100.23"
+_BASE = datetime(2026, 3, 1, 8, 0, 0, tzinfo=UTC)
+_FEATURE_COLUMNS = (
+    "sequence_features",
+    "protocol_features",
+    "credential_features",
+    "target_features",
+    "tool_signals",
+)
+
+
+def _insert_events(offsets: list[int], ingested_at: str, ip: str = _IP) -> list[str]:
+    ids = []
+    with get_session() as session:
+        repo = EventRepository(session)
+        for i, offset in enumerate(offsets):
+            eid = str(uuid.uuid4())
+            ts = _BASE + timedelta(seconds=offset)
+            data = {"ip": ip, "username": "root", "password": f"pw{i % 3}"}
+            repo.insert_raw_event(
+                RawEvent(
+                    id=eid,
+                    ts=ts.isoformat(),
+                    source="cowrie",
+                    type="cowrie.login.failed",
+                    data=data,
+                )
+            )
+            repo.insert_event(
+                HoneypotEvent(
+                    id=eid,
+                    ts=ts,
+                    ingested_at=ts,
+                    source="cowrie",
+                    event_type="auth_failed" if i % 4 else "port_scan",
+                    src_ip=ip,
+                    dst_port=22 if i % 5 else 2222,
+                    service="ssh",
+                )
+            )
+            repo.upsert_source_ip(ip, ts)
+            ids.append(eid)
+        for eid in ids:
+            session.execute(
+                text("UPDATE raw_events SET ingested_at = :at WHERE id = :id"),
+                {"at": ingested_at, "id": eid},
+            )
+    return ids
+
+
+def _stored() -> tuple[dict, dict | None]:
+    with get_session() as session:
+        repo = EventRepository(session)
+        return repo.get_behavioral_fingerprint(_IP), repo.get_fingerprint_state(_IP)
+
+
+def _full_rebuild() -> dict:
+    with get_session() as session:
+        return build_fingerprint(EventRepository(session).get_events_for_fingerprint(_IP))
+
+
+def _assert_matches_full_rebuild(stored: dict) -> None:
+    full = _full_rebuild()
+    assert stored["event_count_at_computation"] == full["event_count"]
+    assert stored["confidence"] == full["confidence"]
+    for column in _FEATURE_COLUMNS:
+        assert stored[column] == full[column], column
+    timing, full_timing = json.loads(stored["timing_features"]), json.loads(full["timing_features"])
+    for key, value in full_timing["interval"].items():
+        assert timing["interval"][key] == pytest.approx(value, abs=0.0011), key
+
+
+@pytest.fixture()
+def full_scans(monkeypatch):
+    """Count build_fingerprint() calls made by _compute_and_store()."""
+    calls: list[int] = []
+    original = fingerprint_module.build_fingerprint
+
+    def _spy(events):
+        calls.append(len(events))
+        return original(events)
+
+    monkeypatch.setattr(fingerprint_module, "build_fingerprint", _spy)
+    return calls
+
+
+def test_first_refresh_builds_state_from_all_events(full_scans):
+    _insert_events(list(range(0, 120, 10)), "2026-03-01T09:00:00+00:00")
+    _compute_and_store(_IP)
+    fp, state = _stored()
+    assert full_scans == [12]
+    assert state["event_count"] == 12
+    assert state["watermark"] == "2026-03-01T09:00:00+00:00"
+    _assert_matches_full_rebuild(fp)
+
+
+def test_refresh_folds_only_new_events(full_scans, monkeypatch):
+    _insert_events(list(range(0, 120, 10)), "2026-03-01T09:00:00+00:00")
+    _compute_and_store(_IP)
+    _insert_events(list(range(200, 400, 7)), "2026-03-01T09:05:00+00:00")
+
+    fetched: list[tuple[str | None, int]] = []
+    original = EventRepository.get_fingerprint_events_since
+
+    def _spy(self, ip, ingested_after):
+        events, watermark = original(self, ip, ingested_after)
+        fetched.append((ingested_after, len(events)))
+        return events, watermark
+
+    monkeypatch.setattr(EventRepository, "get_fingerprint_events_since", _spy)
+    _compute_and_store(_IP)
+
+    fp, state = _stored()
+    assert full_scans == [12]  # no second full scan
+    assert fetched == [("2026-03-01T09:00:00+00:00", 29)]
+    assert state["event_count"] == 41
+    assert state["watermark"] == "2026-03-01T09:05:00+00:00"
+    _assert_matches_full_rebuild(fp)
+
+
+def test_refresh_without_new_events_reuses_state(full_scans):
+    _insert_events([0, 30, 60], "2026-03-01T09:00:00+00:00")
+    _compute_and_store(_IP)
+    _compute_and_store(_IP)
+    fp, state = _stored()
+    assert full_scans == [3]
+    assert state["event_count"] == 3
+    _assert_matches_full_rebuild(fp)
+
+
+def test_pruned_events_trigger_rebuild(full_scans):
+    ids = _insert_events([0, 30, 60, 90], "2026-03-01T09:00:00+00:00")
+    _compute_and_store(_IP)
+    with get_engine().connect() as conn:
+        conn.execute(text("DELETE FROM events WHERE id = :id"), {"id": ids[0]})
+        conn.execute(text("DELETE FROM raw_events WHERE id = :id"), {"id": ids[0]})
+        conn.commit()
+    _compute_and_store(_IP)
+    fp, state = _stored()
+    assert full_scans == [4, 3]
+    assert state["event_count"] == 3
+    _assert_matches_full_rebuild(fp)
+
+
+def test_event_committed_behind_watermark_triggers_rebuild(full_scans):
+    _insert_events([0, 30], "2026-03-01T09:00:00+00:00")
+    _compute_and_store(_IP)
+    _insert_events([60], "2026-03-01T08:59:59+00:00")  # ingested_at behind the watermark
+    _compute_and_store(_IP)
+    fp, state = _stored()
+    assert full_scans == [2, 3]
+    assert state["event_count"] == 3
+    _assert_matches_full_rebuild(fp)
+
+
+def test_out_of_order_event_triggers_rebuild(full_scans):
+    _insert_events([100, 200], "2026-03-01T09:00:00+00:00")
+    _compute_and_store(_IP)
+    _insert_events([50], "2026-03-01T09:05:00+00:00")  # older ts, newer ingest
+    _compute_and_store(_IP)
+    fp, state = _stored()
+    assert full_scans == [2, 3]
+    _assert_matches_full_rebuild(fp)
+
+
+def test_state_version_mismatch_triggers_rebuild(full_scans, monkeypatch):
+    _insert_events([0, 30], "2026-03-01T09:00:00+00:00")
+    _compute_and_store(_IP)
+    monkeypatch.setattr("app.intelligence.constants.FINGERPRINT_STATE_VERSION", 99)
+    _compute_and_store(_IP)
+    _, state = _stored()
+    assert full_scans == [2, 2]
+    assert state["state_version"] == 99
+
+
+def test_full_rebuild_flag_bypasses_state(full_scans):
+    _insert_events([0, 30], "2026-03-01T09:00:00+00:00")
+    _compute_and_store(_IP)
+    _compute_and_store(_IP, full_rebuild=True)
+    assert full_scans == [2, 2]
+
+
+def test_incremental_disabled_always_scans_and_writes_no_state(full_scans, monkeypatch):
+    monkeypatch.setattr(settings, "FINGERPRINT_INCREMENTAL", False)
+    _insert_events([0, 30], "2026-03-01T09:00:00+00:00")
+    _compute_and_store(_IP)
+    _compute_and_store(_IP)
+    _, state = _stored()
+    assert full_scans == [2, 2]
+    assert state is None
+
+
+# ---------------------------------------------------------------------------
+# Bounded fingerprint windows
+# ---------------------------------------------------------------------------
+
+
+def _history_windows() -> list[tuple[str | None, int]]:
+    with get_engine().connect() as conn:
+        rows = conn.execute(
+            text(
+                "SELECT fingerprint_window, event_count_at_computation "
+                "FROM fingerprint_history WHERE source_ip = :ip ORDER BY computed_at"
+            ),
+            {"ip": _IP},
+        ).fetchall()
+    return [(r[0], r[1]) for r in rows]
+
+
+def test_last_events_window_builds_from_newest_events(full_scans, monkeypatch):
+    monkeypatch.setattr(settings, "FINGERPRINT_WINDOW", "last_events")
+    monkeypatch.setattr(settings, "FINGERPRINT_WINDOW_EVENTS", 5)
+    _insert_events(list(range(0, 120, 10)), "2026-03-01T09:00:00+00:00")
+    _compute_and_store(_IP)
+    fp, state = _stored()
+    assert full_scans == [5]
+    assert fp["event_count_at_computation"] == 5
+    assert state is None
+    assert _history_windows() == [("last_events:5", 5)]
+
+
+def test_last_days_window_counts_back_from_newest_event(full_scans, monkeypatch):
+    monkeypatch.setattr(settings, "FINGERPRINT_WINDOW", "last_days")
+    monkeypatch.setattr(settings, "FINGERPRINT_WINDOW_DAYS", 1)
+    two_days = 2 * 86400
+    _insert_events([0, 30, two_days, two_days + 30, two_days + 60], "2026-03-03T09:00:00+00:00")
+    _compute_and_store(_IP)
+    assert full_scans == [3]
+    assert _history_windows() == [("last_days:1:100000", 3)]
+
+
+def test_last_days_window_is_capped_at_window_events(full_scans, monkeypatch):
+    monkeypatch.setattr(settings, "FINGERPRINT_WINDOW", "last_days")
+    monkeypatch.setattr(settings, "FINGERPRINT_WINDOW_DAYS", 30)
+    monkeypatch.setattr(settings, "FINGERPRINT_WINDOW_EVENTS", 4)
+    _insert_events(list(range(0, 120, 10)), "2026-03-01T09:00:00+00:00")
+    _compute_and_store(_IP)
+    assert full_scans == [4]
+    assert _history_windows() == [("last_days:30:4", 4)]
+
+
+def test_sample_window_records_label(full_scans, monkeypatch):
+    monkeypatch.setattr(settings, "FINGERPRINT_WINDOW", "sample")
+    monkeypatch.setattr(settings, "FINGERPRINT_WINDOW_EVENTS", 4)
+    _insert_events(list(range(0, 120, 10)), "2026-03-01T09:00:00+00:00")
+    _compute_and_store(_IP)
+    _compute_and_store(_IP)
+    assert full_scans == [4, 4]
+    # The sample is deterministic: the second build reproduces the first.
+    assert _history_windows() == [("sample:4", 4)]
+
+
+def test_default_window_recorded_as_all(full_scans):
+    _insert_events([0, 30], "2026-03-01T09:00:00+00:00")
+    _compute_and_store(_IP)
+    assert _history_windows() == [("all", 2)]
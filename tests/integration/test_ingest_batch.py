@@ -0,0 +1,272 @@
+"""
+Integration tests for the set-based batch ingest engine (app/ingest/batch.py).
+
+Verifies that POST /api/ingest keeps per-event receipt and deduplication
+semantics while issuing a bounded number of statements per batch, and that
+the aggregated source_ips end state matches sequential per-event ingest.
+
+Schema is bootstrapped by tests/conftest.py; rows are reset per test by
+tests/integration/conftest.py.
+"""
+
+from __future__ import annotations
+
+import json
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event, text
+
+import app.utils.asn as asn_module
+import app.utils.geoip as geoip_module
+from app.core.config import settings
+from app.db.connection import get_engine
+from app.db.repository import EventRepository
+from app.ingest.dedup import get_recent_event_ids, reset_recent_event_ids_for_testing
+from app.intelligence.constants import MIN_EVENTS_FOR_CLUSTERING
+from app.main import app
+
+client = TestClient(app)
+HEADERS = {"x-api-key": "dev-123", "Content-Type": "application/json"}
+
+
+def _event(
+    event_id: str | None = None,
+    ip: str = "8.8.8.8",
+    ts: str = "2025-10-28T18:31:08+00:00",
+    raw_type: str = "cowrie.login.failed",
+) -> dict:
+    return {
+        "id": event_id or str(uuid.uuid4()),
+        "ts": ts,
+        "source": "cowrie",
+        "type": raw_type,
+        "data": {"ip": ip, "username": "root", "password": "bad"},
+    }
+
+
+def _ingest(events: list[dict]) -> dict:
+    r = client.post("/api/ingest", json={"events": events}, headers=HEADERS)
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def _source_ip_rows() -> list[tuple]:
+    with get_engine().connect() as conn:
+        rows = conn.execute(text("""
+                SELECT ip, first_seen, last_seen, event_count, tags, reputation_score
+                FROM source_ips ORDER BY ip
+                """)).fetchall()
+    return [tuple(r) for r in rows]
+
+
+@pytest.fixture(autouse=True)
+def no_mmdb(monkeypatch, tmp_path):
+    monkeypatch.setattr(geoip_module, "CITY_DB_PATH", tmp_path / "absent-city.mmdb")
+    monkeypatch.setattr(asn_module, "ASN_DB_PATH", tmp_path / "absent-asn.mmdb")
+    geoip_module.reset_reader_for_testing()
+    asn_module.reset_asn_reader_for_testing()
+
+
+@pytest.fixture(autouse=True)
+def no_fingerprint_tasks(monkeypatch):
+    """Keep background fingerprinting out of source_ips comparisons and statement counts."""
+    monkeypatch.setattr(
+        "app.routers.ingest.schedule_fingerprints_for_batch", lambda ips, first, bt: None
+    )
+
+
+# ---------------------------------------------------------------------------
+# Receipt semantics
+# ---------------------------------------------------------------------------
+
+
+def test_repeated_id_within_batch_counted_as_duplicate():
+    ev = _event()
+    receipt = _ingest([ev, _event(), ev])
+    assert receipt["accepted"] == 2
+    assert receipt["duplicate"] == 1
+    with get_engine().connect() as conn:
+        count = conn.execute(
+            text("SELECT COUNT(*) FROM raw_events WHERE id = :id"), {"id": ev["id"]}
+        ).scalar()
+    assert count == 1
+
+
+def test_rejected_event_keeps_batch_index_among_duplicates():
+    existing = _event()
+    _ingest([existing])
+    bad = _event()
+    bad["ts"] = "garbage"
+    receipt = _ingest([existing, _event(), bad])
+    assert receipt == {
+        "batch_id": receipt["batch_id"],
+        "accepted": 1,
+        "rejected": 1,
+        "duplicate": 1,
+        "errors": [{"index": 2, "reason": "unparseable timestamp: 'garbage'"}],
+    }
+
+
+def test_dedup_race_falls_back_to_per_event_inserts(monkeypatch):
+    """An id missed by the bulk dedup read must be counted as duplicate, not 500."""
+    racing = _event()
+    _ingest([racing])
+
+    monkeypatch.setattr(EventRepository, "events_exist", lambda self, ids: set())
+    fresh = _event()
+    receipt = _ingest([racing, fresh])
+    assert receipt["accepted"] == 1
+    assert receipt["duplicate"] == 1
+
+    rows = _source_ip_rows()
+    assert rows[0][3] == 2  # the racing id must not be counted twice
+
+
+# ---------------------------------------------------------------------------
+# Recent-id pre-filter
+# ---------------------------------------------------------------------------
+
+
+@pytest.fixture()
+def recent_id_filter(monkeypatch):
+    monkeypatch.setattr(settings, "INGEST_RECENT_ID_CACHE_SIZE", 1000)
+    reset_recent_event_ids_for_testing()
+    yield get_recent_event_ids()
+    reset_recent_event_ids_for_testing()
+
+
+def test_recent_id_filter_answers_replayed_batch_without_db(recent_id_filter, monkeypatch):
+    events = [_event() for _ in range(3)]
+    _ingest(events)
+
+    checked: list[list[str]] = []
+    original = EventRepository.events_exist
+
+    def _spy(self, ids):
+        checked.append(list(ids))
+        return original(self, ids)
+
+    monkeypatch.setattr(EventRepository, "events_exist", _spy)
+    fresh = _event()
+    receipt = _ingest([*events, fresh])
+    assert receipt["accepted"] == 1
+    assert receipt["duplicate"] == 3
+    assert checked == [[fresh["id"]]]
+
+
+def test_recent_id_filter_remembers_db_confirmed_duplicates(recent_id_filter):
+    ev = _event()
+    _ingest([ev])
+    recent_id_filter.clear()
+
+    _ingest([ev])  # miss → DB confirms duplicate → remembered
+    known, _ = recent_id_filter.split([ev["id"]])
+    assert known == {ev["id"]}
+
+
+def test_recent_id_filter_not_populated_on_rollback(recent_id_filter, monkeypatch):
+    def _boom(self, rows):
+        raise RuntimeError("simulated write failure")
+
+    monkeypatch.setattr(EventRepository, "upsert_source_ips_bulk", _boom)
+    ev = _event()
+    with pytest.raises(RuntimeError):
+        _ingest([ev])
+    assert len(recent_id_filter) == 0
+
+
+# ---------------------------------------------------------------------------
+# source_ips end state
+# ---------------------------------------------------------------------------
+
+
+def test_batch_source_ips_state_matches_sequential_ingest():
+    events = [
+        _event(ip="8.8.8.8", ts="2025-10-28T18:31:08+00:00"),
+        _event(ip="1.1.1.1", ts="2025-10-28T18:31:09+00:00", raw_type="cowrie.command.input"),
+        _event(ip="8.8.8.8", ts="2025-10-28T18:31:05+00:00", raw_type="cowrie.command.input"),
+        _event(ip="8.8.8.8", ts="2025-10-28T18:31:20+00:00"),
+    ]
+    for ev in events:
+        _ingest([ev])
+    sequential = _source_ip_rows()
+
+    with get_engine().connect() as conn:
+        conn.execute(text("DELETE FROM events"))
+        conn.execute(text("DELETE FROM raw_events"))
+        conn.execute(text("DELETE FROM source_ips"))
+        conn.commit()
+
+    _ingest(events)
+    assert _source_ip_rows() == sequential
+    assert json.loads(sequential[1][4]) == ["brute-force", "command-exec"]
+
+
+def test_brute_force_batch_onto_existing_ip_matches_sequential_ingest():
+    earlier = _event(ts="2025-10-28T18:30:00+00:00", raw_type="cowrie.command.input")
+    burst = [_event(ts=f"2025-10-28T18:31:{i % 60:02d}+00:00") for i in range(120)]
+
+    _ingest([earlier])
+    for ev in burst:
+        _ingest([ev])
+    sequential = _source_ip_rows()
+
+    with get_engine().connect() as conn:
+        conn.execute(text("DELETE FROM events"))
+        conn.execute(text("DELETE FROM raw_events"))
+        conn.execute(text("DELETE FROM source_ips"))
+        conn.commit()
+
+    _ingest([earlier])
+    _ingest(burst)
+    assert _source_ip_rows() == sequential
+    assert sequential[0][3] == 121
+
+
+# ---------------------------------------------------------------------------
+# Statement budget
+# ---------------------------------------------------------------------------
+
+
+def test_statement_count_independent_of_batch_size():
+    """A 200-event batch from one IP must not issue per-event statements."""
+    statements: list[str] = []
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = get_engine()
+    event.listen(engine, "before_cursor_execute", _count)
+    try:
+        receipt = _ingest([_event() for _ in range(200)])
+    finally:
+        event.remove(engine, "before_cursor_execute", _count)
+
+    assert receipt["accepted"] == 200
+    assert len(statements) < 30
+
+
+# ---------------------------------------------------------------------------
+# Fingerprint scheduling priority hint
+# ---------------------------------------------------------------------------
+
+
+def test_threshold_ips_reported_once_when_clustering_minimum_reached(monkeypatch):
+    scheduled: list[tuple[set, set]] = []
+    monkeypatch.setattr(
+        "app.routers.ingest.schedule_fingerprints_for_batch",
+        lambda ips, first, bt: scheduled.append((set(ips), set(first))),
+    )
+    minimum = MIN_EVENTS_FOR_CLUSTERING
+    _ingest([_event() for _ in range(minimum - 1)] + [_event(ip="1.1.1.1")])
+    _ingest([_event(), _event(ip="1.1.1.1")])
+    _ingest([_event()])
+    _ingest([_event(ip="9.9.9.9") for _ in range(minimum + 3)])
+    assert scheduled == [
+        ({"8.8.8.8", "1.1.1.1"}, set()),
+        ({"8.8.8.8", "1.1.1.1"}, {"8.8.8.8"}),
+        ({"8.8.8.8"}, set()),
+        ({"9.9.9.9"}, {"9.9.9.9"}),
+    ]
@@ -0,0 +1,339 @@
+"""
+Integration tests for the write-behind ingest queue (app/ingest/queue.py).
+
+Covers the 202/503 contract of POST /api/ingest in write-behind mode,
+coalescing of queued batches into one transaction, shutdown drain, spool
+replay after a simulated crash, and failed batches kept for retry.
+
+Schema is bootstrapped by tests/conftest.py; rows are reset per test by
+tests/integration/conftest.py.
+"""
+
+from __future__ import annotations
+
+import json
+import time
+import uuid
+from datetime import UTC, datetime
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+import app.ingest.queue as queue_module
+import app.utils.asn as asn_module
+import app.utils.geoip as geoip_module
+from app.core.config import settings
+from app.db.connection import get_engine
+from app.ingest.queue import IngestQueue, QueuedBatch, get_ingest_queue, shutdown_ingest_queue
+from app.main import app
+from app.schemas.models import RawEvent
+
+client = TestClient(app)
+HEADERS = {"x-api-key": "dev-123", "Content-Type": "application/json"}
+
+
+def _event(event_id: str | None = None, ip: str = "8.8.8.8") -> dict:
+    return {
+        "id": event_id or str(uuid.uuid4()),
+        "ts": "2025-10-28T18:31:08+00:00",
+        "source": "cowrie",
+        "type": "cowrie.login.failed",
+        "data": {"ip": ip, "username": "root", "password": "bad"},
+    }
+
+
+def _batch(n: int = 2) -> QueuedBatch:
+    return QueuedBatch(
+        batch_id=str(uuid.uuid4()),
+        ingested_at=datetime.now(UTC),
+        events=[RawEvent.model_validate(_event()) for _ in range(n)],
+    )
+
+
+def _raw_event_count() -> int:
+    with get_engine().connect() as conn:
+        return conn.execute(text("SELECT COUNT(*) FROM raw_events")).scalar()
+
+
+@pytest.fixture(autouse=True)
+def no_mmdb(monkeypatch, tmp_path):
+    monkeypatch.setattr(geoip_module, "CITY_DB_PATH", tmp_path / "absent-city.mmdb")
+    monkeypatch.setattr(asn_module, "ASN_DB_PATH", tmp_path / "absent-asn.mmdb")
+    geoip_module.reset_reader_for_testing()
+    asn_module.reset_asn_reader_for_testing()
+
+
+@pytest.fixture(autouse=True)
+def no_fingerprint_tasks(monkeypatch):
+    monkeypatch.setattr(
+        queue_module, "schedule_fingerprints_for_batch", lambda ips, first, bt: None
+    )
+
+
+@pytest.fixture()
+def write_behind(monkeypatch):
+    """Enable write-behind mode for the router; drain the queue on teardown."""
+    monkeypatch.setattr(settings, "INGEST_ASYNC_QUEUE_BATCHES", 50)
+    shutdown_ingest_queue()
+    yield get_ingest_queue()
+    shutdown_ingest_queue()
+
+
+# ---------------------------------------------------------------------------
+# Router contract
+# ---------------------------------------------------------------------------
+
+
+def test_write_behind_returns_202_and_writes_after_flush(write_behind):
+    events = [_event(), _event()]
+    r = client.post("/api/ingest", json={"events": events}, headers=HEADERS)
+    assert r.status_code == 202
+    body = r.json()
+    assert body["accepted"] == 2
+    assert body["duplicate"] == 0
+
+    write_behind.flush()
+    assert _raw_event_count() == 2
+
+    with get_engine().connect() as conn:
+        detail = conn.execute(
+            text("SELECT detail FROM audit_log WHERE event_type = 'ingest'")
+        ).scalar()
+    assert json.loads(detail) == {
+        "batch_id": body["batch_id"],
+        "accepted": 2,
+        "rejected": 0,
+        "duplicate": 0,
+        "mode": "async",
+    }
+
+
+def test_write_behind_reports_rejections_with_batch_index(write_behind):
+    bad = _event()
+    bad["ts"] = "garbage"
+    r = client.post("/api/ingest", json={"events": [_event(), bad]}, headers=HEADERS)
+    assert r.status_code == 202
+    assert r.json()["rejected"] == 1
+    assert r.json()["errors"] == [{"index": 1, "reason": "unparseable timestamp: 'garbage'"}]
+    write_behind.flush()
+    assert _raw_event_count() == 1
+
+
+def test_write_behind_duplicates_resolved_by_writer(write_behind):
+    ev = _event()
+    client.post("/api/ingest", json={"events": [ev]}, headers=HEADERS)
+    client.post("/api/ingest", json={"events": [ev, ev]}, headers=HEADERS)
+    write_behind.flush()
+    assert _raw_event_count() == 1
+
+
+def test_full_queue_returns_503_with_retry_after(monkeypatch):
+    full = IngestQueue(max_batches=1, max_coalesce_events=100)  # never started
+    assert full.submit(_batch())
+    monkeypatch.setattr("app.routers.ingest.get_ingest_queue", lambda: full)
+
+    r = client.post("/api/ingest", json={"events": [_event()]}, headers=HEADERS)
+    assert r.status_code == 503
+    assert r.headers["Retry-After"] == str(settings.INGEST_ASYNC_RETRY_AFTER_SECONDS)
+
+
+def test_synchronous_mode_unchanged_when_queue_disabled():
+    assert get_ingest_queue() is None
+    r = client.post("/api/ingest", json={"events": [_event()]}, headers=HEADERS)
+    assert r.status_code == 200
+    assert _raw_event_count() == 1
+
+
+# ---------------------------------------------------------------------------
+# Writer thread
+# ---------------------------------------------------------------------------
+
+
+def test_writer_coalesces_queued_batches_into_one_transaction(monkeypatch):
+    groups: list[int] = []
+    original = IngestQueue._commit
+
+    def _spy(self, group, recent_ids):
+        groups.append(len(group))
+        return original(self, group, recent_ids)
+
+    monkeypatch.setattr(IngestQueue, "_commit", _spy)
+    q = IngestQueue(max_batches=10, max_coalesce_events=1000)
+    for _ in range(4):
+        assert q.submit(_batch())
+    q.start()
+    q.close()
+
+    assert groups == [4]
+    assert _raw_event_count() == 8
+
+
+def test_writer_respects_coalesce_event_limit(monkeypatch):
+    groups: list[int] = []
+    original = IngestQueue._commit
+
+    def _spy(self, group, recent_ids):
+        groups.append(len(group))
+        return original(self, group, recent_ids)
+
+    monkeypatch.setattr(IngestQueue, "_commit", _spy)
+    q = IngestQueue(max_batches=10, max_coalesce_events=4)
+    for _ in range(4):
+        q.submit(_batch(2))
+    q.start()
+    q.close()
+    assert groups == [2, 2]
+
+
+def test_failed_group_is_retried_per_batch(monkeypatch):
+    poison = _batch()
+    original = IngestQueue._commit
+
+    def _fail_on_poison(self, group, recent_ids):
+        if any(b is poison for b in group):
+            raise RuntimeError("simulated write failure")
+        return original(self, group, recent_ids)
+
+    monkeypatch.setattr(IngestQueue, "_commit", _fail_on_poison)
+    q = IngestQueue(max_batches=10, max_coalesce_events=1000)
+    q.submit(_batch())
+    q.submit(poison)
+    q.submit(_batch())
+    q.start()
+    q.close()
+    assert _raw_event_count() == 4
+
+
+def test_close_drains_queue_and_refuses_new_batches():
+    q = IngestQueue(max_batches=10, max_coalesce_events=1000)
+    q.start()
+    for _ in range(3):
+        q.submit(_batch())
+    q.close()
+    assert _raw_event_count() == 6
+    assert q.submit(_batch()) is False
+
+
+# ---------------------------------------------------------------------------
+# Spool
+# ---------------------------------------------------------------------------
+
+
+def test_spool_replayed_after_crash(tmp_path):
+    spool = tmp_path / "spool.jsonl"
+    crashed = IngestQueue(max_batches=10, max_coalesce_events=1000, spool_path=spool)
+    crashed.submit(_batch())
+    crashed.submit(_batch())
+    assert len(spool.read_text().splitlines()) == 2
+    assert _raw_event_count() == 0  # writer never ran
+
+    restarted = IngestQueue(max_batches=10, max_coalesce_events=1000, spool_path=spool)
+    restarted.start()
+    restarted.close()
+    assert _raw_event_count() == 4
+    assert spool.read_text() == ""
+
+
+def test_spool_replay_is_idempotent_and_skips_torn_line(tmp_path):
+    spool = tmp_path / "spool.jsonl"
+    batch = _batch()
+    spool.write_text(batch.to_spool_line() + batch.to_spool_line() + '{"batch_id": "tor')
+
+    q = IngestQueue(max_batches=10, max_coalesce_events=1000, spool_path=spool)
+    q.start()
+    q.close()
+    assert _raw_event_count() == 2
+
+
+def test_failed_batch_stays_in_spool(tmp_path, monkeypatch):
+    def _always_fail(self, group, recent_ids):
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(IngestQueue, "_commit", _always_fail)
+    spool = tmp_path / "spool.jsonl"
+    q = IngestQueue(max_batches=10, max_coalesce_events=1000, spool_path=spool)
+    q.start()
+    batch = _batch()
+    q.submit(batch)
+    q.close()
+
+    lines = spool.read_text().splitlines()
+    assert [QueuedBatch.from_spool_line(line).batch_id for line in lines] == [batch.batch_id]
+
+    monkeypatch.undo()
+    restarted = IngestQueue(max_batches=10, max_coalesce_events=1000, spool_path=spool)
+    restarted.start()
+    restarted.close()
+    assert _raw_event_count() == 2
+    assert spool.read_text() == ""
+
+
+def test_failed_replay_keeps_spool(tmp_path, monkeypatch):
+    def _always_fail(self, group, recent_ids):
+        raise RuntimeError("database is locked")
+
+    spool = tmp_path / "spool.jsonl"
+    spool.write_text(_batch().to_spool_line() + _batch().to_spool_line())
+    monkeypatch.setattr(IngestQueue, "_commit", _always_fail)
+    q = IngestQueue(max_batches=10, max_coalesce_events=1000, spool_path=spool)
+    q.start()
+    q.close()
+    assert len(spool.read_text().splitlines()) == 2
+
+
+def test_held_batch_retried_when_writer_is_idle(monkeypatch):
+    flaky = _batch()
+    failures = [RuntimeError("database is locked")] * 4
+    original = IngestQueue._commit
+
+    def _fail_then_succeed(self, group, recent_ids):
+        if any(b is flaky for b in group) and failures:
+            raise failures.pop()
+        return original(self, group, recent_ids)
+
+    monkeypatch.setattr(IngestQueue, "_commit", _fail_then_succeed)
+    q = IngestQueue(max_batches=10, max_coalesce_events=1000)
+    q.start()
+    q.submit(flaky)  # both attempts fail, then both attempts of the idle retry
+    q.flush()
+    assert _raw_event_count() == 0
+    q.submit(_batch())  # the next idle retry commits the held batch
+    q.close()
+    assert _raw_event_count() == 4
+
+
+def test_held_batches_count_toward_capacity(monkeypatch):
+    outage = [True]
+    original = IngestQueue._commit
+
+    def _fail_during_outage(self, group, recent_ids):
+        if outage[0]:
+            raise RuntimeError("database is locked")
+        return original(self, group, recent_ids)
+
+    monkeypatch.setattr(IngestQueue, "_commit", _fail_during_outage)
+    q = IngestQueue(max_batches=2, max_coalesce_events=1000, held_retry_seconds=0.01)
+    q.start()
+    for _ in range(2):
+        assert q.submit(_batch())
+        q.flush()
+    assert not q.submit(_batch())  # both slots are taken by held batches
+
+    outage[0] = False
+    deadline = time.monotonic() + 5
+    while not q.submit(_batch()):  # the idle retry commits the held batches
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    q.close()
+    assert _raw_event_count() == 6
+
+
+def test_spool_truncated_once_writer_is_idle(tmp_path):
+    spool = tmp_path / "spool.jsonl"
+    q = IngestQueue(max_batches=10, max_coalesce_events=1000, spool_path=spool)
+    q.start()
+    q.submit(_batch())
+    q.flush()
+    assert spool.read_text() == ""
+    q.close()
@@ -0,0 +1,225 @@
+"""
+Integration tests for POST /api/ingest/stream (NDJSON, optionally gzip).
+
+Verifies line-indexed rejections, rolling chunk commits, gzip bodies,
+content negotiation, that one receipt covers the whole stream, and that the
+audit write and fingerprint scheduling run off the event loop.
+
+Schema is bootstrapped by tests/conftest.py; rows are reset per test by
+tests/integration/conftest.py.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import gzip
+import json
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+import app.utils.asn as asn_module
+import app.utils.geoip as geoip_module
+from app.core.config import settings
+from app.db.connection import get_engine
+from app.db.repository import EventRepository
+from app.main import app
+
+client = TestClient(app)
+NDJSON_HEADERS = {"x-api-key": "dev-123", "Content-Type": "application/x-ndjson"}
+
+
+def _event(event_id: str | None = None, ip: str = "8.8.8.8", ts: str | None = None) -> dict:
+    return {
+        "id": event_id or str(uuid.uuid4()),
+        "ts": ts or "2025-10-28T18:31:08+00:00",
+        "source": "cowrie",
+        "type": "cowrie.login.failed",
+        "data": {"ip": ip, "username": "root", "password": "bad"},
+    }
+
+
+def _ndjson(lines: list[dict | str]) -> bytes:
+    return "".join((ln if isinstance(ln, str) else json.dumps(ln)) + "\n" for ln in lines).encode()
+
+
+def _stream(body: bytes, headers: dict | None = None):
+    return client.post("/api/ingest/stream", content=body, headers=headers or NDJSON_HEADERS)
+
+
+def _raw_event_count() -> int:
+    with get_engine().connect() as conn:
+        return conn.execute(text("SELECT COUNT(*) FROM raw_events")).scalar()
+
+
+@pytest.fixture(autouse=True)
+def no_mmdb(monkeypatch, tmp_path):
+    monkeypatch.setattr(geoip_module, "CITY_DB_PATH", tmp_path / "absent-city.mmdb")
+    monkeypatch.setattr(asn_module, "ASN_DB_PATH", tmp_path / "absent-asn.mmdb")
+    geoip_module.reset_reader_for_testing()
+    asn_module.reset_asn_reader_for_testing()
+
+
+@pytest.fixture(autouse=True)
+def no_fingerprint_tasks(monkeypatch):
+    monkeypatch.setattr(
+        "app.routers.ingest.schedule_fingerprints_for_batch", lambda ips, first, bt: None
+    )
+
+
+def test_stream_accepts_events_and_returns_single_receipt():
+    r = _stream(_ndjson([_event() for _ in range(3)]))
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert (body["accepted"], body["rejected"], body["duplicate"]) == (3, 0, 0)
+    assert _raw_event_count() == 3
+
+
+def test_stream_error_indices_are_body_line_numbers():
+    dup = _event()
+    lines = [
+        dup,
+        "",  # blank line still counts toward indices
+        "{not json",
+        {"id": "x", "source": "cowrie"},  # missing ts and type
+        _event(ts="garbage"),
+        dup,
+        _event(),
+    ]
+    r = _stream(_ndjson(lines))
+    body = r.json()
+    assert body["accepted"] == 2
+    assert body["duplicate"] == 1
+    assert body["rejected"] == 3
+    assert [e["index"] for e in body["errors"]] == [2, 3, 4]
+    assert body["errors"][2]["reason"] == "unparseable timestamp: 'garbage'"
+
+
+def test_stream_commits_in_rolling_chunks(monkeypatch):
+    monkeypatch.setattr(settings, "INGEST_STREAM_CHUNK_EVENTS", 4)
+    sizes: list[int] = []
+    original = EventRepository.events_exist
+
+    def _spy(self, ids):
+        sizes.append(len(ids))
+        return original(self, ids)
+
+    monkeypatch.setattr(EventRepository, "events_exist", _spy)
+    bad = _event(ts="garbage")
+    r = _stream(_ndjson([_event() for _ in range(5)] + [bad] + [_event() for _ in range(4)]))
+    body = r.json()
+    assert body["accepted"] == 9
+    assert body["errors"] == [{"index": 5, "reason": "unparseable timestamp: 'garbage'"}]
+    assert sizes == [4, 3, 2]  # the bad-ts line fills a chunk slot, rejected in ingest_batch
+
+
+def test_stream_duplicates_across_chunks(monkeypatch):
+    monkeypatch.setattr(settings, "INGEST_STREAM_CHUNK_EVENTS", 2)
+    ev = _event()
+    r = _stream(_ndjson([ev, _event(), _event(), ev]))
+    assert r.json()["accepted"] == 3
+    assert r.json()["duplicate"] == 1
+
+
+def test_stream_gzip_body():
+    body = gzip.compress(_ndjson([_event() for _ in range(20)]))
+    headers = {**NDJSON_HEADERS, "Content-Encoding": "gzip"}
+    r = _stream(body, headers)
+    assert r.status_code == 200, r.text
+    assert r.json()["accepted"] == 20
+
+
+def test_stream_corrupt_gzip_returns_400():
+    headers = {**NDJSON_HEADERS, "Content-Encoding": "gzip"}
+    r = _stream(b"not gzip at all", headers)
+    assert r.status_code == 400
+
+
+def test_stream_oversized_line_rejected(monkeypatch):
+    monkeypatch.setattr(settings, "INGEST_STREAM_MAX_LINE_BYTES", 300)
+    big = _event()
+    big["data"]["payload"] = "A" * 1000
+    r = _stream(_ndjson([_event(), big, _event()]))
+    body = r.json()
+    assert body["accepted"] == 2
+    assert body["errors"] == [{"index": 1, "reason": "line exceeds 300 bytes"}]
+
+
+def test_stream_error_list_is_capped(monkeypatch):
+    monkeypatch.setattr(settings, "INGEST_STREAM_MAX_ERRORS", 2)
+    r = _stream(_ndjson(["{bad"] * 5))
+    body = r.json()
+    assert body["rejected"] == 5
+    assert len(body["errors"]) == 2
+
+
+def test_stream_requires_ndjson_content_type():
+    headers = {**NDJSON_HEADERS, "Content-Type": "application/json"}
+    assert _stream(_ndjson([_event()]), headers).status_code == 415
+
+
+def test_stream_rejects_unknown_content_encoding():
+    headers = {**NDJSON_HEADERS, "Content-Encoding": "br"}
+    assert _stream(_ndjson([_event()]), headers).status_code == 415
+
+
+def test_stream_requires_api_key():
+    r = client.post(
+        "/api/ingest/stream",
+        content=_ndjson([_event()]),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert r.status_code == 401
+
+
+def test_stream_writes_one_audit_row():
+    _stream(_ndjson([_event(), _event()]))
+    with get_engine().connect() as conn:
+        rows = conn.execute(
+            text("SELECT detail FROM audit_log WHERE event_type = 'ingest'")
+        ).fetchall()
+    assert len(rows) == 1
+    detail = json.loads(rows[0][0])
+    assert detail["mode"] == "stream"
+    assert detail["lines"] == 2
+    assert detail["chunks"] == 1
+
+
+def test_stream_audit_and_scheduling_run_off_the_event_loop(monkeypatch):
+    import app.routers.ingest as ingest_module
+
+    on_loop: dict[str, bool] = {}
+
+    def _in_event_loop() -> bool:
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return False
+        return True
+
+    original_audit = ingest_module._record_audit
+
+    def _audit(detail):
+        on_loop["audit"] = _in_event_loop()
+        original_audit(detail)
+
+    def _schedule(ips, first, bt):
+        on_loop["scheduling"] = _in_event_loop()
+
+    monkeypatch.setattr(ingest_module, "_record_audit", _audit)
+    monkeypatch.setattr(ingest_module, "schedule_fingerprints_for_batch", _schedule)
+    assert _stream(_ndjson([_event()])).status_code == 200
+    assert on_loop == {"audit": False, "scheduling": False}
+
+
+def test_stream_stores_received_line_as_raw_json():
+    line = '{"id": "stream-raw-1", "ts": "2025-10-28T18:31:08+00:00", "source": "cowrie", '
+    line += '"type": "cowrie.login.failed", "sensor": "s1", "data": {"ip": "8.8.8.8"}}'
+    assert _stream((line + "\n").encode()).json()["accepted"] == 1
+    with get_engine().connect() as conn:
+        stored = conn.execute(
+            text("SELECT raw_json FROM raw_events WHERE id = 'stream-raw-1'")
+        ).scalar()
+    assert stored == line
@@ -15,7 +15,7 @@ import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import text
 
-import app.routers.ingest as ingest_module
+import app.utils.enrichment as enrichment_module
 import app.utils.geoip as geoip_module
 from app.db.connection import get_engine
 from app.main import app
@@ -103,7 +103,7 @@ def test_cache_miss_calls_enrich_ip_once(no_mmdb, monkeypatch):
         call_count[0] += 1
         return {"country_code": None, "country_name": None, "city": None}
 
-    monkeypatch.setattr(ingest_module, "enrich_ip", counting_enrich)
+    monkeypatch.setattr(enrichment_module, "enrich_ip", counting_enrich)
 
     resp = _ingest(_event("cache-miss-1"))
     assert resp.status_code == 200
@@ -124,7 +124,7 @@ def test_cache_hit_skips_enrich_ip(no_mmdb, monkeypatch):
         call_count[0] += 1
         return {"country_code": "US", "country_name": "United States", "city": "Mountain View"}
 
-    monkeypatch.setattr(ingest_module, "enrich_ip", counting_enrich)
+    monkeypatch.setattr(enrichment_module, "enrich_ip", counting_enrich)
 
     _ingest(_event("cache-hit-first"))
     assert call_count[0] == 1  # cache miss on first event
@@ -141,7 +141,7 @@ def test_different_ips_each_call_enrich_ip(no_mmdb, monkeypatch):
         call_count[0] += 1
         return {"country_code": None, "country_name": None, "city": None}
 
-    monkeypatch.setattr(ingest_module, "enrich_ip", counting_enrich)
+    monkeypatch.setattr(enrichment_module, "enrich_ip", counting_enrich)
 
     _ingest(
         _event("diff-ip-1", ip=PUBLIC_IP),
@@ -0,0 +1,123 @@
+"""
+Integration tests for GET /api/metrics (Prometheus text format).
+
+Verifies the METRICS_ENABLED gate, API-key auth, and that an ingest request
+shows up in the stage histograms, outcome counters and GeoIP cache gauges.
+
+Schema is bootstrapped by tests/conftest.py; rows are reset per test by
+tests/integration/conftest.py.
+"""
+
+from __future__ import annotations
+
+import re
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.ingest.queue as queue_module
+import app.intelligence.scheduler as scheduler_module
+import app.utils.asn as asn_module
+import app.utils.geoip as geoip_module
+from app.core.config import settings
+from app.ingest.metrics import reset_ingest_metrics_for_testing
+from app.main import app
+
+client = TestClient(app)
+HEADERS = {"x-api-key": "dev-123"}
+
+
+def _event(ts: str = "2025-10-28T18:31:08+00:00") -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "ts": ts,
+        "source": "cowrie",
+        "type": "cowrie.login.failed",
+        "data": {"ip": "8.8.8.8", "username": "root", "password": "bad"},
+    }
+
+
+def _sample(body: str, line_prefix: str) -> float:
+    match = re.search(rf"^{re.escape(line_prefix)} (\S+)$", body, re.MULTILINE)
+    assert match, f"{line_prefix} not in metrics output"
+    return float(match.group(1))
+
+
+@pytest.fixture(autouse=True)
+def no_mmdb(monkeypatch, tmp_path):
+    monkeypatch.setattr(geoip_module, "CITY_DB_PATH", tmp_path / "absent-city.mmdb")
+    monkeypatch.setattr(asn_module, "ASN_DB_PATH", tmp_path / "absent-asn.mmdb")
+    geoip_module.reset_reader_for_testing()
+    asn_module.reset_asn_reader_for_testing()
+
+
+@pytest.fixture(autouse=True)
+def no_fingerprint_tasks(monkeypatch):
+    monkeypatch.setattr(
+        "app.routers.ingest.schedule_fingerprints_for_batch", lambda ips, first, bt: None
+    )
+
+
+@pytest.fixture()
+def metrics_on(monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_ENABLED", True)
+    reset_ingest_metrics_for_testing()
+    yield
+    reset_ingest_metrics_for_testing()
+
+
+def test_metrics_404_when_disabled():
+    assert client.get("/api/metrics", headers=HEADERS).status_code == 404
+
+
+def test_metrics_requires_api_key(metrics_on):
+    assert client.get("/api/metrics").status_code == 401
+
+
+def test_metrics_reflect_ingest(metrics_on):
+    events = [_event(), _event(), _event(ts="garbage")]
+    r = client.post("/api/ingest", json={"events": events + [events[0]]}, headers=HEADERS)
+    assert r.status_code == 200
+
+    r = client.get("/api/metrics", headers=HEADERS)
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = r.text
+
+    events_total = "legiontrap_ingest_events_total"
+    assert _sample(body, f'{events_total}{{mode="sync",outcome="accepted"}}') == 2
+    assert _sample(body, f'{events_total}{{mode="sync",outcome="rejected"}}') == 1
+    assert _sample(body, f'{events_total}{{mode="sync",outcome="duplicate"}}') == 1
+    for stage in ("normalization", "dedup", "enrichment", "persistence", "scoring", "commit"):
+        assert _sample(body, f'legiontrap_ingest_stage_seconds_count{{stage="{stage}"}}') == 1
+    assert _sample(body, 'legiontrap_ingest_stage_seconds_count{stage="audit"}') == 1
+    assert _sample(body, "legiontrap_geoip_cache_misses_total") == 1
+    assert _sample(body, "legiontrap_ingest_queue_depth") == 0
+    assert _sample(body, "legiontrap_fingerprint_scheduler_dirty") == 0
+
+
+def test_metrics_scrape_starts_no_background_threads(metrics_on, monkeypatch):
+    monkeypatch.setattr(settings, "FINGERPRINT_MIN_INTERVAL_SECONDS", 30)
+    monkeypatch.setattr(settings, "INGEST_ASYNC_QUEUE_BATCHES", 10)
+    monkeypatch.setattr(scheduler_module, "_scheduler", None)
+    monkeypatch.setattr(queue_module, "_ingest_queue", None)
+
+    r = client.get("/api/metrics", headers=HEADERS)
+
+    assert r.status_code == 200
+    assert _sample(r.text, "legiontrap_fingerprint_scheduler_dirty") == 0
+    assert _sample(r.text, "legiontrap_ingest_queue_depth") == 0
+    assert scheduler_module.current_fingerprint_scheduler() is None
+    assert queue_module.current_ingest_queue() is None
+
+
+def test_metrics_stream_records_validation_stage(metrics_on):
+    body = b'{"id": "m1", "ts": "2025-10-28T18:31:08+00:00", "source": "cowrie", '
+    body += b'"type": "cowrie.login.failed", "data": {"ip": "8.8.8.8"}}\n{bad\n'
+    headers = {**HEADERS, "Content-Type": "application/x-ndjson"}
+    assert client.post("/api/ingest/stream", content=body, headers=headers).status_code == 200
+
+    text = client.get("/api/metrics", headers=HEADERS).text
+    assert _sample(text, 'legiontrap_ingest_stage_seconds_count{stage="validation"}') == 1
+    assert _sample(text, 'legiontrap_ingest_events_total{mode="stream",outcome="rejected"}') == 1
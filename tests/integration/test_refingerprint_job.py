@@ -0,0 +1,369 @@
+"""Integration tests for the bulk re-fingerprint job (app/jobs/refingerprint.py).
+
+Verifies that the job recomputes only fingerprints below FINGERPRINT_VERSION
+(every IP with all_ips), stores the same fingerprint as the per-IP ingest
+path, re-derives stale event_fingerprint_fields rows from raw_json before
+rebuilding, records a checkpoint and progress per batch, resumes after the
+checkpoint, rate-limits itself, applies a bounded FINGERPRINT_WINDOW as the
+ingest path does, caps the builds in flight, and can be enqueued through
+POST /api/admin/run-refingerprint-job, which does not run it.
+
+Schema is bootstrapped by tests/conftest.py; rows are reset per test by
+tests/integration/conftest.py.
+"""
+
+from __future__ import annotations
+
+import json
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.db.connection import get_session
+from app.db.repository import EventRepository
+from app.intelligence.constants import FINGERPRINT_FIELDS_VERSION, FINGERPRINT_VERSION
+from app.intelligence.tasks import _compute_and_store
+from app.jobs.refingerprint import enqueue_refingerprint_job, run_refingerprint_job
+from app.main import app
+from app.schemas.models import HoneypotEvent, RawEvent
+
+client = TestClient(app)
+HEADERS = {"x-api-key": "dev-123"}
+
+_BASE = datetime(2026, 3, 1, 8, 0, 0, tzinfo=UTC)
+_IPS = ["198.51.100.1", "198.51.100.2", "198.51.100.3"]
+
+
+def _insert_events(ip: str, n: int) -> None:
+    with get_session() as session:
+        repo = EventRepository(session)
+        for i in range(n):
+            eid = str(uuid.uuid4())
+            ts = _BASE + timedelta(seconds=17 * i + len(ip))
+            repo.insert_raw_event(
+                RawEvent(
+                    id=eid,
+                    ts=ts.isoformat(),
+                    source="cowrie",
+                    type="cowrie.login.failed",
+                    data={"ip": ip, "username": "root", "password": f"pw{i % 4}"},
+                )
+            )
+            repo.insert_event(
+                HoneypotEvent(
+                    id=eid,
+                    ts=ts,
+                    ingested_at=ts,
+                    source="cowrie",
+                    event_type="auth_failed",
+                    src_ip=ip,
+                    dst_port=22 if i % 3 else 2222,
+                    service="ssh",
+                )
+            )
+            repo.upsert_source_ip(ip, ts)
+
+
+def _fingerprint(ip: str) -> dict | None:
+    with get_session() as session:
+        return EventRepository(session).get_behavioral_fingerprint(ip)
+
+
+def _job(job_id: str) -> dict:
+    with get_session() as session:
+        return EventRepository(session).get_job(job_id)
+
+
+def _downgrade(ip: str, version: int) -> None:
+    """Make ip's stored fingerprint look as if built by an older FINGERPRINT_VERSION."""
+    with get_session() as session:
+        session.execute(
+            text("""
+                UPDATE behavioral_fingerprints
+                SET fingerprint_version = :v, features_hash = NULL
+                WHERE source_ip = :ip
+            """),
+            {"v": version, "ip": ip},
+        )
+        session.commit()
+
+
+def _cancel(job_id: str) -> None:
+    with get_session() as session:
+        EventRepository(session).cancel_job(job_id)
+        session.commit()
+
+
+class _Sleeps:
+    def __init__(self) -> None:
+        self.calls: list[float] = []
+        self.hook = None
+
+    def __call__(self, seconds: float) -> None:
+        self.calls.append(seconds)
+        if self.hook is not None:
+            self.hook()
+
+
+@pytest.fixture()
+def sleeps():
+    return _Sleeps()
+
+
+def _run(sleeps, **kwargs):
+    kwargs.setdefault("batch_size", 1)
+    kwargs.setdefault("max_ips_per_second", 0)
+    return run_refingerprint_job(sleep=sleeps, clock=lambda: 0.0, worker_id="w1", **kwargs)
+
+
+def test_recomputes_only_ips_below_current_version(sleeps):
+    for ip in _IPS:
+        _insert_events(ip, 8)
+    _compute_and_store(_IPS[0])
+    _compute_and_store(_IPS[1])
+    _downgrade(_IPS[1], FINGERPRINT_VERSION - 1)
+    job = enqueue_refingerprint_job()
+
+    result = _run(sleeps, batch_size=10)
+
+    assert result == {
+        "target_version": FINGERPRINT_VERSION,
+        "recomputed": 2,
+        "unchanged": 0,
+        "fields_refreshed": 0,
+    }
+    assert all(_fingerprint(ip)["fingerprint_version"] == FINGERPRINT_VERSION for ip in _IPS)
+    done = _job(job["id"])
+    assert done["status"] == "completed"
+    assert done["progress_percent"] == 100
+    assert json.loads(done["backend_metadata_json"])["checkpoint"] == _IPS[2]
+
+
+def test_bulk_fingerprint_matches_ingest_path(sleeps):
+    _insert_events(_IPS[0], 12)
+    _compute_and_store(_IPS[0])
+    expected = _fingerprint(_IPS[0])
+    enqueue_refingerprint_job(all_ips=True)
+
+    with ThreadPoolExecutor(max_workers=2) as builder:
+        assert _run(sleeps, executor=builder)["unchanged"] == 1
+    stored = _fingerprint(_IPS[0])
+    assert stored["features_hash"] == expected["features_hash"]
+    assert stored["sequence_features"] == expected["sequence_features"]
+
+
+@pytest.mark.parametrize("mode", ["last_events", "last_days", "sample"])
+def test_bounded_window_matches_ingest_path(sleeps, monkeypatch, mode):
+    monkeypatch.setattr(settings, "FINGERPRINT_WINDOW", mode)
+    monkeypatch.setattr(settings, "FINGERPRINT_WINDOW_EVENTS", 5)
+    _insert_events(_IPS[0], 12)
+    _compute_and_store(_IPS[0])
+    expected = _fingerprint(_IPS[0])
+    enqueue_refingerprint_job(all_ips=True)
+
+    assert _run(sleeps)["unchanged"] == 1
+    stored = _fingerprint(_IPS[0])
+    assert stored["timing_features"] == expected["timing_features"]
+
+
+class _CountingExecutor(ThreadPoolExecutor):
+    """Records the most builds submitted and not yet collected at once."""
+
+    def __init__(self) -> None:
+        super().__init__(max_workers=2)
+        self.pending = 0
+        self.most_pending = 0
+
+    def submit(self, fn, /, *args, **kwargs):
+        future = super().submit(fn, *args, **kwargs)
+        self.pending += 1
+        self.most_pending = max(self.most_pending, self.pending)
+        result = future.result
+
+        def _result(timeout=None):
+            self.pending -= 1
+            return result(timeout)
+
+        future.result = _result
+        return future
+
+
+def test_builds_in_flight_are_capped(sleeps):
+    for ip in _IPS:
+        _insert_events(ip, 4)
+    enqueue_refingerprint_job()
+
+    with _CountingExecutor() as builder:
+        assert _run(sleeps, batch_size=10, executor=builder, max_in_flight=2)["recomputed"] == 3
+    assert builder.most_pending == 2
+
+
+def test_stale_fingerprint_fields_are_rederived_before_rebuild(sleeps):
+    _insert_events(_IPS[0], 8)
+    _compute_and_store(_IPS[0])
+    expected = _fingerprint(_IPS[0])
+    with get_session() as session:
+        ids = [
+            r[0]
+            for r in session.execute(
+                text("SELECT id FROM events WHERE src_ip = :ip ORDER BY id"), {"ip": _IPS[0]}
+            )
+        ]
+        # Rows from an older derivation, and one never written at all.
+        session.execute(
+            text("""
+                UPDATE event_fingerprint_fields
+                SET username_class = 'stale', password_length = 0, derivation_version = 0
+                WHERE id IN (:a, :b)
+            """),
+            {"a": ids[0], "b": ids[1]},
+        )
+        session.execute(text("DELETE FROM event_fingerprint_fields WHERE id = :id"), {"id": ids[2]})
+        session.commit()
+    _downgrade(_IPS[0], FINGERPRINT_VERSION - 1)
+    enqueue_refingerprint_job()
+
+    assert _run(sleeps)["fields_refreshed"] == 3
+    with get_session() as session:
+        rows = session.execute(
+            text("""
+                SELECT username_class, derivation_version FROM event_fingerprint_fields
+                WHERE id IN (:a, :b, :c)
+            """),
+            {"a": ids[0], "b": ids[1], "c": ids[2]},
+        ).fetchall()
+    assert sorted(rows) == [("alpha", FINGERPRINT_FIELDS_VERSION)] * 3
+    stored = _fingerprint(_IPS[0])
+    assert stored["credential_features"] == expected["credential_features"]
+    assert stored["sequence_features"] == expected["sequence_features"]
+
+
+def test_checkpoint_and_progress_recorded_per_batch(sleeps):
+    for ip in _IPS:
+        _insert_events(ip, 4)
+    job = enqueue_refingerprint_job()
+    seen: list[tuple[str, int]] = []
+
+    def _record():
+        current = _job(job["id"])
+        seen.append(
+            (
+                json.loads(current["backend_metadata_json"])["checkpoint"],
+                current["progress_percent"],
+            )
+        )
+
+    sleeps.hook = _record
+    _run(sleeps, max_ips_per_second=1000)
+    assert seen == [(_IPS[0], 33), (_IPS[1], 66), (_IPS[2], 100)]
+
+
+def test_cancelled_job_resumes_after_checkpoint(sleeps):
+    for ip in _IPS:
+        _insert_events(ip, 4)
+    first = enqueue_refingerprint_job(all_ips=True)
+    sleeps.hook = lambda: _cancel(first["id"])
+
+    assert _run(sleeps, max_ips_per_second=1000) is None
+    assert json.loads(_job(first["id"])["backend_metadata_json"])["checkpoint"] == _IPS[0]
+
+    sleeps.hook = None
+    resumed = enqueue_refingerprint_job(resume_job_id=first["id"])
+    assert resumed["id"] != first["id"]
+    # _IPS[1] was rebuilt before the cancel was noticed but never checkpointed:
+    # the resumed job redoes it and finds it unchanged.
+    assert _run(sleeps) == {
+        "target_version": FINGERPRINT_VERSION,
+        "recomputed": 2,
+        "unchanged": 1,
+        "fields_refreshed": 0,
+    }
+
+
+def test_rate_limit_spaces_batches(sleeps):
+    for ip in _IPS:
+        _insert_events(ip, 3)
+    enqueue_refingerprint_job()
+    _run(sleeps, max_ips_per_second=2)
+    assert sleeps.calls == [0.5, 1.0, 1.5]
+
+
+def test_changed_member_becomes_campaign_representative(sleeps):
+    _insert_events(_IPS[0], 12)
+    campaign_id = str(uuid.uuid4())
+    ts = _BASE.isoformat()
+    with get_session() as session:
+        session.execute(
+            text("""
+                INSERT INTO campaigns (id, name, status, confidence, first_seen, last_seen,
+                                       created_at, updated_at)
+                VALUES (:id, 'CAMP', 'dormant', 0.5, :ts, :ts, :ts, :ts)
+            """),
+            {"id": campaign_id, "ts": ts},
+        )
+        session.execute(
+            text("""
+                INSERT INTO campaign_members (campaign_id, source_ip, confidence, added_at,
+                                              last_active)
+                VALUES (:cid, :ip, 0.5, :ts, :ts)
+            """),
+            {"cid": campaign_id, "ip": _IPS[0], "ts": ts},
+        )
+        session.commit()
+    enqueue_refingerprint_job()
+
+    _run(sleeps)
+
+    with get_session() as session:
+        row = session.execute(
+            text("""
+                SELECT representative_fingerprint_json, status, last_seen
+                FROM campaigns WHERE id = :id
+            """),
+            {"id": campaign_id},
+        ).fetchone()
+    assert row[0] is not None
+    # No activity is recorded for a recompute.
+    assert (row[1], row[2]) == ("dormant", ts)
+
+
+def test_nothing_pending_returns_none(sleeps):
+    assert _run(sleeps) is None
+
+
+def test_enqueue_returns_active_job_and_rejects_unknown_resume():
+    first = enqueue_refingerprint_job()
+    assert enqueue_refingerprint_job(all_ips=True)["id"] == first["id"]
+    with pytest.raises(ValueError):
+        enqueue_refingerprint_job(resume_job_id="no-such-job")
+
+
+def test_admin_endpoint_only_enqueues_job(sleeps):
+    _insert_events(_IPS[0], 4)
+    response = client.post(
+        "/api/admin/run-refingerprint-job", params={"all_ips": True}, headers=HEADERS
+    )
+    assert response.status_code == 202
+    body = response.json()
+    assert body["status"] == "pending"
+    assert body["poll_url"] == f"/api/jobs/{body['job_id']}"
+    assert _job(body["job_id"])["status"] == "pending"
+    assert _fingerprint(_IPS[0]) is None
+
+    assert _run(sleeps)["recomputed"] == 1
+    assert _job(body["job_id"])["status"] == "completed"
+
+
+def test_admin_endpoint_requires_api_key_and_known_resume_job():
+    assert client.post("/api/admin/run-refingerprint-job").status_code == 401
+    response = client.post(
+        "/api/admin/run-refingerprint-job",
+        params={"resume_job_id": "no-such-job"},
+        headers=HEADERS,
+    )
+    assert response.status_code == 404
@@ -15,10 +15,12 @@ Coverage:
     - single campaign → 0 suggestions, 0 pairs evaluated
     - coattributed pair skipped, not counted in total_pairs_evaluated
     - pair below min_score → not in suggestions
+    - pair abandoned early (None) → counted, not in suggestions
     - pair above min_score → appears in suggestions with expected fields
     - suggestions sorted by similarity_score DESC
     - limit caps result count
     - limit does not affect total_pairs_evaluated
+    - NumPy kernel screening returns the same suggestions and total
     - suggested_relationship_type is advisory (present in response)
     - no writes occur (pure function)
     - no AI imports in module
@@ -26,8 +28,13 @@ Coverage:
 
 from __future__ import annotations
 
+import json
+import random
 from unittest.mock import patch
 
+import pytest
+
+from app.core.config import settings
 from app.intelligence.actor_suggestions import (
     _derive_relationship_type,
     build_actor_suggestions,
@@ -149,7 +156,7 @@ def test_build_coattributed_pair_skipped():
     c2 = _make_campaign("c2")
     coattributed = {frozenset({"c1", "c2"})}
 
-    with patch("app.intelligence.actor_suggestions.compute_weighted_similarity") as mock_sim:
+    with patch("app.intelligence.actor_suggestions.bounded_weighted_similarity") as mock_sim:
         suggestions, total = build_actor_suggestions(
             [c1, c2], coattributed, min_score=0.0, limit=20
         )
@@ -167,7 +174,7 @@ def test_build_coattributed_pair_not_counted_in_total():
 
     high = _make_result(total=0.90)
     with patch(
-        "app.intelligence.actor_suggestions.compute_weighted_similarity",
+        "app.intelligence.actor_suggestions.bounded_weighted_similarity",
         return_value=high,
     ):
         suggestions, total = build_actor_suggestions(
@@ -184,7 +191,7 @@ def test_build_pair_below_min_score_not_in_suggestions():
     low = _make_result(total=0.70)
 
     with patch(
-        "app.intelligence.actor_suggestions.compute_weighted_similarity",
+        "app.intelligence.actor_suggestions.bounded_weighted_similarity",
         return_value=low,
     ):
         suggestions, total = build_actor_suggestions([c1, c2], set(), min_score=0.85, limit=20)
@@ -193,13 +200,28 @@ def test_build_pair_below_min_score_not_in_suggestions():
     assert total == 1
 
 
+def test_build_abandoned_pair_counted_not_suggested():
+    c1 = _make_campaign("c1")
+    c2 = _make_campaign("c2")
+
+    with patch(
+        "app.intelligence.actor_suggestions.bounded_weighted_similarity",
+        return_value=None,
+    ) as mock_sim:
+        suggestions, total = build_actor_suggestions([c1, c2], set(), min_score=0.85, limit=20)
+
+    assert mock_sim.call_args.kwargs["floor"] == 0.85
+    assert suggestions == []
+    assert total == 1
+
+
 def test_build_pair_above_min_score_included():
     c1 = _make_campaign("c1", "Campaign Alpha")
     c2 = _make_campaign("c2", "Campaign Beta")
     high = _make_result(sequence=0.90, timing=0.85, total=0.90)
 
     with patch(
-        "app.intelligence.actor_suggestions.compute_weighted_similarity",
+        "app.intelligence.actor_suggestions.bounded_weighted_similarity",
         return_value=high,
     ):
         suggestions, total = build_actor_suggestions([c1, c2], set(), min_score=0.85, limit=20)
@@ -220,7 +242,7 @@ def test_build_suggestion_fields_complete():
     high = _make_result(total=0.90)
 
     with patch(
-        "app.intelligence.actor_suggestions.compute_weighted_similarity",
+        "app.intelligence.actor_suggestions.bounded_weighted_similarity",
         return_value=high,
     ):
         suggestions, _ = build_actor_suggestions([c1, c2], set(), min_score=0.85, limit=20)
@@ -255,7 +277,7 @@ def test_build_suggestions_sorted_descending():
         return _make_result(total=s)
 
     with patch(
-        "app.intelligence.actor_suggestions.compute_weighted_similarity", side_effect=mock_sim
+        "app.intelligence.actor_suggestions.bounded_weighted_similarity", side_effect=mock_sim
     ):
         suggestions, _ = build_actor_suggestions(campaigns, set(), min_score=0.0, limit=20)
 
@@ -268,7 +290,7 @@ def test_build_limit_caps_results():
     high = _make_result(total=0.90)
 
     with patch(
-        "app.intelligence.actor_suggestions.compute_weighted_similarity",
+        "app.intelligence.actor_suggestions.bounded_weighted_similarity",
         return_value=high,
     ):
         suggestions, total = build_actor_suggestions(campaigns, set(), min_score=0.0, limit=3)
@@ -283,7 +305,7 @@ def test_build_limit_does_not_affect_total_pairs_evaluated():
     high = _make_result(total=0.90)
 
     with patch(
-        "app.intelligence.actor_suggestions.compute_weighted_similarity",
+        "app.intelligence.actor_suggestions.bounded_weighted_similarity",
         return_value=high,
     ):
         _, total_limit_1 = build_actor_suggestions(campaigns, set(), min_score=0.0, limit=1)
@@ -294,6 +316,40 @@ def test_build_limit_does_not_affect_total_pairs_evaluated():
     assert total_limit_100 == 6
 
 
+def _random_campaign(rng: random.Random, cid: str) -> dict:
+    ports = [rng.choice([22, 23, 80, 443]) for _ in range(rng.randint(1, 4))]
+    campaign = _make_campaign(cid)
+    campaign["sequence_features"] = json.dumps(
+        {
+            "port_sequence": ports,
+            "event_type_sequence": [rng.choice(["auth_failed", "command"]) for _ in range(10)],
+            "credential_sequence": [],
+        }
+    )
+    campaign["target_features"] = json.dumps(
+        {"port_freq": {str(p): 1.0 for p in ports}, "top_dst_ports": ports}
+    )
+    campaign["timing_features"] = json.dumps(
+        {"interval": {"mean": rng.uniform(1, 100)}, "burst_cv": rng.random()}
+    )
+    return campaign
+
+
+def test_build_numpy_screening_matches_pure_python(monkeypatch):
+    pytest.importorskip("numpy")
+    rng = random.Random(1)
+    campaigns = [_random_campaign(rng, f"c{i}") for i in range(40)]
+    coattributed = {frozenset({"c0", "c1"})}
+
+    monkeypatch.setattr(settings, "CLUSTERING_NUMPY_MIN_CANDIDATES", 0)
+    expected = build_actor_suggestions(campaigns, coattributed, min_score=0.8, limit=500)
+    monkeypatch.setattr(settings, "CLUSTERING_NUMPY_MIN_CANDIDATES", 1)
+    screened = build_actor_suggestions(campaigns, coattributed, min_score=0.8, limit=500)
+
+    assert expected[0]
+    assert screened == expected
+
+
 # ---------------------------------------------------------------------------
 # Invariants
 # ---------------------------------------------------------------------------
@@ -42,3 +42,30 @@ def test_enrich_asn_returns_asn_number_for_public_ip():
     assert result["asn"] is not None
     assert isinstance(result["asn"], int)
     assert result["asn_org"] is not None
+
+
+class _StubReader:
+    """Stands in for maxminddb.Reader: get() returns a decoded record or None."""
+
+    def __init__(self, records: dict[str, dict]):
+        self._records = records
+
+    def get(self, ip):
+        if ip == "not-an-ip":
+            raise ValueError(ip)
+        return self._records.get(ip)
+
+    def close(self):
+        pass
+
+
+def test_enrich_asn_extracts_stored_fields_from_record(monkeypatch):
+    record = {"autonomous_system_number": 15169, "autonomous_system_organization": "GOOGLE"}
+    monkeypatch.setattr(asn_module, "_asn_reader", _StubReader({"8.8.8.8": record}))
+    assert enrich_asn("8.8.8.8") == {"asn": 15169, "asn_org": "GOOGLE"}
+
+
+def test_enrich_asn_address_not_found_or_invalid_returns_all_none(monkeypatch):
+    monkeypatch.setattr(asn_module, "_asn_reader", _StubReader({}))
+    for ip in ("1.2.3.4", "not-an-ip"):
+        assert enrich_asn(ip) == {"asn": None, "asn_org": None}
@@ -0,0 +1,218 @@
+"""Unit tests for candidate pruning (app/intelligence/candidate_index.py).
+
+The bound must never be below the exact weighted_total — otherwise pruning
+could change a clustering decision.  Checked on seeded random fingerprint
+pairs (including empty, missing and partially-null features), for both the
+per-pair bound and the shape-level bound used for index-disjoint campaigns,
+and end to end: the surviving candidates contain every candidate the
+exhaustive scan would score at or above the threshold.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import random
+
+import pytest
+
+from app.intelligence.candidate_cache import ClusteringCandidate
+from app.intelligence.candidate_index import (
+    CandidateIndex,
+    disjoint_upper_bound,
+    similarity_upper_bound,
+    summarize,
+    viable_candidates,
+)
+from app.intelligence.similarity import (
+    compute_weighted_similarity,
+    parse_fingerprint,
+    parsed_weighted_similarity,
+)
+
+_PORTS = [21, 22, 23, 80, 443, 2222, 3389, 8080]
+_EVENTS = ["auth_failed", "auth_success", "command", "connect", "download"]
+_SERVICES = ["ssh", "telnet", "http", "smb"]
+_KEX = ["curve25519-sha256", "ecdh-sha2-nistp256", "diffie-hellman-group14-sha1"]
+_CREDS = [("lower", "digits"), ("root", "dict"), ("admin", "mixed")]
+
+
+def _maybe(rng: random.Random, value, p_none: float = 0.2):
+    return None if rng.random() < p_none else value
+
+
+def _seq(rng: random.Random, pool: list, max_len: int) -> list:
+    return [rng.choice(pool) for _ in range(rng.randint(0, max_len))]
+
+
+def _histogram(rng: random.Random, n: int) -> list[float]:
+    raw = [rng.random() for _ in range(n)]
+    total = sum(raw)
+    return [v / total for v in raw]
+
+
+def _random_fp(rng: random.Random, pools: dict | None = None) -> dict:
+    pools = pools or {}
+    ports = pools.get("ports", _PORTS)
+    events = pools.get("events", _EVENTS)
+    services = pools.get("services", _SERVICES)
+    kex = pools.get("kex", _KEX)
+    creds = [
+        {"username_pattern": u, "password_class": p}
+        for u, p in _seq(rng, pools.get("creds", _CREDS), 6)
+    ]
+    timing = {
+        "interval": {k: rng.uniform(0, 100) for k in ("mean", "stddev", "p25", "p75", "p95")},
+        "tod_histogram": _histogram(rng, 24),
+        "dow_histogram": _histogram(rng, 7),
+        "burst_cv": rng.uniform(0, 2),
+    }
+    sequence = {
+        "port_sequence": _seq(rng, ports, 8),
+        "event_type_sequence": _seq(rng, events, 60),
+        "credential_sequence": creds,
+    }
+    protocol = {
+        "service_distribution": {s: rng.random() for s in _seq(rng, services, 3)},
+        "ssh_kex_ordering": _maybe(rng, _seq(rng, kex, 4), 0.4),
+        "tls_cipher_ordering": _maybe(rng, _seq(rng, kex, 3), 0.6),
+    }
+    credential = {
+        "username_class_dist": {u: 1.0 for u, _ in pools.get("creds", _CREDS)[: rng.randint(0, 3)]},
+        "password_char_class": {
+            k: rng.random() for k in rng.sample(["lower", "upper", "digit"], rng.randint(0, 3))
+        },
+        "credential_sequence": creds,
+    }
+    target = {
+        "port_freq": {str(p): rng.random() for p in _seq(rng, ports, 12)},
+        "top_dst_ports": _seq(rng, ports, 5),
+    }
+    return {
+        name: _maybe(rng, json.dumps(value))
+        for name, value in (
+            ("timing_features", timing),
+            ("sequence_features", sequence),
+            ("protocol_features", protocol),
+            ("credential_features", credential),
+            ("target_features", target),
+        )
+    }
+
+
+def _random_weights(rng: random.Random) -> dict[str, float] | None:
+    if rng.random() < 0.5:
+        return None
+    return {
+        k: rng.uniform(0.05, 0.6)
+        for k in ("timing", "sequence", "protocol", "credential", "target")
+    }
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_upper_bound_never_below_exact_score(seed):
+    rng = random.Random(seed)
+    for _ in range(300):
+        a, b = _random_fp(rng), _random_fp(rng)
+        weights = _random_weights(rng)
+        exact = compute_weighted_similarity(a, b, weights=weights).weighted_total
+        pa, pb = parse_fingerprint(a), parse_fingerprint(b)
+        bound = similarity_upper_bound(summarize(pa), summarize(pb), weights=weights)
+        assert bound >= exact
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_disjoint_bound_never_below_exact_score(seed):
+    rng = random.Random(seed)
+    left = {"ports": [21, 22, 23], "events": ["a", "b"], "services": ["ssh"], "kex": ["k1"]}
+    right = {"ports": [80, 443], "events": ["c"], "services": ["http"], "kex": ["k2"]}
+    left["creds"] = [("root", "dict")]
+    right["creds"] = [("admin", "mixed")]
+    for _ in range(300):
+        a, b = _random_fp(rng, left), _random_fp(rng, right)
+        weights = _random_weights(rng)
+        sa, sb = summarize(parse_fingerprint(a)), summarize(parse_fingerprint(b))
+        assert not (sa.tokens & sb.tokens)
+        exact = compute_weighted_similarity(a, b, weights=weights).weighted_total
+        assert disjoint_upper_bound(sa, sb, weights=weights) >= exact
+
+
+def test_identical_fingerprints_are_never_pruned():
+    rng = random.Random(7)
+    for _ in range(50):
+        fp = _random_fp(rng)
+        s = summarize(parse_fingerprint(fp))
+        exact = compute_weighted_similarity(fp, fp).weighted_total
+        assert similarity_upper_bound(s, s) >= exact
+
+
+def test_edit_distance_bound_is_tight_for_permutations():
+    a = summarize(parse_fingerprint({"target_features": json.dumps({"top_dst_ports": [22, 80]})}))
+    b = summarize(parse_fingerprint({"target_features": json.dumps({"top_dst_ports": [80, 22]})}))
+    # Same multiset: the bound cannot rule out a perfect match.
+    assert similarity_upper_bound(a, b) == 1.0
+
+
+def test_non_positive_weights_disable_pruning():
+    s = summarize(parse_fingerprint(_random_fp(random.Random(1))))
+    weights = {"timing": 0.0, "sequence": 0.5, "protocol": 0.5, "credential": 0.0, "target": 0.0}
+    assert similarity_upper_bound(s, s, weights=weights) == math.inf
+
+
+def test_unbounded_timing_disables_pruning():
+    fp = {"timing_features": json.dumps({"interval": {"mean": -5.0}})}
+    s = summarize(parse_fingerprint(fp))
+    assert similarity_upper_bound(s, s) == math.inf
+
+
+def test_unsummarisable_features_yield_none():
+    fp = {"sequence_features": json.dumps({"credential_sequence": ["not-a-dict"]})}
+    assert summarize(parse_fingerprint(fp)) is None
+
+
+def test_index_changed_adds_and_removes_postings():
+    sa = summarize(parse_fingerprint({"target_features": json.dumps({"top_dst_ports": [22]})}))
+    sb = summarize(parse_fingerprint({"target_features": json.dumps({"top_dst_ports": [80]})}))
+    index = CandidateIndex().changed({}, {"a": sa, "b": sb})
+    assert index.sharing(sa) == {"a"}
+    smaller = index.changed({"a": sa}, {})
+    assert smaller.sharing(sa) == set()
+    assert index.sharing(sa) == {"a"}  # the original index is unchanged
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_viable_candidates_keep_every_candidate_above_threshold(seed):
+    rng = random.Random(seed)
+    threshold = 0.6
+    candidates = []
+    for i in range(200):
+        fp = parse_fingerprint(_random_fp(rng))
+        candidates.append(
+            ClusteringCandidate(
+                campaign_id=f"c{i}",
+                status="active",
+                last_seen="2026-01-01T00:00:00+00:00",
+                weight_profile=_random_weights(rng),
+                fingerprint=fp,
+                summary=summarize(fp),
+            )
+        )
+    indexed = {c.campaign_id for c in candidates[:150]}
+    index = CandidateIndex().changed(
+        {}, {c.campaign_id: c.summary for c in candidates if c.campaign_id in indexed}
+    )
+
+    for _ in range(20):
+        new_fp = parse_fingerprint(_random_fp(rng))
+        viable = viable_candidates(summarize(new_fp), candidates, index, indexed, threshold)
+        expected = [
+            c.campaign_id
+            for c in candidates
+            if parsed_weighted_similarity(
+                new_fp, c.fingerprint, weights=c.weight_profile
+            ).weighted_total
+            >= threshold
+        ]
+        viable_ids = [c.campaign_id for c in viable]
+        assert [cid for cid in viable_ids if cid in expected] == expected
+        assert viable_ids == [c.campaign_id for c in candidates if c in viable]
@@ -286,3 +286,35 @@ def test_similarity_uses_weight_constants(monkeypatch):
     # With weight_timing=1.0 and identical timing features, weighted_total should be > 0.9
     assert result.weighted_total > 0.9
     assert result.dimensions_used == 1
+
+
+# ---------------------------------------------------------------------------
+# Fingerprint window settings
+# ---------------------------------------------------------------------------
+
+
+def test_settings_fingerprint_window_default_is_all():
+    assert Settings(**_REQUIRED_FIELDS).FINGERPRINT_WINDOW == "all"
+
+
+def test_settings_fingerprint_window_is_lowercased():
+    s = Settings(**{**_REQUIRED_FIELDS, "FINGERPRINT_WINDOW": "Last_Events"})
+    assert s.FINGERPRINT_WINDOW == "last_events"
+
+
+def test_settings_rejects_unknown_fingerprint_window():
+    with pytest.raises(ValidationError):
+        Settings(**{**_REQUIRED_FIELDS, "FINGERPRINT_WINDOW": "newest"})
+
+
+@pytest.mark.parametrize("field", ["FINGERPRINT_WINDOW_EVENTS", "FINGERPRINT_WINDOW_DAYS"])
+def test_settings_rejects_zero_fingerprint_window_size(field):
+    with pytest.raises(ValidationError):
+        Settings(**{**_REQUIRED_FIELDS, field: 0})
+
+
+def test_settings_rejects_unknown_fingerprint_executor():
+    with pytest.raises(ValidationError):
+        Settings(**{**_REQUIRED_FIELDS, "FINGERPRINT_EXECUTOR": "celery"})
+    s = Settings(**{**_REQUIRED_FIELDS, "FINGERPRINT_EXECUTOR": "Worker"})
+    assert s.FINGERPRINT_EXECUTOR == "worker"
@@ -0,0 +1,225 @@
+"""Unit tests for the process-wide GeoIP/ASN enrichment cache (app/utils/enrichment.py)."""
+
+from __future__ import annotations
+
+import os
+
+import pytest
+
+import app.utils.asn as asn_module
+import app.utils.enrichment as enrichment_module
+import app.utils.geoip as geoip_module
+from app.core.config import settings
+from app.utils.enrichment import (
+    EnrichmentCache,
+    enrich,
+    enrich_many,
+    enrichment_cache_stats,
+    reset_enrichment_cache_for_testing,
+)
+
+_NEGATIVE_CITY = {"country_code": None, "country_name": None, "city": None}
+_NEGATIVE_ASN = {"asn": None, "asn_org": None}
+
+
+@pytest.fixture()
+def lookups(monkeypatch, tmp_path):
+    """Stub both readers with counting lookups; return the list of looked-up IPs."""
+    calls: list[str] = []
+
+    def _city(ip):
+        calls.append(ip)
+        if ip.startswith("10."):
+            return dict(_NEGATIVE_CITY)
+        return {"country_code": "US", "country_name": "United States", "city": None}
+
+    def _asn(ip):
+        return dict(_NEGATIVE_ASN) if ip.startswith("10.") else {"asn": 15169, "asn_org": "G"}
+
+    monkeypatch.setattr(geoip_module, "CITY_DB_PATH", tmp_path / "city.mmdb")
+    monkeypatch.setattr(asn_module, "ASN_DB_PATH", tmp_path / "asn.mmdb")
+    monkeypatch.setattr(enrichment_module, "enrich_ip", _city)
+    monkeypatch.setattr(enrichment_module, "enrich_asn", _asn)
+    return calls
+
+
+# ---------------------------------------------------------------------------
+# EnrichmentCache
+# ---------------------------------------------------------------------------
+
+
+def test_cache_evicts_least_recently_used():
+    cache = EnrichmentCache(capacity=2, ttl_seconds=60)
+    cache.put("a", {"asn": 1})
+    cache.put("b", {"asn": 2})
+    cache.get("a")
+    cache.put("c", {"asn": 3})
+    assert cache.get("b") is None
+    assert cache.get("a") == {"asn": 1}
+    assert cache.stats()["evictions"] == 1
+
+
+def test_cache_entries_expire_after_ttl(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(enrichment_module.time, "monotonic", lambda: clock[0])
+    cache = EnrichmentCache(capacity=10, ttl_seconds=60)
+    cache.put("a", {"asn": 1})
+    clock[0] += 59
+    assert cache.get("a") == {"asn": 1}
+    clock[0] += 2
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_cache_returns_copies():
+    cache = EnrichmentCache(capacity=10, ttl_seconds=60)
+    cache.put("a", {"asn": 1})
+    cache.get("a")["asn"] = 999
+    assert cache.get("a") == {"asn": 1}
+
+
+def test_cache_rejects_zero_capacity():
+    with pytest.raises(ValueError):
+        EnrichmentCache(capacity=0, ttl_seconds=60)
+
+
+# ---------------------------------------------------------------------------
+# enrich()
+# ---------------------------------------------------------------------------
+
+
+def test_enrich_merges_city_and_asn(lookups):
+    assert enrich("8.8.8.8") == {
+        "country_code": "US",
+        "country_name": "United States",
+        "city": None,
+        "asn": 15169,
+        "asn_org": "G",
+    }
+
+
+def test_enrich_hits_reader_once_per_ip(lookups):
+    for _ in range(5):
+        enrich("8.8.8.8")
+    assert lookups == ["8.8.8.8"]
+    stats = enrichment_cache_stats()
+    assert stats["hits"] == 4
+    assert stats["misses"] == 1
+
+
+def test_enrich_caches_negative_results(lookups):
+    first = enrich("10.0.0.1")
+    second = enrich("10.0.0.1")
+    assert first == second == {**_NEGATIVE_CITY, **_NEGATIVE_ASN}
+    assert lookups == ["10.0.0.1"]
+    assert enrichment_cache_stats()["negative_hits"] == 1
+
+
+def test_enrich_prefix_len_shares_entry_per_subnet(lookups, monkeypatch):
+    monkeypatch.setattr(settings, "GEOIP_CACHE_PREFIX_LEN", 24)
+    reset_enrichment_cache_for_testing()
+    enrich("8.8.8.8")
+    enrich("8.8.8.4")
+    enrich("8.8.9.1")
+    assert lookups == ["8.8.8.8", "8.8.9.1"]
+
+
+def test_enrich_prefix_len_ignores_non_ipv4_keys(lookups, monkeypatch):
+    monkeypatch.setattr(settings, "GEOIP_CACHE_PREFIX_LEN", 24)
+    reset_enrichment_cache_for_testing()
+    enrich("2001:db8::1")
+    enrich("2001:db8::2")
+    enrich("not-an-ip")
+    assert lookups == ["2001:db8::1", "2001:db8::2", "not-an-ip"]
+
+
+def test_enrich_disabled_when_cache_size_zero(lookups, monkeypatch):
+    monkeypatch.setattr(settings, "GEOIP_CACHE_SIZE", 0)
+    reset_enrichment_cache_for_testing()
+    enrich("8.8.8.8")
+    enrich("8.8.8.8")
+    assert lookups == ["8.8.8.8", "8.8.8.8"]
+    assert enrichment_cache_stats()["capacity"] == 0
+
+
+def test_enrich_invalidates_when_mmdb_mtime_changes(lookups, monkeypatch):
+    monkeypatch.setattr(enrichment_module, "_SIGNATURE_CHECK_SECONDS", 0.0)
+    closed: list[str] = []
+    monkeypatch.setattr(geoip_module, "close_reader", lambda: closed.append("city"))
+    monkeypatch.setattr(asn_module, "close_asn_reader", lambda: closed.append("asn"))
+
+    city = geoip_module.CITY_DB_PATH
+    city.write_bytes(b"v1")
+    enrich("8.8.8.8")
+    enrich("8.8.8.8")
+    assert lookups == ["8.8.8.8"]
+
+    stat = city.stat()
+    os.utime(city, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    enrich("8.8.8.8")
+    assert lookups == ["8.8.8.8", "8.8.8.8"]
+    assert closed == ["city", "asn"]
+    assert enrichment_cache_stats()["invalidations"] == 1
+
+
+def test_enrich_invalidates_when_mmdb_provisioned(lookups, monkeypatch):
+    """A negative result cached while the file was absent must not outlive it."""
+    monkeypatch.setattr(enrichment_module, "_SIGNATURE_CHECK_SECONDS", 0.0)
+    enrich("8.8.8.8")
+    asn_module.ASN_DB_PATH.write_bytes(b"v1")
+    enrich("8.8.8.8")
+    assert lookups == ["8.8.8.8", "8.8.8.8"]
+
+
+def test_enrich_signature_check_is_throttled(lookups, monkeypatch):
+    monkeypatch.setattr(enrichment_module, "_SIGNATURE_CHECK_SECONDS", 3600.0)
+    enrich("8.8.8.8")
+    geoip_module.CITY_DB_PATH.write_bytes(b"v1")
+    enrich("8.8.8.8")
+    assert lookups == ["8.8.8.8"]
+
+
+# ---------------------------------------------------------------------------
+# enrich_many()
+# ---------------------------------------------------------------------------
+
+
+def test_enrich_many_dedupes_before_lookup(lookups):
+    result = enrich_many(["8.8.8.8", "10.0.0.1", "8.8.8.8", "10.0.0.1"])
+    assert set(result) == {"8.8.8.8", "10.0.0.1"}
+    assert lookups == ["8.8.8.8", "10.0.0.1"]
+    assert enrichment_cache_stats()["misses"] == 2
+
+
+def test_enrich_many_matches_enrich(lookups):
+    ips = ["8.8.8.8", "10.0.0.1", "1.1.1.1"]
+    batch = enrich_many(ips)
+    assert batch == {ip: enrich(ip) for ip in ips}
+
+
+def test_enrich_many_one_lookup_per_subnet(lookups, monkeypatch):
+    monkeypatch.setattr(settings, "GEOIP_CACHE_PREFIX_LEN", 24)
+    reset_enrichment_cache_for_testing()
+    result = enrich_many([f"8.8.8.{i}" for i in range(1, 50)])
+    assert len(result) == 49
+    assert lookups == ["8.8.8.1"]
+    assert enrichment_cache_stats()["misses"] == 1
+
+
+def test_enrich_many_returns_independent_dicts(lookups, monkeypatch):
+    monkeypatch.setattr(settings, "GEOIP_CACHE_PREFIX_LEN", 24)
+    reset_enrichment_cache_for_testing()
+    result = enrich_many(["8.8.8.1", "8.8.8.2"])
+    result["8.8.8.1"]["asn"] = None
+    assert result["8.8.8.2"]["asn"] == 15169
+
+
+def test_enrich_many_without_cache_still_dedupes(lookups, monkeypatch):
+    monkeypatch.setattr(settings, "GEOIP_CACHE_SIZE", 0)
+    reset_enrichment_cache_for_testing()
+    enrich_many(["8.8.8.8", "8.8.8.8"])
+    assert lookups == ["8.8.8.8"]
+
+
+def test_enrich_many_empty():
+    assert enrich_many([]) == {}
@@ -8,8 +8,14 @@ from __future__ import annotations
 import json
 from datetime import UTC, datetime, timedelta
 
+from app.core.config import settings
 from app.intelligence.constants import MIN_EVENTS_FOR_CLUSTERING
-from app.intelligence.fingerprint import build_fingerprint, compute_confidence
+from app.intelligence.fingerprint import (
+    FingerprintWindow,
+    build_fingerprint,
+    compute_confidence,
+    fingerprint_content_hash,
+)
 
 _BASE_TS = datetime(2025, 1, 1, 12, 0, 0, tzinfo=UTC)
 
@@ -172,3 +178,109 @@ def test_build_fingerprint_with_cred_data_populates_credential_features():
     parsed = json.loads(result["credential_features"])
     assert "credential_count" in parsed
     assert parsed["credential_count"] == 15
+
+
+# ---------------------------------------------------------------------------
+# FingerprintWindow
+# ---------------------------------------------------------------------------
+
+
+def test_fingerprint_window_default_is_all():
+    window = FingerprintWindow()
+    assert not window.bounded
+    assert window.label == "all"
+
+
+def test_fingerprint_window_labels():
+    assert FingerprintWindow("last_events", events=500).label == "last_events:500"
+    assert FingerprintWindow("sample", events=200).label == "sample:200"
+    assert FingerprintWindow("last_days", days=7).label == "last_days:7"
+    assert FingerprintWindow("last_days", events=50, days=7).label == "last_days:7:50"
+
+
+def test_fingerprint_window_from_settings(monkeypatch):
+    monkeypatch.setattr(settings, "FINGERPRINT_WINDOW", "sample")
+    monkeypatch.setattr(settings, "FINGERPRINT_WINDOW_EVENTS", 250)
+    assert FingerprintWindow.from_settings() == FingerprintWindow("sample", events=250)
+    monkeypatch.setattr(settings, "FINGERPRINT_WINDOW", "last_days")
+    monkeypatch.setattr(settings, "FINGERPRINT_WINDOW_DAYS", 14)
+    window = FingerprintWindow.from_settings()
+    assert window.bounded
+    assert window == FingerprintWindow("last_days", events=250, days=14)
+    assert window.label == "last_days:14:250"
+
+
+def _stamped(n: int) -> list[dict]:
+    return [_make_event(i * 3600) for i in range(n)]
+
+
+def test_fingerprint_window_apply_all_returns_events():
+    events = _stamped(5)
+    assert FingerprintWindow().apply(events) == events
+
+
+def test_fingerprint_window_apply_last_events():
+    events = _stamped(10)
+    assert FingerprintWindow("last_events", events=3).apply(events) == events[-3:]
+
+
+def test_fingerprint_window_apply_last_days_counts_back_from_newest():
+    events = _stamped(60)  # hourly, 59 hours from first to last
+    assert FingerprintWindow("last_days", days=1).apply(events) == events[-25:]
+
+
+def test_fingerprint_window_apply_last_days_caps_events():
+    events = _stamped(60)
+    assert FingerprintWindow("last_days", events=10, days=1).apply(events) == events[-10:]
+
+
+def test_fingerprint_window_apply_sample_ranks():
+    events = _stamped(10)
+    sampled = FingerprintWindow("sample", events=3).apply(events)
+    assert sampled == [events[0], events[3], events[6]]
+    assert FingerprintWindow("sample", events=20).apply(events) == events
+
+
+# ---------------------------------------------------------------------------
+# fingerprint_content_hash
+# ---------------------------------------------------------------------------
+
+
+def _hash(fp: dict, version: int = 1, label: str = "all") -> str:
+    return fingerprint_content_hash(fp, fingerprint_version=version, window_label=label)
+
+
+def test_content_hash_stable_for_identical_features():
+    assert _hash(build_fingerprint(_events(15))) == _hash(build_fingerprint(_events(15)))
+
+
+def test_content_hash_ignores_event_count_only():
+    fp = build_fingerprint(_events(15))
+    assert _hash(fp) == _hash({**fp, "event_count": fp["event_count"] + 1})
+
+
+def test_content_hash_ignores_what_similarity_does_not_compare():
+    fp = build_fingerprint(_events(15))
+    base = _hash(fp)
+    assert _hash({**fp, "confidence": 0.9}) == base
+    assert _hash({**fp, "tool_signals": '{"tools":["zgrab"]}'}) == base
+
+
+def test_content_hash_ignores_event_types_past_the_compared_prefix():
+    fp = build_fingerprint(_events(60))
+    seq = json.loads(fp["sequence_features"])
+    assert len(seq["event_type_sequence"]) > 50
+    longer = {**seq, "event_type_sequence": seq["event_type_sequence"] + ["port_scan"]}
+    assert _hash(fp) == _hash({**fp, "sequence_features": json.dumps(longer)})
+    changed = {**seq, "event_type_sequence": ["port_scan"] + seq["event_type_sequence"][1:]}
+    assert _hash(fp) != _hash({**fp, "sequence_features": json.dumps(changed)})
+
+
+def test_content_hash_changes_with_features_version_and_window():
+    fp = build_fingerprint(_events(15))
+    base = _hash(fp)
+    target = json.loads(fp["target_features"])
+    target["top_dst_ports"] = [*target["top_dst_ports"], 65000]
+    assert _hash({**fp, "target_features": json.dumps(target)}) != base
+    assert _hash(fp, version=2) != base
+    assert _hash(fp, label="last_events:100") != base
@@ -13,6 +13,7 @@ Coverage:
   - all fields stored correctly
   - nullable fields (fingerprint_id, campaign_id) may be None
   - feature columns may be None
+  - fingerprint_window is stored, NULL by default
   - list_fingerprint_history_for_ip returns records oldest first
   - list_fingerprint_history_for_ip respects limit
   - list_fingerprint_history_for_ip returns empty list for unknown ip
@@ -155,6 +156,12 @@ def test_all_fields_stored(Session):
     assert row["created_at"]
 
 
+def test_fingerprint_window_stored(Session):
+    row = _insert(Session, fingerprint_window="last_days:30")
+    assert row["fingerprint_window"] == "last_days:30"
+    assert _insert(Session)["fingerprint_window"] is None
+
+
 def test_nullable_fingerprint_id(Session):
     row = _insert(Session, fingerprint_id=None)
     assert row["fingerprint_id"] is None
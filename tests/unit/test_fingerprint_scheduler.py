@@ -0,0 +1,165 @@
+"""Unit tests for app/intelligence/scheduler.py.
+
+The scheduler thread is not started: tests drive run_pending() with a fake
+clock, and job creation / execution in app/intelligence/tasks.py are replaced
+with recorders.  No database.
+"""
+
+from __future__ import annotations
+
+import pytest
+
+from app.core.config import settings
+from app.intelligence import scheduler as scheduler_module
+from app.intelligence import tasks
+from app.intelligence.scheduler import FingerprintScheduler, get_fingerprint_scheduler
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture()
+def active():
+    """IPs that already have a pending or running fingerprint job."""
+    return set()
+
+
+@pytest.fixture()
+def runs(monkeypatch, active):
+    """Record (ip, job_id) for every fingerprint task the scheduler runs."""
+    ran: list[tuple[str, str]] = []
+    monkeypatch.setattr(
+        tasks, "create_fingerprint_job", lambda ip: None if ip in active else f"job-{ip}"
+    )
+    monkeypatch.setattr(tasks, "run_fingerprint_task", lambda ip, job_id: ran.append((ip, job_id)))
+    return ran
+
+
+@pytest.fixture()
+def clock():
+    return _Clock()
+
+
+@pytest.fixture()
+def sched(clock):
+    s = FingerprintScheduler(30, max_workers=1, clock=clock)
+    yield s
+    s.close()
+
+
+def test_rejects_non_positive_interval():
+    with pytest.raises(ValueError):
+        FingerprintScheduler(0)
+
+
+def test_first_mark_dispatches_immediately(sched, runs):
+    sched.mark_dirty("10.0.0.1")
+    assert sched.run_pending() == ["10.0.0.1"]
+    sched.close()
+    assert runs == [("10.0.0.1", "job-10.0.0.1")]
+
+
+def test_marks_within_interval_coalesce_into_one_refresh(sched, clock, runs):
+    sched.mark_dirty("10.0.0.1")
+    sched.run_pending()
+    for _ in range(5):
+        clock.now += 5
+        sched.mark_dirty("10.0.0.1")
+        assert sched.run_pending() == []
+    assert sched.dirty_count == 1
+    clock.now = 1030.0
+    assert sched.run_pending() == ["10.0.0.1"]
+    assert sched.run_pending() == []
+    assert (sched.marks, sched.coalesced, sched.dispatched) == (6, 4, 2)
+
+
+def test_priority_skips_interval_and_goes_first(sched, clock, runs):
+    sched.mark_dirty("10.0.0.1")
+    sched.mark_dirty("10.0.0.2")
+    sched.run_pending()
+    clock.now += 1
+    sched.mark_dirty("10.0.0.3")
+    sched.mark_dirty("10.0.0.1")
+    sched.mark_dirty("10.0.0.2", priority=True)
+    assert sched.run_pending() == ["10.0.0.2", "10.0.0.3"]
+    clock.now += 30
+    assert sched.run_pending() == ["10.0.0.1"]
+
+
+def test_priority_upgrades_already_dirty_ip(sched, clock, runs):
+    sched.mark_dirty("10.0.0.1")
+    sched.run_pending()
+    sched.mark_dirty("10.0.0.1")
+    sched.mark_dirty("10.0.0.1", priority=True)
+    assert sched.run_pending() == ["10.0.0.1"]
+
+
+def test_active_job_keeps_ip_dirty_until_next_interval(sched, clock, runs, active):
+    active.add("10.0.0.1")
+    sched.mark_dirty("10.0.0.1")
+    assert sched.run_pending() == ["10.0.0.1"]
+    assert sched.dirty_count == 1
+    assert sched.dispatched == 0
+    clock.now += 10
+    assert sched.run_pending() == []
+    active.clear()
+    clock.now += 20
+    assert sched.run_pending() == ["10.0.0.1"]
+    sched.close()
+    assert runs == [("10.0.0.1", "job-10.0.0.1")]
+
+
+def test_close_dispatches_remaining_dirty_ips(sched, clock, runs):
+    sched.mark_dirty("10.0.0.1")
+    sched.run_pending()
+    sched.mark_dirty("10.0.0.1")
+    sched.close()
+    assert [ip for ip, _ in runs] == ["10.0.0.1", "10.0.0.1"]
+    assert sched.dirty_count == 0
+
+
+def test_scheduler_thread_dispatches_marks(runs):
+    s = FingerprintScheduler(30, max_workers=1)
+    s.start()
+    s.mark_dirty("10.0.0.9")
+    s.close()
+    assert runs == [("10.0.0.9", "job-10.0.0.9")]
+
+
+def test_no_scheduler_when_interval_is_zero(monkeypatch):
+    monkeypatch.setattr(settings, "FINGERPRINT_MIN_INTERVAL_SECONDS", 0)
+    assert get_fingerprint_scheduler() is None
+
+
+# ---------------------------------------------------------------------------
+# tasks.schedule_fingerprints_for_batch
+# ---------------------------------------------------------------------------
+
+
+class _Tasks:
+    def __init__(self) -> None:
+        self.added: list[tuple] = []
+
+    def add_task(self, func, *args) -> None:
+        self.added.append(args)
+
+
+def test_batch_schedules_threshold_ips_first(monkeypatch, runs):
+    monkeypatch.setattr(settings, "FINGERPRINT_MIN_INTERVAL_SECONDS", 0)
+    background = _Tasks()
+    tasks.schedule_fingerprints_for_batch(["10.0.0.1", "10.0.0.2"], {"10.0.0.2"}, background)
+    assert background.added == [("10.0.0.2", "job-10.0.0.2"), ("10.0.0.1", "job-10.0.0.1")]
+
+
+def test_batch_marks_scheduler_when_debounced(monkeypatch, sched, runs):
+    monkeypatch.setattr(scheduler_module, "get_fingerprint_scheduler", lambda: sched)
+    background = _Tasks()
+    tasks.schedule_fingerprints_for_batch(["10.0.0.1", "10.0.0.2"], {"10.0.0.2"}, background)
+    assert background.added == []
+    assert sched.dirty_count == 2
+    assert sched.run_pending() == ["10.0.0.2", "10.0.0.1"]
@@ -41,3 +41,55 @@ def test_enrich_ip_returns_country_for_public_ip():
     result = enrich_ip("8.8.8.8")
     assert result["country_code"] is not None
     assert len(result["country_code"]) == 2
+
+
+class _StubReader:
+    """Stands in for maxminddb.Reader: get() returns a decoded record or None."""
+
+    def __init__(self, records: dict[str, dict]):
+        self._records = records
+
+    def get(self, ip):
+        if ip == "not-an-ip":
+            raise ValueError(ip)
+        return self._records.get(ip)
+
+    def close(self):
+        pass
+
+
+_CITY_RECORD = {
+    "city": {"geoname_id": 5375480, "names": {"en": "Mountain View", "de": "Mountain View"}},
+    "continent": {"code": "NA", "names": {"en": "North America"}},
+    "country": {"iso_code": "US", "names": {"en": "United States", "fr": "États Unis"}},
+    "location": {"latitude": 37.4, "longitude": -122.1},
+    "subdivisions": [{"iso_code": "CA", "names": {"en": "California"}}],
+}
+
+
+def test_enrich_ip_extracts_stored_fields_from_record(monkeypatch):
+    monkeypatch.setattr(geoip_module, "_city_reader", _StubReader({"8.8.8.8": _CITY_RECORD}))
+    assert enrich_ip("8.8.8.8") == {
+        "country_code": "US",
+        "country_name": "United States",
+        "city": "Mountain View",
+    }
+
+
+def test_enrich_ip_record_without_city_or_names(monkeypatch):
+    record = {"country": {"iso_code": "DE"}}
+    monkeypatch.setattr(geoip_module, "_city_reader", _StubReader({"1.2.3.4": record}))
+    assert enrich_ip("1.2.3.4") == {"country_code": "DE", "country_name": None, "city": None}
+
+
+def test_enrich_ip_address_not_found_or_invalid_returns_all_none(monkeypatch):
+    monkeypatch.setattr(geoip_module, "_city_reader", _StubReader({}))
+    for ip in ("1.2.3.4", "not-an-ip"):
+        assert enrich_ip(ip) == {"country_code": None, "country_name": None, "city": None}
+
+
+def test_enrich_ip_corrupt_mmdb_returns_all_none(monkeypatch, tmp_path):
+    corrupt = tmp_path / "corrupt.mmdb"
+    corrupt.write_bytes(b"not a maxmind database")
+    monkeypatch.setattr(geoip_module, "CITY_DB_PATH", corrupt)
+    assert enrich_ip("8.8.8.8") == {"country_code": None, "country_name": None, "city": None}
@@ -282,6 +282,46 @@ def test_import_public_ip_upserts_source_ips(tmp_path, import_engine):
     assert row[0] == 1
 
 
+def test_import_aggregates_source_ips_per_file(tmp_path, import_engine):
+    dup = _cowrie_event(ip="8.8.8.8", ts="2025-10-28T18:31:01+00:00")
+    first = tmp_path / "a.jsonl"
+    _write_jsonl(first, [dup])
+    import_files([first], import_engine)
+
+    second = tmp_path / "b.jsonl"
+    _write_jsonl(
+        second,
+        [
+            _cowrie_event(ip="8.8.8.8", ts="2025-10-28T18:31:09+00:00"),
+            dup,  # already imported: must not count
+            _cowrie_event(ip="9.9.9.9", ts="2025-10-28T18:31:10+00:00"),
+            _cowrie_event(ip="8.8.8.8", ts="2025-10-28T18:31:05+00:00"),
+        ],
+    )
+    upserts: list[str] = []
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        if "INTO source_ips" in statement:
+            upserts.append(statement)
+
+    sa_event.listen(import_engine, "before_cursor_execute", _count)
+    try:
+        import_files([second], import_engine)
+    finally:
+        sa_event.remove(import_engine, "before_cursor_execute", _count)
+
+    assert len(upserts) == 1
+    with import_engine.connect() as conn:
+        rows = conn.execute(
+            text("SELECT ip, first_seen, last_seen, event_count FROM source_ips ORDER BY ip")
+        ).fetchall()
+    # last_seen follows file order, as with one upsert per event.
+    assert [tuple(r) for r in rows] == [
+        ("8.8.8.8", "2025-10-28T18:31:01+00:00", "2025-10-28T18:31:05+00:00", 3),
+        ("9.9.9.9", "2025-10-28T18:31:10+00:00", "2025-10-28T18:31:10+00:00", 1),
+    ]
+
+
 # ---------------------------------------------------------------------------
 # Multiple files
 # ---------------------------------------------------------------------------
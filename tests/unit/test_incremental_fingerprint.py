@@ -0,0 +1,238 @@
+"""Unit tests for app/intelligence/incremental.py.
+
+FingerprintState output is compared against extract_all_features() /
+build_fingerprint() over the same events, folded in one pass, in chunks, and
+across a JSON round-trip.  All tests use in-memory event dicts.
+"""
+
+from __future__ import annotations
+
+import json
+import random
+from datetime import UTC, datetime, timedelta
+
+import pytest
+
+import app.intelligence.incremental as incremental_module
+from app.intelligence.fingerprint import build_fingerprint, build_fingerprint_from_state
+from app.intelligence.incremental import FingerprintState
+from app.intelligence.sequence import extract_all_features, fingerprint_fields
+
+_BASE_TS = datetime(2025, 1, 1, 12, 0, 0, tzinfo=UTC)
+
+
+def _random_events(n: int, seed: int = 7) -> list[dict]:
+    rng = random.Random(seed)
+    events = []
+    offset = 0.0
+    for _ in range(n):
+        # Mostly sub-minute gaps, some same-second bursts, some session breaks.
+        roll = rng.random()
+        if roll < 0.1:
+            offset += 0
+        elif roll < 0.15:
+            offset += rng.uniform(1801, 90000)
+        else:
+            offset += rng.uniform(0.05, 60)
+        raw: dict = {}
+        if rng.random() < 0.6:
+            raw["username"] = rng.choice(["root", "admin", "user1", "a@b.c", "1234", ""])
+        if rng.random() < 0.6:
+            raw["password"] = rng.choice(["123456", "Passw0rd!", "letmein", "", "x"])
+        if rng.random() < 0.05:
+            raw["kex_algs"] = ["curve25519-sha256", rng.choice(["dh-group14", "dh-group1"])]
+        events.append(
+            {
+                "ts": (_BASE_TS + timedelta(seconds=offset)).isoformat(),
+                "dst_port": rng.choice([22, 23, 80, 443, 2222, 8080, None]),
+                "event_type": rng.choice(["auth_failed", "auth_failed", "port_scan", "http_probe"]),
+                "service": rng.choice(["ssh", "telnet", "http", None]),
+                "source": rng.choice(["cowrie", "cowrie", "dionaea"]),
+                "raw_data": raw,
+            }
+        )
+    return events
+
+
+def _fold_in_chunks(events: list[dict], sizes: list[int]) -> FingerprintState:
+    state = FingerprintState()
+    start = 0
+    for size in sizes:
+        chunk = events[start : start + size]
+        # Persist and reload between chunks, as the fingerprint task does.
+        state = FingerprintState.from_dict(json.loads(json.dumps(state.to_dict())))
+        assert state.fold(chunk)
+        start += size
+    assert start == len(events)
+    return state
+
+
+def _assert_close(incremental, full, abs_tol: float = 0.0011, path: str = "") -> None:
+    """Equal, except floats may differ by one unit in the last rounded digit."""
+    if isinstance(full, float) and isinstance(incremental, float):
+        assert incremental == pytest.approx(full, abs=abs_tol), path
+    elif isinstance(full, dict):
+        assert isinstance(incremental, dict), path
+        assert list(incremental) == list(full), path
+        for key in full:
+            _assert_close(incremental[key], full[key], abs_tol, f"{path}.{key}")
+    elif isinstance(full, list):
+        assert isinstance(incremental, list) and len(incremental) == len(full), path
+        for i, (a, b) in enumerate(zip(incremental, full, strict=True)):
+            _assert_close(a, b, abs_tol, f"{path}[{i}]")
+    else:
+        assert incremental == full, path
+
+
+# ---------------------------------------------------------------------------
+# Agreement with the full scan
+# ---------------------------------------------------------------------------
+
+
+def test_single_fold_matches_extract_all_features():
+    events = _random_events(400)
+    state = FingerprintState()
+    assert state.fold(events)
+    _assert_close(state.features(), extract_all_features(events))
+
+
+def test_chunked_folds_with_round_trips_match_extract_all_features():
+    events = _random_events(500, seed=11)
+    state = _fold_in_chunks(events, [1, 1, 37, 200, 0, 261])
+    _assert_close(state.features(), extract_all_features(events))
+
+
+def test_fingerprint_from_state_matches_build_fingerprint():
+    events = _random_events(120, seed=3)
+    state = _fold_in_chunks(events, [60, 60])
+    incremental = build_fingerprint_from_state(state)
+    full = build_fingerprint(events)
+    assert incremental["event_count"] == full["event_count"] == 120
+    assert incremental["confidence"] == full["confidence"]
+    for column in ("sequence_features", "protocol_features", "credential_features"):
+        assert incremental[column] == full[column]
+    for column in ("target_features", "tool_signals"):
+        assert incremental[column] == full[column]
+    _assert_close(json.loads(incremental["timing_features"]), json.loads(full["timing_features"]))
+
+
+def test_typed_events_fold_like_raw_data_events():
+    events = _random_events(300, seed=13)
+    typed = [
+        {**{k: v for k, v in e.items() if k != "raw_data"}, **fingerprint_fields(e["raw_data"])}
+        for e in events
+    ]
+    raw_state, typed_state = FingerprintState(), FingerprintState()
+    assert raw_state.fold(events) and typed_state.fold(typed)
+    assert typed_state.to_dict() == raw_state.to_dict()
+
+
+@pytest.mark.parametrize(
+    "events",
+    [
+        [],
+        _random_events(1),
+        # Two events in different sessions: no interval, so no timing features.
+        [
+            {"ts": "2025-01-01T00:00:00+00:00", "dst_port": None, "event_type": "unknown"},
+            {"ts": "2025-01-02T00:00:00+00:00", "dst_port": None, "event_type": "unknown"},
+        ],
+    ],
+    ids=["empty", "one-event", "no-intervals"],
+)
+def test_sparse_inputs_match_extract_all_features(events):
+    state = FingerprintState()
+    assert state.fold(events)
+    assert state.features() == extract_all_features(events)
+
+
+def test_whole_password_length_mean_keeps_int_type():
+    events = [
+        {
+            "ts": f"2025-01-01T00:00:0{i}+00:00",
+            "dst_port": 22,
+            "event_type": "auth_failed",
+            "raw_data": {"username": "root", "password": "abcd"},
+        }
+        for i in range(3)
+    ]
+    state = FingerprintState()
+    state.fold(events)
+    assert json.dumps(state.features()) == json.dumps(extract_all_features(events))
+
+
+def test_event_type_sequence_is_not_capped():
+    events = _random_events(300, seed=5)
+    state = _fold_in_chunks(events, [150, 150])
+    sequence = state.features()["sequence_features"]["event_type_sequence"]
+    assert sequence == [e["event_type"] for e in sorted(events, key=lambda e: e["ts"])]
+
+
+def test_state_holds_no_raw_credentials():
+    events = [
+        {
+            "ts": "2025-01-01T00:00:00+00:00",
+            "dst_port": 22,
+            "event_type": "auth_failed",
+            "raw_data": {"username": "sekrit-user", "password": "hunter2-pass"},
+        }
+    ]
+    state = FingerprintState()
+    state.fold(events)
+    dumped = json.dumps(state.to_dict())
+    assert "sekrit-user" not in dumped
+    assert "hunter2-pass" not in dumped
+
+
+# ---------------------------------------------------------------------------
+# Ordering
+# ---------------------------------------------------------------------------
+
+
+def test_fold_refuses_events_older_than_state():
+    events = _random_events(50, seed=9)
+    state = FingerprintState()
+    state.fold(events[10:])
+    before = state.to_dict()
+    assert state.fold(events[:10]) is False
+    assert state.to_dict() == before
+
+
+def test_fold_accepts_events_at_last_timestamp():
+    state = FingerprintState()
+    state.fold([{"ts": "2025-01-01T00:00:00+00:00", "event_type": "port_scan"}])
+    assert state.fold([{"ts": "2025-01-01T00:00:00+00:00", "event_type": "port_scan"}])
+    assert state.event_count == 2
+
+
+# ---------------------------------------------------------------------------
+# Interval sketch
+# ---------------------------------------------------------------------------
+
+
+def test_percentiles_switch_to_sketch_within_documented_accuracy(monkeypatch):
+    monkeypatch.setattr(incremental_module, "EXACT_INTERVAL_LIMIT", 64)
+    events = _random_events(2000, seed=21)
+    state = _fold_in_chunks(events, [30, 500, 1470])
+    assert state.interval_digest.exact is None  # past the limit → sketch
+
+    full = extract_all_features(events)["timing_features"]["interval"]
+    got = state.features()["timing_features"]["interval"]
+    accuracy = incremental_module.INTERVAL_SKETCH_ACCURACY
+    for key in ("p25", "p75", "p95"):
+        assert got[key] == pytest.approx(full[key], rel=accuracy, abs=0.001), key
+    assert got["mean"] == pytest.approx(full["mean"], abs=0.0011)
+    assert got["stddev"] == pytest.approx(full["stddev"], abs=0.0011)
+
+
+def test_sketch_reports_zero_intervals_exactly(monkeypatch):
+    monkeypatch.setattr(incremental_module, "EXACT_INTERVAL_LIMIT", 4)
+    events = [
+        {"ts": "2025-01-01T00:00:00+00:00", "event_type": "port_scan", "dst_port": 22}
+        for _ in range(20)
+    ]
+    state = FingerprintState()
+    state.fold(events)
+    assert state.interval_digest.exact is None
+    interval = state.features()["timing_features"]["interval"]
+    assert (interval["p25"], interval["p75"], interval["p95"]) == (0.0, 0.0, 0.0)
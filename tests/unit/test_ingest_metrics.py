@@ -0,0 +1,98 @@
+"""Unit tests for ingest pipeline instrumentation (app/ingest/metrics.py)."""
+
+from __future__ import annotations
+
+import pytest
+
+from app.core.config import settings
+from app.ingest import metrics as metrics_module
+from app.ingest.metrics import (
+    Histogram,
+    IngestMetrics,
+    commit_timer,
+    format_sample,
+    get_ingest_metrics,
+    observe_stage,
+    record_outcome,
+    reset_ingest_metrics_for_testing,
+    stage_timer,
+)
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics():
+    reset_ingest_metrics_for_testing()
+    yield
+    reset_ingest_metrics_for_testing()
+
+
+@pytest.fixture()
+def enabled(monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_ENABLED", True)
+
+
+def test_histogram_buckets_are_cumulative():
+    h = Histogram([0.1, 1.0])
+    for v in (0.05, 0.1, 0.5, 3.0):
+        h.observe(v)
+    cumulative, total, count = h.snapshot()
+    assert cumulative == [2, 3, 4]  # le=0.1 is inclusive
+    assert count == 4
+    assert total == pytest.approx(3.65)
+
+
+def test_format_sample_escapes_labels():
+    assert format_sample("m", 3) == "m 3"
+    assert format_sample("m", 0.25, stage='a"b') == 'm{stage="a\\"b"} 0.25'
+
+
+def test_render_lists_every_stage_and_outcome():
+    text = "\n".join(IngestMetrics().render())
+    for stage in metrics_module.STAGES:
+        assert f'legiontrap_ingest_stage_seconds_count{{stage="{stage}"}} 0' in text
+    assert 'legiontrap_ingest_stage_seconds_bucket{stage="dedup",le="+Inf"} 0' in text
+    assert 'legiontrap_ingest_events_total{mode="stream",outcome="duplicate"} 0' in text
+
+
+def test_disabled_records_nothing():
+    assert settings.METRICS_ENABLED is False
+    with stage_timer("dedup"):
+        pass
+    observe_stage("validation", 0.5)
+    record_outcome("sync", 3, 1, 1)
+    with commit_timer() as timer:
+        assert timer.wrap(len)([1, 2]) == 2
+
+    m = get_ingest_metrics()
+    assert all(h.snapshot()[2] == 0 for h in m.stages.values())
+    assert set(m.outcomes().values()) == {0}
+
+
+def test_stage_timer_observes_once_per_block(enabled):
+    with stage_timer("dedup"):
+        pass
+    with stage_timer("dedup"):
+        pass
+    assert get_ingest_metrics().stages["dedup"].snapshot()[2] == 2
+
+
+def test_commit_timer_observes_only_after_unit_ran(enabled):
+    with commit_timer() as timer:
+        assert timer.wrap(lambda session: session + 1)(1) == 2
+    with pytest.raises(RuntimeError), commit_timer() as timer:
+        timer.wrap(lambda session: session)(None)
+        raise RuntimeError("commit failed")
+    with commit_timer():
+        pass  # unit never ran
+    assert get_ingest_metrics().stages["commit"].snapshot()[2] == 1
+
+
+def test_record_outcome_accumulates_by_mode(enabled):
+    record_outcome("sync", 3, 1, 2)
+    record_outcome("sync", 1, 0, 0)
+    record_outcome("stream", 5, 0, 0)
+    outcomes = get_ingest_metrics().outcomes()
+    assert outcomes[("sync", "accepted")] == 4
+    assert outcomes[("sync", "duplicate")] == 2
+    assert outcomes[("stream", "accepted")] == 5
+    assert outcomes[("async", "accepted")] == 0
@@ -23,6 +23,11 @@ Coverage:
   - backend_metadata_json stored and retrieved correctly
   - result_summary_json stored and retrieved correctly
   - invalid status values are not inserted by the state machine
+  - claim_jobs leases pending jobs oldest first, at most limit
+  - heartbeat extends only the owning worker's running lease
+  - expired leases are re-queued, then failed after max_attempts
+  - complete_job/fail_job with worker_id only finish the holder's lease
+  - leased jobs are exempt from transition_stale_jobs_to_failed
 """
 
 from __future__ import annotations
@@ -526,3 +531,113 @@ def test_completed_job_does_not_block_new_job(repo, session):
     _commit(session)
     assert job2["id"] != job1["id"]
     assert job2["status"] == "pending"
+
+
+# ---------------------------------------------------------------------------
+# claim_jobs / heartbeat / requeue_expired_leases
+# ---------------------------------------------------------------------------
+
+_T0 = "2026-03-01T08:00:00+00:00"
+
+
+def _at(seconds: int) -> str:
+    return (datetime.fromisoformat(_T0) + timedelta(seconds=seconds)).isoformat()
+
+
+def _pending_jobs(repo, session, n: int) -> tuple[str, list[str]]:
+    job_type = f"lease_test_{uuid.uuid4().hex[:8]}"
+    ids = [repo.create_job(job_type=job_type)["id"] for _ in range(n)]
+    _commit(session)
+    return job_type, ids
+
+
+def test_claim_jobs_leases_oldest_first(repo, session):
+    job_type, ids = _pending_jobs(repo, session, 3)
+    claimed = repo.claim_jobs(job_type, "w1", 2, 60, now=_T0)
+    _commit(session)
+    assert [j["id"] for j in claimed] == ids[:2]
+    for job in claimed:
+        assert job["status"] == "running"
+        assert job["worker_id"] == "w1"
+        assert job["lease_expires_at"] == _at(60)
+        assert job["attempts"] == 1
+    assert repo.get_job(ids[2])["status"] == "pending"
+
+
+def test_claim_jobs_never_claims_a_job_twice(repo, session):
+    job_type, ids = _pending_jobs(repo, session, 2)
+    first = repo.claim_jobs(job_type, "w1", 5, 60, now=_T0)
+    second = repo.claim_jobs(job_type, "w2", 5, 60, now=_at(1))
+    _commit(session)
+    assert [j["id"] for j in first] == ids
+    assert second == []
+    assert repo.claim_jobs(job_type, "w1", 0, 60, now=_T0) == []
+
+
+def test_heartbeat_extends_only_owned_running_lease(repo, session):
+    job_type, (job_id,) = _pending_jobs(repo, session, 1)
+    repo.claim_jobs(job_type, "w1", 1, 60, now=_T0)
+    assert repo.heartbeat(job_id, "w1", 60, now=_at(30)) is True
+    assert repo.get_job(job_id)["lease_expires_at"] == _at(90)
+    assert repo.heartbeat(job_id, "w2", 60, now=_at(30)) is False
+    repo.complete_job(job_id, result_summary_json={})
+    assert repo.heartbeat(job_id, "w1", 60, now=_at(40)) is False
+    _commit(session)
+
+
+def test_expired_lease_is_requeued_and_reclaimed(repo, session):
+    job_type, (job_id,) = _pending_jobs(repo, session, 1)
+    repo.claim_jobs(job_type, "w1", 1, 60, now=_T0)
+    assert repo.claim_jobs(job_type, "w2", 1, 60, now=_at(59)) == []
+    reclaimed = repo.claim_jobs(job_type, "w2", 1, 60, now=_at(61))
+    _commit(session)
+    assert [(j["id"], j["worker_id"], j["attempts"]) for j in reclaimed] == [(job_id, "w2", 2)]
+    assert repo.heartbeat(job_id, "w1", 60, now=_at(62)) is False
+
+
+def test_stale_worker_cannot_finish_reclaimed_job(repo, session):
+    job_type, (job_id,) = _pending_jobs(repo, session, 1)
+    repo.claim_jobs(job_type, "w1", 1, 60, now=_T0)
+    repo.claim_jobs(job_type, "w2", 1, 60, now=_at(61))
+    _commit(session)
+    assert repo.complete_job(job_id, result_summary_json={}, worker_id="w1") is False
+    assert repo.fail_job(job_id, error_message="stale", worker_id="w1") is False
+    _commit(session)
+    job = repo.get_job(job_id)
+    assert (job["status"], job["worker_id"], job["lease_expires_at"]) == ("running", "w2", _at(121))
+
+    assert repo.complete_job(job_id, result_summary_json={}, worker_id="w2") is True
+    _commit(session)
+    job = repo.get_job(job_id)
+    assert job["status"] == "completed"
+    assert job["lease_expires_at"] is None
+
+
+def test_fail_job_with_worker_id_clears_lease(repo, session):
+    job_type, (job_id,) = _pending_jobs(repo, session, 1)
+    repo.claim_jobs(job_type, "w1", 1, 60, now=_T0)
+    assert repo.fail_job(job_id, error_message="boom", worker_id="w1") is True
+    _commit(session)
+    job = repo.get_job(job_id)
+    assert job["status"] == "failed"
+    assert job["lease_expires_at"] is None
+
+
+def test_expired_lease_fails_after_max_attempts(repo, session):
+    job_type, (job_id,) = _pending_jobs(repo, session, 1)
+    repo.claim_jobs(job_type, "w1", 1, 10, now=_T0, max_attempts=2)
+    repo.claim_jobs(job_type, "w2", 1, 10, now=_at(20), max_attempts=2)
+    assert repo.requeue_expired_leases(job_type, now=_at(40), max_attempts=2) == 1
+    _commit(session)
+    job = repo.get_job(job_id)
+    assert job["status"] == "failed"
+    assert job["error_message"] == "Job lease expired too many times"
+
+
+def test_leased_job_is_not_failed_by_stale_timeout(repo, session):
+    job_type, (job_id,) = _pending_jobs(repo, session, 1)
+    repo.claim_jobs(job_type, "w1", 1, 60, now=_T0)
+    _commit(session)
+    repo.transition_stale_jobs_to_failed(timeout_seconds=1)
+    _commit(session)
+    assert repo.get_job(job_id)["status"] == "running"
@@ -0,0 +1,73 @@
+"""Unit tests for the incremental NDJSON splitter (app/ingest/ndjson.py)."""
+
+from __future__ import annotations
+
+import gzip
+import zlib
+
+import pytest
+
+from app.ingest.ndjson import NDJSONDecoder
+
+
+def _decode(decoder: NDJSONDecoder, chunks: list[bytes]) -> list[bytes | None]:
+    lines: list[bytes | None] = []
+    for chunk in chunks:
+        lines.extend(decoder.feed(chunk))
+    lines.extend(decoder.close())
+    return lines
+
+
+def _bytewise(body: bytes) -> list[bytes]:
+    return [body[i : i + 1] for i in range(len(body))]
+
+
+def test_splits_lines_across_arbitrary_chunk_boundaries():
+    body = b'{"a":1}\n{"b":2}\r\n\n{"c":3}'
+    expected = [b'{"a":1}', b'{"b":2}', b"", b'{"c":3}']
+    assert _decode(NDJSONDecoder(1024), [body]) == expected
+    assert _decode(NDJSONDecoder(1024), _bytewise(body)) == expected
+
+
+def test_trailing_newline_yields_no_extra_line():
+    assert _decode(NDJSONDecoder(1024), [b"x\ny\n"]) == [b"x", b"y"]
+
+
+def test_oversized_line_yielded_once_as_none_and_skipped():
+    body = b"ok\n" + b"z" * 50 + b"\nnext\n"
+    expected = [b"ok", None, b"next"]
+    assert _decode(NDJSONDecoder(10), [body]) == expected
+    assert _decode(NDJSONDecoder(10), _bytewise(body)) == expected
+
+
+def test_oversized_final_line_without_newline():
+    assert _decode(NDJSONDecoder(4), [b"a\n", b"bbbbbbbb"]) == [b"a", None]
+
+
+def test_gzip_body_decoded_incrementally():
+    body = b"".join(b'{"n":%d}\n' % i for i in range(2000))
+    compressed = gzip.compress(body)
+    lines = _decode(NDJSONDecoder(1024, gzip=True), _bytewise(compressed))
+    assert lines == [b'{"n":%d}' % i for i in range(2000)]
+
+
+def test_gzip_inflates_in_bounded_steps():
+    """A highly compressible line cannot expand past max_line_bytes in one buffer."""
+    compressed = gzip.compress(b"a" * 5_000_000 + b"\nok\n")
+    decoder = NDJSONDecoder(1024, gzip=True)
+    assert _decode(decoder, [compressed]) == [None, b"ok"]
+    assert len(decoder._buffer) == 0
+
+
+def test_corrupt_gzip_raises_zlib_error():
+    decoder = NDJSONDecoder(1024, gzip=True)
+    with pytest.raises(zlib.error):
+        list(decoder.feed(b"definitely not gzip"))
+
+
+def test_truncated_gzip_raises_on_close():
+    compressed = gzip.compress(b'{"a":1}\n{"b":2}\n')
+    decoder = NDJSONDecoder(1024, gzip=True)
+    list(decoder.feed(compressed[:-8]))
+    with pytest.raises(zlib.error):
+        list(decoder.close())
@@ -0,0 +1,72 @@
+"""Unit tests for the RawEvent ingest fast path (app/schemas/models.py)."""
+
+from __future__ import annotations
+
+import json
+
+import pytest
+from pydantic import ValidationError
+
+from app.schemas.models import RawEvent
+from app.utils.event_utils import extract_src_ip
+
+
+def _event(**extra) -> dict:
+    return {
+        "id": "evt-1",
+        "ts": "2025-10-28T18:31:08+00:00",
+        "source": "cowrie",
+        "type": "cowrie.login.failed",
+        "data": {"ip": "8.8.8.8", "username": "root", "password": "bad"},
+        **extra,
+    }
+
+
+def test_from_json_line_keeps_received_text():
+    line = json.dumps(_event(sensor="s1"), indent=None, separators=(", ", ": ")).encode()
+    raw = RawEvent.from_json_line(line)
+    assert raw.raw_json() == line.decode()
+    assert json.loads(raw.raw_json()) == json.loads(raw.model_dump_json())
+
+
+def test_from_json_line_without_id_serialises_generated_id():
+    event = _event()
+    del event["id"]
+    raw = RawEvent.from_json_line(json.dumps(event).encode())
+    assert json.loads(raw.raw_json())["id"] == raw.id
+
+
+def test_from_json_line_rejects_invalid_input():
+    with pytest.raises(ValidationError):
+        RawEvent.from_json_line(b'{"id": "x", "source": "cowrie"}')
+
+
+def test_raw_json_falls_back_to_model_dump_json():
+    raw = RawEvent.model_validate(_event())
+    assert raw.raw_json() == raw.model_dump_json()
+
+
+def test_received_text_is_not_part_of_the_model():
+    raw = RawEvent.from_json_line(json.dumps(_event()).encode())
+    assert raw.model_dump() == RawEvent.model_validate(_event()).model_dump()
+
+
+@pytest.mark.parametrize(
+    "event",
+    [
+        _event(),
+        _event(data={"src_ip": "1.1.1.1"}),
+        _event(data={}, src_ip="9.9.9.9"),
+        _event(data={"ip": "10.0.0.1"}, client_ip="4.4.4.4"),
+        _event(data={"ip": 42}, source_ip="208.67.222.222"),
+        _event(data={}),
+    ],
+)
+def test_normalization_view_matches_model_dump(event):
+    raw = RawEvent.model_validate(event)
+    assert extract_src_ip(raw.normalization_view()) == extract_src_ip(raw.model_dump())
+
+
+def test_normalization_view_does_not_copy_data():
+    raw = RawEvent.model_validate(_event())
+    assert raw.normalization_view()["data"] is raw.data
@@ -0,0 +1,70 @@
+"""Unit tests for the process-local recent event id filter (app/ingest/dedup.py)."""
+
+from __future__ import annotations
+
+import pytest
+
+from app.core.config import settings
+from app.ingest.dedup import (
+    RecentEventIds,
+    get_recent_event_ids,
+    reset_recent_event_ids_for_testing,
+)
+
+
+def test_split_separates_known_and_unknown_ids():
+    ids = RecentEventIds(capacity=10)
+    ids.remember(["a", "b"])
+    known, unknown = ids.split(["a", "c", "b", "d"])
+    assert known == {"a", "b"}
+    assert unknown == ["c", "d"]
+
+
+def test_split_counts_hits_and_misses():
+    ids = RecentEventIds(capacity=10)
+    ids.remember(["a"])
+    ids.split(["a", "b", "c"])
+    assert ids.hits == 1
+    assert ids.misses == 2
+
+
+def test_capacity_evicts_least_recently_used():
+    ids = RecentEventIds(capacity=2)
+    ids.remember(["a", "b"])
+    ids.split(["a"])  # touch a → b becomes the oldest
+    ids.remember(["c"])
+    known, unknown = ids.split(["a", "b", "c"])
+    assert known == {"a", "c"}
+    assert unknown == ["b"]
+    assert len(ids) == 2
+
+
+def test_clear_resets_state():
+    ids = RecentEventIds(capacity=4)
+    ids.remember(["a"])
+    ids.split(["a"])
+    ids.clear()
+    assert len(ids) == 0
+    assert ids.hits == 0
+
+
+def test_invalid_capacity_rejected():
+    with pytest.raises(ValueError):
+        RecentEventIds(capacity=0)
+
+
+def test_get_recent_event_ids_disabled_by_default():
+    reset_recent_event_ids_for_testing()
+    assert settings.INGEST_RECENT_ID_CACHE_SIZE == 0
+    assert get_recent_event_ids() is None
+
+
+def test_get_recent_event_ids_singleton_when_enabled(monkeypatch):
+    monkeypatch.setattr(settings, "INGEST_RECENT_ID_CACHE_SIZE", 5)
+    reset_recent_event_ids_for_testing()
+    try:
+        first = get_recent_event_ids()
+        assert first is not None
+        assert get_recent_event_ids() is first
+    finally:
+        reset_recent_event_ids_for_testing()
@@ -11,7 +11,8 @@ Privacy invariants verified here:
 from __future__ import annotations
 
 import json
-from datetime import UTC, datetime, timedelta
+import random
+from datetime import UTC, datetime, timedelta, timezone
 
 import pytest
 
@@ -24,6 +25,7 @@ from app.intelligence.sequence import (
     compute_tool_signals,
     extract_all_features,
     extract_sessions,
+    fingerprint_fields,
 )
 
 # ---------------------------------------------------------------------------
@@ -504,6 +506,110 @@ def test_extract_all_features_empty_events_all_none_or_empty():
     assert result["credential_features"] is None
 
 
+def _reference_features(events: list[dict]) -> dict:
+    """The six per-category functions, called independently."""
+    return {
+        "timing_features": compute_timing_features(events),
+        "sequence_features": compute_sequence_features(events),
+        "protocol_features": compute_protocol_features(events),
+        "credential_features": compute_credential_features(events),
+        "target_features": compute_target_features(events),
+        "tool_signals": compute_tool_signals(events),
+    }
+
+
+def _mixed_events(n: int, seed: int) -> list[dict]:
+    """Unsorted events with timestamp ties, mixed UTC offsets, >50 ports and credentials."""
+    rng = random.Random(seed)
+    events = []
+    for _ in range(n):
+        offset = rng.choice([0, 0, 1, 5, 61, 3600 * 3]) * rng.randint(0, 40)
+        ts = _BASE_TS + timedelta(seconds=offset)
+        if rng.random() < 0.2:
+            ts = ts.astimezone(timezone(timedelta(hours=2)))
+        raw: dict = {}
+        if rng.random() < 0.5:
+            raw["username"] = rng.choice(["root", "a@b.c", "007", "", "x-y"])
+        if rng.random() < 0.5:
+            raw["password"] = rng.choice(["abcd", "Abc123!", "", "1234", "ZZ"])
+        if rng.random() < 0.1:
+            raw["tls_cipher_suites"] = ["c02b", rng.choice(["c02f", "c030"])]
+        event = {
+            "ts": ts.isoformat(),
+            "dst_port": rng.choice([None, rng.randint(1, 120)]),
+            "event_type": rng.choice(["auth_failed", "port_scan", "http_probe"]),
+            "service": rng.choice([None, "", "ssh", "http"]),
+            "raw_data": raw,
+        }
+        if rng.random() < 0.9:
+            event["source"] = rng.choice(["cowrie", "dionaea"])
+        events.append(event)
+    return events
+
+
+@pytest.mark.parametrize("n,seed", [(0, 0), (1, 1), (2, 2), (40, 3), (600, 4), (600, 5)])
+def test_extract_all_features_identical_to_per_category_functions(n, seed):
+    events = _mixed_events(n, seed)
+    assert json.dumps(extract_all_features(events)) == json.dumps(_reference_features(events))
+
+
+def _typed(events: list[dict]) -> list[dict]:
+    """The events as the repository returns them: fingerprint_fields() in place of raw_data."""
+    typed = []
+    for e in events:
+        t = {k: v for k, v in e.items() if k != "raw_data"}
+        t.update(fingerprint_fields(e["raw_data"]))
+        typed.append(t)
+    return typed
+
+
+@pytest.mark.parametrize("n,seed", [(1, 7), (40, 8), (600, 9)])
+def test_typed_events_produce_identical_features(n, seed):
+    events = _mixed_events(n, seed)
+    reference = json.dumps(extract_all_features(events))
+    assert json.dumps(extract_all_features(_typed(events))) == reference
+    assert json.dumps(_reference_features(_typed(events))) == reference
+
+
+def test_fingerprint_fields_keep_no_raw_credentials():
+    fields = fingerprint_fields(
+        {"username": "sekrit-user", "password": "Hunter2-pass", "kex_algs": ["curve25519-sha256"]}
+    )
+    assert fields == {
+        "username_class": "special",
+        "password_class": "special",
+        "password_length": 12,
+        "password_flags": 0b1111,
+        "ssh_kex": ["curve25519-sha256"],
+        "tls_ciphers": None,
+    }
+
+
+def test_fingerprint_fields_absent_credentials_are_none():
+    fields = fingerprint_fields({"username": "root"})
+    assert fields["username_class"] == "alpha"
+    assert fields["password_class"] is None
+    assert fields["password_length"] is None
+    assert fields["password_flags"] is None
+
+
+def test_extract_all_features_parses_each_timestamp_once(monkeypatch):
+    import app.intelligence.sequence as sequence_module
+
+    calls: list[str] = []
+    original = sequence_module._parse_dt
+
+    def _spy(ts: str):
+        calls.append(ts)
+        return original(ts)
+
+    monkeypatch.setattr(sequence_module, "_parse_dt", _spy)
+    monkeypatch.setattr(sequence_module, "_parse_epoch", lambda ts: pytest.fail("re-parsed"))
+    events = _mixed_events(50, 6)
+    extract_all_features(events)
+    assert len(calls) == len(events)
+
+
 # ---------------------------------------------------------------------------
 # Privacy invariant: no source IP in any feature category
 # ---------------------------------------------------------------------------
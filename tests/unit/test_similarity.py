@@ -6,6 +6,7 @@ All tests use in-memory dicts only — no database, no HTTP.
 from __future__ import annotations
 
 import json
+import random
 
 import pytest
 
@@ -19,8 +20,11 @@ from app.intelligence.similarity import (
     _levenshtein,
     _normalized_edit_sim,
     _stat_sim,
+    bounded_weighted_similarity,
     compute_weighted_similarity,
     credential_similarity,
+    parse_fingerprint,
+    parsed_weighted_similarity,
     protocol_similarity,
     sequence_similarity,
     target_similarity,
@@ -448,3 +452,112 @@ def test_weighted_similarity_no_raw_values_in_result():
         assert val is None or isinstance(
             val, int | float
         ), f"Field {key!r} has non-numeric value {val!r}"
+
+
+# ---------------------------------------------------------------------------
+# bounded_weighted_similarity
+# ---------------------------------------------------------------------------
+
+_EQUAL_WEIGHTS = {k: 0.2 for k in ("timing", "sequence", "protocol", "credential", "target")}
+
+
+def _random_parsed(rng: random.Random):
+    ports = [22, 23, 80, 443, 8080]
+
+    def _maybe(value):
+        return None if rng.random() < 0.2 else value
+
+    def _seq(pool, n):
+        return [rng.choice(pool) for _ in range(rng.randint(0, n))]
+
+    creds = [
+        {"username_pattern": rng.choice(["root", "admin"]), "password_class": "dict"}
+        for _ in range(rng.randint(0, 4))
+    ]
+    return parse_fingerprint(
+        _make_fp(
+            timing=_maybe(
+                {
+                    "interval": {k: rng.uniform(0, 50) for k in ("mean", "stddev", "p95")},
+                    "burst_cv": rng.uniform(0, 2),
+                }
+            ),
+            sequence=_maybe(
+                {
+                    "port_sequence": _seq(ports, 6),
+                    "event_type_sequence": _seq(["auth_failed", "command", "connect"], 40),
+                    "credential_sequence": creds,
+                }
+            ),
+            protocol=_maybe({"service_distribution": {s: 1.0 for s in _seq(["ssh", "http"], 2)}}),
+            credential=_maybe(
+                {
+                    "password_char_class": {"lower": rng.random(), "digit": rng.random()},
+                    "credential_sequence": creds,
+                }
+            ),
+            target=_maybe({"top_dst_ports": _seq(ports, 5)}),
+        )
+    )
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_bounded_similarity_matches_exact_or_is_below_floor(seed):
+    rng = random.Random(seed)
+    for _ in range(300):
+        a, b = _random_parsed(rng), _random_parsed(rng)
+        weights = None if rng.random() < 0.5 else _EQUAL_WEIGHTS
+        floor = rng.uniform(0.0, 1.0)
+        exact = parsed_weighted_similarity(a, b, weights=weights)
+        bounded = bounded_weighted_similarity(a, b, floor=floor, weights=weights)
+        if bounded is None:
+            assert exact.weighted_total < floor
+        else:
+            assert bounded == exact
+
+
+def test_bounded_similarity_without_floor_is_exact():
+    rng = random.Random(11)
+    for _ in range(100):
+        a, b = _random_parsed(rng), _random_parsed(rng)
+        exact = parsed_weighted_similarity(a, b)
+        assert bounded_weighted_similarity(a, b, floor=0.0) == exact
+
+
+def test_bounded_similarity_abandons_before_remaining_dimensions():
+    """Target alone rules out the floor; the malformed sequence is never read."""
+    a = parse_fingerprint(
+        _make_fp(sequence={"credential_sequence": ["x"]}, target={"top_dst_ports": [22]})
+    )
+    b = parse_fingerprint(
+        _make_fp(sequence={"credential_sequence": ["y"]}, target={"top_dst_ports": [80]})
+    )
+    assert bounded_weighted_similarity(a, b, floor=0.9, weights=_EQUAL_WEIGHTS) is None
+    with pytest.raises(AttributeError):
+        parsed_weighted_similarity(a, b, weights=_EQUAL_WEIGHTS)
+
+
+def test_bounded_similarity_non_positive_weight_evaluates_everything():
+    a = parse_fingerprint(_make_fp(sequence=_FULL_SEQUENCE, target={"top_dst_ports": [22]}))
+    b = parse_fingerprint(_make_fp(sequence=_FULL_SEQUENCE, target={"top_dst_ports": [80]}))
+    weights = {**_EQUAL_WEIGHTS, "sequence": -0.2}
+    exact = parsed_weighted_similarity(a, b, weights=weights)
+    assert bounded_weighted_similarity(a, b, floor=exact.weighted_total, weights=weights) == exact
+
+
+def test_bounded_similarity_negative_char_class_evaluates_everything():
+    """Negative ratios can score credential above 1.0, beyond the bound's assumption."""
+    a = parse_fingerprint(
+        _make_fp(
+            credential={"password_char_class": {"lower": -5.0}}, target={"top_dst_ports": [22]}
+        )
+    )
+    b = parse_fingerprint(
+        _make_fp(
+            credential={"password_char_class": {"lower": -5.5}}, target={"top_dst_ports": [80]}
+        )
+    )
+    exact = parsed_weighted_similarity(a, b, weights=_EQUAL_WEIGHTS)
+    assert exact.credential_similarity > 1.0
+    bounded = bounded_weighted_similarity(a, b, floor=exact.weighted_total, weights=_EQUAL_WEIGHTS)
+    assert bounded == exact
@@ -0,0 +1,218 @@
+"""Unit tests for app/intelligence/similarity_numpy.py.
+
+score_against_many() must agree with parsed_weighted_similarity() to within
+SCORE_TOLERANCE, leave out only candidates below the floor, and let
+contenders() keep every best-scoring candidate — checked on seeded random
+fingerprints.  Fingerprints the packed arithmetic does not cover stay on the
+pure-Python path.  Skipped when NumPy is not installed.
+"""
+
+from __future__ import annotations
+
+import json
+import random
+
+import pytest
+
+from app.intelligence import similarity_numpy
+from app.intelligence.similarity import parse_fingerprint, parsed_weighted_similarity
+from app.intelligence.similarity_numpy import (
+    SCORE_TOLERANCE,
+    PackedCandidates,
+    contenders,
+    score_against_many,
+)
+
+pytest.importorskip("numpy")
+
+_PORTS = [22, 23, 80, 443, 2222, 8080]
+_EVENTS = ["auth_failed", "auth_success", "command", "connect"]
+_KEX = ["curve25519-sha256", "ecdh-sha2-nistp256", "diffie-hellman-group14-sha1"]
+_CHAR_CLASS = ("has_upper_ratio", "has_lower_ratio", "has_digit_ratio", "has_special_ratio")
+_DIMENSIONS = ("timing", "sequence", "protocol", "credential", "target")
+_WEIGHTS = {"timing": 0.3, "sequence": 0.2, "protocol": 0.2, "credential": 0.1, "target": 0.2}
+
+
+def _enc(d):
+    return json.dumps(d) if d is not None else None
+
+
+def _make_fp(**features) -> dict:
+    return {
+        "id": "fp-1",
+        "source_ip": "192.0.2.1",
+        "confidence": 0.8,
+        **{f"{k}_features": _enc(features.get(k)) for k in _DIMENSIONS},
+    }
+
+
+def _random_fp(rng: random.Random):
+    def _maybe(value):
+        return None if rng.random() < 0.15 else value
+
+    def _seq(pool, n):
+        return [rng.choice(pool) for _ in range(rng.randint(0, n))]
+
+    def _hist(n):
+        raw = [rng.random() for _ in range(n)]
+        return [v / sum(raw) for v in raw]
+
+    creds = [
+        {"username_pattern": rng.choice(["root", "admin"]), "password_class": "dict"}
+        for _ in range(rng.randint(0, 4))
+    ]
+    ports = _seq(_PORTS, 6)
+    mean = rng.uniform(1, 500)
+    return parse_fingerprint(
+        _make_fp(
+            timing=_maybe(
+                {
+                    "interval": {"mean": mean, "stddev": mean / 3, "p95": mean * 2},
+                    "tod_histogram": _maybe(_hist(24)),
+                    "dow_histogram": _maybe(_hist(7)),
+                    "burst_cv": rng.uniform(-0.5, 2),
+                }
+            ),
+            sequence=_maybe(
+                {
+                    "port_sequence": ports,
+                    "event_type_sequence": _seq(_EVENTS, 60),
+                    "credential_sequence": creds,
+                }
+            ),
+            protocol=_maybe(
+                {
+                    "service_distribution": {s: 1.0 for s in _seq(["ssh", "http", "ftp"], 2)},
+                    "ssh_kex_ordering": _maybe(_seq(_KEX, 3)),
+                }
+            ),
+            credential=_maybe(
+                {
+                    "username_class_dist": {u: 1.0 for u in _seq(["root", "admin", "digits"], 2)},
+                    "password_char_class": {
+                        k: rng.random() for k in _CHAR_CLASS if rng.random() < 0.8
+                    },
+                    "credential_sequence": creds,
+                }
+            ),
+            target=_maybe(
+                {"port_freq": {str(p): rng.random() for p in ports}, "top_dst_ports": ports}
+            ),
+        )
+    )
+
+
+def _candidates(rng: random.Random, n: int):
+    fps = {f"c{i}": _random_fp(rng) for i in range(n)}
+    weights = {cid: _WEIGHTS if rng.random() < 0.3 else None for cid in fps}
+    packed = PackedCandidates().synced({cid: (fp, weights[cid]) for cid, fp in fps.items()})
+    return fps, weights, packed
+
+
+def _exact(fp, fps, weights) -> dict[str, float]:
+    return {
+        cid: parsed_weighted_similarity(fp, other, weights=weights[cid]).weighted_total
+        for cid, other in fps.items()
+    }
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_scores_match_exact_within_tolerance(seed):
+    rng = random.Random(seed)
+    fps, weights, packed = _candidates(rng, 200)
+    assert len(packed) == len(fps)
+    for _ in range(5):
+        fp = _random_fp(rng)
+        exact = _exact(fp, fps, weights)
+        scores = score_against_many(fp, packed)
+        assert scores.keys() == exact.keys()
+        assert all(abs(scores[cid] - exact[cid]) < SCORE_TOLERANCE for cid in exact)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_floor_omits_only_candidates_below_it(seed):
+    rng = random.Random(seed)
+    fps, weights, packed = _candidates(rng, 200)
+    for _ in range(5):
+        fp = _random_fp(rng)
+        floor = rng.uniform(0.3, 0.7)
+        exact = _exact(fp, fps, weights)
+        scores = score_against_many(fp, packed, floor=floor)
+        assert all(cid in scores for cid, total in exact.items() if total >= floor)
+        assert all(abs(scores[cid] - exact[cid]) < SCORE_TOLERANCE for cid in scores)
+
+
+def test_contenders_include_every_best_candidate():
+    rng = random.Random(7)
+    fps, weights, packed = _candidates(rng, 200)
+    # Duplicate fingerprints give exact ties for the best score.
+    fps.update({f"dup{i}": fps[f"c{i}"] for i in range(20)})
+    weights.update({f"dup{i}": weights[f"c{i}"] for i in range(20)})
+    packed = packed.synced({cid: (fp, weights[cid]) for cid, fp in fps.items()})
+    for i in range(10):
+        fp = fps[f"c{i}"] if i % 2 else _random_fp(rng)
+        exact = _exact(fp, fps, weights)
+        best = max(exact.values())
+        selected = contenders(score_against_many(fp, packed, floor=0.5), 0.5)
+        if best >= 0.5:
+            assert {cid for cid, total in exact.items() if total == best} <= selected
+        else:
+            assert selected == set()
+
+
+def test_unpackable_candidates_are_left_out():
+    rng = random.Random(3)
+    good = _random_fp(rng)
+    bad_timing = parse_fingerprint(_make_fp(timing={"interval": {"mean": -1.0}}))
+    unhashable = parse_fingerprint(_make_fp(protocol={"ssh_kex_ordering": [["a"], ["b"]]}))
+    packed = PackedCandidates().synced(
+        {"good": (good, None), "timing": (bad_timing, None), "kex": (unhashable, None)}
+    )
+
+    assert len(packed) == 1
+    assert "good" in packed and "timing" not in packed and "kex" not in packed
+    assert score_against_many(bad_timing, packed) is None
+    assert score_against_many(unhashable, packed) is None
+    assert score_against_many(good, packed).keys() == {"good"}
+
+
+def test_non_positive_weights_are_not_packed():
+    fp = _random_fp(random.Random(4))
+    packed = PackedCandidates().synced({"c": (fp, {**_WEIGHTS, "timing": 0.0})})
+    assert "c" not in packed
+
+
+def test_synced_returns_self_when_unchanged():
+    rng = random.Random(5)
+    fps, weights, packed = _candidates(rng, 20)
+    sources = {cid: (fp, weights[cid]) for cid, fp in fps.items()}
+    assert packed.synced(dict(sources)) is packed
+
+
+def test_synced_repacks_changed_and_removed_campaigns():
+    rng = random.Random(6)
+    fps, weights, packed = _candidates(rng, 20)
+    fps["c1"] = _random_fp(rng)
+    weights["c2"] = _WEIGHTS if weights["c2"] is None else None
+    del fps["c3"]
+    fps["new"] = _random_fp(rng)
+    weights["new"] = None
+
+    repacked = packed.synced({cid: (fp, weights[cid]) for cid, fp in fps.items()})
+
+    assert repacked is not packed
+    assert "c3" not in repacked and "new" in repacked
+    assert len(repacked) == len(fps)
+    fp = _random_fp(rng)
+    exact = _exact(fp, fps, weights)
+    scores = score_against_many(fp, repacked)
+    assert all(abs(scores[cid] - exact[cid]) < SCORE_TOLERANCE for cid in exact)
+
+
+def test_use_for_respects_threshold(monkeypatch):
+    monkeypatch.setattr(similarity_numpy.settings, "CLUSTERING_NUMPY_MIN_CANDIDATES", 10)
+    assert not similarity_numpy.use_for(9)
+    assert similarity_numpy.use_for(10)
+    monkeypatch.setattr(similarity_numpy.settings, "CLUSTERING_NUMPY_MIN_CANDIDATES", 0)
+    assert not similarity_numpy.enabled()
+    assert not similarity_numpy.use_for(10_000)
@@ -44,6 +44,11 @@ Coverage:
   No AI imports:
     - stability module does not import from app.ai
 
+  Fingerprint windows:
+    - NULL window is treated as "all"
+    - pairs whose window changed are skipped and counted
+    - no pair sharing a window → insufficient_data
+
   Idempotency:
     - same input always produces same output (deterministic)
 """
@@ -120,6 +125,7 @@ def _make_row(
     credential: str | None = _CREDENTIAL_A,
     target: str | None = _TARGET_A,
     computed_at: str = "2026-01-01T00:00:00+00:00",
+    window: str | None = None,
 ) -> dict:
     return {
         "timing_features": timing,
@@ -128,6 +134,7 @@ def _make_row(
         "credential_features": credential,
         "target_features": target,
         "computed_at": computed_at,
+        "fingerprint_window": window,
     }
 
 
@@ -363,6 +370,38 @@ def test_insufficient_explanation_has_reason():
     assert "records_available" in result.explanation
 
 
+# ---------------------------------------------------------------------------
+# Fingerprint windows
+# ---------------------------------------------------------------------------
+
+
+def test_null_window_pairs_with_all():
+    result = compute_campaign_stability([_make_row(), _make_row(window="all")])
+    assert result.pair_count == 1
+    assert result.explanation["window_mismatch_pairs"] == 0
+
+
+def test_window_change_pair_is_skipped():
+    history = [
+        _make_row(),
+        _make_row(),
+        _make_row(timing=_TIMING_B_DRIFT, sequence=_SEQUENCE_B_DRIFT, window="last_events:100"),
+    ]
+    result = compute_campaign_stability(history)
+    assert result.status == _STATUS_OK
+    assert result.pair_count == 1
+    assert result.composite_score == pytest.approx(1.0)
+    assert result.explanation["window_mismatch_pairs"] == 1
+
+
+def test_no_pair_sharing_window_returns_insufficient_data():
+    history = [_make_row(window="all"), _make_row(window="sample:500")]
+    result = compute_campaign_stability(history)
+    assert result.status == _STATUS_INSUFFICIENT
+    assert result.pair_count == 0
+    assert "window" in result.explanation["reason"]
+
+
 # ---------------------------------------------------------------------------
 # as_dict()
 # ---------------------------------------------------------------------------
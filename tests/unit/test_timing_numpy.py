@@ -0,0 +1,120 @@
+"""Unit tests for app/intelligence/timing_numpy.py.
+
+The pure-Python compute_timing_features() (FINGERPRINT_NUMPY_MIN_EVENTS=0) is
+the reference; the NumPy backend must agree with it.  Skipped when NumPy is not
+installed.
+"""
+
+from __future__ import annotations
+
+import random
+from datetime import UTC, datetime, timedelta, timezone
+
+import pytest
+
+from app.core.config import settings
+from app.intelligence import timing_numpy
+from app.intelligence.sequence import compute_timing_features, extract_all_features
+
+np = pytest.importorskip("numpy")
+
+_BASE_TS = datetime(2025, 1, 1, 12, 0, 0, tzinfo=UTC)
+
+
+def _events(n: int, seed: int) -> list[dict]:
+    rng = random.Random(seed)
+    events = []
+    for _ in range(n):
+        offset = rng.choice([0.0, 0.25, 1.5, 40.0, 1801.0, 50000.0]) * rng.randint(0, 200)
+        ts = _BASE_TS + timedelta(seconds=offset)
+        if rng.random() < 0.2:
+            ts = ts.astimezone(timezone(timedelta(hours=-5)))
+        events.append({"ts": ts.isoformat(), "dst_port": 22, "event_type": "auth_failed"})
+    return events
+
+
+def _reference(events: list[dict], monkeypatch) -> dict | None:
+    monkeypatch.setattr(settings, "FINGERPRINT_NUMPY_MIN_EVENTS", 0)
+    return compute_timing_features(events)
+
+
+def _assert_agrees(got: dict | None, ref: dict | None) -> None:
+    if ref is None:
+        assert got is None
+        return
+    # Percentiles and histograms use the same float64 operations: identical.
+    for key in ("p25", "p75", "p95"):
+        assert got["interval"][key] == ref["interval"][key], key
+    assert got["tod_histogram"] == ref["tod_histogram"]
+    assert got["dow_histogram"] == ref["dow_histogram"]
+    # Moments: pairwise vs exact summation, one unit in the last digit at most.
+    for key in ("mean", "stddev"):
+        assert got["interval"][key] == pytest.approx(ref["interval"][key], abs=0.0011), key
+    assert got["burst_cv"] == pytest.approx(ref["burst_cv"], abs=2e-6)
+    if ref["session_duration"] is None:
+        assert got["session_duration"] is None
+    else:
+        for key in ("mean", "stddev"):
+            assert got["session_duration"][key] == pytest.approx(
+                ref["session_duration"][key], abs=0.0011
+            )
+
+
+@pytest.fixture()
+def numpy_always(monkeypatch):
+    monkeypatch.setattr(settings, "FINGERPRINT_NUMPY_MIN_EVENTS", 1)
+
+
+@pytest.mark.parametrize("n,seed", [(2, 1), (3, 2), (50, 3), (1500, 4), (5000, 5)])
+def test_numpy_backend_matches_pure_python(n, seed, monkeypatch):
+    events = _events(n, seed)
+    ref = _reference(events, monkeypatch)
+    sorted_epochs = [
+        datetime.fromisoformat(e["ts"]).timestamp() for e in sorted(events, key=lambda e: e["ts"])
+    ]
+    _assert_agrees(timing_numpy.timing_features_from_epochs(sorted_epochs), ref)
+
+
+def test_numpy_backend_no_intervals_returns_none():
+    # Two events more than a session gap apart: no within-session interval.
+    assert timing_numpy.timing_features_from_epochs([0.0, 3600.0]) is None
+    assert timing_numpy.timing_features_from_epochs([0.0]) is None
+
+
+def test_numpy_backend_values_are_plain_floats():
+    result = timing_numpy.timing_features_from_epochs([0.0, 1.0, 3.0, 10.0])
+    assert type(result["interval"]["mean"]) is float
+    assert all(type(v) is float for v in result["tod_histogram"])
+
+
+def test_compute_timing_features_selects_numpy_above_threshold(monkeypatch):
+    calls: list[int] = []
+    original = timing_numpy.timing_features_from_epochs
+
+    def _spy(sorted_epochs):
+        calls.append(len(sorted_epochs))
+        return original(sorted_epochs)
+
+    monkeypatch.setattr(timing_numpy, "timing_features_from_epochs", _spy)
+    monkeypatch.setattr(settings, "FINGERPRINT_NUMPY_MIN_EVENTS", 100)
+    compute_timing_features(_events(99, 6))
+    assert calls == []
+    compute_timing_features(_events(100, 6))
+    extract_all_features(_events(150, 6))
+    assert calls == [100, 150]
+
+
+def test_extract_all_features_numpy_timing_agrees(numpy_always, monkeypatch):
+    events = _events(800, 7)
+    got = extract_all_features(events)["timing_features"]
+    _assert_agrees(got, _reference(events, monkeypatch))
+
+
+def test_falls_back_to_pure_python_without_numpy(monkeypatch):
+    monkeypatch.setattr(timing_numpy, "available", lambda: False)
+    monkeypatch.setattr(settings, "FINGERPRINT_NUMPY_MIN_EVENTS", 1)
+    monkeypatch.setattr(
+        timing_numpy, "timing_features_from_epochs", lambda e: pytest.fail("numpy used")
+    )
+    events = _events(30, 8)
+    assert compute_timing_features(events) is not None